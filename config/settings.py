@@ -16,6 +16,7 @@ class APISettings:
 class BettingSettings:
     BET365_ID = 8
     PINNACLE_ID = 4
+    MIN_VALUE = 1.05  # Seuil prob × cote pour considérer une value bet
 
 class Settings:
     API = APISettings()
@@ -1,117 +1,170 @@
 #!/usr/bin/env python3
 """
-Script principal pour lancer le Football Clone Detector
+Script principal : pipeline quotidien in-process (un seul interpréteur, une base, un client HTTP).
+
+Étapes (dépendances déduites des tables lues / écrites, cf. src/services/pipeline.py) :
+  fetch_today → build_elo_history | fit_goal_model | build_h2h | build_form_features (en parallèle)
+              → generate_predictions → settle_bets → export_predictions → compact_odds
+Une étape dont les entrées n'ont pas changé depuis son dernier succès est sautée.
+
+Usage:
+  python -u run.py                                  # pipeline incrémental complet
+  python -u run.py --force                          # ignore les empreintes
+  python -u run.py --only build_h2h,build_form_features
+  python -u run.py --skip fetch_today
+  python -u run.py --list                           # état des étapes
+  python -u run.py --metrics-json reports/metrics.json   # + rapport des durées / compteurs
+  python -u run.py --serve                          # pipeline puis interface Streamlit
 """
 
 import sys
 import os
-from datetime import datetime
+import argparse
+from datetime import datetime, timezone
 
 # Ajouter le répertoire racine du projet au path pour résoudre les imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.api.football_api import FootballAPI
-from src.services.clone_detector import clone_detector
-from src.services.elo_system import elo_system
-from src.services.odds_analyzer import odds_analyzer
 from src.models.database import db
+from src.services.pipeline import Pipeline, Stage, today_watermark
+from src.utils.metrics import metrics
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Étapes : les scripts sont importés à la demande et appelés in-process
+# ──────────────────────────────────────────────────────────────────────────────
+
+def run_fetch_today():
+    from scripts import fetch_today
+    return fetch_today.main()
+
+def run_build_elo_history():
+    from scripts import build_elo_history
+    return build_elo_history.main()
+
+def run_fit_goal_model():
+    from scripts import fit_goal_model
+    return fit_goal_model.main([])
+
+def run_build_h2h():
+    from scripts import build_h2h
+    return build_h2h.main([])
+
+def run_build_form_features():
+    from scripts import build_form_features
+    return build_form_features.main([])
+
+def run_generate_predictions():
+    from scripts import generate_predictions
+    return generate_predictions.main([])
+
+def run_settle_bets():
+    from scripts import settle_bets
+    return settle_bets.main()
+
+def run_compact_odds():
+    from scripts import compact_odds
+    return compact_odds.main([])
+
+def run_export_predictions():
+    from scripts import export_predictions
+    export_predictions.main(["--days", "1"])
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    if not os.path.exists(os.path.join(export_predictions.OUT_DIR, f"{today}.csv")):
+        print("⚠️ Pas de prédictions pour aujourd'hui, export des 7 derniers jours...")
+        export_predictions.main(["--days", "7"])
+
+STAGES = [
+    Stage("fetch_today", run_fetch_today,
+          outputs=("matches", "teams", "team_aliases"), always=True,
+          description="Matchs du jour (API-Football)"),
+    Stage("build_elo_history", run_build_elo_history,
+          inputs=("matches", "elo_config", "elo_league_params"), outputs=("match_elo", "team_stats"),
+          description="Historique ELO"),
+    Stage("fit_goal_model", run_fit_goal_model,
+          inputs=("matches",), outputs=("goal_model_leagues", "goal_model_teams"),
+          watermark=today_watermark, description="Modèle de buts Poisson / Dixon-Coles par ligue"),
+    Stage("build_h2h", run_build_h2h,
+          inputs=("matches",), outputs=("h2h_summary",),
+          description="Index des confrontations directes"),
+    Stage("build_form_features", run_build_form_features,
+          inputs=("matches",), outputs=("team_form_features",),
+          description="Forme glissante par équipe"),
+    Stage("generate_predictions", run_generate_predictions,
+          inputs=("matches", "odds", "ou25_odds", "btts_odds", "team_stats", "goal_model_leagues", "goal_model_teams"),
+          outputs=("predictions", "prediction_matrix", "method_stats"),
+          watermark=today_watermark, description="Prédictions du jour"),
+    Stage("settle_bets", run_settle_bets,
+          inputs=("matches", "predictions"), outputs=("settled_bets", "bet_daily_stats"),
+          description="Règlement des paris"),
+    Stage("export_predictions", run_export_predictions,
+          inputs=("predictions",), watermark=today_watermark,
+          description="Export CSV/JSON"),
+    Stage("compact_odds", run_compact_odds,
+          inputs=("odds_snapshots",), watermark=today_watermark,
+          description="Sous-échantillonnage de l'historique des cotes"),
+]
+
+def print_state(pipeline: Pipeline):
+    state = pipeline.load_state()
+    deps = pipeline.dependencies()
+    print(f"{'Étape':<22} {'Statut':<8} {'Dernier passage':<20} {'Durée':>7}  Dépend de")
+    print("-" * 90)
+    for name, stage in pipeline.stages.items():
+        s = state.get(name, {})
+        duration = f"{s['duration_s']:.1f}s" if s.get("duration_s") is not None else "-"
+        print(f"{name:<22} {s.get('status') or '-':<8} {s.get('finished_at') or '-':<20} {duration:>7}  "
+              f"{', '.join(sorted(deps[name])) or '-'}")
 
 def main():
     """Fonction principale"""
-    print("🎯 Football Clone Detector")
+    parser = argparse.ArgumentParser(description="Pipeline quotidien (ingestion → prédictions → export)")
+    parser.add_argument("--only", default="", help="Étapes à exécuter (séparées par des virgules).")
+    parser.add_argument("--skip", default="", help="Étapes à ignorer (séparées par des virgules).")
+    parser.add_argument("--force", action="store_true", help="Exécute même si les entrées n'ont pas changé.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PIPELINE_WORKERS", "4")),
+                        help="Étapes indépendantes exécutées en parallèle.")
+    parser.add_argument("--list", action="store_true", help="Affiche l'état des étapes et quitte.")
+    parser.add_argument("--metrics-json", default="", help="Écrit le rapport des métriques par étape (JSON).")
+    parser.add_argument("--serve", action="store_true", help="Lance l'interface Streamlit après le pipeline.")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(STAGES, max_workers=args.workers)
+    if args.list:
+        print_state(pipeline)
+        return 0
+
+    print("🎯 Football Prediction Pipeline")
     print("=" * 50)
+    print(f"📅 {datetime.now().strftime('%d/%m/%Y %H:%M')}")
 
-    # Initialiser l'API
-    api = FootballAPI()
-
-    print(f"📅 Date d'aujourd'hui: {datetime.now().strftime('%d/%m/%Y')}")
+    only = [s.strip() for s in args.only.split(",") if s.strip()]
+    skip = [s.strip() for s in args.skip.split(",") if s.strip()]
 
+    db.enable_pool()
     try:
-        # 1. Récupérer les matchs du jour
-        print("\n1️⃣ Récupération des matchs du jour...")
-        today_fixtures = api.get_today_fixtures()
-        print(f"   ✅ {len(today_fixtures)} matchs trouvés")
-
-        # 2. Traiter chaque match
-        print("\n2️⃣ Traitement des matchs...")
-        processed_matches = 0
-
-        for fixture in today_fixtures:
-            try:
-                fixture_id = fixture['fixture']['id']
-
-                # Stocker le match en base
-                store_match_data(fixture)
-
-                # Récupérer et stocker les côtes
-                odds_data = api.get_odds(fixture_id)
-                if odds_data:
-                    odds_analyzer.store_odds(fixture_id, odds_data)
-
-                processed_matches += 1
-                print(f"   ✅ Match {processed_matches}/{len(today_fixtures)} traité")
-
-            except Exception as e:
-                print(f"   ❌ Erreur traitement match {fixture_id}: {e}")
-
-        # 3. Détecter les clones
-        print("\n3️⃣ Détection des clones...")
-        clones = clone_detector.detect_daily_clones()
-        print(f"   ✅ {len(clones)} paires de clones détectées")
-
-        if clones:
-            print("\n🔍 CLONES DÉTECTÉS:")
-            for i, clone in enumerate(clones, 1):
-                match1 = clone['match1']
-                match2 = clone['match2']
-                similarity = clone['similarity_score']
-
-                print(f"\n   Clone {i}: Similarité {similarity:.1%}")
-                print(f"   📍 {match1['home_team']} vs {match1['away_team']}")
-                print(f"   📍 {match2['home_team']} vs {match2['away_team']}")
-                print(f"   💡 {clone['recommendation']}")
-
-        # 4. Lancer Streamlit
-        print("\n4️⃣ Lancement de l'interface Streamlit...")
-        print("   🌐 Accédez à: http://localhost:8501")
-        print("   ⌨️  Ctrl+C pour arrêter")
-
-        os.system("streamlit run streamlit_app/main.py")
-
+        reports = pipeline.run(only=only or None, skip=skip, force=args.force)
     except KeyboardInterrupt:
         print("\n\n👋 Arrêt demandé par l'utilisateur")
-    except Exception as e:
-        print(f"\n❌ Erreur critique: {e}")
         return 1
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close_pool()
+
+    print("\n📊 RÉSUMÉ")
+    print("-" * 50)
+    for r in reports:
+        print(f"  {r['stage']:<22} {r['status']:<8} {r['duration_s']:6.1f}s  {r['message']}")
+    failed = [r for r in reports if r["status"] in ("failed", "blocked")]
+    if args.metrics_json:
+        print(f"\n⏱️ Métriques: {metrics.write_report(args.metrics_json)}")
+
+    if args.serve:
+        print("\n🌐 Lancement de l'interface Streamlit: http://localhost:8501")
+        os.system("streamlit run streamlit_app/main.py")
 
-    return 0
-
-def store_match_data(fixture_data):
-    """Stocke les données de match en base"""
-    fixture = fixture_data['fixture']
-    teams = fixture_data['teams']
-
-    # Stocker les équipes
-    for team_type in ['home', 'away']:
-        team = teams[team_type]
-        with db.get_connection() as conn:
-            conn.execute(
-                """INSERT OR IGNORE INTO teams (id, name, logo, league_id)
-                   VALUES (?, ?, ?, ?)""",
-                (team['id'], team['name'], team.get('logo'), fixture['league']['id'])
-            )
-            conn.commit()
-
-    # Stocker le match
-    with db.get_connection() as conn:
-        conn.execute(
-            """INSERT OR REPLACE INTO matches
-               (fixture_id, home_team_id, away_team_id, league_id, match_date, status)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (fixture['id'], teams['home']['id'], teams['away']['id'],
-             fixture['league']['id'], fixture['date'], fixture['status']['short'])
-        )
-        conn.commit()
+    return 1 if failed else 0
 
 if __name__ == "__main__":
     exit(main())
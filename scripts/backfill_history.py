@@ -4,7 +4,10 @@ Backfill historique DIAGNOSTIC:
 - Récupère fixtures + scores + cotes (1X2, O/U 2.5, BTTS) sur N jours passés,
 - Ligues depuis config/leagues.py (ALLOWED_LEAGUES). Si aucune ligue trouvée, prend TOUTES les ligues,
 - Affiche pour chaque appel: BASE_URL, headers, params, nb fixtures bruts, gardés, cotes.
-- Remplit: teams, matches (scores), odds, ou25_odds, btts_odds.
+- Remplit: teams, matches (scores), odds, ou25_odds, btts_odds (dernière cote) et odds_snapshots
+  (historique, captures inchangées ignorées).
+- Payloads lus en flux (src/api/json_stream.py) : fixtures un par un, cotes bookmaker par bookmaker
+  en ne gardant que les 3 marchés ; écritures par lots (executemany + commit tous les WRITE_BATCH).
 
 Usage (GitHub Actions ou local):
   HISTORY_DAYS=365 python -u scripts/backfill_history.py
@@ -18,6 +21,11 @@ from typing import Dict, Any, List, Optional, Tuple
 
 from config.settings import Settings
 from src.models.database import db
+from src.api.http_client import http_session
+from src.api.json_stream import JSONStream, stream_items
+from src.services.odds_parser import BookmakerOdds, STORED_MARKETS, parse_bookmakers, parse_odds_payload
+from src.services.odds_history import odds_history, snapshot_rows
+from src.utils.metrics import metrics
 
 BASE_URL = Settings.API.BASE_URL.rstrip("/")
 HEADERS = {
@@ -25,6 +33,8 @@ HEADERS = {
     "X-RapidAPI-Key": Settings.API.API_KEY,
     "X-RapidAPI-Host": Settings.API.HOST,
 }
+# Fixtures par lot d'écriture (executemany des cotes + commit)
+WRITE_BATCH = int(os.getenv("BACKFILL_WRITE_BATCH", "200"))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Utils config
@@ -51,12 +61,13 @@ def days_to_backfill() -> int:
 # HTTP client (avec logs détaillés, pagination, backoff 429)
 # ──────────────────────────────────────────────────────────────────────────────
 
+@metrics.timed()
 def http_get(path: str, params: Dict[str, Any], retries: int = 5, backoff: float = 1.4) -> Optional[Dict[str, Any]]:
     url = f"{BASE_URL}/{path.lstrip('/')}"
     for i in range(retries):
         try:
             print(f"[GET] {url} params={params} attempt={i+1}", flush=True)
-            r = requests.get(url, headers=HEADERS, params=params, timeout=25)
+            r = http_session.get(url, headers=HEADERS, params=params, timeout=25)
             if r.status_code == 429:
                 print("[RATE-LIMIT] 429 reçu → backoff", flush=True)
                 time.sleep(backoff**i + 0.25)
@@ -69,6 +80,28 @@ def http_get(path: str, params: Dict[str, Any], retries: int = 5, backoff: float
     print(f"[ERROR] GET abandonné après {retries} tentatives → {url} {params}", flush=True)
     return None
 
+@metrics.timed()
+def http_stream(path: str, params: Dict[str, Any], item_path: str = "response.item",
+                retries: int = 5, backoff: float = 1.4) -> Optional[JSONStream]:
+    """Comme http_get, mais le corps est lu en flux : éléments de `item_path` un par un."""
+    url = f"{BASE_URL}/{path.lstrip('/')}"
+    for i in range(retries):
+        try:
+            print(f"[GET] {url} params={params} attempt={i+1} (stream)", flush=True)
+            r = http_session.get(url, headers=HEADERS, params=params, timeout=25, stream=True)
+            if r.status_code == 429:
+                r.close()
+                print("[RATE-LIMIT] 429 reçu → backoff", flush=True)
+                time.sleep(backoff**i + 0.25)
+                continue
+            r.raise_for_status()
+            return stream_items(r, item_path)
+        except requests.RequestException as e:
+            print(f"[WARN] GET failed: {e} (attempt {i+1})", flush=True)
+            time.sleep(backoff**i + 0.25)
+    print(f"[ERROR] GET abandonné après {retries} tentatives → {url} {params}", flush=True)
+    return None
+
 # ──────────────────────────────────────────────────────────────────────────────
 # DB upserts
 # ──────────────────────────────────────────────────────────────────────────────
@@ -85,6 +118,7 @@ def upsert_team(conn, team: Dict[str, Any], league_id: Optional[int]):
         (tid, name, league_id),
     )
 
+@metrics.timed()
 def upsert_match(conn, fx: Dict[str, Any]):
     fixture = fx.get("fixture") or {}
     league  = fx.get("league") or {}
@@ -105,98 +139,86 @@ def upsert_match(conn, fx: Dict[str, Any]):
     if home_id: upsert_team(conn, home, league_id)
     if away_id: upsert_team(conn, away, league_id)
 
-    conn.execute(
-        """INSERT INTO matches (fixture_id, league_id, date, status_short, home_team_id, away_team_id, goals_home, goals_away)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-           ON CONFLICT(fixture_id) DO UPDATE SET
-             league_id=excluded.league_id,
-             date=excluded.date,
-             status_short=excluded.status_short,
-             home_team_id=excluded.home_team_id,
-             away_team_id=excluded.away_team_id,
-             goals_home=COALESCE(excluded.goals_home, matches.goals_home),
-             goals_away=COALESCE(excluded.goals_away, matches.goals_away)""",
-        (fid, league_id, date_iso, status, home_id, away_id, gh, ga),
+    # matches.fixture_id n'est pas UNIQUE (index simple) : UPDATE puis INSERT si absent
+    cur = conn.execute(
+        """UPDATE matches SET
+             league_id=?, date=?, status_short=?, home_team_id=?, away_team_id=?,
+             goals_home=COALESCE(?, goals_home), goals_away=COALESCE(?, goals_away)
+           WHERE fixture_id=?""",
+        (league_id, date_iso, status, home_id, away_id, gh, ga, str(fid)),
     )
+    if cur.rowcount == 0:
+        conn.execute(
+            """INSERT INTO matches (fixture_id, league_id, date, status_short, home_team_id, away_team_id, goals_home, goals_away)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (str(fid), league_id, date_iso, status, home_id, away_id, gh, ga),
+        )
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Odds parsing (1X2 / OU2.5 / BTTS) + stockage
+# Odds parsing (1X2 / OU2.5 / BTTS) + stockage par lots
 # ──────────────────────────────────────────────────────────────────────────────
 
-def parse_markets(odds_payload: Dict[str, Any]):
-    """Retourne {bm_id: {'name':..., '1x2':(oh,od,oa), 'ou25':(over,under), 'btts':(yes,no)}}"""
-    out = {}
-    resp = odds_payload.get("response") or []
-    if not resp: return out
-    block = resp[0]
-    for bm in block.get("bookmakers", []) or []:
-        bm_id = int(bm.get("id")); bm_name = (bm.get("name") or "")
-        oh=od=oa=None; over25=under25=None; yes=no=None
-        for bet in bm.get("bets", []) or []:
-            name = (bet.get("name") or "").lower()
-            values = bet.get("values", []) or []
-            # 1X2
-            if "winner" in name or "1x2" in name:
-                for v in values:
-                    val = (v.get("value") or "").lower()
-                    try: odd = float(v.get("odd"))
-                    except (TypeError, ValueError): odd = None
-                    if "home" in val or val == "1": oh = odd
-                    elif "draw" in val or val == "x": od = odd
-                    elif "away" in val or val == "2": oa = odd
-            # Over/Under 2.5
-            if "over/under" in name or "goals over/under" in name:
-                for v in values:
-                    val = (v.get("value") or "").lower()  # "Over 2.5"
-                    try: odd = float(v.get("odd"))
-                    except (TypeError, ValueError): odd = None
-                    if "2.5" in val:
-                        if "over" in val:  over25 = odd
-                        if "under" in val: under25 = odd
-            # BTTS
-            if "both teams to score" in name or "btts" in name:
-                for v in values:
-                    val = (v.get("value") or "").lower()  # "Yes"/"No"
-                    try: odd = float(v.get("odd"))
-                    except (TypeError, ValueError): odd = None
-                    if "yes" in val: yes = odd
-                    if "no" in val:  no  = odd
-        out[bm_id] = {"name": bm_name, "1x2": (oh,od,oa), "ou25": (over25, under25), "btts": (yes, no)}
-    return out
-
-def store_markets(conn, fixture_id: int, mkts: dict):
-    for bm_id, d in mkts.items():
-        bm_name = d["name"]
-        oh, od, oa = d["1x2"]
-        if oh and od and oa:
-            conn.execute(
+@metrics.timed()
+def parse_markets(odds_payload: Dict[str, Any]) -> List[BookmakerOdds]:
+    """Bookmakers d'un payload /odds, limités aux marchés stockés (src/services/odds_parser.py)."""
+    return parse_odds_payload(odds_payload, STORED_MARKETS)
+
+class MarketWriter:
+    """Cotes en attente d'écriture : un executemany par table et par lot de fixtures."""
+
+    def __init__(self, conn, batch_size: int = WRITE_BATCH):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pending = 0
+        self.odds, self.ou25, self.btts, self.snapshots = [], [], [], []
+
+    def add(self, fixture_id: int, books: List[BookmakerOdds]):
+        for b in books:
+            if b.has_1x2():
+                self.odds.append((fixture_id, b.id, b.name, b.home, b.draw, b.away))
+            over25, under25 = b.ou25
+            if over25 and under25:
+                self.ou25.append((fixture_id, b.id, b.name, over25, under25))
+            if b.btts_yes and b.btts_no:
+                self.btts.append((fixture_id, b.id, b.name, b.btts_yes, b.btts_no))
+        self.snapshots.extend(snapshot_rows(fixture_id, books))
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    @metrics.timed("store_markets")
+    def flush(self):
+        if self.odds:
+            self.conn.executemany(
                 """INSERT INTO odds (fixture_id, bookmaker_id, bookmaker_name, home_odd, draw_odd, away_odd)
                    VALUES (?, ?, ?, ?, ?, ?)
                    ON CONFLICT(fixture_id, bookmaker_id) DO UPDATE SET
                      bookmaker_name=excluded.bookmaker_name,
                      home_odd=excluded.home_odd, draw_odd=excluded.draw_odd, away_odd=excluded.away_odd""",
-                (fixture_id, bm_id, bm_name, oh, od, oa),
+                self.odds,
             )
-        over25, under25 = d["ou25"]
-        if over25 and under25:
-            conn.execute(
+        if self.ou25:
+            self.conn.executemany(
                 """INSERT INTO ou25_odds (fixture_id, bookmaker_id, bookmaker_name, over25_odd, under25_odd)
                    VALUES (?, ?, ?, ?, ?)
                    ON CONFLICT(fixture_id, bookmaker_id) DO UPDATE SET
                      bookmaker_name=excluded.bookmaker_name,
                      over25_odd=excluded.over25_odd, under25_odd=excluded.under25_odd""",
-                (fixture_id, bm_id, bm_name, over25, under25),
+                self.ou25,
             )
-        yes, no = d["btts"]
-        if yes and no:
-            conn.execute(
+        if self.btts:
+            self.conn.executemany(
                 """INSERT INTO btts_odds (fixture_id, bookmaker_id, bookmaker_name, yes_odd, no_odd)
                    VALUES (?, ?, ?, ?, ?)
                    ON CONFLICT(fixture_id, bookmaker_id) DO UPDATE SET
                      bookmaker_name=excluded.bookmaker_name,
                      yes_odd=excluded.yes_odd, no_odd=excluded.no_odd""",
-                (fixture_id, bm_id, bm_name, yes, no),
+                self.btts,
             )
+        odds_history.record(self.conn, self.snapshots)
+        self.conn.commit()
+        self.pending = 0
+        self.odds, self.ou25, self.btts, self.snapshots = [], [], [], []
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Backfill d'une date (avec DIAGNOSTIC)
@@ -214,65 +236,52 @@ def fetch_and_store_date(date_str: str, league_ids: Optional[List[int]]) -> Tupl
     odds_written = 0
 
     with db.get_connection() as conn:
+        writer = MarketWriter(conn)
         # Aucun filtre ligue → un seul appel paginé: /fixtures?date=YYYY-MM-DD
-        if not league_ids:
+        # Filtré par ligues → une requête par ligue (chacune paginée si besoin)
+        for lg in (league_ids or [None]):
             page = 1
             total_pages = 1
             while page <= total_pages:
                 params = {"date": date_str, "page": page}
-                print(f"[DEBUG] fixtures call (NO LEAGUE FILTER) params={params}", flush=True)
-                data = http_get("fixtures", params)
-                if not data or "response" not in data:
+                if lg is not None:
+                    params["league"] = lg
+                print(f"[DEBUG] fixtures call ({f'LEAGUE={lg}' if lg is not None else 'NO LEAGUE FILTER'}) params={params}", flush=True)
+                stream = http_stream("fixtures", params)
+                if stream is None:
                     break
-                resp = data["response"]
-                raw_total += len(resp)
-                print(f"[DEBUG]   bruts={len(resp)} (page {page})", flush=True)
 
-                for fx in resp:
+                # Fixtures écrits au fil du flux ; seuls les ids sont gardés pour les cotes
+                # (le flux est entièrement lu avant d'enchaîner d'autres requêtes)
+                fixture_ids = []
+                for fx in stream:
                     upsert_match(conn, fx)
-                    kept += 1
-                    fid = int((fx.get("fixture") or {}).get("id"))
-                    odds = http_get("odds", {"fixture": fid})
-                    if odds:
-                        mkts = parse_markets(odds)
-                        if mkts:
-                            store_markets(conn, fid, mkts)
-                            odds_written += 1
-
-                paging = data.get("paging") or {}
+                    fixture_ids.append(int((fx.get("fixture") or {}).get("id")))
+                raw_total += len(fixture_ids)
+                kept += len(fixture_ids)
+                print(f"[DEBUG]   bruts={len(fixture_ids)} (page {page})", flush=True)
+
+                for fid in fixture_ids:
+                    bookmakers = http_stream("odds", {"fixture": fid}, "response.item.bookmakers.item")
+                    if bookmakers is None:
+                        continue
+                    with metrics.timer("parse_markets"):
+                        books = parse_bookmakers(bookmakers, STORED_MARKETS)
+                    if books:
+                        writer.add(fid, books)
+                        odds_written += 1
+
+                paging = stream.meta.get("paging") or {}
                 total_pages = int(paging.get("total", 1) or 1)
                 page += 1
 
-        # Filtré par ligues → une requête par ligue (chacune paginée si besoin)
-        else:
-            for lg in league_ids:
-                page = 1
-                total_pages = 1
-                while page <= total_pages:
-                    params = {"date": date_str, "league": lg, "page": page}
-                    print(f"[DEBUG] fixtures call (LEAGUE={lg}) params={params}", flush=True)
-                    data = http_get("fixtures", params)
-                    if not data or "response" not in data:
-                        break
-                    resp = data["response"]
-                    raw_total += len(resp)
-                    print(f"[DEBUG]   bruts={len(resp)} (page {page})", flush=True)
-
-                    for fx in resp:
-                        upsert_match(conn, fx)
-                        kept += 1
-                        fid = int((fx.get("fixture") or {}).get("id"))
-                        odds = http_get("odds", {"fixture": fid})
-                        if odds:
-                            mkts = parse_markets(odds)
-                            if mkts:
-                                store_markets(conn, fid, mkts)
-                                odds_written += 1
-
-                    paging = data.get("paging") or {}
-                    total_pages = int(paging.get("total", 1) or 1)
-                    page += 1
+        writer.flush()
+        if kept:
+            db.bump_data_version("backfill_history", conn)
+        conn.commit()
 
+    metrics.rows(kept)
+    metrics.count("odds_fixtures", odds_written)
     print(f"[{date_str}] bruts={raw_total} | gardés={kept} | odds={odds_written}", flush=True)
     return raw_total, kept, odds_written
 
@@ -310,4 +319,4 @@ def main():
     print(f"✅ Backfill terminé: bruts={total_raw} | gardés={total_kept} | odds_dates={total_odds}", flush=True)
 
 if __name__ == "__main__":
-    main()
+    metrics.main("backfill_history", main)
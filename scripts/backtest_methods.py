@@ -0,0 +1,275 @@
+# scripts/backtest_methods.py
+"""
+Backtest walk-forward des méthodes ELO, B365, PINNACLE et COMBINED de FootballPredictor.
+
+L'historique est rejoué jour par jour ; pour chaque match du jour D, chaque méthode n'utilise
+que ce qui était connu avant D :
+- ELO : ratings rejoués en mémoire jusqu'à la veille (src/services/elo_replay.py), convertis en
+  probabilités par elo_replay.elo_predictions comme la version live (ratings team_stats par id),
+- B365 / PINNACLE : même estimateur que la version live (src/services/odds_neighbours.py : k plus
+  proches voisins pondérés, rayon adaptatif ≥ seuil) parmi les matchs terminés AVANT D
+  (la version live cherche dans tout l'historique),
+- COMBINED : FootballPredictor.combine avec les poids passés en paramètre.
+Le calcul des voisins est vectorisé (produit matriciel requêtes × historique visible).
+
+Sorties : log-loss, Brier, ROI (paris à value prob × meilleure cote ≥ MIN_VALUE, mise 1)
+par méthode et par saison, et table de calibration (déciles de probabilité).
+
+Usage:
+  python -u scripts/backtest_methods.py
+  python -u scripts/backtest_methods.py --start 2023-08-01 --end 2024-06-30
+  python -u scripts/backtest_methods.py --threshold 0.04 --k-factor 24 --home-adv 80
+  python -u scripts/backtest_methods.py --global-elo          # sans elo_league_params
+  python -u scripts/backtest_methods.py --weights '{"PINNACLE": [0.5, 0.3, 0.1]}' --csv backtests/
+"""
+import os
+import json
+import time
+import argparse
+from datetime import date, timedelta
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.settings import Settings
+from src.models.database import db
+from src.services import elo_replay
+from src.services.odds_neighbours import NeighbourIndex, implied, outcomes
+from src.services.elo_system import load_elo_config, load_league_params
+from scripts.generate_predictions import (
+    BET365_ID, PINNACLE_ID, ODDS_SIMILARITY_THRESHOLD, MIN_SIMILAR_SAMPLES,
+    MAX_SIMILAR_SAMPLES, COMBINE_WEIGHTS, FootballPredictor, PredictionResult,
+)
+
+METHODS = ["ELO", "B365", "PINNACLE", "COMBINED"]
+BOOKMAKERS = {"B365": BET365_ID, "PINNACLE": PINNACLE_ID}
+EPS = 1e-15
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Données
+# ──────────────────────────────────────────────────────────────────────────────
+
+def load_odds(conn) -> pd.DataFrame:
+    """Cotes 1N2 par (fixture, bookmaker)."""
+    return pd.read_sql_query("""
+        SELECT CAST(fixture_id AS TEXT) AS fixture_id, CAST(bookmaker_id AS INTEGER) AS bookmaker_id,
+               home_odd, draw_odd, away_odd
+        FROM odds
+        WHERE home_odd IS NOT NULL AND draw_odd IS NOT NULL AND away_odd IS NOT NULL
+    """, conn)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Méthodes bookmaker : voisins parmi les matchs antérieurs
+# ──────────────────────────────────────────────────────────────────────────────
+
+def bookmaker_predictions(history: pd.DataFrame, odds: pd.DataFrame, bookmaker_id: int,
+                          eval_mask: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pour chaque ligne évaluée de `history` ayant des cotes du bookmaker : probabilités 1N2 des
+    MAX_SIMILAR_SAMPLES plus proches voisins (rayon ≥ threshold, pondérés par la distance) parmi
+    les matchs des jours antérieurs. Retourne (probs n × 3 avec NaN si indisponible, taille
+    d'échantillon effective n, confiance n).
+    """
+    n = len(history)
+    probs = np.full((n, 3), np.nan)
+    samples = np.zeros(n, dtype=int)
+    confidence = np.zeros(n)
+
+    bm = odds[odds["bookmaker_id"] == bookmaker_id].drop_duplicates("fixture_id")
+    joined = history[["fixture_id", "day", "result", "gh", "ga"]].reset_index().merge(bm, on="fixture_id")
+    if joined.empty:
+        return probs, samples, confidence
+    joined = joined.sort_values(["day", "index"], kind="mergesort")
+
+    rows = joined["index"].to_numpy()
+    days = joined["day"].to_numpy()
+    points = implied(joined[["home_odd", "draw_odd", "away_odd"]].to_numpy())
+    index = NeighbourIndex(points, outcomes(joined["gh"].to_numpy(), joined["ga"].to_numpy())[:, :3])
+
+    query = np.flatnonzero(eval_mask[rows])
+    if len(query) == 0:
+        return probs, samples, confidence
+    # Historique visible pour un jour D : préfixe des lignes de jours < D
+    visible = np.searchsorted(days, days[query], side="left")
+    found = index.query(points[query], k=MAX_SIMILAR_SAMPLES, min_radius=threshold,
+                        min_samples=MIN_SIMILAR_SAMPLES, visible=visible)
+
+    ok = ~np.isnan(found["estimates"][:, 0])
+    target = rows[query[ok]]
+    probs[target] = found["estimates"][ok]
+    samples[target] = np.rint(found["effective"][ok]).astype(int)
+    confidence[target] = found["confidence"][ok]
+    return probs, samples, confidence
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Backtest
+# ──────────────────────────────────────────────────────────────────────────────
+
+def run_backtest(history: pd.DataFrame, odds: pd.DataFrame, start: str, end: str,
+                 threshold: float = ODDS_SIMILARITY_THRESHOLD, elo_params: Dict = None,
+                 weights: Dict = None, league_params: Dict = None) -> pd.DataFrame:
+    """
+    Une ligne par (match évalué, méthode) : probabilités, résultat et meilleure cote par issue.
+    elo_params : k_factor, home_advantage, draw_base, draw_width (cf. elo_config).
+    league_params : paramètres ELO par ligue (cf. elo_league_params), optionnels.
+    """
+    eval_mask = ((history["day"] >= start) & (history["day"] <= end)).to_numpy()
+
+    elo_params = elo_params or {}
+    elo = elo_replay.replay(history, **elo_params, league_params=league_params)
+    # Ratings d'avant-match (mêmes clés canoniques que team_stats) -> même calcul que predict_elo en live
+    elo_probs, elo_conf = elo_replay.elo_predictions(elo["home_pre"], elo["away_pre"], history["league"].tolist(),
+                                                     elo_params, league_params)
+    preds = {"ELO": elo_probs}
+
+    conf, sizes = {"ELO": elo_conf}, {"ELO": np.zeros(len(history), dtype=int)}
+    for method, bm_id in BOOKMAKERS.items():
+        preds[method], sizes[method], conf[method] = bookmaker_predictions(history, odds, bm_id, eval_mask, threshold)
+
+    # COMBINED : même fonction que la version live, appliquée ligne à ligne (peu coûteux)
+    combined = np.full((len(history), 3), np.nan)
+    for i in np.flatnonzero(eval_mask):
+        parts = {}
+        for method in ("ELO", "B365", "PINNACLE"):
+            p = preds[method][i]
+            if not np.isnan(p[0]):
+                parts[method] = PredictionResult(*p, confidence=float(conf[method][i]), sample_size=int(sizes[method][i]))
+        res = FootballPredictor.combine(parts["ELO"], parts.get("B365"), parts.get("PINNACLE"), weights=weights)
+        combined[i] = (res.home_prob, res.draw_prob, res.away_prob)
+    preds["COMBINED"] = combined
+
+    # Meilleure cote par issue (comme store_prediction / get_best_odds)
+    best = odds.groupby("fixture_id")[["home_odd", "draw_odd", "away_odd"]].max()
+    best = best.reindex(history["fixture_id"]).to_numpy()
+
+    idx = np.flatnonzero(eval_mask)
+    frames = []
+    for method in METHODS:
+        p = preds[method][idx]
+        frames.append(pd.DataFrame({
+            "fixture_id": history["fixture_id"].to_numpy()[idx],
+            "day": history["day"].to_numpy()[idx],
+            "season": history["season"].to_numpy()[idx],
+            "method": method,
+            "p_home": p[:, 0], "p_draw": p[:, 1], "p_away": p[:, 2],
+            "result": history["result"].to_numpy()[idx],
+            "odd_home": best[idx, 0], "odd_draw": best[idx, 1], "odd_away": best[idx, 2],
+        }))
+    out = pd.concat(frames, ignore_index=True)
+    return out.dropna(subset=["p_home"])
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Métriques
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _arrays(df: pd.DataFrame):
+    probs = df[["p_home", "p_draw", "p_away"]].to_numpy()
+    onehot = np.eye(3)[df["result"].to_numpy()]
+    odds = df[["odd_home", "odd_draw", "odd_away"]].to_numpy()
+    return probs, onehot, odds
+
+def score(df: pd.DataFrame, min_value: float = Settings.BETTING.MIN_VALUE) -> pd.Series:
+    probs, onehot, odds = _arrays(df)
+    p_true = np.clip((probs * onehot).sum(axis=1), EPS, 1.0)
+    bets = (probs * np.nan_to_num(odds) >= min_value) & (odds > 1.0)
+    pnl = np.where(onehot > 0, np.nan_to_num(odds) - 1.0, -1.0)[bets]
+    return pd.Series({
+        "matches": len(df),
+        "log_loss": float(-np.log(p_true).mean()),
+        "brier": float(((probs - onehot) ** 2).sum(axis=1).mean()),
+        "accuracy": float((probs.argmax(axis=1) == df["result"].to_numpy()).mean()),
+        "bets": int(bets.sum()),
+        "units": float(pnl.sum()),
+        "roi": float(pnl.mean()) if len(pnl) else float("nan"),
+    })
+
+def summarize(results: pd.DataFrame, by=("method",)) -> pd.DataFrame:
+    return results.groupby(list(by), sort=False, dropna=False).apply(score).reset_index()
+
+def calibration(results: pd.DataFrame, bins: int = 10) -> pd.DataFrame:
+    """Toutes issues confondues : probabilité moyenne prédite vs fréquence observée par tranche."""
+    frames = []
+    for method, df in results.groupby("method", sort=False):
+        probs, onehot, _ = _arrays(df)
+        p, y = probs.ravel(), onehot.ravel()
+        bucket = np.minimum((p * bins).astype(int), bins - 1)
+        agg = pd.DataFrame({"bucket": bucket, "p": p, "y": y}).groupby("bucket").agg(
+            n=("p", "size"), predicted=("p", "mean"), observed=("y", "mean"))
+        agg.insert(0, "method", method)
+        agg.insert(1, "range", [f"{b / bins:.1f}-{(b + 1) / bins:.1f}" for b in agg.index])
+        frames.append(agg.reset_index(drop=True))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of prediction methods")
+    parser.add_argument("--start", help="Premier jour évalué (YYYY-MM-DD). Défaut: 90 jours après le début de l'historique.")
+    parser.add_argument("--end", help="Dernier jour évalué (YYYY-MM-DD). Défaut: dernier jour avec résultat.")
+    parser.add_argument("--threshold", type=float, default=ODDS_SIMILARITY_THRESHOLD, help="Seuil de similarité des cotes.")
+    parser.add_argument("--k-factor", type=float, help="K de l'ELO (défaut: elo_config).")
+    parser.add_argument("--home-adv", type=float, help="Avantage du terrain ELO (défaut: elo_config).")
+    parser.add_argument("--global-elo", action="store_true", help="Ignore les paramètres ELO par ligue (elo_league_params).")
+    parser.add_argument("--weights", default="", help='Poids COMBINED (JSON), ex. \'{"ELO": [0.4, 0.2, 0.0]}\'.')
+    parser.add_argument("--csv", default="", help="Dossier où écrire summary.csv / by_season.csv / calibration.csv.")
+    args = parser.parse_args(argv)
+
+    weights = dict(COMBINE_WEIGHTS)
+    if args.weights:
+        weights.update({k: tuple(v) for k, v in json.loads(args.weights).items()})
+
+    t0 = time.perf_counter()
+    with db.get_connection() as conn:
+        history = elo_replay.load_history(conn)
+        odds = load_odds(conn)
+        elo_params = load_elo_config(conn)
+        league_params = {} if args.global_elo else load_league_params(conn)
+    if args.k_factor is not None:
+        elo_params["k_factor"] = args.k_factor
+    if args.home_adv is not None:
+        elo_params["home_advantage"] = args.home_adv
+    if history.empty:
+        print("❌ Aucun match terminé en base.")
+        return 1
+
+    start = args.start or (date.fromisoformat(history["day"].iloc[0]) + timedelta(days=90)).isoformat()
+    end = args.end or history["day"].iloc[-1]
+    print(f"📚 {len(history):,} matchs terminés, {len(odds):,} lignes de cotes ({time.perf_counter() - t0:.1f}s)")
+    print(f"🗓️ Période évaluée: {start} → {end} | seuil={args.threshold} "
+          f"K={elo_params['k_factor']} HA={elo_params['home_advantage']} "
+          f"nul={elo_params['draw_base']}/{elo_params['draw_width']} | {len(league_params)} ligues paramétrées")
+
+    results = run_backtest(history, odds, start, end, threshold=args.threshold,
+                           elo_params=elo_params, weights=weights, league_params=league_params)
+    if results.empty:
+        print("⚠️ Aucun match dans la période évaluée.")
+        return 1
+
+    summary = summarize(results)
+    by_season = summarize(results, by=("method", "season"))
+    calib = calibration(results)
+
+    pd.set_option("display.width", 160)
+    print("\n📊 Résumé par méthode")
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    if by_season["season"].nunique() > 1:
+        print("\n📅 Par saison")
+        print(by_season.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print("\n🎯 Calibration")
+    print(calib.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    if args.csv:
+        os.makedirs(args.csv, exist_ok=True)
+        summary.to_csv(os.path.join(args.csv, "summary.csv"), index=False)
+        by_season.to_csv(os.path.join(args.csv, "by_season.csv"), index=False)
+        calib.to_csv(os.path.join(args.csv, "calibration.csv"), index=False)
+        print(f"\n💾 Tables écrites dans {args.csv}")
+
+    print(f"\n⏱️ Backtest terminé en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
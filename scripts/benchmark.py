@@ -0,0 +1,257 @@
+# scripts/benchmark.py
+"""
+Banc de mesure du pipeline sur données synthétiques (scripts/synthetic_data.py), à plusieurs échelles.
+
+Pour chaque échelle : base neuve générée dans --workdir, puis chaque cible est exécutée --repeat fois
+(sorties des scripts masquées) et mesurée avec src/utils/metrics.py (durée, requêtes et temps SQLite,
+lignes). Les résultats sont ajoutés à --results (JSON lines) avec le commit git, pour comparer
+d'un commit à l'autre (--compare : dernier commit différent, ou --baseline <hash>).
+
+Cibles (dans l'ordre : chacune s'appuie sur la précédente) :
+  build_elo_history, odds_method_stats, generate_predictions,
+  generate_predictions_incremental (passage sans changement d'entrées après generate_predictions),
+  clone_detector (CloneDetector.get_today_matches_with_predictions),
+  dashboard (chargeurs de la page « Matchs du jour » : ligues, comptage, page + détails)
+
+Usage:
+  python -u scripts/benchmark.py                                   # échelles small,medium
+  python -u scripts/benchmark.py --scales small,medium,large --repeat 5 --compare
+  python -u scripts/benchmark.py --scales 8x10 --targets build_elo_history,generate_predictions
+"""
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.models.database import db
+from src.utils.metrics import metrics
+from scripts.synthetic_data import SyntheticData
+
+# échelle -> (saisons, ligues)
+SCALES = {
+    "small": (2, 2),
+    "medium": (5, 5),
+    "large": (10, 10),
+}
+RESULTS_PATH = os.path.join("benchmarks", "results.jsonl")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cibles
+# ──────────────────────────────────────────────────────────────────────────────
+
+def bench_build_elo_history():
+    from scripts import build_elo_history
+    return build_elo_history.main()
+
+def bench_odds_method_stats():
+    from scripts import odds_method_stats
+    return odds_method_stats.main()
+
+def bench_generate_predictions():
+    from scripts.generate_predictions import FootballPredictor
+    return FootballPredictor(db.path).generate_all_predictions()
+
+def bench_generate_predictions_incremental():
+    from scripts.generate_predictions import FootballPredictor
+    return FootballPredictor(db.path).generate_all_predictions(incremental=True)
+
+def bench_clone_detector():
+    from scripts.detect_clones import CloneDetector
+    return CloneDetector(db.path).get_today_matches_with_predictions()
+
+def bench_dashboard():
+    from src.services.match_queries import match_queries, DEFAULT_PAGE_SIZE
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    for league in [None] + [lg["league"] for lg in match_queries.list_leagues(day)]:
+        match_queries.count_fixtures(day, league)
+        fixtures = match_queries.get_fixtures_page(day, league, 1, DEFAULT_PAGE_SIZE)
+        match_queries.get_page_details([f["fixture_id"] for f in fixtures])
+
+TARGETS: Dict[str, Callable[[], Any]] = {
+    "build_elo_history": bench_build_elo_history,
+    "odds_method_stats": bench_odds_method_stats,
+    "generate_predictions": bench_generate_predictions,
+    "generate_predictions_incremental": bench_generate_predictions_incremental,
+    "clone_detector": bench_clone_detector,
+    "dashboard": bench_dashboard,
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Exécution
+# ──────────────────────────────────────────────────────────────────────────────
+
+def git_revision() -> Tuple[str, bool]:
+    """(commit court, arbre modifié ?) ; 'unknown' hors dépôt git."""
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return rev, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+def parse_scale(raw: str) -> Tuple[int, int]:
+    if raw in SCALES:
+        return SCALES[raw]
+    seasons, _, leagues = raw.partition("x")
+    return int(seasons), int(leagues)
+
+def use_database(path: str):
+    """Redirige l'instance globale `db` (et les caches qui en dépendent) vers une autre base."""
+    from src.services.elo_system import elo_system
+    db.close_pool()
+    db.path = path
+    db._init_db()
+    elo_system.reload_config()
+
+def run_target(name: str, repeat: int, verbose: bool) -> Dict[str, Any]:
+    durations, last = [], {}
+    for _ in range(repeat):
+        sink = None if verbose else io.StringIO()
+        with metrics.stage(f"bench.{name}") as sm:
+            if sink is None:
+                TARGETS[name]()
+            else:
+                with redirect_stdout(sink):
+                    TARGETS[name]()
+        durations.append(sm.duration_s)
+        last = sm.as_dict()
+    return {
+        "target": name,
+        "runs": repeat,
+        "best_s": round(min(durations), 4),
+        "median_s": round(statistics.median(durations), 4),
+        "sql_queries": last["sql_queries"],
+        "sql_time_s": last["sql_time_s"],
+        "rows": last["rows"],
+        "status": "ok",
+    }
+
+def run_scale(label: str, seasons: int, leagues: int, args, workdir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(workdir, f"bench_{seasons}x{leagues}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    use_database(path)
+    t0 = time.perf_counter()
+    counts = SyntheticData(seasons, leagues, args.teams, args.bookmakers, seed=args.seed).write(db)
+    print(f"\n🏗️ Échelle {label} ({seasons} saisons × {leagues} ligues) : {counts['matches']:,} matchs, "
+          f"{counts['odds']:,} cotes 1X2, {counts['today']} matchs du jour ({time.perf_counter() - t0:.1f}s)")
+
+    rows = []
+    for name in args.targets:
+        try:
+            result = run_target(name, args.repeat, args.verbose)
+        except (ImportError, SyntaxError) as e:
+            result = {"target": name, "status": "unavailable", "error": f"{type(e).__name__}: {e}"}
+        except Exception as e:  # une cible cassée ne bloque pas les autres
+            result = {"target": name, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        result.update({"scale": label, "seasons": seasons, "leagues": leagues, "matches": counts["matches"]})
+        rows.append(result)
+        if result["status"] == "ok":
+            print(f"  ⏱️ {name:<22} best {result['best_s']:8.3f}s  median {result['median_s']:8.3f}s  "
+                  f"SQL {result['sql_queries']:>6} req / {result['sql_time_s']:.3f}s")
+        else:
+            print(f"  ⚠️ {name:<22} {result['status']}: {result['error']}")
+    return rows
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Résultats
+# ──────────────────────────────────────────────────────────────────────────────
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_results(path: str, rows: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def compare(rows: List[Dict[str, Any]], history: List[Dict[str, Any]], baseline: Optional[str]):
+    """Écart du temps médian avec la dernière mesure (même échelle, même cible) d'un autre commit."""
+    current = rows[0]["commit"] if rows else None
+    print("\n📈 Comparaison (médiane)")
+    for row in rows:
+        if row["status"] != "ok":
+            continue
+        previous = [h for h in history
+                    if h.get("status") == "ok" and h["scale"] == row["scale"] and h["target"] == row["target"]
+                    and (h["commit"].startswith(baseline) if baseline else h["commit"] != current)]
+        if not previous:
+            print(f"  {row['scale']:<8} {row['target']:<22} pas de référence")
+            continue
+        ref = previous[-1]
+        delta = (row["median_s"] / ref["median_s"] - 1) * 100 if ref["median_s"] else 0.0
+        icon = "🔴" if delta > 10 else ("🟢" if delta < -10 else "⚪")
+        print(f"  {icon} {row['scale']:<8} {row['target']:<22} {ref['median_s']:8.3f}s ({ref['commit']}) → "
+              f"{row['median_s']:8.3f}s  {delta:+6.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction pipeline on synthetic data")
+    parser.add_argument("--scales", default="small,medium",
+                        help=f"Échelles ({', '.join(SCALES)}) ou SAISONSxLIGUES, séparées par des virgules.")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Cibles à mesurer.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--teams", type=int, default=20, help="Équipes par ligue.")
+    parser.add_argument("--bookmakers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default="", help="Dossier des bases générées (temporaire par défaut).")
+    parser.add_argument("--results", default=RESULTS_PATH, help="Fichier JSON lines des résultats.")
+    parser.add_argument("--no-save", action="store_true", help="N'ajoute pas les résultats au fichier.")
+    parser.add_argument("--compare", action="store_true", help="Compare au dernier commit mesuré.")
+    parser.add_argument("--baseline", default="", help="Commit de référence pour --compare.")
+    parser.add_argument("--verbose", action="store_true", help="Affiche la sortie des scripts mesurés.")
+    args = parser.parse_args(argv)
+
+    args.targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        print(f"❌ Cibles inconnues: {', '.join(sorted(unknown))}")
+        return 1
+
+    commit, dirty = git_revision()
+    print(f"🧪 Benchmark @ {commit}{' (modifié)' if dirty else ''} | cibles: {', '.join(args.targets)} | ×{args.repeat}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="football_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    # Les métriques restent en mémoire : les bases de bench sont jetables
+    enabled, metrics.enabled = metrics.enabled, False
+    original_path = db.path
+    rows = []
+    try:
+        for label in [s.strip() for s in args.scales.split(",") if s.strip()]:
+            seasons, leagues = parse_scale(label)
+            rows.extend(run_scale(label, seasons, leagues, args, workdir))
+    finally:
+        metrics.enabled = enabled
+        use_database(original_path)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    for row in rows:
+        row.update({"commit": commit, "dirty": dirty, "measured_at": stamp})
+
+    history = load_results(args.results)
+    if args.compare:
+        compare(rows, history, args.baseline or None)
+    if not args.no_save:
+        append_results(args.results, rows)
+        print(f"\n💾 {len(rows)} mesures ajoutées à {args.results}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
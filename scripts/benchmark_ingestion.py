@@ -0,0 +1,391 @@
+# scripts/benchmark_ingestion.py
+"""
+Banc de mesure de l'ingestion API-Football hors ligne : les scripts update_data, backfill_history
+et fetch_today tournent sur des réponses rejouées (src/api/replay.py) au lieu de RapidAPI.
+
+Corpus : cassettes enregistrées en production (HTTP_RECORD_DIR=… python -u scripts/fetch_today.py)
+ou générées ici au format API-Football (--synthesize) à partir de scripts/synthetic_data.py :
+/fixtures?date=D pour chaque jour, /odds?fixture=ID avec les marchés d'un vrai payload
+(1X2, Over/Under 0.5 → 4.5, BTTS, handicap asiatique, double chance, score exact, plus les marchés
+mi-temps, équipe et pair/impair que l'ingestion ignore).
+
+Le transport rejoué simule la latence (--latency-ms, --jitter-ms) et le rate limit (--rate-429,
+--every-429, --retry-after) : on mesure débit, retries / backoff et effet de --concurrency
+(jours ingérés en parallèle). Chaque passage part d'une base neuve ; résultats ajoutés à --results
+comme scripts/benchmark.py (cible ingest.<script>, --compare pour l'écart avec un autre commit).
+
+Usage:
+  python -u scripts/benchmark_ingestion.py --synthesize --days 14 --leagues 4
+  python -u scripts/benchmark_ingestion.py --cassettes cassettes/ --latency-ms 120 --jitter-ms 60 --concurrency 4
+  python -u scripts/benchmark_ingestion.py --synthesize --every-429 20 --retry-after 1 --targets fetch_today
+"""
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Les scripts d'ingestion lisent la clé au chargement : une valeur factice suffit au rejeu
+os.environ.setdefault("RAPIDAPI_KEY", "replay")
+
+import numpy as np
+
+from src.models.database import db
+from src.api.http_client import get_session, set_session
+from src.api.replay import ReplayAdapter, iter_cassettes, write_cassette, replay_session
+from src.utils.metrics import metrics, COUNTERS
+from scripts.benchmark import use_database, git_revision, load_results, append_results, compare, RESULTS_PATH
+from scripts.synthetic_data import SyntheticData, BOOKMAKERS, BASE_GOALS, HOME_GOALS, MAX_GOALS, to_odds
+
+OU_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+AH_LINES = (-1.5, -0.5, 0.5, 1.5)
+EXACT_SCORES = [(h, a) for h in range(5) for a in range(5)]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Corpus synthétique au format API-Football
+# ──────────────────────────────────────────────────────────────────────────────
+
+def score_grid(lam_h: np.ndarray, lam_a: np.ndarray) -> np.ndarray:
+    """P(buts domicile = i, buts extérieur = j), Poisson indépendant, shape (n, G, G)."""
+    k = np.arange(MAX_GOALS + 1)
+    log_fact = np.cumsum(np.r_[0.0, np.log(k[1:])])
+    ph = np.exp(k * np.log(lam_h[:, None]) - lam_h[:, None] - log_fact)
+    pa = np.exp(k * np.log(lam_a[:, None]) - lam_a[:, None] - log_fact)
+    grid = ph[:, :, None] * pa[:, None, :]
+    return grid / grid.sum(axis=(1, 2), keepdims=True)
+
+def _values(labels: List[str], odds: np.ndarray) -> List[Dict[str, str]]:
+    return [{"value": label, "odd": f"{odd:.2f}"} for label, odd in zip(labels, odds.tolist())]
+
+def bookmaker_bets(lam_h: float, lam_a: float, margin: float) -> List[Dict[str, Any]]:
+    """Marchés d'un bookmaker pour un match (buts attendus déjà bruités), dont des marchés mi-temps
+    et équipe comme dans un vrai payload."""
+    grid = score_grid(np.array([lam_h]), np.array([lam_a]))[0]
+    g = np.arange(grid.shape[0])
+    diff = g[:, None] - g[None, :]
+    total = g[:, None] + g[None, :]
+    home, draw = grid[diff > 0].sum(), grid[diff == 0].sum()
+    away = 1.0 - home - draw
+    bets = [{"id": 1, "name": "Match Winner",
+             "values": _values(["Home", "Draw", "Away"], to_odds(np.array([home, draw, away]), margin))}]
+
+    ou = []
+    for line in OU_LINES:
+        over = grid[total > line].sum()
+        ou += _values([f"Over {line}", f"Under {line}"], to_odds(np.array([over, 1 - over]), margin))
+    bets.append({"id": 5, "name": "Goals Over/Under", "values": ou})
+
+    btts = grid[1:, 1:].sum()
+    bets.append({"id": 8, "name": "Both Teams Score",
+                 "values": _values(["Yes", "No"], to_odds(np.array([btts, 1 - btts]), margin))})
+
+    ah = []
+    for line in AH_LINES:
+        p = grid[diff + line > 0].sum()
+        ah += _values([f"Home {line:+g}", f"Away {-line:+g}"], to_odds(np.array([p, 1 - p]), margin))
+    bets.append({"id": 4, "name": "Asian Handicap", "values": ah})
+
+    bets.append({"id": 12, "name": "Double Chance",
+                 "values": _values(["Home/Draw", "Home/Away", "Draw/Away"],
+                                   to_odds(np.array([home + draw, home + away, draw + away]), margin))})
+
+    exact = np.array([grid[h, a] for h, a in EXACT_SCORES])
+    bets.append({"id": 10, "name": "Exact Score", "values": _values([f"{h}:{a}" for h, a in EXACT_SCORES],
+                                                                     to_odds(exact, margin))})
+
+    dnb = home / (home + away)
+    bets.append({"id": 2, "name": "Home/Away", "values": _values(["Home", "Away"], to_odds(np.array([dnb, 1 - dnb]), margin))})
+    # Mi-temps : ~45 % des buts en 1re période, 55 % en 2de
+    for bet_id, name, share in ((13, "First Half Winner", 0.45), (3, "Second Half Winner", 0.55)):
+        half = score_grid(np.array([lam_h * share]), np.array([lam_a * share]))[0]
+        h1, d1 = half[diff > 0].sum(), half[diff == 0].sum()
+        bets.append({"id": bet_id, "name": name,
+                     "values": _values(["Home", "Draw", "Away"], to_odds(np.array([h1, d1, 1 - h1 - d1]), margin))})
+        if bet_id == 13:
+            ou1 = []
+            for line in (0.5, 1.5, 2.5):
+                over = half[total > line].sum()
+                ou1 += _values([f"Over {line}", f"Under {line}"], to_odds(np.array([over, 1 - over]), margin))
+            bets.append({"id": 6, "name": "Goals Over/Under First Half", "values": ou1})
+            b1 = half[1:, 1:].sum()
+            bets.append({"id": 34, "name": "Both Teams Score - First Half",
+                         "values": _values(["Yes", "No"], to_odds(np.array([b1, 1 - b1]), margin))})
+    for bet_id, name, axis in ((16, "Total - Home", 1), (17, "Total - Away", 0)):
+        marginal = grid.sum(axis=axis)
+        team = []
+        for line in (0.5, 1.5, 2.5):
+            over = marginal[g > line].sum()
+            team += _values([f"Over {line}", f"Under {line}"], to_odds(np.array([over, 1 - over]), margin))
+        bets.append({"id": bet_id, "name": name, "values": team})
+    odd_total = grid[total % 2 == 1].sum()
+    bets.append({"id": 21, "name": "Odd/Even", "values": _values(["Odd", "Even"],
+                                                                 to_odds(np.array([odd_total, 1 - odd_total]), margin))})
+    return bets
+
+def synthesize_cassettes(root: str, days: int, leagues: int, teams: int, bookmakers: int,
+                         seed: int = 42) -> Dict[str, int]:
+    """Écrit fixtures?date=D (jours passés + aujourd'hui) et odds?fixture=ID dans `root`."""
+    gen = SyntheticData(seasons=1, leagues=leagues, teams=teams, bookmakers=bookmakers, seed=seed)
+    rng = np.random.default_rng(seed)
+    m = gen.schedule()
+    today = gen.today
+    dates = [(today - timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1)]
+    lam_h = np.exp(BASE_GOALS + HOME_GOALS + m["att_h"] - m["def_a"])
+    lam_a = np.exp(BASE_GOALS + m["att_a"] - m["def_h"])
+    team_name = lambda t: f"Synthetic {gen.league_ids[t // gen.n_teams]}-{t % gen.n_teams + 1:02d}"
+
+    n_fixtures = n_odds = 0
+    for day in dates:
+        idx = np.flatnonzero(m["day"] == day)
+        played = day < today.isoformat()
+        goals_h = rng.poisson(lam_h[idx]) if len(idx) else np.array([], dtype=int)
+        goals_a = rng.poisson(lam_a[idx]) if len(idx) else np.array([], dtype=int)
+        fixtures = []
+        for j, i in enumerate(idx):
+            fid = 1_000_000 + int(i)
+            h, a = int(m["home"][i]), int(m["away"][i])
+            league_id = int(m["league"][i])
+            kickoff = f"{day}T{'19' if league_id == 2 else '15'}:00:00+00:00"
+            gh, ga = (int(goals_h[j]), int(goals_a[j])) if played else (None, None)
+            fixtures.append({
+                "fixture": {"id": fid, "referee": None, "timezone": "UTC", "date": kickoff,
+                            "timestamp": int(datetime.fromisoformat(kickoff).timestamp()),
+                            "venue": {"id": None, "name": None, "city": None},
+                            "status": {"long": "Match Finished" if played else "Not Started",
+                                       "short": "FT" if played else "NS", "elapsed": 90 if played else None}},
+                "league": {"id": league_id, "name": f"Synthetic League {league_id}", "country": "Synthetic",
+                           "season": int(m["season"][i]), "round": "Regular Season"},
+                "teams": {"home": {"id": 10_000 + h, "name": team_name(h),
+                                   "winner": (gh > ga) if played else None},
+                          "away": {"id": 10_000 + a, "name": team_name(a),
+                                   "winner": (ga > gh) if played else None}},
+                "goals": {"home": gh, "away": ga},
+                "score": {"halftime": {"home": None, "away": None}, "fulltime": {"home": gh, "away": ga},
+                          "extratime": {"home": None, "away": None}, "penalty": {"home": None, "away": None}},
+            })
+        payload = {"get": "fixtures", "parameters": {"date": day}, "errors": [], "results": len(fixtures),
+                   "paging": {"current": 1, "total": 1}, "response": fixtures}
+        write_cassette(root, "fixtures", {"date": day}, json.dumps(payload).encode())
+        n_fixtures += len(fixtures)
+
+        for j, i in enumerate(idx):
+            fx = fixtures[j]
+            books = []
+            for bm_id, (name, margin, noise) in gen.bookmakers:
+                bets = bookmaker_bets(float(lam_h[i] * np.exp(rng.normal(0, noise))),
+                                      float(lam_a[i] * np.exp(rng.normal(0, noise))), margin)
+                books.append({"id": bm_id, "name": name, "bets": bets})
+            odds = {"get": "odds", "parameters": {"fixture": str(fx["fixture"]["id"])}, "errors": [], "results": 1,
+                    "paging": {"current": 1, "total": 1},
+                    "response": [{"league": fx["league"], "fixture": {k: fx["fixture"][k] for k in
+                                                                      ("id", "timezone", "date", "timestamp")},
+                                  "update": f"{day}T08:00:00+00:00", "bookmakers": books}]}
+            write_cassette(root, "odds", {"fixture": fx["fixture"]["id"]}, json.dumps(odds).encode())
+            n_odds += 1
+    return {"dates": len(dates), "fixtures": n_fixtures, "odds": n_odds}
+
+def corpus_index(root: str) -> Tuple[List[str], List[int]]:
+    """Dates des cassettes fixtures?date=D et ligues qu'elles contiennent."""
+    dates, leagues = set(), set()
+    for _, meta, body in iter_cassettes(root):
+        if meta.get("endpoint") != "fixtures" or "date" not in meta.get("params", {}):
+            continue
+        dates.add(meta["params"]["date"])
+        for fx in json.loads(body).get("response") or []:
+            league_id = (fx.get("league") or {}).get("id")
+            if league_id is not None:
+                leagues.add(int(league_id))
+    return sorted(dates), sorted(leagues)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Cibles : ingestion d'une date par chaque script (retour = fixtures stockés)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def ingest_update_data(date_str: str, leagues: List[int]) -> int:
+    from scripts import update_data
+    _, matches_cnt, _ = update_data.ingest(date_str, leagues)
+    return matches_cnt
+
+def ingest_backfill_history(date_str: str, leagues: List[int]) -> int:
+    from scripts import backfill_history
+    _, kept, _ = backfill_history.fetch_and_store_date(date_str, leagues)
+    return kept
+
+def ingest_fetch_today(date_str: str, leagues: List[int]) -> int:
+    from scripts import fetch_today
+    api = fetch_today.OptimizedFootballAPI()
+    with db.get_connection() as conn:
+        stored = sum(fetch_today.parse_and_store_fixture(fx, conn)
+                     for fx in api.iter_fixtures_for_date(date_str) if api.is_allowed(fx))
+        fetch_today.team_resolver.flush(conn)
+        conn.commit()
+    return stored
+
+TARGETS: Dict[str, Callable[[str, List[int]], int]] = {
+    "update_data": ingest_update_data,
+    "backfill_history": ingest_backfill_history,
+    "fetch_today": ingest_fetch_today,
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Exécution
+# ──────────────────────────────────────────────────────────────────────────────
+
+def fresh_database(path: str):
+    from src.services.team_resolver import team_resolver
+    if os.path.exists(path):
+        os.remove(path)
+    use_database(path)
+    team_resolver.__init__(team_resolver.mapping_path)  # alias en mémoire de la base précédente
+
+def run_once(name: str, dates: List[str], leagues: List[int], adapter: ReplayAdapter,
+             concurrency: int, verbose: bool) -> Dict[str, Any]:
+    def one_date(day: str) -> Tuple[int, Dict[str, Any]]:
+        # Une étape racine par date : le contexte des métriques est propre à chaque thread
+        with metrics.stage(f"ingest.{name}") as sm:
+            stored = TARGETS[name](day, leagues)
+        return stored, sm.as_dict()
+
+    sink = None if verbose else io.StringIO()
+    t0 = time.perf_counter()
+    if sink is None:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one_date, dates))
+    else:
+        with redirect_stdout(sink), ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one_date, dates))
+    wall = time.perf_counter() - t0
+
+    totals = {k: sum(r[1][k] for r in results) for k in COUNTERS}
+    totals["fixtures"] = sum(r[0] for r in results)
+    totals["duration_s"] = wall
+    totals.update({f"replay_{k}": v for k, v in adapter.stats.items()})
+    return totals
+
+def run_target(name: str, dates: List[str], leagues: List[int], args, workdir: str) -> Dict[str, Any]:
+    durations, last = [], {}
+    for r in range(args.repeat):
+        fresh_database(os.path.join(workdir, f"ingest_{name}.db"))
+        session = replay_session(args.cassettes, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                 rate_429=args.rate_429, every_429=args.every_429,
+                                 retry_after=args.retry_after, seed=args.seed + r)
+        set_session(session)
+        adapter = session.get_adapter("https://")
+        last = run_once(name, dates, leagues, adapter, args.concurrency, args.verbose)
+        durations.append(last["duration_s"])
+    median = statistics.median(durations)
+    return {
+        "target": f"ingest.{name}",
+        "runs": args.repeat,
+        "best_s": round(min(durations), 4),
+        "median_s": round(median, 4),
+        "fixtures": last["fixtures"],
+        "fixtures_per_s": round(last["fixtures"] / median, 2) if median else None,
+        "api_calls": last["replay_calls"],
+        "throttled": last["replay_throttled"],
+        "misses": last["replay_misses"],
+        "api_time_s": round(last["api_time_s"], 4),
+        "sql_queries": last["sql_queries"],
+        "sql_time_s": round(last["sql_time_s"], 4),
+        "status": "ok",
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API-Football ingestion on replayed payloads")
+    parser.add_argument("--cassettes", default="", help="Dossier des cassettes (temporaire avec --synthesize).")
+    parser.add_argument("--synthesize", action="store_true", help="Génère le corpus dans --cassettes.")
+    parser.add_argument("--days", type=int, default=14, help="Jours générés (jusqu'à aujourd'hui).")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=20, help="Équipes par ligue.")
+    parser.add_argument("--bookmakers", type=int, default=len(BOOKMAKERS))
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Scripts à mesurer.")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilité d'un 429 par appel.")
+    parser.add_argument("--every-429", type=int, default=0, help="Un 429 tous les N appels.")
+    parser.add_argument("--retry-after", type=int, default=None, help="En-tête Retry-After (s) des 429.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Dates ingérées en parallèle.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--results", default=RESULTS_PATH, help="Fichier JSON lines des résultats.")
+    parser.add_argument("--no-save", action="store_true", help="N'ajoute pas les résultats au fichier.")
+    parser.add_argument("--compare", action="store_true", help="Compare au dernier commit mesuré.")
+    parser.add_argument("--baseline", default="", help="Commit de référence pour --compare.")
+    parser.add_argument("--verbose", action="store_true", help="Affiche la sortie des scripts mesurés.")
+    args = parser.parse_args(argv)
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        print(f"❌ Cibles inconnues: {', '.join(sorted(unknown))}")
+        return 1
+    if not args.cassettes and not args.synthesize:
+        print("❌ --cassettes <dossier> ou --synthesize requis")
+        return 1
+
+    workdir = tempfile.mkdtemp(prefix="football_ingest_")
+    if not args.cassettes:
+        args.cassettes = os.path.join(workdir, "cassettes")
+    if args.synthesize:
+        t0 = time.perf_counter()
+        counts = synthesize_cassettes(args.cassettes, args.days, args.leagues, args.teams, args.bookmakers, args.seed)
+        print(f"🏗️ Corpus synthétique : {counts['dates']} jours, {counts['fixtures']} fixtures, "
+              f"{counts['odds']} payloads de cotes ({time.perf_counter() - t0:.1f}s)")
+
+    dates, leagues = corpus_index(args.cassettes)
+    if not dates:
+        print(f"❌ Aucune cassette fixtures?date=… dans {args.cassettes}")
+        return 1
+    os.environ["ALLOWED_LEAGUE_IDS"] = ",".join(map(str, leagues))  # filtre de fetch_today
+
+    commit, dirty = git_revision()
+    label = f"replay_{len(dates)}d_c{args.concurrency}"
+    print(f"🧪 Ingestion @ {commit}{' (modifié)' if dirty else ''} | {len(dates)} jours, ligues {leagues} | "
+          f"latence {args.latency_ms:g}±{args.jitter_ms:g}ms | 429: taux {args.rate_429:g}, tous les "
+          f"{args.every_429 or '-'} | ×{args.concurrency} threads")
+
+    enabled, metrics.enabled = metrics.enabled, False
+    original_path, original_session = db.path, get_session()
+    rows = []
+    try:
+        for name in targets:
+            try:
+                row = run_target(name, dates, leagues, args, workdir)
+            except Exception as e:  # un script cassé ne bloque pas les autres
+                row = {"target": f"ingest.{name}", "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            row.update({"scale": label, "dates": len(dates), "concurrency": args.concurrency,
+                        "latency_ms": args.latency_ms, "rate_429": args.rate_429, "every_429": args.every_429})
+            rows.append(row)
+            if row["status"] == "ok":
+                print(f"  ⏱️ {name:<18} median {row['median_s']:8.3f}s  {row['fixtures_per_s'] or 0:>8.1f} fixtures/s  "
+                      f"API {row['api_calls']:>5} appels ({row['throttled']} × 429, {row['misses']} manquants)  "
+                      f"SQL {row['sql_queries']:>6} req / {row['sql_time_s']:.3f}s")
+            else:
+                print(f"  ⚠️ {name:<18} {row['status']}: {row['error']}")
+    finally:
+        metrics.enabled = enabled
+        set_session(original_session)
+        use_database(original_path)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    for row in rows:
+        row.update({"commit": commit, "dirty": dirty, "measured_at": stamp})
+
+    history = load_results(args.results)
+    if args.compare:
+        compare(rows, history, args.baseline or None)
+    if not args.no_save:
+        append_results(args.results, rows)
+        print(f"\n💾 {len(rows)} mesures ajoutées à {args.results}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,201 @@
+# scripts/benchmark_odds_parser.py
+"""
+Banc du parseur de cotes (src/services/odds_parser.py) contre les parseurs qu'il remplace
+(parse_1x2_from_odds_payload d'update_data, parse_markets de backfill_history : copies figées
+ci-dessous), sur un corpus de payloads /odds enregistrés (cassettes de src/api/replay.py) ou
+générés (--synthesize, cf. scripts/benchmark_ingestion.py).
+
+Mesure le temps de parsing seul (JSON déjà décodé), meilleur de --repeat passages, puis compare
+les cotes extraites (1X2, O/U 2.5, BTTS) bookmaker par bookmaker.
+
+Usage:
+  python -u scripts/benchmark_odds_parser.py --synthesize --days 14 --leagues 4
+  python -u scripts/benchmark_odds_parser.py --cassettes cassettes/ --repeat 10 --compare
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.api.replay import iter_cassettes
+from src.services.odds_parser import ALL_MARKETS, MARKET_1X2, STORED_MARKETS, parse_odds_payload
+from scripts.benchmark import git_revision, load_results, append_results, compare, RESULTS_PATH
+from scripts.benchmark_ingestion import synthesize_cassettes
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Parseurs d'origine (référence)
+# ──────────────────────────────────────────────────────────────────────────────
+
+def legacy_parse_1x2(odds_payload: Dict[str, Any]) -> List[Tuple[int, str, float, float, float]]:
+    res = []
+    responses = odds_payload.get("response") or []
+    if not responses:
+        return res
+    latest = responses[0]
+    for bm in latest.get("bookmakers", []) or []:
+        bm_id = int(bm.get("id"))
+        bm_name = str(bm.get("name") or "")
+        home_odd = draw_odd = away_odd = None
+        for bet in bm.get("bets", []) or []:
+            name = (bet.get("name") or "").lower()
+            if "winner" in name or "1x2" in name:
+                for v in bet.get("values", []) or []:
+                    val = (v.get("value") or "").lower()
+                    odd_str = v.get("odd")
+                    try:
+                        odd = float(odd_str) if odd_str is not None else None
+                    except (TypeError, ValueError):
+                        odd = None
+                    if "home" in val or val in ("1", "local"):
+                        home_odd = odd
+                    elif "draw" in val or val in ("x", "nul"):
+                        draw_odd = odd
+                    elif "away" in val or val in ("2", "visitor", "visiting"):
+                        away_odd = odd
+        if home_odd and draw_odd and away_odd:
+            res.append((bm_id, bm_name, home_odd, draw_odd, away_odd))
+    return res
+
+def legacy_parse_markets(odds_payload: Dict[str, Any]):
+    out = {}
+    resp = odds_payload.get("response") or []
+    if not resp: return out
+    block = resp[0]
+    for bm in block.get("bookmakers", []) or []:
+        bm_id = int(bm.get("id")); bm_name = (bm.get("name") or "")
+        oh=od=oa=None; over25=under25=None; yes=no=None
+        for bet in bm.get("bets", []) or []:
+            name = (bet.get("name") or "").lower()
+            values = bet.get("values", []) or []
+            if "winner" in name or "1x2" in name:
+                for v in values:
+                    val = (v.get("value") or "").lower()
+                    try: odd = float(v.get("odd"))
+                    except (TypeError, ValueError): odd = None
+                    if "home" in val or val == "1": oh = odd
+                    elif "draw" in val or val == "x": od = odd
+                    elif "away" in val or val == "2": oa = odd
+            if "over/under" in name or "goals over/under" in name:
+                for v in values:
+                    val = (v.get("value") or "").lower()
+                    try: odd = float(v.get("odd"))
+                    except (TypeError, ValueError): odd = None
+                    if "2.5" in val:
+                        if "over" in val:  over25 = odd
+                        if "under" in val: under25 = odd
+            if "both teams to score" in name or "btts" in name:
+                for v in values:
+                    val = (v.get("value") or "").lower()
+                    try: odd = float(v.get("odd"))
+                    except (TypeError, ValueError): odd = None
+                    if "yes" in val: yes = odd
+                    if "no" in val:  no  = odd
+        out[bm_id] = {"name": bm_name, "1x2": (oh,od,oa), "ou25": (over25, under25), "btts": (yes, no)}
+    return out
+
+VARIANTS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "legacy_1x2": legacy_parse_1x2,
+    "parser_1x2": lambda p: parse_odds_payload(p, frozenset({MARKET_1X2})),
+    "legacy_markets": legacy_parse_markets,
+    "parser_markets": lambda p: parse_odds_payload(p, STORED_MARKETS),
+    "parser_all": lambda p: parse_odds_payload(p, ALL_MARKETS),
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Mesure & comparaison
+# ──────────────────────────────────────────────────────────────────────────────
+
+def load_corpus(root: str) -> List[Dict[str, Any]]:
+    return [json.loads(body) for _, meta, body in iter_cassettes(root) if meta.get("endpoint") == "odds"]
+
+def time_variant(func: Callable, payloads: List[Dict[str, Any]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for payload in payloads:
+            func(payload)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def agreement(payloads: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Écarts ancien / nouveau parseur par marché (bookmakers comparés un à un)."""
+    diffs = {"bookmakers": 0, "1x2": 0, "ou25": 0, "btts": 0}
+    for payload in payloads:
+        old = legacy_parse_markets(payload)
+        for b in parse_odds_payload(payload, STORED_MARKETS):
+            ref = old.get(b.id)
+            diffs["bookmakers"] += 1
+            if ref is None:
+                continue
+            diffs["1x2"] += ref["1x2"] != b.x12
+            diffs["ou25"] += ref["ou25"] != b.ou25
+            diffs["btts"] += ref["btts"] != b.btts
+    return diffs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the odds parser against the legacy parsers")
+    parser.add_argument("--cassettes", default="", help="Dossier de cassettes (temporaire avec --synthesize).")
+    parser.add_argument("--synthesize", action="store_true", help="Génère le corpus dans --cassettes.")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--bookmakers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--results", default=RESULTS_PATH, help="Fichier JSON lines des résultats.")
+    parser.add_argument("--no-save", action="store_true", help="N'ajoute pas les résultats au fichier.")
+    parser.add_argument("--compare", action="store_true", help="Compare au dernier commit mesuré.")
+    parser.add_argument("--baseline", default="", help="Commit de référence pour --compare.")
+    args = parser.parse_args(argv)
+
+    if not args.cassettes and not args.synthesize:
+        print("❌ --cassettes <dossier> ou --synthesize requis")
+        return 1
+    workdir = tempfile.mkdtemp(prefix="football_odds_")
+    try:
+        root = args.cassettes or os.path.join(workdir, "cassettes")
+        if args.synthesize:
+            synthesize_cassettes(root, args.days, args.leagues, 20, args.bookmakers, args.seed)
+        payloads = load_corpus(root)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if not payloads:
+        print("❌ Aucun payload /odds dans le corpus")
+        return 1
+
+    n_books = sum(len((p.get("response") or [{}])[0].get("bookmakers") or []) for p in payloads)
+    commit, dirty = git_revision()
+    print(f"🧪 Parseur de cotes @ {commit}{' (modifié)' if dirty else ''} | {len(payloads)} payloads, "
+          f"{n_books} bookmakers | meilleur de {args.repeat}")
+
+    rows, timings = [], {}
+    for name, func in VARIANTS.items():
+        best = time_variant(func, payloads, args.repeat)
+        timings[name] = best
+        rows.append({"target": f"odds_parser.{name}", "scale": f"corpus_{len(payloads)}", "runs": args.repeat,
+                     "best_s": round(best, 5), "median_s": round(best, 5), "status": "ok",
+                     "payloads": len(payloads), "us_per_bookmaker": round(best / max(n_books, 1) * 1e6, 2)})
+        print(f"  ⏱️ {name:<16} {best * 1000:9.2f} ms  {best / max(n_books, 1) * 1e6:7.2f} µs/bookmaker")
+
+    print(f"\n🚀 1X2 : ×{timings['legacy_1x2'] / timings['parser_1x2']:.1f}  |  "
+          f"1X2 + O/U 2.5 + BTTS : ×{timings['legacy_markets'] / timings['parser_markets']:.1f}")
+    diffs = agreement(payloads)
+    print(f"🔎 Écarts ancien/nouveau sur {diffs['bookmakers']} bookmakers : 1X2={diffs['1x2']} | "
+          f"O/U 2.5={diffs['ou25']} | BTTS={diffs['btts']}")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    for row in rows:
+        row.update({"commit": commit, "dirty": dirty, "measured_at": stamp})
+    history = load_results(args.results)
+    if args.compare:
+        compare(rows, history, args.baseline or None)
+    if not args.no_save:
+        append_results(args.results, rows)
+        print(f"\n💾 {len(rows)} mesures ajoutées à {args.results}")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
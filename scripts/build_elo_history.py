@@ -1,6 +1,18 @@
 # scripts/build_elo_history.py
+"""
+Reconstruit match_elo (ratings avant / après et probabilités de chaque match terminé) et team_stats
+(ratings courants) en un rejeu numpy (src/services/elo_replay.py) avec les paramètres actifs :
+elo_config (global) et elo_league_params (K / avantage du terrain par ligue, décalages de force).
+
+Usage:
+  python -u scripts/build_elo_history.py
+"""
+import pandas as pd
+
 from src.models.database import db
-from src.services.elo_system import elo_system
+from src.services import elo_replay
+from src.services.elo_system import elo_system, load_elo_config, load_league_params
+from src.utils.metrics import metrics
 
 def ensure_match_elo_table(conn):
     """S'assure que la table match_elo existe."""
@@ -20,86 +32,62 @@ def ensure_match_elo_table(conn):
     conn.commit()
 
 def main():
-    # S'assurer que la table match_elo existe
-    with db.get_connection() as conn:
+    with metrics.stage("load"), db.get_connection() as conn:
         ensure_match_elo_table(conn)
-        # Vide l'historique ELO (reconstruit proprement)
-        conn.execute("DELETE FROM match_elo")
-        conn.commit()
+        history = elo_replay.load_history(conn)
+        config = load_elo_config(conn)
+        league_params = load_league_params(conn)
+        # Ligue de rattachement de toutes les équipes (matchs à venir compris) pour celles sans historique
+        fixtures = pd.read_sql_query(f"""
+            SELECT {elo_replay.LEAGUE_KEY} AS league, {elo_replay.HOME_KEY} AS home, {elo_replay.AWAY_KEY} AS away
+            FROM matches WHERE {elo_replay.HOME_KEY} IS NOT NULL AND {elo_replay.AWAY_KEY} IS NOT NULL
+        """, conn)
+        unplayed = [r[0] for r in conn.execute("SELECT team_id FROM team_stats").fetchall()]
+        metrics.count("rows_read", len(history))
 
-    with db.get_connection() as conn:
-        # S'adapter au schéma réel (essayer d'abord goals_home/goals_away, puis home_score/away_score)
-        cols = set(db._columns(conn, "matches"))
-        
-        # Choisir les colonnes de buts appropriées
-        if "goals_home" in cols and "goals_away" in cols:
-            goals_home_col, goals_away_col = "goals_home", "goals_away"
-        elif "home_score" in cols and "away_score" in cols:
-            goals_home_col, goals_away_col = "home_score", "away_score"
-        else:
-            print("❌ Aucune colonne de scores trouvée dans matches")
-            return
-            
-        # Choisir les colonnes d'équipes appropriées
-        if "home_team_id" in cols and "away_team_id" in cols:
-            home_col, away_col = "home_team_id", "away_team_id"
-        elif "home_team" in cols and "away_team" in cols:
-            home_col, away_col = "home_team", "away_team"
-        else:
-            print("❌ Aucune colonne d'équipes trouvée dans matches")
-            return
+    if history.empty:
+        print("❌ Aucun match terminé dans matches")
+        return
 
-        rows = conn.execute(f"""
-            SELECT fixture_id, {home_col}, {away_col}, {goals_home_col}, {goals_away_col}, date
-            FROM matches
-            WHERE {goals_home_col} IS NOT NULL AND {goals_away_col} IS NOT NULL
-            ORDER BY date ASC
-        """).fetchall()
+    # Rejeu complet depuis des ratings neutres (1500 + décalage de ligue)
+    with metrics.stage("replay"):
+        r = elo_replay.replay(history, **config, league_params=league_params)
+    probs = r["probs"]
+    snapshots = list(zip(
+        history["fixture_id"].tolist(),
+        r["home_pre"].tolist(), r["away_pre"].tolist(),
+        r["home_post"].tolist(), r["away_post"].tolist(),
+        probs[:, 0].tolist(), probs[:, 1].tolist(), probs[:, 2].tolist(),
+    ))
 
-    processed = 0
-    for r in rows:
-        fid, home_id, away_id, gh, ga, _ = r
-        
-        # Convertir en string si nécessaire
-        home_id = str(home_id) if home_id is not None else None
-        away_id = str(away_id) if away_id is not None else None
-        
-        if not home_id or not away_id:
-            continue
-            
-        # ELO avant match
-        home_pre = elo_system.get_team_elo(home_id)
-        away_pre = elo_system.get_team_elo(away_id)
-        
-        # Probas avant match
-        probs = elo_system.predict_match(home_id, away_id)
-        
-        # Mise à jour ELO avec le score réel
-        home_post, away_post = elo_system.update_ratings(home_pre, away_pre, gh, ga)
-        elo_system.set_team_elo(home_id, home_post)
-        elo_system.set_team_elo(away_id, away_post)
-        
-        # Stockage snapshot
-        with db.get_connection() as conn:
-            conn.execute("""INSERT INTO match_elo (fixture_id, home_pre_elo, away_pre_elo, home_post_elo, away_post_elo,
+    # Équipes sans match rejoué (promues, nouvelles) : rating d'entrée de leur ligue (1500 + décalage)
+    replayed = {str(t) for t in r["teams"]}
+    unplayed = [t for t in unplayed if str(t) not in replayed]
+    leagues = elo_replay.home_leagues(fixtures).reindex(unplayed) if not fixtures.empty else pd.Series(index=unplayed, dtype=object)
+    seeds = list(zip(map(str, unplayed),
+                     elo_replay.lookup_ratings({}, unplayed, leagues.tolist(), league_params).tolist()))
+
+    with metrics.stage("write"), db.get_connection() as conn:
+        metrics.rows(len(snapshots))
+        conn.execute("DELETE FROM match_elo")
+        conn.executemany("""INSERT INTO match_elo (fixture_id, home_pre_elo, away_pre_elo, home_post_elo, away_post_elo,
                                                    home_win_prob, draw_prob, away_win_prob)
                             VALUES (?,?,?,?,?,?,?,?)
                             ON CONFLICT(fixture_id) DO UPDATE SET
                               home_pre_elo=excluded.home_pre_elo, away_pre_elo=excluded.away_pre_elo,
                               home_post_elo=excluded.home_post_elo, away_post_elo=excluded.away_post_elo,
                               home_win_prob=excluded.home_win_prob, draw_prob=excluded.draw_prob, away_win_prob=excluded.away_win_prob
-                         """,
-                         (fid, home_pre, away_pre, home_post, away_post,
-                          probs["home_win_prob"], probs["draw_prob"], probs["away_win_prob"]))
-            conn.commit()
-        
-        processed += 1
-        
-        # Log de progression
-        if processed % 1000 == 0:
-            print(f"Processed {processed} matches...")
-    
-    print(f"✅ ELO historique reconstruit ({processed} matches traités).")
+                         """, snapshots)
+        conn.executemany("""
+            INSERT INTO team_stats (team_id, elo, updated_at) VALUES (?, ?, datetime('now'))
+            ON CONFLICT(team_id) DO UPDATE SET elo = excluded.elo, updated_at = excluded.updated_at
+        """, [(str(t), float(e)) for t, e in zip(r["teams"], r["ratings"])] + seeds)
+        db.bump_data_version("build_elo_history", conn)
+        conn.commit()
+
+    # Le cache de EloSystem et ses paramètres sont rechargés au prochain accès
+    elo_system.reload_config()
+    print(f"✅ ELO historique reconstruit ({len(snapshots)} matches traités, {len(r['teams'])} équipes).")
 
 if __name__ == "__main__":
-    main()
+    metrics.main("build_elo_history", main)
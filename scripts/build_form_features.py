@@ -0,0 +1,25 @@
+# scripts/build_form_features.py
+"""
+Met à jour le feature store de forme (team_form_features) pour les équipes ayant de nouveaux résultats.
+--full recalcule toutes les équipes.
+
+Usage:
+  python -u scripts/build_form_features.py [--full]
+"""
+import argparse
+from src.services.form_features import form_features
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build rolling form features")
+    parser.add_argument("--full", action="store_true", help="Recalcule toutes les équipes.")
+    args = parser.parse_args(argv)
+
+    result = form_features.update(full=args.full)
+    if result["teams"] == 0:
+        print("ℹ Feature store de forme déjà à jour.")
+        return 0
+    print(f"✅ Forme: {result['teams']} équipes recalculées ({result['rows']} lignes).")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
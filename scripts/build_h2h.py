@@ -0,0 +1,25 @@
+# scripts/build_h2h.py
+"""
+Met à jour l'index des confrontations directes (h2h_summary) avec les matchs terminés
+depuis le dernier passage. --rebuild repart de zéro.
+
+Usage:
+  python -u scripts/build_h2h.py [--rebuild]
+"""
+import argparse
+from src.services.h2h_index import h2h_index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build head-to-head index")
+    parser.add_argument("--rebuild", action="store_true", help="Vide l'index et le reconstruit entièrement.")
+    args = parser.parse_args(argv)
+
+    result = h2h_index.rebuild() if args.rebuild else h2h_index.update()
+    if result["fixtures"] == 0:
+        print("ℹ Aucun nouveau résultat pour l'index H2H.")
+        return 0
+    print(f"✅ H2H: {result['fixtures']} matchs intégrés ({result['pairs']} paires mises à jour).")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
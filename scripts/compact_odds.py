@@ -0,0 +1,37 @@
+# scripts/compact_odds.py
+"""
+Compacte l'historique des cotes (odds_snapshots) des fixtures sans nouvelle capture depuis
+--idle-days : garde l'ouverture et la dernière capture de chaque tranche de --bucket-minutes,
+puis uniquement les changements de prix. --vacuum rend l'espace libéré au système.
+
+Usage:
+  python -u scripts/compact_odds.py
+  python -u scripts/compact_odds.py --idle-days 7 --bucket-minutes 360 --all --vacuum
+"""
+import argparse
+from src.services.odds_history import odds_history
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Downsample and compact odds snapshots")
+    parser.add_argument("--idle-days", type=float, default=3.0, help="Fixtures sans capture depuis N jours.")
+    parser.add_argument("--bucket-minutes", type=int, default=60, help="Une capture gardée par tranche.")
+    parser.add_argument("--lookback-days", type=float, default=30.0,
+                        help="Seulement les fixtures devenues inactives dans cette fenêtre.")
+    parser.add_argument("--all", action="store_true", help="Tout l'historique (ignore --lookback-days).")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM après compaction.")
+    args = parser.parse_args(argv)
+
+    result = odds_history.compact(idle_days=args.idle_days, bucket_s=args.bucket_minutes * 60,
+                                  lookback_days=None if args.all else args.lookback_days)
+    removed = result["downsampled"] + result["merged"]
+    if args.vacuum and removed:
+        odds_history.vacuum()
+    if removed == 0:
+        print(f"ℹ Historique des cotes déjà compact ({result['remaining']} captures).")
+        return 0
+    print(f"✅ Cotes: {removed} captures supprimées ({result['downsampled']} sous-échantillonnées, "
+          f"{result['merged']} identiques) | {result['remaining']} restantes.")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
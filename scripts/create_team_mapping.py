@@ -2,34 +2,53 @@
 import requests
 import pandas as pd
 import json
-from difflib import SequenceMatcher
 from config.settings import Settings
 from config.league_mapping import LEAGUE_CODE_TO_API_ID
+from config.leagues import ALLOWED_LEAGUES
+from src.api.http_client import http_session
+from src.services.team_name_matcher import TeamNameIndex, match_cache, normalize_name, score_names
 
 class TeamMapper:
     def __init__(self):
         self.settings = Settings()
         self.team_mapping = {}
+        # Équipes API de toutes les ligues traitées (repli des promus + coupes)
+        self.global_index = TeamNameIndex()
     
-    def get_api_teams(self, league_id, season=2024):
-        """Récupère les équipes via l'API Football"""
-        url = f"{self.settings.API.BASE_URL}/standings"
+    def get_api_teams(self, league_id, season=2024, endpoint="standings"):
+        """Récupère les équipes via l'API Football (mises en cache par ligue/saison)"""
+        cached = match_cache.load(league_id, season)
+        if cached["api_teams"]:
+            return cached["api_teams"]
+
+        url = f"{self.settings.API.BASE_URL}/{endpoint}"
         params = {
             "league": league_id,
             "season": season
         }
         
-        response = requests.get(url, headers=self.settings.API.headers, params=params)
+        response = http_session.get(url, headers=self.settings.API.headers, params=params, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
             teams = []
             if data.get("response"):
-                for standing in data["response"][0]["league"]["standings"][0]:
-                    teams.append({
-                        "name": standing["team"]["name"],
-                        "id": standing["team"]["id"]
-                    })
+                if endpoint == "standings":
+                    # Toutes les poules (coupes, ligues à plusieurs groupes), pas seulement la première
+                    for group in data["response"][0]["league"]["standings"]:
+                        for standing in group:
+                            teams.append({
+                                "name": standing["team"]["name"],
+                                "id": standing["team"]["id"]
+                            })
+                else:
+                    for item in data["response"]:
+                        teams.append({
+                            "name": item["team"]["name"],
+                            "id": item["team"]["id"]
+                        })
+            if teams:
+                match_cache.save(league_id, season, teams, cached["mapping"])
             return teams
         return []
     
@@ -47,61 +66,67 @@ class TeamMapper:
             return []
     
     def similarity(self, a, b):
-        """Calcule la similarité entre deux chaînes"""
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+        """Calcule la similarité entre deux noms (normalisés)"""
+        return score_names(normalize_name(a), normalize_name(b))
     
     def normalize_name(self, name):
         """Normalise le nom d'une équipe pour améliorer le matching"""
-        # Remplacements pour normaliser les noms
-        replacements = {
-            # Préfixes/suffixes courants
-            "FC ": "", " FC": "", "CF ": "", " CF": "",
-            "AC ": "", " AC": "", "SC ": "", " SC": "",
-            "AS ": "", " AS": "", "CD ": "", " CD": "",
-            "SK ": "", " SK": "", "FK ": "", " FK": "",
-            "1. ": "", "2. ": "",
-            
-            # Cas spéciaux
-            "Real ": "", "Club ": "",
-            "Atletico ": "Atletico ",
-            "Saint ": "St ", "Saint-": "St-",
-        }
-        
-        normalized = name
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        return normalized.strip()
+        return normalize_name(name)
     
-    def match_teams(self, fd_teams, api_teams):
-        """Fait correspondre les équipes FD avec l'API"""
-        mapping = {}
-        
+    def match_teams(self, fd_teams, api_teams, league_id=None, season=2024):
+        """
+        Fait correspondre les équipes FD avec l'API.
+        Index de trigrammes sur les noms API (blocage) ; seuls les quelques candidats
+        bloqués sont scorés. Repli sur l'index global (équipes de toutes les ligues déjà vues)
+        pour les promus/relégués absents du classement de la ligue.
+        """
+        cached = match_cache.load(league_id, season) if league_id is not None else {"mapping": {}}
+        wanted = set(fd_teams)
+        mapping = {fd: api for fd, api in cached["mapping"].items() if fd in wanted}
+
+        index = TeamNameIndex(api_teams)
+        for team in api_teams:
+            self.global_index.add(team)
+
         for fd_team in fd_teams:
-            best_match = None
-            best_score = 0
-            
-            fd_normalized = self.normalize_name(fd_team)
-            
-            for api_team in api_teams:
-                api_normalized = self.normalize_name(api_team["name"])
-                
-                # Match exact
-                if fd_normalized.lower() == api_normalized.lower():
-                    mapping[fd_team] = api_team["name"]
-                    break
-                
-                # Match par similarité
-                score = self.similarity(fd_normalized, api_normalized)
-                if score > best_score and score > 0.75:  # Seuil de 75%
-                    best_score = score
-                    best_match = api_team["name"]
-            
-            # Si pas de match exact, utiliser le meilleur match
-            if fd_team not in mapping and best_match:
-                mapping[fd_team] = best_match
-        
+            if fd_team in mapping:
+                continue
+            hit = index.match(fd_team) or self.global_index.match(fd_team)
+            if hit:
+                mapping[fd_team] = hit[0]["name"]
+
+        if league_id is not None:
+            match_cache.save(league_id, season, api_teams, mapping)
         return mapping
+
+    def map_cup_competitions(self, season=2024):
+        """
+        Coupes / compétitions internationales d'ALLOWED_LEAGUES (pas de CSV FD) :
+        chaque équipe est rattachée à son nom canonique des ligues déjà traitées,
+        par id API d'abord, puis par l'index global de noms.
+        """
+        league_ids = {v for v in LEAGUE_CODE_TO_API_ID.values() if v is not None}
+        mapped = 0
+        for name, cup_id in ALLOWED_LEAGUES.items():
+            if cup_id in league_ids:
+                continue
+            api_teams = self.get_api_teams(cup_id, season, endpoint="teams")
+            if not api_teams:
+                continue
+            mapping = {}
+            for team in api_teams:
+                known = self.global_index.by_id.get(team["id"])
+                if known is not None:
+                    mapping[team["name"]] = self.global_index.teams[known]["name"]
+                    continue
+                hit = self.global_index.match(team["name"])
+                if hit:
+                    mapping[team["name"]] = hit[0]["name"]
+            if mapping:
+                self.team_mapping[str(cup_id)] = mapping
+                mapped += len(mapping)
+                print(f"  🏆 {name}: {len(mapping)}/{len(api_teams)} équipes rattachées")
+        return mapped
     
     def create_full_mapping(self):
         """Crée le dictionnaire complet de correspondance"""
@@ -139,7 +164,7 @@ class TeamMapper:
                 continue
             
             # Créer le mapping
-            mapping = self.match_teams(fd_teams, api_teams)
+            mapping = self.match_teams(fd_teams, api_teams, league_id)
             
             if mapping:
                 self.team_mapping[str(league_id)] = mapping
@@ -155,6 +180,10 @@ class TeamMapper:
             else:
                 print(f"  ❌ Aucune correspondance trouvée")
         
+        # Coupes et compétitions internationales (même passe, index global)
+        print("🔄 Coupes / compétitions internationales...")
+        total_mapped += self.map_cup_competitions()
+        
         # Sauvegarder le résultat
         output_file = 'config/team_mapping.json'
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -1,64 +1,346 @@
+# scripts/export_predictions.py
+"""
+Export des prédictions par jour (date de created_at) en streaming :
+le curseur est lu par paquets et chaque paquet est écrit directement dans les fichiers du jour,
+sans jamais charger une journée (ou --days 365) en mémoire.
+
+Formats (--formats, séparés par des virgules) :
+  csv      predictions/YYYY-MM-DD.csv
+  json     predictions/YYYY-MM-DD.json      (tableau JSON, format historique)
+  ndjson   predictions/YYYY-MM-DD.ndjson    (une ligne JSON par prédiction)
+  parquet  predictions/parquet/date=YYYY-MM-DD/part-<premier id>.parquet (pyarrow requis)
+
+Mode --incremental : ne réécrit que les fichiers des jours modifiés depuis le dernier export.
+generate_predictions recalcule un match par DELETE puis INSERT (nouvel id) : un simple ajout
+des lignes id > dernier id laisserait l'ancienne ligne (fixture_id, method) dans le fichier.
+L'état (predictions/.export_state.json) mémorise le dernier id et le nombre de lignes par jour ;
+sont réécrits intégralement les jours qui contiennent une ligne id > dernier id et ceux dont le
+nombre de lignes a changé (prédictions supprimées), les fichiers d'un jour vidé sont supprimés.
+Sans état préalable, fait un export complet de --days et crée l'état.
+
+Usage:
+  python -u scripts/export_predictions.py --days 1
+  python -u scripts/export_predictions.py --days 365 --formats csv,ndjson,parquet
+  python -u scripts/export_predictions.py --incremental
+"""
 import os
-import sys
+import csv
+import glob
+import json
 import argparse
 import datetime as dt
-import pandas as pd
+from typing import Dict, List, Optional
 from src.models.database import db
 
-def export_day(conn, date_iso: str) -> int:
-    """Exporte les prédictions d'une date (YYYY-MM-DD) en CSV+JSON. Retourne le nb de lignes."""
-    q = "SELECT * FROM predictions WHERE substr(created_at,1,10)=?"
-    df = pd.read_sql_query(q, conn, params=[date_iso])
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dépendance optionnelle
+    pa = pq = None
+
+OUT_DIR = "predictions"
+STATE_PATH = os.path.join(OUT_DIR, ".export_state.json")
+DEFAULT_FORMATS = "csv,json"
+CHUNK_SIZE = 5000
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Writers (un par format et par jour, ouverts à la demande)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class CsvWriter:
+    def __init__(self, path: str, columns: List[str], append: bool):
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.f = open(path, "a" if exists else "w", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        if not exists:
+            self.w.writerow(columns)
+
+    def write(self, rows: List[tuple]):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class NdjsonWriter:
+    def __init__(self, path: str, columns: List[str], append: bool):
+        self.columns = columns
+        self.f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, rows: List[tuple]):
+        self.f.writelines(json.dumps(dict(zip(self.columns, r)), ensure_ascii=False) + "\n" for r in rows)
+
+    def close(self):
+        self.f.close()
+
+class JsonArrayWriter:
+    """Tableau JSON écrit élément par élément ; en ajout, rouvre le tableau avant le ']' final."""
+    def __init__(self, path: str, columns: List[str], append: bool):
+        self.columns = columns
+        self.first = True
+        if append and os.path.exists(path) and self._reopen(path):
+            return
+        self.f = open(path, "w", encoding="utf-8")
+        self.f.write("[")
+
+    def _reopen(self, path: str) -> bool:
+        f = open(path, "r+b")
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        # remonte jusqu'au ']' final (les fichiers sont petits en fin, on lit par blocs de 64 octets)
+        while pos > 0:
+            step = min(64, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b"]")
+            if idx >= 0:
+                f.seek(pos - step + idx)
+                f.truncate()
+                head = f.tell()
+                f.seek(max(0, head - 64))
+                tail = f.read().rstrip()
+                self.first = tail.endswith(b"[")
+                f.close()
+                self.f = open(path, "a", encoding="utf-8")
+                return True
+            pos -= step
+        f.close()
+        return False
+
+    def write(self, rows: List[tuple]):
+        for r in rows:
+            item = json.dumps(dict(zip(self.columns, r)), ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            self.f.write(("\n  " if self.first else ",\n  ") + item)
+            self.first = False
+
+    def close(self):
+        self.f.write("\n]" if not self.first else "]")
+        self.f.close()
+
+SQL_TO_ARROW = {"INTEGER": "int64", "REAL": "float64", "TEXT": "string"}
+
+def parquet_schema(conn, columns: List[str]):
+    """Schéma fixe tiré des types déclarés : un paquet entièrement NULL ne change pas le type d'une colonne."""
+    declared = {r[1]: (r[2] or "").upper() for r in conn.execute("PRAGMA table_info(predictions)").fetchall()}
+    return pa.schema([(c, SQL_TO_ARROW.get(declared.get(c), "string")) for c in columns])
+
+class ParquetWriter:
+    """Un fichier par export et par jour (dataset partitionné par date), écrit par row groups."""
+    def __init__(self, day_dir: str, schema, append: bool, first_id: int):
+        os.makedirs(day_dir, exist_ok=True)
+        if not append:
+            for old in glob.glob(os.path.join(day_dir, "*.parquet")):
+                os.remove(old)
+        self.writer = pq.ParquetWriter(os.path.join(day_dir, f"part-{first_id}.parquet"), schema)
+        self.schema = schema
+
+    def write(self, rows: List[tuple]):
+        cols = list(zip(*rows))
+        arrays = [pa.array(list(v), type=field.type) for v, field in zip(cols, self.schema)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
 
-    os.makedirs("predictions", exist_ok=True)
+class DayExporter:
+    """Répartit les paquets de lignes vers les fichiers de leur jour."""
+    def __init__(self, formats: List[str], columns: List[str], append: bool, schema=None):
+        self.formats = formats
+        self.columns = columns
+        self.schema = schema
+        self.append = append
+        self.day_idx = columns.index("created_at")
+        self.id_idx = columns.index("id")
+        self.writers: Dict[str, list] = {}
+        self.counts: Dict[str, int] = {}
 
-    if df.empty:
-        print(f"[info] No predictions for {date_iso}")
-        return 0
+    def _open(self, day: str, first_id: int) -> list:
+        # Les lignes arrivent triées : on ferme les fichiers des jours précédents (365 jours ≠ 1000 fichiers ouverts).
+        # Un jour déjà vu (ordre par id en incrémental) est rouvert en ajout.
+        self.close()
+        append = self.append or day in self.counts
+        out = []
+        for fmt in self.formats:
+            if fmt == "csv":
+                out.append(CsvWriter(os.path.join(OUT_DIR, f"{day}.csv"), self.columns, append))
+            elif fmt == "json":
+                out.append(JsonArrayWriter(os.path.join(OUT_DIR, f"{day}.json"), self.columns, append))
+            elif fmt == "ndjson":
+                out.append(NdjsonWriter(os.path.join(OUT_DIR, f"{day}.ndjson"), self.columns, append))
+            elif fmt == "parquet":
+                out.append(ParquetWriter(os.path.join(OUT_DIR, "parquet", f"date={day}"), self.schema, append, first_id))
+        return out
 
-    csv_path = f"predictions/{date_iso}.csv"
-    json_path = f"predictions/{date_iso}.json"
-    df.to_csv(csv_path, index=False)
-    df.to_json(json_path, orient="records", force_ascii=False, indent=2)
-    print(f"[ok] Wrote {csv_path} and {json_path} ({len(df)} rows)")
-    return len(df)
+    def write(self, rows: List[tuple]):
+        by_day: Dict[str, List[tuple]] = {}
+        for r in rows:
+            day = (r[self.day_idx] or "")[:10] or "unknown"
+            by_day.setdefault(day, []).append(r)
+        for day, day_rows in by_day.items():
+            if day not in self.writers:
+                self.writers[day] = self._open(day, day_rows[0][self.id_idx] or 0)
+                self.counts.setdefault(day, 0)
+            for w in self.writers[day]:
+                w.write(day_rows)
+            self.counts[day] += len(day_rows)
 
-def main():
+    def close(self):
+        for writers in self.writers.values():
+            for w in writers:
+                w.close()
+        self.writers = {}
+
+def stream_query(conn, sql: str, params: tuple, formats: List[str], append: bool,
+                 exporter: Optional[DayExporter] = None) -> DayExporter:
+    """Écrit le résultat de la requête ; un exporter existant est réutilisé (compteurs cumulés)."""
+    cur = conn.execute(sql, params)
+    if exporter is None:
+        columns = [d[0] for d in cur.description]
+        schema = parquet_schema(conn, columns) if "parquet" in formats else None
+        exporter = DayExporter(formats, columns, append, schema)
+    try:
+        while True:
+            rows = cur.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            exporter.write([tuple(r) for r in rows])
+    finally:
+        exporter.close()
+    return exporter
+
+# ──────────────────────────────────────────────────────────────────────────────
+# État incrémental
+# ──────────────────────────────────────────────────────────────────────────────
+
+def load_state() -> Optional[dict]:
+    if not os.path.exists(STATE_PATH):
+        return None
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(last_id: int, days: Dict[str, int]):
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id, "days": days,
+                   "exported_at": dt.datetime.utcnow().isoformat(timespec="seconds")}, f)
+
+def day_counts(conn) -> Dict[str, int]:
+    """Nombre de lignes par jour de created_at (parcours de l'index idx_predictions_created_at)."""
+    return {r[0]: r[1] for r in conn.execute("""
+        SELECT substr(created_at, 1, 10) AS day, COUNT(*) FROM predictions
+        WHERE created_at IS NOT NULL GROUP BY day
+    """).fetchall()}
+
+def max_prediction_id(conn) -> int:
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM predictions").fetchone()[0]
+
+def remove_day_files(day: str):
+    for ext in ("csv", "json", "ndjson"):
+        path = os.path.join(OUT_DIR, f"{day}.{ext}")
+        if os.path.exists(path):
+            os.remove(path)
+    for old in glob.glob(os.path.join(OUT_DIR, "parquet", f"date={day}", "*.parquet")):
+        os.remove(old)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Modes d'export
+# ──────────────────────────────────────────────────────────────────────────────
+
+RANGE_SQL = """
+    SELECT * FROM predictions
+    WHERE created_at >= ? AND created_at < ?
+    ORDER BY created_at, id
+"""
+
+def export_range(conn, start_iso: str, end_iso: str, formats: List[str],
+                 exporter: Optional[DayExporter] = None) -> DayExporter:
+    """Réécrit les fichiers des jours [start, end] (bornes incluses) — une seule requête sur l'index created_at."""
+    end_excl = (dt.date.fromisoformat(end_iso) + dt.timedelta(days=1)).isoformat()
+    return stream_query(conn, RANGE_SQL, (start_iso, end_excl), formats, append=False, exporter=exporter)
+
+def export_day(conn, date_iso: str, formats: List[str] = None) -> int:
+    """Exporte les prédictions d'une date (YYYY-MM-DD). Retourne le nb de lignes."""
+    exporter = export_range(conn, date_iso, date_iso, formats or DEFAULT_FORMATS.split(","))
+    return exporter.counts.get(date_iso, 0)
+
+def changed_days(conn, state: dict, counts: Dict[str, int]) -> List[str]:
+    """Jours à réécrire : lignes ajoutées depuis last_id, ou nombre de lignes différent de l'état."""
+    days = {r[0] for r in conn.execute("""
+        SELECT DISTINCT substr(created_at, 1, 10) FROM predictions
+        WHERE id > ? AND created_at IS NOT NULL
+    """, (int(state.get("last_id", 0)),)).fetchall()}
+    known = state.get("days") or {}
+    days.update(day for day, n in known.items() if counts.get(day, 0) != n)
+    return sorted(days)
+
+def export_incremental(conn, state: dict, formats: List[str], counts: Dict[str, int]) -> Optional[DayExporter]:
+    """Réécrit entièrement les jours modifiés depuis le dernier export (None si rien n'a changé)."""
+    exporter = None
+    for day in changed_days(conn, state, counts):
+        if counts.get(day, 0) == 0:
+            remove_day_files(day)
+            print(f"[ok] Removed {day}: plus aucune prédiction")
+            continue
+        exporter = export_range(conn, day, day, formats, exporter=exporter)
+    return exporter
+
+def export_latest(conn, formats: List[str]) -> DayExporter:
+    """Fallback : dernière série disponible (created_at maximal)."""
+    return stream_query(conn, """
+        SELECT * FROM predictions
+        WHERE created_at = (SELECT MAX(created_at) FROM predictions)
+        ORDER BY id
+    """, (), formats, append=False)
+
+def report(exporter: DayExporter, label: str):
+    for day, n in sorted(exporter.counts.items()):
+        print(f"[ok] {label} {day}: {n} rows ({', '.join(exporter.formats)})")
+
+def parse_formats(raw: str) -> List[str]:
+    formats = [f.strip().lower() for f in raw.split(",") if f.strip()]
+    unknown = set(formats) - {"csv", "json", "ndjson", "parquet"}
+    if unknown:
+        raise SystemExit(f"❌ Formats inconnus: {', '.join(sorted(unknown))}")
+    if "parquet" in formats and pq is None:
+        print("[warn] pyarrow non installé → export parquet ignoré")
+        formats.remove("parquet")
+    return formats
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Export predictions to files")
     parser.add_argument("--days", type=int, default=1, help="Nombre de jours à exporter (depuis aujourd'hui, inclus).")
-    args = parser.parse_args()
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help="csv,json,ndjson,parquet (défaut: csv,json).")
+    parser.add_argument("--incremental", action="store_true", help="Ne réécrit que les jours modifiés depuis le dernier export.")
+    args = parser.parse_args(argv)
 
+    formats = parse_formats(args.formats)
+    os.makedirs(OUT_DIR, exist_ok=True)
     today = dt.datetime.utcnow().date()
-    total_files = 0
-    total_rows = 0
 
     with db.get_connection() as conn:
-        for i in range(args.days):
-            d = (today - dt.timedelta(days=i)).isoformat()
-            n = export_day(conn, d)
-            if n > 0:
-                total_files += 2  # csv + json
-                total_rows += n
-
-        # fallback: s'il n'y a absolument rien, on exporte la dernière série disponible
-        if total_rows == 0:
-            df = pd.read_sql_query("""
-                SELECT * FROM predictions
-                WHERE created_at = (SELECT MAX(created_at) FROM predictions)
-            """, conn)
-            if df.empty:
-                # déposer un placeholder pour que le dossier existe
-                os.makedirs("predictions", exist_ok=True)
-                open("predictions/.gitkeep", "w").close()
-                print("[warn] No predictions in DB. Wrote predictions/.gitkeep")
-                return
-            # utilise la date de la première ligne
-            last_date = df["created_at"].iloc[0][:10]
-            csv_path = f"predictions/{last_date}.csv"
-            json_path = f"predictions/{last_date}.json"
-            df.to_csv(csv_path, index=False)
-            df.to_json(json_path, orient="records", force_ascii=False, indent=2)
-            print(f"[ok] Fallback wrote {csv_path} and {json_path} ({len(df)} rows)")
+        state = load_state() if args.incremental else None
+        # lus avant l'export : une prédiction insérée pendant l'export sera reprise au prochain passage
+        last_id, counts = max_prediction_id(conn), day_counts(conn)
+        if state is not None:
+            exporter = export_incremental(conn, state, formats, counts)
+            if exporter is None:
+                print("[info] Aucune prédiction modifiée depuis le dernier export.")
+            else:
+                report(exporter, "Rewrote")
+        else:
+            start = (today - dt.timedelta(days=max(1, args.days) - 1)).isoformat()
+            exporter = export_range(conn, start, today.isoformat(), formats)
+            report(exporter, "Wrote")
+
+            # fallback: s'il n'y a absolument rien, on exporte la dernière série disponible
+            if not exporter.counts:
+                exporter = export_latest(conn, formats)
+                if not exporter.counts:
+                    # déposer un placeholder pour que le dossier existe
+                    open(os.path.join(OUT_DIR, ".gitkeep"), "w").close()
+                    print("[warn] No predictions in DB. Wrote predictions/.gitkeep")
+                    return
+                report(exporter, "Fallback wrote")
+
+        save_state(last_id, counts)
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,7 @@ import os
 import re
 import pandas as pd
 from src.models.database import db
+from src.services.team_resolver import team_resolver
 
 DATA_DIR = "data"
 
@@ -85,7 +86,9 @@ def parse_format_europe(df, code, season):
             status="FT" if home_score is not None else "NS",
             league=code,
             season=season,
-            fixture_id=fixture_id
+            fixture_id=fixture_id,
+            home_team_id=team_resolver.resolve(home_team, league=code),
+            away_team_id=team_resolver.resolve(away_team, league=code),
         )
 
 def parse_format_worldwide(df, code, season):
@@ -121,7 +124,9 @@ def parse_format_worldwide(df, code, season):
             status="FT" if home_score is not None else "NS",
             league=code,
             season=season,
-            fixture_id=fixture_id
+            fixture_id=fixture_id,
+            home_team_id=team_resolver.resolve(home_team, league=code),
+            away_team_id=team_resolver.resolve(away_team, league=code),
         )
 
 def main():
@@ -142,5 +147,10 @@ def main():
         else:
             print(f"❌ Format inconnu pour {code}, colonnes: {df.columns}")
 
+        # Alias et équipes synthétiques découverts dans ce fichier
+        team_resolver.flush()
+
+    db.bump_data_version("fd_ingest")
+
 if __name__ == "__main__":
     main()
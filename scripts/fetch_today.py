@@ -10,8 +10,11 @@ import os
 import time
 import requests
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, Iterator, List, Optional, Any, Set
 from src.models.database import db
+from src.services.team_resolver import team_resolver
+from src.api.http_client import http_session
+from src.api.json_stream import stream_items
 
 # Configuration API
 API_HOST = "api-football-v1.p.rapidapi.com"
@@ -22,6 +25,8 @@ RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY", "").strip()
 REQ_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "60"))
 MAX_RETRIES = int(os.getenv("REQUEST_MAX_RETRIES", "3"))
 BACKOFF_BASE = float(os.getenv("REQUEST_BACKOFF_BASE", "2.0"))
+# Fixtures écrits par transaction (commit par lot plutôt qu'un par match)
+WRITE_BATCH = int(os.getenv("FETCH_WRITE_BATCH", "200"))
 
 class OptimizedFootballAPI:
     def __init__(self):
@@ -66,6 +71,21 @@ class OptimizedFootballAPI:
     
     def get_with_retry(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Effectue une requête GET avec retries intelligents"""
+        response = self.request_with_retry(endpoint, params)
+        if response is None:
+            return None
+        data = response.json()
+        response_count = len(data.get("response", []))
+        paging = data.get("paging", {})
+
+        print(f"✅ Success: {response_count} items")
+        if paging:
+            print(f"📄 Pagination: page {paging.get('current', '?')}/{paging.get('total', '?')}")
+
+        return data
+
+    def request_with_retry(self, endpoint: str, params: Dict[str, Any], stream: bool = False) -> Optional[requests.Response]:
+        """Réponse HTTP 200 (corps non lu si stream=True), après retries ; None si échec"""
         url = f"{BASE_URL}/{endpoint.lstrip('/')}"
         
         print(f"🌐 API Call: GET {endpoint}")
@@ -73,25 +93,18 @@ class OptimizedFootballAPI:
         
         for attempt in range(1, MAX_RETRIES + 1):
             try:
-                response = requests.get(
+                response = http_session.get(
                     url, 
                     headers=self.headers, 
                     params=params, 
-                    timeout=REQ_TIMEOUT
+                    timeout=REQ_TIMEOUT,
+                    stream=stream,
                 )
                 
                 print(f"📊 HTTP {response.status_code} (attempt {attempt}/{MAX_RETRIES})")
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    response_count = len(data.get("response", []))
-                    paging = data.get("paging", {})
-                    
-                    print(f"✅ Success: {response_count} items")
-                    if paging:
-                        print(f"📄 Pagination: page {paging.get('current', '?')}/{paging.get('total', '?')}")
-                    
-                    return data
+                    return response
                     
                 elif response.status_code == 429:
                     print("⏰ Rate limited (429), waiting...")
@@ -119,12 +132,17 @@ class OptimizedFootballAPI:
         return None
     
     def fetch_all_fixtures_for_date(self, date_str: str) -> List[Dict[str, Any]]:
+        """Tous les fixtures d'une date en liste (cf. iter_fixtures_for_date pour le flux)"""
+        return list(self.iter_fixtures_for_date(date_str))
+
+    def iter_fixtures_for_date(self, date_str: str) -> Iterator[Dict[str, Any]]:
         """
-        Récupère TOUS les fixtures d'une date avec pagination
+        Récupère TOUS les fixtures d'une date avec pagination, en flux :
+        chaque fixture est produit dès sa réception (mémoire constante, même sans filtre de ligue).
         C'est plus efficace que de faire une requête par ligue
         """
         print(f"\n📅 Fetching ALL fixtures for {date_str}")
-        all_fixtures = []
+        total = 0
         
         page = 1
         max_pages = 10  # Sécurité pour éviter les boucles infinies
@@ -134,21 +152,29 @@ class OptimizedFootballAPI:
             if page > 1:
                 params["page"] = page
                 
-            data = self.get_with_retry("fixtures", params)
-            
-            if not data or not data.get("response"):
+            response = self.request_with_retry("fixtures", params, stream=True)
+            if response is None:
+                print(f"📄 Page {page}: No data, stopping pagination")
+                break
+
+            stream = stream_items(response, "response.item")
+            count = 0
+            with response:
+                for fixture in stream:
+                    count += 1
+                    yield fixture
+            total += count
+
+            if not count:
                 print(f"📄 Page {page}: No data, stopping pagination")
                 break
             
-            fixtures = data["response"]
-            all_fixtures.extend(fixtures)
-            
-            # Vérifier pagination
-            paging = data.get("paging", {})
+            # Vérifier pagination (paging peut suivre la liste : lu une fois le flux consommé)
+            paging = stream.meta.get("paging") or {}
             current_page = paging.get("current", page)
             total_pages = paging.get("total", page)
             
-            print(f"📄 Page {current_page}/{total_pages}: {len(fixtures)} fixtures")
+            print(f"📄 Page {current_page}/{total_pages}: {count} fixtures ({stream.bytes_read / 1024:.0f} Ko)")
             
             # Arrêter si c'est la dernière page
             if current_page >= total_pages:
@@ -159,8 +185,11 @@ class OptimizedFootballAPI:
             # Pause courte pour éviter le rate limiting
             time.sleep(0.5)
         
-        print(f"📊 Total raw fixtures: {len(all_fixtures)}")
-        return all_fixtures
+        print(f"📊 Total raw fixtures: {total}")
+
+    def is_allowed(self, fixture: Dict[str, Any]) -> bool:
+        league_id = (fixture.get("league") or {}).get("id")
+        return not self.allowed_leagues or bool(league_id and int(league_id) in self.allowed_leagues)
     
     def filter_fixtures_by_leagues(self, fixtures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filtre les fixtures selon les ligues autorisées"""
@@ -175,7 +204,7 @@ class OptimizedFootballAPI:
             league_data = fixture.get("league", {})
             league_id = league_data.get("id")
             
-            if league_id and int(league_id) in self.allowed_leagues:
+            if self.is_allowed(fixture):
                 filtered_fixtures.append(fixture)
                 
                 # Compter par ligue pour stats
@@ -212,8 +241,8 @@ class OptimizedFootballAPI:
         print(f"🗓️ Target dates: {dates}")
         return dates
 
-def parse_and_store_fixture(fixture_data: Dict[str, Any]) -> bool:
-    """Parse et stocke un fixture dans la base de données"""
+def parse_and_store_fixture(fixture_data: Dict[str, Any], conn=None) -> bool:
+    """Parse et stocke un fixture dans la base de données (dans la transaction de `conn` si fournie)"""
     try:
         # Extraction des données
         fixture = fixture_data.get("fixture", {})
@@ -259,6 +288,9 @@ def parse_and_store_fixture(fixture_data: Dict[str, Any]) -> bool:
             league=str(league_id) if league_id else None,
             season=str(season) if season else None,
             fixture_id=str(fixture_id),
+            home_team_id=team_resolver.resolve(home_team_name, home_team_data.get("id")),
+            away_team_id=team_resolver.resolve(away_team_name, away_team_data.get("id")),
+            conn=conn,
         )
         
         return True
@@ -285,31 +317,41 @@ def main():
         for date_str in target_dates:
             print(f"\n{'='*25} {date_str} {'='*25}")
             
-            # Récupérer tous les fixtures de cette date
-            all_fixtures = api.fetch_all_fixtures_for_date(date_str)
-            
-            if not all_fixtures:
+            # Fixtures reçus en flux, filtrés et écrits au fil de l'eau (commit par lot)
+            raw_count = kept_count = inserted_count = 0
+            league_counts: Dict[str, int] = {}
+            with db.get_connection() as conn:
+                for fixture in api.iter_fixtures_for_date(date_str):
+                    raw_count += 1
+                    if not api.is_allowed(fixture):
+                        continue
+                    kept_count += 1
+                    league_data = fixture.get("league") or {}
+                    league_name = league_data.get("name", f"League {league_data.get('id')}")
+                    league_counts[league_name] = league_counts.get(league_name, 0) + 1
+
+                    if parse_and_store_fixture(fixture, conn):
+                        inserted_count += 1
+                    if kept_count % WRITE_BATCH == 0:
+                        team_resolver.flush(conn)
+                        conn.commit()
+                        print(f"📝 Processed {kept_count} fixtures...")
+                team_resolver.flush(conn)
+                conn.commit()
+
+            if not raw_count:
                 print(f"❌ No fixtures found for {date_str}")
                 continue
-            
-            # Filtrer selon nos ligues
-            filtered_fixtures = api.filter_fixtures_by_leagues(all_fixtures)
-            
-            if not filtered_fixtures:
+
+            print(f"🔍 Filtered to {kept_count} fixtures from allowed leagues")
+            for league_name, count in sorted(league_counts.items()):
+                print(f"  🏆 {league_name}: {count} fixtures")
+
+            if not kept_count:
                 print(f"❌ No fixtures in allowed leagues for {date_str}")
                 continue
             
-            # Traiter et stocker
-            inserted_count = 0
-            for i, fixture in enumerate(filtered_fixtures, 1):
-                if parse_and_store_fixture(fixture):
-                    inserted_count += 1
-                
-                # Progress update
-                if i % 10 == 0 or i == len(filtered_fixtures):
-                    print(f"📝 Processed {i}/{len(filtered_fixtures)} fixtures...")
-            
-            print(f"✅ {date_str}: {inserted_count}/{len(filtered_fixtures)} fixtures stored")
+            print(f"✅ {date_str}: {inserted_count}/{kept_count} fixtures stored")
             
             if inserted_count > 0:
                 total_inserted += inserted_count
@@ -327,6 +369,10 @@ def main():
         print(f"✅ Total fixtures inserted: {total_inserted}")
         print(f"📅 Successful dates: {', '.join(successful_dates) if successful_dates else 'None'}")
         
+        team_resolver.flush()
+        if total_inserted > 0:
+            db.bump_data_version("fetch_today")
+
         # Statistiques de la base
         with db.get_connection() as conn:
             total_matches = conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
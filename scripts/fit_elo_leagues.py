@@ -0,0 +1,198 @@
+# scripts/fit_elo_leagues.py
+"""
+Apprend les paramètres ELO par ligue (table elo_league_params) par rejeux numpy de l'historique :
+
+1. décalages de force (offset) : chaque équipe entre à 1500 + offset de sa ligue de rattachement ;
+   les offsets sont ajustés itérativement pour annuler le résidu moyen (réel − attendu) des matchs
+   entre équipes de ligues différentes (coupes d'Europe, coupes nationales entre divisions),
+2. K par ligue, puis avantage du terrain par ligue, puis régression de début de saison :
+   pour chaque valeur de la grille, un rejeu avec cette valeur pour toutes les ligues, et chaque
+   ligue garde la valeur qui minimise SA log-loss (les ligues sont quasi indépendantes),
+3. offsets réajustés avec les K / avantages retenus.
+
+Une ligue avec moins de --min-matches matchs évalués garde les paramètres globaux (elo_config) ;
+sans --min-cross matchs inter-ligues, son offset reste 0. Les offsets sont centrés (moyenne par
+équipe nulle). --save n'écrit que si la log-loss globale s'améliore ; relancer ensuite
+scripts/build_elo_history.py.
+
+Usage:
+  python -u scripts/fit_elo_leagues.py
+  python -u scripts/fit_elo_leagues.py --k 12,16,24,32 --home-adv 0,40,80,120 --save
+"""
+import time
+import argparse
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.models.database import db
+from src.services import elo_replay
+from src.services.elo_system import load_elo_config, save_league_params
+
+# Pas de Newton approché : dE/d(écart) ≈ ln(10)/400 × E(1−E) ≈ 0.00144 autour de E = 0.5
+OFFSET_STEP = 0.5 / 0.00144
+OFFSET_MAX_STEP = 50.0
+
+def floats(raw: str) -> List[float]:
+    return [float(x) for x in raw.split(",") if x.strip()]
+
+class LeagueFitter:
+    def __init__(self, history: pd.DataFrame, config: Dict[str, float], eval_mask: np.ndarray,
+                 min_matches: int, min_cross: int):
+        self.history = history
+        self.config = config
+        self.eval_mask = eval_mask
+        self.team_leagues = elo_replay.home_leagues(history)
+        self.match_league = history["league"].astype(str).to_numpy()
+        self.home_league = self.team_leagues.reindex(history["home"]).astype(str).to_numpy()
+        self.away_league = self.team_leagues.reindex(history["away"]).astype(str).to_numpy()
+        self.cross = self.home_league != self.away_league
+        self.result = history["result"].to_numpy()
+        self.actual = np.select([self.result == elo_replay.HOME, self.result == elo_replay.DRAW], [1.0, 0.5], 0.0)
+
+        counts = pd.Series(self.match_league[eval_mask]).value_counts()
+        self.leagues = sorted(counts[counts >= min_matches].index)
+        cross_counts = pd.concat([
+            pd.Series(self.home_league[self.cross]), pd.Series(self.away_league[self.cross])
+        ]).value_counts()
+        self.cross_counts = cross_counts
+        self.offset_leagues = sorted(cross_counts[cross_counts >= min_cross].index)
+        self.params: Dict[str, Dict[str, float]] = {}
+        self.replays = 0
+
+    # ---------- rejeu / score ----------
+    def replay(self, params: Dict[str, Dict[str, float]]) -> Dict[str, np.ndarray]:
+        self.replays += 1
+        return elo_replay.replay(self.history, **self.config, league_params=params, team_leagues=self.team_leagues)
+
+    def losses(self, probs: np.ndarray) -> np.ndarray:
+        p_true = probs[np.arange(len(self.result)), self.result]
+        return -np.log(np.clip(p_true, 1e-15, 1.0))
+
+    def league_loss(self, probs: np.ndarray) -> pd.Series:
+        loss = self.losses(probs)[self.eval_mask]
+        return pd.Series(loss).groupby(self.match_league[self.eval_mask]).mean()
+
+    def total_loss(self, params: Dict[str, Dict[str, float]]) -> float:
+        return float(self.losses(self.replay(params)["probs"])[self.eval_mask].mean())
+
+    def _with(self, key: str, value: float, leagues: List[str]) -> Dict[str, Dict[str, float]]:
+        params = {lg: dict(p) for lg, p in self.params.items()}
+        for lg in leagues:
+            params.setdefault(lg, {})[key] = value
+        return params
+
+    # ---------- étapes ----------
+    def fit_offsets(self, iterations: int):
+        """Annule le résidu moyen des matchs inter-ligues, du point de vue de chaque ligue de rattachement."""
+        if not self.offset_leagues:
+            return
+        teams_per_league = self.team_leagues.value_counts()
+        for _ in range(iterations):
+            r = self.replay(self.params)
+            resid = (self.actual - r["expected"])[self.cross]
+            per_league = pd.concat([
+                pd.Series(resid, index=self.home_league[self.cross]),
+                pd.Series(-resid, index=self.away_league[self.cross]),
+            ]).groupby(level=0).mean()
+
+            max_step = 0.0
+            for lg in self.offset_leagues:
+                step = float(np.clip(OFFSET_STEP * per_league.get(lg, 0.0), -OFFSET_MAX_STEP, OFFSET_MAX_STEP))
+                p = self.params.setdefault(lg, {})
+                p["offset"] = p.get("offset", 0.0) + step
+                max_step = max(max_step, abs(step))
+
+            # Centrage : rating d'entrée moyen (par équipe) = 1500
+            weights = teams_per_league.reindex(self.offset_leagues).fillna(0)
+            mean = sum(self.params[lg]["offset"] * w for lg, w in weights.items()) / max(1, teams_per_league.sum())
+            for lg in self.offset_leagues:
+                self.params[lg]["offset"] -= mean
+            if max_step < 1.0:
+                break
+
+    def fit_grid(self, key: str, values: List[float]):
+        """Chaque ligue retient la valeur de `values` qui minimise sa propre log-loss."""
+        if not self.leagues or not values:
+            return
+        table = pd.DataFrame({
+            v: self.league_loss(self.replay(self._with(key, v, self.leagues))["probs"]).reindex(self.leagues)
+            for v in values
+        })
+        best = table.idxmin(axis=1)
+        for lg, v in best.items():
+            if pd.notna(v):
+                self.params.setdefault(lg, {})[key] = float(v)
+
+    def rows(self) -> List[Dict]:
+        counts = pd.Series(self.match_league).value_counts()
+        out = []
+        for lg, p in sorted(self.params.items()):
+            out.append({
+                "league_id": lg, **p,
+                "matches": int(counts.get(lg, 0)),
+                "cross_matches": int(self.cross_counts.get(lg, 0)),
+            })
+        return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit per-league ELO parameters")
+    parser.add_argument("--k", default="12,16,20,24,32,40", help="Grille de K par ligue.")
+    parser.add_argument("--home-adv", default="0,25,50,75,100,125", help="Grille d'avantage du terrain par ligue.")
+    parser.add_argument("--season-regress", default="0,0.1,0.2,0.33,0.5", help="Grille de régression de début de saison.")
+    parser.add_argument("--offset-iterations", type=int, default=20)
+    parser.add_argument("--min-matches", type=int, default=300, help="Matchs évalués minimum pour des K / avantage propres.")
+    parser.add_argument("--min-cross", type=int, default=10, help="Matchs inter-ligues minimum pour un offset.")
+    parser.add_argument("--warmup-days", type=int, default=180, help="Jours de chauffe exclus du score.")
+    parser.add_argument("--save", action="store_true", help="Écrit les paramètres dans elo_league_params.")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    with db.get_connection() as conn:
+        history = elo_replay.load_history(conn)
+        config = load_elo_config(conn)
+    if history.empty:
+        print("❌ Aucun match terminé en base.")
+        return 1
+
+    start = (date.fromisoformat(history["day"].iloc[0]) + timedelta(days=args.warmup_days)).isoformat()
+    eval_mask = (history["day"] >= start).to_numpy()
+    if not eval_mask.any():
+        print(f"❌ Aucun match après la période de chauffe ({start}).")
+        return 1
+
+    fitter = LeagueFitter(history, config, eval_mask, args.min_matches, args.min_cross)
+    print(f"📚 {len(history):,} matchs ({int(eval_mask.sum()):,} évalués depuis {start}), "
+          f"{history['league'].nunique()} ligues, {int(fitter.cross.sum()):,} matchs inter-ligues")
+    print(f"🎛️ {len(fitter.leagues)} ligues avec paramètres propres, {len(fitter.offset_leagues)} avec offset")
+
+    baseline = fitter.total_loss({})
+    fitter.fit_offsets(args.offset_iterations)
+    fitter.fit_grid("k_factor", floats(args.k))
+    fitter.fit_grid("home_advantage", floats(args.home_adv))
+    fitter.fit_grid("season_regress", floats(args.season_regress))
+    fitter.fit_offsets(args.offset_iterations)
+    fitted = fitter.total_loss(fitter.params)
+
+    rows = fitter.rows()
+    if rows:
+        table = pd.DataFrame(rows).sort_values("matches", ascending=False)
+        print("\n🏟️ Paramètres par ligue")
+        print(table.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print(f"\n📏 Log-loss globale (elo_config seul): {baseline:.4f}")
+    print(f"✨ Log-loss avec paramètres par ligue: {fitted:.4f} ({fitter.replays} rejeux)")
+
+    if args.save:
+        if fitted < baseline and rows:
+            save_league_params(rows)
+            print(f"💾 {len(rows)} ligues écrites dans elo_league_params → relancer scripts/build_elo_history.py")
+        else:
+            print("ℹ Pas d'amélioration, elo_league_params inchangée.")
+
+    print(f"\n⏱️ Terminé en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
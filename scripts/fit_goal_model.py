@@ -0,0 +1,65 @@
+# scripts/fit_goal_model.py
+"""
+Ajuste le modèle de buts Poisson / Dixon–Coles (src/services/goal_model.py) sur les matchs terminés :
+une tâche par ligue (attaque / défense par équipe, avantage du terrain et ρ par ligue), réparties
+sur --workers processus, puis écriture dans goal_model_leagues / goal_model_teams (méthode POISSON
+de generate_predictions). Les matchs sont pondérés par exp(-decay × âge en jours) à partir
+d'aujourd'hui ; --decay 0 les pondère tous également.
+
+Usage:
+  python -u scripts/fit_goal_model.py
+  python -u scripts/fit_goal_model.py --decay 0 --lookback-days 730 --workers 8
+"""
+import os
+import math
+import time
+import argparse
+from datetime import datetime, timezone
+
+from src.models.database import db
+from src.services import elo_replay, goal_model
+from src.utils.metrics import metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit the per-league Poisson / Dixon-Coles goal model")
+    parser.add_argument("--decay", type=float, default=goal_model.DEFAULT_DECAY,
+                        help="Décroissance temporelle par jour (0 = sans).")
+    parser.add_argument("--lookback-days", type=int, default=goal_model.LOOKBACK_DAYS,
+                        help="Matchs plus anciens ignorés (0 = tout l'historique).")
+    parser.add_argument("--min-matches", type=int, default=goal_model.MIN_LEAGUE_MATCHES,
+                        help="Matchs minimum pour ajuster une ligue.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("GOAL_MODEL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+                        help="Processus d'ajustement (1 = séquentiel).")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    with metrics.stage("load"), db.get_connection() as conn:
+        history = elo_replay.load_history(conn)
+        metrics.count("rows_read", len(history))
+    if history.empty:
+        print("❌ Aucun match terminé en base.")
+        return 1
+
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    with metrics.stage("fit"):
+        fits = goal_model.fit_leagues(history, decay=args.decay, reference_day=today, workers=args.workers,
+                                      lookback_days=args.lookback_days or None, min_matches=args.min_matches)
+    if not fits:
+        print(f"⚠️ Aucune ligue avec au moins {args.min_matches} matchs sur la période.")
+        return 1
+
+    with metrics.stage("write"), db.get_connection() as conn:
+        goal_model.save_fits(conn, fits, args.decay)
+        db.bump_data_version("fit_goal_model", conn)
+        conn.commit()
+    metrics.rows(sum(len(f["teams"]) for f in fits))
+
+    for f in sorted(fits, key=lambda f: f["league"]):
+        print(f"  ⚽ Ligue {f['league']:<8} {f['matches']:>6,} matchs, {len(f['teams']):>3} équipes | "
+              f"avantage ×{math.exp(f['home_adv']):.2f} ρ={f['rho']:+.3f} ({f['solver']})")
+    print(f"✅ Modèle de buts ajusté: {len(fits)} ligues ({args.workers} processus, decay={args.decay:g}) "
+          f"en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    exit(metrics.main("fit_goal_model", main))
@@ -1,26 +1,66 @@
 # scripts/generate_predictions_enhanced.py
 """
-Système de prédictions complet avec 4 méthodes :
+Système de prédictions complet avec 5 méthodes :
 1. ELO - Basé sur les ratings ELO
 2. B365 - Basé sur l'historique des cotes Bet365  
 3. PINNACLE - Basé sur l'historique des cotes Pinnacle
 4. COMBINED - Fusion intelligente des 3 méthodes
+5. POISSON - Modèle de buts Dixon–Coles par ligue (scripts/fit_goal_model.py) : 1X2, O/U 2.5, BTTS
+
+Les méthodes bookmaker donnent 1X2, Over 2.5 et BTTS à partir du même ensemble de voisins
+historiques : k plus proches voisins pondérés par noyau, à rayon adaptatif, calculés pour tous
+les matchs du jour en bloc (src/services/odds_neighbours.py, historique chargé une fois par
+bookmaker et par passage) ; les mêmes fréquences alimentent method_stats. Les values sont calculées sur les meilleures cotes odds / ou25_odds / btts_odds.
+
+Par défaut, seuls les matchs dont les entrées (ratings ELO, modèle de buts, cotes) ont changé depuis leur dernière
+prédiction sont recalculés (empreintes dans prediction_inputs) ; --full recalcule tout le jour.
+
+Usage:
+  python -u scripts/generate_predictions.py [--full]
 """
 from __future__ import annotations
 import sqlite3
 import math
+import json
+import hashlib
+import argparse
 from typing import Dict, List, Optional, Tuple, NamedTuple
 from datetime import datetime
 from dataclasses import dataclass
 
-DB_PATH = "data/football.db"
+import numpy as np
+
+from src.models.database import db, DB_PATH, DB_TIMEOUT
+from src.services import prediction_matrix
+from src.services.elo_system import elo_system
+from src.services import elo_replay, goal_model, odds_neighbours
+from src.services.odds_neighbours import NeighbourIndex
+from src.utils.metrics import metrics
 
 # Configuration
-HOME_ADV = 100.0
 DEFAULT_ELO = 1500.0
 BET365_ID = 8
 PINNACLE_ID = 4
-ODDS_SIMILARITY_THRESHOLD = 0.06  # 6% de différence sur les probas implicites
+ODDS_SIMILARITY_THRESHOLD = 0.06  # rayon minimal des voisins (distance des probas implicites)
+MIN_SIMILAR_SAMPLES = 5           # historique du bookmaker en dessous duquel pas de prédiction
+MAX_SIMILAR_SAMPLES = 30          # k plus proches voisins retenus (rayon élargi si besoin)
+
+# Pondération du COMBINED par méthode : (poids de base, + confiance × pente, bonus si échantillon ≥ LARGE_SAMPLE)
+COMBINE_WEIGHTS = {
+    "ELO": (0.4, 0.2, 0.0),        # 0.4-0.6 selon confiance
+    "B365": (0.3, 0.3, 0.1),       # 0.3-0.6 (+0.1)
+    "PINNACLE": (0.35, 0.35, 0.15),  # 0.35-0.7 (+0.15) : souvent plus précis
+}
+LARGE_SAMPLE = 20
+POISSON_FULL_CONFIDENCE = 38      # matchs ajustés (par équipe) pour une confiance POISSON de 1
+# Meilleures cotes par marché : (table, [(clé, colonne)])
+BEST_ODDS_COLUMNS = (
+    ("odds", (("home_odd", "home_odd"), ("draw_odd", "draw_odd"), ("away_odd", "away_odd"))),
+    ("ou25_odds", (("over25_odd", "over25_odd"), ("under25_odd", "under25_odd"))),
+    ("btts_odds", (("btts_yes_odd", "yes_odd"), ("btts_no_odd", "no_odd"))),
+)
+# À incrémenter quand le calcul des prédictions change : invalide toutes les empreintes d'entrées
+PREDICTION_VERSION = 4
 
 @dataclass
 class PredictionResult:
@@ -29,7 +69,9 @@ class PredictionResult:
     draw_prob: float
     away_prob: float
     confidence: float = 0.0  # Score de confiance 0-1
-    sample_size: int = 0     # Nombre d'échantillons historiques utilisés
+    sample_size: int = 0     # Nombre d'échantillons historiques utilisés (effectif si pondérés)
+    over25_prob: Optional[float] = None  # Over 2.5 (méthodes bookmaker et COMBINED)
+    btts_prob: Optional[float] = None    # Les deux équipes marquent
 
 @dataclass
 class MatchFixture:
@@ -39,13 +81,19 @@ class MatchFixture:
     league: Optional[str]
     home_team: str
     away_team: str
+    home_id: Optional[str] = None  # clés canoniques (team_stats, historique), cf. elo_replay.HOME_KEY
+    away_id: Optional[str] = None
 
 class FootballPredictor:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self._indexes: Dict[int, NeighbourIndex] = {}
     
     def get_conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+        # Base par défaut : connexion partagée (pool du pipeline) et mêmes réglages que db
+        if self.db_path == db.path:
+            return db.connect()
+        conn = sqlite3.connect(self.db_path, timeout=DB_TIMEOUT)
         conn.row_factory = sqlite3.Row
         return conn
     
@@ -58,82 +106,142 @@ class FootballPredictor:
     
     def get_today_fixtures(self) -> List[MatchFixture]:
         """Récupère les matchs du jour"""
+        return self.select_fixtures(today=True)
+
+    def get_fixtures(self, fixture_ids: List[str]) -> List[MatchFixture]:
+        """Matchs désignés par fixture_id (re-prédiction ciblée)"""
+        ids = sorted({str(f) for f in fixture_ids})
+        fixtures = []
+        for i in range(0, len(ids), 500):
+            fixtures += self.select_fixtures(fixture_ids=ids[i:i + 500])
+        return fixtures
+
+    def select_fixtures(self, today: bool = False, fixture_ids: Optional[List[str]] = None) -> List[MatchFixture]:
+        """
+        Matchs avec noms d'affichage et clés canoniques (home_id / away_id, league) : ids du
+        TeamResolver à défaut des noms, comme l'historique rejoué (elo_replay.HOME_KEY…).
+        """
+        where = ""
+        params: List[str] = []
+        if fixture_ids is not None:
+            where = f"WHERE fixture_id IN ({', '.join('?' * len(fixture_ids))})"
+            params += fixture_ids
+        elif today:
+            where = "WHERE substr(date,1,10)=?"
+            params.append(self.today_str())
+        
         with self.get_conn() as conn:
-            cols = set(self.table_columns("matches"))
-            
-            # Adapter aux colonnes disponibles
-            col_date = "date" if "date" in cols else None
-            col_fixture = "fixture_id" if "fixture_id" in cols else None
-            col_league = "league" if "league" in cols else ("league_id" if "league_id" in cols else None)
-            home_col = "home_team" if "home_team" in cols else ("home_team_id" if "home_team_id" in cols else None)
-            away_col = "away_team" if "away_team" in cols else ("away_team_id" if "away_team_id" in cols else None)
-            
-            if not home_col or not away_col:
-                return []
-            
-            select_cols = []
-            if col_fixture: select_cols.append(col_fixture)
-            if col_date: select_cols.append(col_date)
-            if col_league: select_cols.append(col_league)
-            select_cols += [home_col, away_col]
-            
-            where = ""
-            params = []
-            if col_date:
-                where = f"WHERE substr({col_date},1,10)=?"
-                params.append(self.today_str())
-            
-            query = f"SELECT {', '.join(select_cols)} FROM matches {where}"
-            rows = conn.execute(query, params).fetchall()
-            
-            fixtures = []
-            for r in rows:
-                fixtures.append(MatchFixture(
-                    fixture_id=r[col_fixture] if col_fixture else None,
-                    date=r[col_date] if col_date else None,
-                    league=r[col_league] if col_league else None,
-                    home_team=str(r[home_col]) if r[home_col] else "",
-                    away_team=str(r[away_col]) if r[away_col] else ""
-                ))
-            
-            return fixtures
+            rows = conn.execute(f"""
+                SELECT fixture_id, date, {elo_replay.LEAGUE_KEY} AS league,
+                       COALESCE(home_team, home_team_id) AS home_team, COALESCE(away_team, away_team_id) AS away_team,
+                       {elo_replay.HOME_KEY} AS home_id, {elo_replay.AWAY_KEY} AS away_id
+                FROM matches {where}
+            """, params).fetchall()
+        
+        return [MatchFixture(
+            fixture_id=r["fixture_id"],
+            date=r["date"],
+            league=r["league"],
+            home_team=str(r["home_team"]) if r["home_team"] else "",
+            away_team=str(r["away_team"]) if r["away_team"] else "",
+            home_id=r["home_id"],
+            away_id=r["away_id"]
+        ) for r in rows]
     
     # ═══════════════════════════════════════════════════════════════════
     # MÉTHODE 1: ELO SYSTEM
     # ═══════════════════════════════════════════════════════════════════
     
-    def get_team_elo(self, team_id: str) -> float:
-        """Récupère le rating ELO d'une équipe"""
+    def team_ratings(self, teams: List[str]) -> Dict[str, float]:
+        """Ratings ELO courants (team_stats) de plusieurs équipes, par clé canonique (MatchFixture.home_id)"""
         with self.get_conn() as conn:
-            row = conn.execute(
-                "SELECT elo FROM team_stats WHERE team_id = ?",
-                (team_id.strip(),)
-            ).fetchone()
-            return float(row["elo"]) if row and row["elo"] else DEFAULT_ELO
-    
-    def predict_elo(self, home_team: str, away_team: str) -> PredictionResult:
-        """Prédiction basée sur les ratings ELO"""
-        home_elo = self.get_team_elo(home_team)
-        away_elo = self.get_team_elo(away_team)
-        
-        # Calcul des probabilités avec avantage domicile
-        diff = (home_elo + HOME_ADV) - away_elo
-        p_home_raw = 1.0 / (1.0 + math.pow(10.0, (-diff / 400.0)))
-        p_away_raw = 1.0 - p_home_raw
-        
-        # Ajout d'une probabilité de nul (25% puis renormalisation)
-        p_draw = 0.25
-        scale = p_home_raw + p_away_raw
-        if scale <= 0:
-            return PredictionResult(0.375, 0.25, 0.375, confidence=0.5)
-        
-        p_home = p_home_raw * (0.75 / scale)
-        p_away = p_away_raw * (0.75 / scale)
-        
-        # Confiance basée sur la différence ELO
-        confidence = min(1.0, abs(diff) / 400.0)
+            return elo_replay.team_ratings(conn, teams)
+    
+    def get_team_elo(self, team_id: str, league: Optional[str] = None) -> float:
+        """Récupère le rating ELO d'une équipe (clé canonique ; rating d'entrée de sa ligue si inconnue)"""
+        return float(elo_replay.lookup_ratings(self.team_ratings([team_id]), [team_id], [league],
+                                               elo_system.league_params)[0])
+    
+    @metrics.timed()
+    def predict_elo(self, home_team: str, away_team: str, league: Optional[str] = None,
+                    ratings: Optional[Dict[str, float]] = None) -> PredictionResult:
+        """
+        Prédiction basée sur les ratings ELO (mêmes paramètres que EloSystem : elo_config / elo_league_params).
+        home_team / away_team : clés canoniques (MatchFixture.home_id), comme les ratings rejoués par
+        build_elo_history ; `ratings` : ratings déjà chargés (cf. team_ratings), lus en base sinon.
+        """
+        if ratings is None:
+            ratings = self.team_ratings([home_team, away_team])
+        home_elo, away_elo = elo_replay.lookup_ratings(ratings, [home_team, away_team], [league, league],
+                                                       elo_system.league_params)
+        probs, confidence = elo_replay.elo_predictions([home_elo], [away_elo], [league],
+                                                       elo_system.config, elo_system.league_params)
+        return PredictionResult(float(probs[0, 0]), float(probs[0, 1]), float(probs[0, 2]),
+                                confidence=float(confidence[0]))
+    
+    # ═══════════════════════════════════════════════════════════════════
+    # MÉTHODE 5: MODÈLE DE BUTS (POISSON / DIXON–COLES)
+    # ═══════════════════════════════════════════════════════════════════
+    
+    def fixture_keys(self, fixture_ids: List[str]) -> Dict[str, Tuple[str, str, str]]:
+        """(ligue, équipe dom., équipe ext.) avec les mêmes clés que l'historique (elo_replay.load_history)"""
+        ids = sorted({str(f) for f in fixture_ids if f})
+        out = {}
+        with self.get_conn() as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for r in conn.execute(f"""
+                    SELECT CAST(fixture_id AS TEXT), {elo_replay.LEAGUE_KEY}, {elo_replay.HOME_KEY}, {elo_replay.AWAY_KEY}
+                    FROM matches WHERE fixture_id IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall():
+                    out[r[0]] = (r[1], r[2], r[3])
+        return out
+    
+    @metrics.timed()
+    def predict_poisson_batch(self, fixture_ids: List[str]) -> Dict[str, PredictionResult]:
+        """
+        Prédictions POISSON de plusieurs matchs : matrices de score de tous les matchs en un appel
+        (goal_model.score_matrices), puis 1X2, Over 2.5 et BTTS. Équipe inconnue de sa ligue
+        (promue…) : forces moyennes de la ligue ; ligue non ajustée : pas de prédiction.
+        """
+        keys = self.fixture_keys(fixture_ids)
+        if not keys:
+            return {}
+        with self.get_conn() as conn:
+            fits = goal_model.load_fits(conn, [k[0] for k in keys.values() if k[0]])
         
-        return PredictionResult(p_home, p_draw, p_away, confidence=confidence)
+        ids, lam, mu, rho, seen = [], [], [], [], []
+        for fid, (league, home, away) in keys.items():
+            fit = fits.get(league)
+            if fit is None:
+                continue
+            h_att, h_def, h_n = fit["teams"].get(home, (0.0, 0.0, 0))
+            a_att, a_def, a_n = fit["teams"].get(away, (0.0, 0.0, 0))
+            ids.append(fid)
+            lam.append(math.exp(fit["home_adv"] + h_att + a_def))
+            mu.append(math.exp(a_att + h_def))
+            rho.append(fit["rho"])
+            seen.append(min(h_n, a_n))
+        if not ids:
+            return {}
+        
+        probs = goal_model.market_probabilities(goal_model.score_matrices(np.array(lam), np.array(mu), np.array(rho)))
+        return {
+            fid: PredictionResult(
+                float(probs["home"][i]), float(probs["draw"][i]), float(probs["away"][i]),
+                confidence=min(1.0, seen[i] / POISSON_FULL_CONFIDENCE),
+                sample_size=int(seen[i]),
+                over25_prob=float(probs["over25"][i]),
+                btts_prob=float(probs["btts"][i])
+            )
+            for i, fid in enumerate(ids)
+        }
+    
+    def predict_poisson(self, fixture_id: str) -> Optional[PredictionResult]:
+        """Prédiction du modèle de buts pour un match"""
+        if not fixture_id:
+            return None
+        return self.predict_poisson_batch([fixture_id]).get(str(fixture_id))
     
     # ═══════════════════════════════════════════════════════════════════
     # MÉTHODE 2 & 3: BOOKMAKER ANALYSIS (BET365 & PINNACLE)
@@ -179,77 +287,76 @@ class FootballPredictor:
             
             return (float(row["home_odd"]), float(row["draw_odd"]), float(row["away_odd"]))
     
-    def find_similar_historical_matches(self, current_odds: Tuple[float, float, float], 
-                                      bookmaker_id: int, min_samples: int = 10) -> List[Dict]:
-        """Trouve les matchs historiques avec des cotes similaires"""
+    def current_odds(self, fixture_ids: List[str], bookmaker_id: int) -> Dict[str, Tuple[float, float, float]]:
+        """Cotes 1X2 actuelles du bookmaker pour plusieurs matchs"""
+        ids = sorted({str(f) for f in fixture_ids if f})
+        out = {}
         with self.get_conn() as conn:
-            # Récupérer tous les matchs avec résultats et cotes du bookmaker
-            rows = conn.execute("""
-                SELECT m.fixture_id, m.goals_home, m.goals_away,
-                       o.home_odd, o.draw_odd, o.away_odd
-                FROM matches m
-                JOIN odds o ON o.fixture_id = m.fixture_id AND o.bookmaker_id = ?
-                WHERE m.goals_home IS NOT NULL AND m.goals_away IS NOT NULL
-                  AND o.home_odd IS NOT NULL AND o.draw_odd IS NOT NULL AND o.away_odd IS NOT NULL
-            """, (bookmaker_id,)).fetchall()
-            
-            similar_matches = []
-            
-            for row in rows:
-                hist_odds = (float(row["home_odd"]), float(row["draw_odd"]), float(row["away_odd"]))
-                similarity = self.odds_similarity(current_odds, hist_odds)
-                
-                if similarity <= ODDS_SIMILARITY_THRESHOLD:
-                    similar_matches.append({
-                        "fixture_id": row["fixture_id"],
-                        "goals_home": int(row["goals_home"]),
-                        "goals_away": int(row["goals_away"]),
-                        "similarity": similarity,
-                        "odds": hist_odds
-                    })
-            
-            # Trier par similarité (plus similaire en premier)
-            similar_matches.sort(key=lambda x: x["similarity"])
-            
-            return similar_matches[:min(len(similar_matches), min_samples * 3)]  # Plus d'échantillons pour la robustesse
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for r in conn.execute(f"""
+                    SELECT fixture_id, home_odd, draw_odd, away_odd FROM odds
+                    WHERE bookmaker_id = ? AND fixture_id IN ({', '.join('?' * len(chunk))})
+                      AND home_odd IS NOT NULL AND draw_odd IS NOT NULL AND away_odd IS NOT NULL
+                """, [bookmaker_id, *chunk]).fetchall():
+                    out[str(r["fixture_id"])] = (float(r["home_odd"]), float(r["draw_odd"]), float(r["away_odd"]))
+        return out
+    
+    def bookmaker_index(self, bookmaker_id: int) -> NeighbourIndex:
+        """
+        Index des matchs joués avec cotes 1X2 du bookmaker (probas implicites -> issues 1X2 / O2.5 / BTTS).
+        Lu une seule fois par passage (cf. predict_fixtures) et partagé par tous les matchs et marchés.
+        """
+        index = self._indexes.get(bookmaker_id)
+        if index is None:
+            with self.get_conn() as conn:
+                rows = conn.execute("""
+                    SELECT m.goals_home, m.goals_away, o.home_odd, o.draw_odd, o.away_odd
+                    FROM matches m
+                    JOIN odds o ON o.fixture_id = m.fixture_id AND o.bookmaker_id = ?
+                    WHERE m.goals_home IS NOT NULL AND m.goals_away IS NOT NULL
+                      AND o.home_odd IS NOT NULL AND o.draw_odd IS NOT NULL AND o.away_odd IS NOT NULL
+                """, (bookmaker_id,)).fetchall()
+            data = np.array([tuple(r) for r in rows], dtype=float).reshape(-1, 5)
+            index = NeighbourIndex(odds_neighbours.implied(data[:, 2:]),
+                                   odds_neighbours.outcomes(data[:, 0], data[:, 1]))
+            self._indexes[bookmaker_id] = index
+            metrics.count("history_rows", len(index))
+        return index
+    
+    @metrics.timed()
+    def predict_bookmakers(self, fixture_ids: List[str], bookmaker_id: int) -> Dict[str, PredictionResult]:
+        """
+        Prédictions bookmaker de plusieurs matchs en un seul calcul : 1X2, Over 2.5 et BTTS des
+        MAX_SIMILAR_SAMPLES plus proches voisins, pondérés par la distance des cotes.
+        Disponible pour tout match coté dès que l'historique du bookmaker compte MIN_SIMILAR_SAMPLES matchs.
+        """
+        current = self.current_odds(fixture_ids, bookmaker_id)
+        if not current:
+            return {}
+        index = self.bookmaker_index(bookmaker_id)
+        ids = list(current)
+        found = index.query(odds_neighbours.implied([current[f] for f in ids]), k=MAX_SIMILAR_SAMPLES,
+                            min_radius=ODDS_SIMILARITY_THRESHOLD, min_samples=MIN_SIMILAR_SAMPLES)
+        
+        out = {}
+        for fid, est, conf, eff in zip(ids, found["estimates"], found["confidence"], found["effective"]):
+            if np.isnan(est[0]):
+                continue
+            out[fid] = PredictionResult(
+                float(est[odds_neighbours.HOME]), float(est[odds_neighbours.DRAW]), float(est[odds_neighbours.AWAY]),
+                confidence=float(conf),
+                sample_size=int(round(eff)),
+                over25_prob=float(est[odds_neighbours.OVER25]),
+                btts_prob=float(est[odds_neighbours.BTTS])
+            )
+        return out
     
     def predict_bookmaker(self, fixture_id: str, bookmaker_id: int) -> Optional[PredictionResult]:
-        """Prédiction basée sur l'historique des cotes d'un bookmaker"""
-        current_odds = self.get_current_odds(fixture_id, bookmaker_id)
-        if not current_odds:
-            return None
-        
-        similar_matches = self.find_similar_historical_matches(current_odds, bookmaker_id)
-        
-        if len(similar_matches) < 5:  # Minimum d'échantillons
+        """Prédiction basée sur l'historique des cotes d'un bookmaker (1X2, Over 2.5 et BTTS des mêmes voisins)"""
+        if not fixture_id:
             return None
-        
-        # Analyser les résultats historiques
-        home_wins = draw_count = away_wins = 0
-        total_matches = len(similar_matches)
-        
-        for match in similar_matches:
-            gh, ga = match["goals_home"], match["goals_away"]
-            if gh > ga:
-                home_wins += 1
-            elif gh == ga:
-                draw_count += 1
-            else:
-                away_wins += 1
-        
-        # Probabilités empiriques
-        home_prob = home_wins / total_matches
-        draw_prob = draw_count / total_matches
-        away_prob = away_wins / total_matches
-        
-        # Score de confiance basé sur la taille de l'échantillon et la cohérence
-        confidence = min(1.0, total_matches / 50.0)  # Plus d'échantillons = plus de confiance
-        
-        return PredictionResult(
-            home_prob, draw_prob, away_prob,
-            confidence=confidence,
-            sample_size=total_matches
-        )
+        return self.predict_bookmakers([fixture_id], bookmaker_id).get(str(fixture_id))
     
     def predict_bet365(self, fixture_id: str) -> Optional[PredictionResult]:
         """Prédiction basée sur Bet365"""
@@ -263,105 +370,159 @@ class FootballPredictor:
     # MÉTHODE 4: COMBINED
     # ═══════════════════════════════════════════════════════════════════
     
+    @metrics.timed()
     def predict_combined(self, match: MatchFixture) -> Optional[PredictionResult]:
         """Fusion intelligente des 3 méthodes précédentes"""
-        # Obtenir les prédictions individuelles
-        elo_pred = self.predict_elo(match.home_team, match.away_team)
+        elo_pred = self.predict_elo(match.home_id or match.home_team, match.away_id or match.away_team, match.league)
         bet365_pred = self.predict_bet365(match.fixture_id) if match.fixture_id else None
         pinnacle_pred = self.predict_pinnacle(match.fixture_id) if match.fixture_id else None
-        
-        # Système de pondération dynamique
-        predictions = []
-        weights = []
-        
-        # ELO: toujours disponible, poids de base
-        predictions.append((elo_pred.home_prob, elo_pred.draw_prob, elo_pred.away_prob))
-        weights.append(0.4 + elo_pred.confidence * 0.2)  # 0.4-0.6 selon confiance
-        
-        # Bet365: poids selon disponibilité et qualité
-        if bet365_pred:
-            predictions.append((bet365_pred.home_prob, bet365_pred.draw_prob, bet365_pred.away_prob))
-            weight = 0.3 + bet365_pred.confidence * 0.3  # 0.3-0.6
-            if bet365_pred.sample_size >= 20:
-                weight += 0.1  # Bonus pour échantillon large
-            weights.append(weight)
-        
-        # Pinnacle: souvent plus précis, poids légèrement supérieur
-        if pinnacle_pred:
-            predictions.append((pinnacle_pred.home_prob, pinnacle_pred.draw_prob, pinnacle_pred.away_prob))
-            weight = 0.35 + pinnacle_pred.confidence * 0.35  # 0.35-0.7
-            if pinnacle_pred.sample_size >= 20:
-                weight += 0.15  # Bonus plus important pour Pinnacle
-            weights.append(weight)
-        
-        if not predictions:
-            return None
-        
+        return self.combine(elo_pred, bet365_pred, pinnacle_pred)
+
+    @staticmethod
+    def combine(elo_pred: PredictionResult, bet365_pred: Optional[PredictionResult] = None,
+                pinnacle_pred: Optional[PredictionResult] = None,
+                weights: Dict[str, Tuple[float, float, float]] = None) -> PredictionResult:
+        """
+        Moyenne pondérée des prédictions disponibles (sans accès DB, réutilisée par le backtest).
+        Poids d'une méthode = base + confiance × pente (+ bonus si échantillon ≥ LARGE_SAMPLE).
+        """
+        weights = weights or COMBINE_WEIGHTS
+        parts = [(m, p) for m, p in (("ELO", elo_pred), ("B365", bet365_pred), ("PINNACLE", pinnacle_pred))
+                 if p is not None]
+
+        raw = []
+        for method, pred in parts:
+            base, slope, bonus = weights[method]
+            raw.append(base + pred.confidence * slope + (bonus if pred.sample_size >= LARGE_SAMPLE else 0.0))
+
         # Normaliser les poids
-        total_weight = sum(weights)
+        total_weight = sum(raw)
         if total_weight <= 0:
             return elo_pred  # Fallback ELO
-        
-        normalized_weights = [w / total_weight for w in weights]
-        
+        normalized_weights = [w / total_weight for w in raw]
+
         # Moyenne pondérée
-        combined_home = sum(pred[0] * weight for pred, weight in zip(predictions, normalized_weights))
-        combined_draw = sum(pred[1] * weight for pred, weight in zip(predictions, normalized_weights))
-        combined_away = sum(pred[2] * weight for pred, weight in zip(predictions, normalized_weights))
-        
+        combined_home = sum(p.home_prob * w for (_, p), w in zip(parts, normalized_weights))
+        combined_draw = sum(p.draw_prob * w for (_, p), w in zip(parts, normalized_weights))
+        combined_away = sum(p.away_prob * w for (_, p), w in zip(parts, normalized_weights))
+
         # Renormaliser pour être sûr
         total_prob = combined_home + combined_draw + combined_away
         if total_prob <= 0:
             return elo_pred
-        
-        combined_home /= total_prob
-        combined_draw /= total_prob
-        combined_away /= total_prob
-        
-        # Score de confiance combiné
-        combined_confidence = sum(
-            getattr(pred_obj, 'confidence', 0.5) * weight 
-            for pred_obj, weight in zip([elo_pred, bet365_pred, pinnacle_pred], normalized_weights)
-            if pred_obj is not None
-        )
-        
-        combined_sample_size = sum([
-            getattr(pred_obj, 'sample_size', 0)
-            for pred_obj in [bet365_pred, pinnacle_pred]
-            if pred_obj is not None
-        ])
-        
+
+        combined_confidence = sum(p.confidence * w for (_, p), w in zip(parts, normalized_weights))
+        combined_sample_size = sum(p.sample_size for m, p in parts if m != "ELO")
+
+        # Over 2.5 / BTTS : mêmes poids, renormalisés sur les méthodes qui les fournissent
+        def market_average(attr: str) -> Optional[float]:
+            pairs = [(getattr(p, attr), w) for (_, p), w in zip(parts, raw) if getattr(p, attr) is not None]
+            weight = sum(w for _, w in pairs)
+            return sum(v * w for v, w in pairs) / weight if weight > 0 else None
+
         return PredictionResult(
-            combined_home, combined_draw, combined_away,
+            combined_home / total_prob, combined_draw / total_prob, combined_away / total_prob,
             confidence=combined_confidence,
-            sample_size=combined_sample_size
+            sample_size=combined_sample_size,
+            over25_prob=market_average("over25_prob"),
+            btts_prob=market_average("btts_prob")
         )
     
+    # ═══════════════════════════════════════════════════════════════════
+    # EMPREINTES DES ENTRÉES (recalcul incrémental)
+    # ═══════════════════════════════════════════════════════════════════
+    
+    def input_fingerprints(self, fixtures: List[MatchFixture]) -> Dict[str, str]:
+        """
+        Empreinte par match de tout ce qui entre dans ses prédictions : ratings ELO des deux équipes
+        et paramètres ELO de la ligue, paramètres du modèle de buts (ligue et équipes), cotes
+        1X2 / O/U 2.5 / BTTS de chaque bookmaker (meilleures cotes et méthodes bookmaker). L'historique des voisins (B365/PINNACLE) n'y entre pas : --full le prend en compte.
+        """
+        matches = [m for m in fixtures if m.fixture_id]
+        ids = sorted({str(m.fixture_id) for m in matches})
+        # Mêmes clés canoniques et même lookup que predict_elo
+        teams = [(m.home_id or m.home_team, m.away_id or m.away_team) for m in matches]
+        odds: Dict[str, List] = {}
+        keys = self.fixture_keys(ids)
+        with self.get_conn() as conn:
+            fits = goal_model.load_fits(conn, [k[0] for k in keys.values() if k[0]])
+            ratings = elo_replay.team_ratings(conn, [t for pair in teams for t in pair])
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for r in conn.execute(f"""
+                    SELECT fixture_id, bookmaker_id, home_odd, draw_odd, away_odd FROM odds
+                    WHERE fixture_id IN ({', '.join('?' * len(chunk))})
+                    ORDER BY fixture_id, bookmaker_id
+                """, chunk).fetchall():
+                    odds.setdefault(str(r["fixture_id"]), []).append(
+                        [str(r["bookmaker_id"]), r["home_odd"], r["draw_odd"], r["away_odd"]])
+                for table, cols in (("ou25_odds", "over25_odd, under25_odd"), ("btts_odds", "yes_odd, no_odd")):
+                    for r in conn.execute(f"""
+                        SELECT fixture_id, bookmaker_id, {cols} FROM {table}
+                        WHERE fixture_id IN ({', '.join('?' * len(chunk))})
+                        ORDER BY fixture_id, bookmaker_id
+                    """, chunk).fetchall():
+                        odds.setdefault(str(r[0]), []).append([table, str(r[1]), r[2], r[3]])
+        
+        config = elo_system.config
+        leagues = [m.league for m in matches]
+        home_elo = elo_replay.lookup_ratings(ratings, [h for h, _ in teams], leagues, elo_system.league_params)
+        away_elo = elo_replay.lookup_ratings(ratings, [a for _, a in teams], leagues, elo_system.league_params)
+        out = {}
+        for m, (home, away), rh, ra in zip(matches, teams, home_elo.tolist(), away_elo.tolist()):
+            fid = str(m.fixture_id)
+            payload = {
+                "v": PREDICTION_VERSION,
+                "teams": [m.home_team, m.away_team, home, away, m.league, m.date],
+                "elo": [rh, ra, elo_system.params_for(m.league)[1], config["draw_base"], config["draw_width"]],
+                "odds": odds.get(fid, []),
+                "goals": self._goal_model_inputs(fits, keys.get(fid)),
+            }
+            out[fid] = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        return out
+    
+    @staticmethod
+    def _goal_model_inputs(fits: Dict[str, Dict], key: Optional[Tuple[str, str, str]]) -> Optional[List]:
+        fit = fits.get(key[0]) if key else None
+        if fit is None:
+            return None
+        return [fit["home_adv"], fit["rho"], fit["teams"].get(key[1]), fit["teams"].get(key[2])]
+    
+    def stored_fingerprints(self, fixture_ids: List[str]) -> Dict[str, str]:
+        ids = sorted({str(f) for f in fixture_ids})
+        out = {}
+        with self.get_conn() as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for r in conn.execute(f"""
+                    SELECT fixture_id, fingerprint FROM prediction_inputs
+                    WHERE fixture_id IN ({', '.join('?' * len(chunk))})
+                """, chunk).fetchall():
+                    out[r["fixture_id"]] = r["fingerprint"]
+        return out
+    
     # ═══════════════════════════════════════════════════════════════════
     # STOCKAGE ET EXPORT
     # ═══════════════════════════════════════════════════════════════════
     
     def get_best_odds(self, fixture_id: str) -> Dict[str, Optional[float]]:
-        """Récupère les meilleures cotes disponibles"""
+        """Récupère les meilleures cotes disponibles (1X2, O/U 2.5, BTTS)"""
+        best = {key: None for _, columns in BEST_ODDS_COLUMNS for key, _ in columns}
         if not fixture_id:
-            return {"home_odd": None, "draw_odd": None, "away_odd": None}
+            return best
         
         with self.get_conn() as conn:
-            rows = conn.execute("""
-                SELECT home_odd, draw_odd, away_odd
-                FROM odds
-                WHERE fixture_id = ?
-            """, (fixture_id,)).fetchall()
-            
-            if not rows:
-                return {"home_odd": None, "draw_odd": None, "away_odd": None}
-            
             # Prendre les meilleures cotes (les plus élevées)
-            best_home = max((r["home_odd"] for r in rows if r["home_odd"]), default=None)
-            best_draw = max((r["draw_odd"] for r in rows if r["draw_odd"]), default=None)  
-            best_away = max((r["away_odd"] for r in rows if r["away_odd"]), default=None)
+            for table, columns in BEST_ODDS_COLUMNS:
+                row = conn.execute(f"""
+                    SELECT {', '.join(f"MAX({col}) AS {key}" for key, col in columns)}
+                    FROM {table}
+                    WHERE fixture_id = ?
+                """, (fixture_id,)).fetchone()
+                if row:
+                    best.update({key: row[key] for key, _ in columns})
             
-            return {"home_odd": best_home, "draw_odd": best_draw, "away_odd": best_away}
+            return best
     
     def calculate_value(self, prob: float, odd: Optional[float]) -> Optional[float]:
         """Calcule la value d'un pari (prob × cote - 1)"""
@@ -369,43 +530,69 @@ class FootballPredictor:
             return None
         return prob * odd - 1.0
     
+    @metrics.timed()
     def store_prediction(self, match: MatchFixture, method: str, 
                         home_prob: float, draw_prob: float, away_prob: float,
-                        confidence: float = None, sample_size: int = None):
-        """Stocke les 3 prédictions (H/D/A) pour une méthode"""
-        odds = self.get_best_odds(match.fixture_id)
+                        confidence: float = None, sample_size: int = None,
+                        over25_prob: Optional[float] = None, btts_prob: Optional[float] = None,
+                        odds: Optional[Dict[str, Optional[float]]] = None) -> int:
+        """Stocke les prédictions d'une méthode : 1X2 (H/D/A), OU25 (OVER/UNDER) et BTTS (YES/NO) si fournis"""
+        if odds is None:
+            odds = self.get_best_odds(match.fixture_id)
         
         predictions_data = [
-            ("H", home_prob, odds["home_odd"]),
-            ("D", draw_prob, odds["draw_odd"]),
-            ("A", away_prob, odds["away_odd"])
+            ("1X2", "H", home_prob, odds["home_odd"]),
+            ("1X2", "D", draw_prob, odds["draw_odd"]),
+            ("1X2", "A", away_prob, odds["away_odd"])
         ]
+        if over25_prob is not None:
+            predictions_data += [("OU25", "OVER", over25_prob, odds["over25_odd"]),
+                                 ("OU25", "UNDER", 1.0 - over25_prob, odds["under25_odd"])]
+        if btts_prob is not None:
+            predictions_data += [("BTTS", "YES", btts_prob, odds["btts_yes_odd"]),
+                                 ("BTTS", "NO", 1.0 - btts_prob, odds["btts_no_odd"])]
         
         with self.get_conn() as conn:
-            for selection, prob, odd in predictions_data:
-                value = self.calculate_value(prob, odd)
-                
-                # Données étendues pour analysis
-                extra_data = {}
-                if confidence is not None:
-                    extra_data['confidence'] = confidence
-                if sample_size is not None:
-                    extra_data['sample_size'] = sample_size
-                
-                conn.execute("""
-                    INSERT INTO predictions (
-                        fixture_id, date, league, home_team, away_team,
-                        method, market, selection, prob, odd, value, 
-                        confidence, sample_size, created_at
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-                """, (
-                    match.fixture_id, match.date, match.league,
-                    match.home_team, match.away_team,
-                    method, "1X2", selection,
-                    prob, odd, value,
-                    confidence, sample_size
-                ))
+            conn.executemany("""
+                INSERT INTO predictions (
+                    fixture_id, date, league, home_team, away_team,
+                    method, market, selection, prob, odd, value, 
+                    confidence, sample_size, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            """, [(
+                match.fixture_id, match.date, match.league,
+                match.home_team, match.away_team,
+                method, market, selection,
+                prob, odd, self.calculate_value(prob, odd),
+                confidence, sample_size
+            ) for market, selection, prob, odd in predictions_data])
+        metrics.rows(len(predictions_data))
+        return len(predictions_data)
+    
+    def store_method_stats(self, conn, fixture_ids: List[str],
+                           stats: List[Tuple[str, str, PredictionResult]]):
+        """
+        Fréquences des voisins historiques (method_stats, lues par le comparateur) : remplace les lignes
+        B365/PINNACLE de ces matchs par celles de `stats` (fixture_id, méthode, prédiction).
+        """
+        ids = sorted({str(f) for f in fixture_ids if f})
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            conn.execute(f"""
+                DELETE FROM method_stats WHERE method IN ('B365', 'PINNACLE')
+                  AND fixture_id IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+        conn.executemany("""
+            INSERT INTO method_stats (fixture_id, method, sample_size, home_win_pct, draw_pct, away_win_pct,
+                                      over25_pct, btts_yes_pct)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(fixture_id, method) DO UPDATE SET
+              sample_size=excluded.sample_size,
+              home_win_pct=excluded.home_win_pct, draw_pct=excluded.draw_pct, away_win_pct=excluded.away_win_pct,
+              over25_pct=excluded.over25_pct, btts_yes_pct=excluded.btts_yes_pct, created_at=datetime('now')
+        """, [(fid, method, p.sample_size, p.home_prob, p.draw_prob, p.away_prob, p.over25_prob, p.btts_prob)
+              for fid, method, p in stats])
     
     def ensure_predictions_schema(self):
         """S'assure que la table predictions a les bonnes colonnes"""
@@ -421,60 +608,135 @@ class FootballPredictor:
             
             conn.commit()
     
-    def generate_all_predictions(self) -> Dict[str, int]:
-        """Génère toutes les prédictions pour les matchs du jour"""
+    def generate_all_predictions(self, incremental: bool = False) -> Dict[str, int]:
+        """
+        Génère les prédictions des matchs du jour.
+        incremental=True : seuls les matchs dont l'empreinte des entrées a changé depuis leur
+        dernière prédiction (ou jamais prédits) sont recalculés et réécrits.
+        """
         self.ensure_predictions_schema()
         
-        # Nettoyer les prédictions du jour
+        if not incremental:
+            # Nettoyer les prédictions du jour
+            with self.get_conn() as conn:
+                conn.execute("DELETE FROM predictions WHERE substr(date,1,10) = ?", (self.today_str(),))
+                conn.commit()
+        
+        with metrics.stage("fixtures"):
+            fixtures = self.get_today_fixtures()
+            metrics.count("fixtures", len(fixtures))
+        if not incremental:
+            return self.predict_fixtures(fixtures, "generate_predictions")
+        
+        with metrics.stage("fingerprints"):
+            fingerprints = self.input_fingerprints(fixtures)
+            stored = self.stored_fingerprints(list(fingerprints))
+        changed = [m for m in fixtures
+                   if not m.fixture_id or fingerprints.get(str(m.fixture_id)) != stored.get(str(m.fixture_id))]
+        metrics.count("fixtures_changed", len(changed))
+        
+        # Prédictions à réécrire : matchs modifiés + matchs qui ne sont plus au programme du jour
+        today_ids = {str(m.fixture_id) for m in fixtures if m.fixture_id}
         with self.get_conn() as conn:
-            conn.execute("DELETE FROM predictions WHERE substr(date,1,10) = ?", (self.today_str(),))
+            existing = {str(r[0]) for r in conn.execute(
+                "SELECT DISTINCT fixture_id FROM predictions WHERE substr(date,1,10) = ? AND fixture_id IS NOT NULL",
+                (self.today_str(),)).fetchall()}
+            stale = sorted((existing - today_ids) | {str(m.fixture_id) for m in changed if m.fixture_id})
+            for i in range(0, len(stale), 500):
+                chunk = stale[i:i + 500]
+                conn.execute(f"DELETE FROM predictions WHERE fixture_id IN ({', '.join('?' * len(chunk))})", chunk)
+            conn.execute("DELETE FROM predictions WHERE substr(date,1,10) = ? AND fixture_id IS NULL",
+                         (self.today_str(),))
             conn.commit()
         
-        fixtures = self.get_today_fixtures()
-        if not fixtures:
-            return {"fixtures": 0, "predictions": 0}
-        
-        method_counts = {"ELO": 0, "B365": 0, "PINNACLE": 0, "COMBINED": 0}
+        result = self.predict_fixtures(changed, "generate_predictions", fingerprints,
+                                       dropped=sorted(existing - today_ids))
+        result["unchanged"] = len(fixtures) - len(changed)
+        return result
+
+    def generate_for_fixtures(self, fixture_ids: List[str]) -> Dict[str, int]:
+        """Régénère seulement ces matchs (cotes qui ont bougé, cf. scripts/poll_odds.py)"""
+        self.ensure_predictions_schema()
+        fixtures = self.get_fixtures(fixture_ids)
+        ids = [str(m.fixture_id) for m in fixtures]
+        with self.get_conn() as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                conn.execute(f"DELETE FROM predictions WHERE fixture_id IN ({', '.join('?' * len(chunk))})", chunk)
+            conn.commit()
+        metrics.count("fixtures", len(fixtures))
+        return self.predict_fixtures(fixtures, "repredict")
+
+    def predict_fixtures(self, fixtures: List[MatchFixture], source: str,
+                         fingerprints: Optional[Dict[str, str]] = None, dropped: List[str] = ()) -> Dict[str, int]:
+        """
+        Prédictions des 5 méthodes pour ces matchs (+ method_stats des méthodes bookmaker), empreinte
+        de leurs entrées et rafraîchissement de la vue pivotée (`dropped` : matchs dont les prédictions
+        ont été retirées).
+        """
+        method_counts = {"ELO": 0, "B365": 0, "PINNACLE": 0, "COMBINED": 0, "POISSON": 0}
+        if not fixtures and not dropped:
+            return {"fixtures": 0, "predictions": 0, **method_counts}
+        # Empreinte prise avant le calcul : une cote arrivée pendant le passage déclenchera le suivant
+        if fingerprints is None:
+            fingerprints = self.input_fingerprints(fixtures)
+        self._indexes = {}  # historique relu une fois par passage, partagé par tous les matchs
+        stats: List[Tuple[str, str, PredictionResult]] = []
+        # Méthodes bookmaker : tous les matchs en un calcul vectorisé par bookmaker
+        ids = [m.fixture_id for m in fixtures if m.fixture_id]
+        batched = {"B365": self.predict_bookmakers(ids, BET365_ID),
+                   "PINNACLE": self.predict_bookmakers(ids, PINNACLE_ID)}
+        poisson = self.predict_poisson_batch(ids)
+        ratings = self.team_ratings([t for m in fixtures for t in (m.home_id or m.home_team, m.away_id or m.away_team)])
         
         for match in fixtures:
             if not match.home_team or not match.away_team:
                 continue
+            odds = self.get_best_odds(match.fixture_id)
             
-            # 1. Méthode ELO (toujours disponible)
-            elo_pred = self.predict_elo(match.home_team, match.away_team)
-            self.store_prediction(match, "ELO", 
+            # 1. Méthode ELO (toujours disponible, 1X2 seulement)
+            elo_pred = self.predict_elo(match.home_id or match.home_team, match.away_id or match.away_team,
+                                        match.league, ratings)
+            method_counts["ELO"] += self.store_prediction(match, "ELO", 
                                 elo_pred.home_prob, elo_pred.draw_prob, elo_pred.away_prob,
-                                elo_pred.confidence)
-            method_counts["ELO"] += 3
-            
-            # 2. Méthode Bet365
-            if match.fixture_id:
-                bet365_pred = self.predict_bet365(match.fixture_id)
-                if bet365_pred:
-                    self.store_prediction(match, "B365",
-                                        bet365_pred.home_prob, bet365_pred.draw_prob, bet365_pred.away_prob,
-                                        bet365_pred.confidence, bet365_pred.sample_size)
-                    method_counts["B365"] += 3
+                                elo_pred.confidence, odds=odds)
             
-            # 3. Méthode Pinnacle
-            if match.fixture_id:
-                pinnacle_pred = self.predict_pinnacle(match.fixture_id)
-                if pinnacle_pred:
-                    self.store_prediction(match, "PINNACLE",
-                                        pinnacle_pred.home_prob, pinnacle_pred.draw_prob, pinnacle_pred.away_prob,
-                                        pinnacle_pred.confidence, pinnacle_pred.sample_size)
-                    method_counts["PINNACLE"] += 3
+            # 2-3. Méthodes Bet365 et Pinnacle : 1X2, Over 2.5 et BTTS des mêmes voisins
+            bookmaker_preds = {method: preds.get(str(match.fixture_id)) for method, preds in batched.items()}
+            for method, pred in bookmaker_preds.items():
+                if pred:
+                    method_counts[method] += self.store_prediction(match, method,
+                                        pred.home_prob, pred.draw_prob, pred.away_prob,
+                                        pred.confidence, pred.sample_size,
+                                        pred.over25_prob, pred.btts_prob, odds=odds)
+                    stats.append((match.fixture_id, method, pred))
             
-            # 4. Méthode Combined
-            combined_pred = self.predict_combined(match)
+            # 4. Méthode Combined (prédictions déjà calculées ci-dessus)
+            combined_pred = self.combine(elo_pred, bookmaker_preds.get("B365"), bookmaker_preds.get("PINNACLE"))
             if combined_pred:
-                self.store_prediction(match, "COMBINED",
+                method_counts["COMBINED"] += self.store_prediction(match, "COMBINED",
                                     combined_pred.home_prob, combined_pred.draw_prob, combined_pred.away_prob,
-                                    combined_pred.confidence, combined_pred.sample_size)
-                method_counts["COMBINED"] += 3
-        
-        # Commit final
-        with self.get_conn() as conn:
+                                    combined_pred.confidence, combined_pred.sample_size,
+                                    combined_pred.over25_prob, combined_pred.btts_prob, odds=odds)
+            
+            # 5. Méthode Poisson / Dixon–Coles (hors COMBINED)
+            poisson_pred = poisson.get(str(match.fixture_id))
+            if poisson_pred:
+                method_counts["POISSON"] += self.store_prediction(match, "POISSON",
+                                    poisson_pred.home_prob, poisson_pred.draw_prob, poisson_pred.away_prob,
+                                    poisson_pred.confidence, poisson_pred.sample_size,
+                                    poisson_pred.over25_prob, poisson_pred.btts_prob, odds=odds)
+        
+        # Vue pivotée (fixture, marché, sélection) lue par le comparateur
+        with metrics.stage("matrix"), self.get_conn() as conn:
+            self.store_method_stats(conn, [m.fixture_id for m in fixtures], stats)
+            prediction_matrix.refresh(conn, [m.fixture_id for m in fixtures] + list(dropped))
+            conn.executemany("""
+                INSERT INTO prediction_inputs (fixture_id, fingerprint, updated_at) VALUES (?, ?, datetime('now'))
+                ON CONFLICT(fixture_id) DO UPDATE SET fingerprint=excluded.fingerprint, updated_at=excluded.updated_at
+            """, [(str(m.fixture_id), fingerprints[str(m.fixture_id)]) for m in fixtures
+                  if m.fixture_id and str(m.fixture_id) in fingerprints])
+            db.bump_data_version(source, conn)
             conn.commit()
         
         return {
@@ -483,28 +745,40 @@ class FootballPredictor:
             **method_counts
         }
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate today's predictions")
+    parser.add_argument("--full", action="store_true",
+                        help="Recalcule tous les matchs du jour (sinon seulement ceux dont les entrées ont changé).")
+    args = parser.parse_args(argv)
+
     print("🎯 Enhanced Football Prediction System")
     print("=" * 60)
     print("🔹 ELO System")
     print("🔹 Bet365 Historical Analysis") 
     print("🔹 Pinnacle Historical Analysis")
     print("🔹 Combined Intelligent Fusion")
+    print("🔹 Poisson / Dixon-Coles Goal Model")
     print("=" * 60)
     
     predictor = FootballPredictor()
-    results = predictor.generate_all_predictions()
+    results = predictor.generate_all_predictions(incremental=not args.full)
     
     print("\n📊 GENERATION COMPLETE")
     print("-" * 30)
     print(f"📅 Fixtures processed: {results['fixtures']}")
+    if results.get("unchanged"):
+        print(f"⏭️ Fixtures unchanged: {results['unchanged']}")
     print(f"📈 Total predictions: {results['predictions']}")
     print("\nBreakdown by method:")
     print(f"  🏆 ELO:      {results['ELO']:3d} predictions")
     print(f"  💰 B365:     {results['B365']:3d} predictions") 
     print(f"  📊 PINNACLE: {results['PINNACLE']:3d} predictions")
     print(f"  🎯 COMBINED: {results['COMBINED']:3d} predictions")
+    print(f"  ⚽ POISSON:  {results['POISSON']:3d} predictions")
     
+    if results['predictions'] == 0 and results.get("unchanged"):
+        print("\nℹ Inputs unchanged, predictions already up to date.")
+        return 0
     if results['predictions'] == 0:
         print("\n⚠️ No predictions generated - check if fixtures exist for today")
         return 1
@@ -513,4 +787,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    exit(main())
+    exit(metrics.main("generate_predictions", main))
@@ -0,0 +1,146 @@
+# scripts/poll_odds.py
+"""
+Rafraîchit les cotes (1X2, O/U 2.5, BTTS) des matchs à venir, de plus en plus souvent à
+l'approche du coup d'envoi (src/services/odds_scheduler.py) :
+- appels limités par un seau à jetons (--rate appels/min) et un plafond par passage (--budget),
+- fixtures d'une même ligue/jour regroupées en un appel /odds?league=…&season=…&date=…,
+- cotes écrites comme le backfill (dernière cote + odds_snapshots),
+- seuls les matchs dont les cotes ont bougé de plus de --threshold sont re-prédits.
+
+Usage:
+  python -u scripts/poll_odds.py                        # jusqu'au dernier coup d'envoi des 24 h
+  python -u scripts/poll_odds.py --once                 # un seul passage (cron)
+  python -u scripts/poll_odds.py --hours 6 --rate 20 --budget 300 --threshold 0.03 --no-predict
+"""
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from src.models.database import db
+from src.services.odds_parser import BookmakerOdds, STORED_MARKETS, parse_bookmakers
+from src.services.odds_scheduler import (OddsScheduler, ScheduledFixture, TokenBucket, price_shift,
+                                         REPREDICT_THRESHOLD)
+from src.utils.metrics import metrics
+from scripts.backfill_history import MarketWriter, http_get, http_stream
+
+RATE_PER_MIN = float(os.getenv("ODDS_POLL_RATE", "30"))
+BUDGET = int(os.getenv("ODDS_POLL_BUDGET", "500"))
+
+class OddsPoller:
+    """`poll` de l'ordonnanceur : appels API (à travers le seau à jetons), écriture, décalage de prix."""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+
+    def fetch_fixture(self, fixture_id: str) -> Optional[List[BookmakerOdds]]:
+        if not self.bucket.acquire():
+            return None
+        bookmakers = http_stream("odds", {"fixture": fixture_id}, "response.item.bookmakers.item")
+        if bookmakers is None:
+            return None
+        return parse_bookmakers(bookmakers, STORED_MARKETS)
+
+    def fetch_league(self, league_id, season, day: str) -> Dict[str, List[BookmakerOdds]]:
+        out: Dict[str, List[BookmakerOdds]] = {}
+        page, total_pages = 1, 1
+        while page <= total_pages and self.bucket.acquire():
+            data = http_get("odds", {"league": league_id, "season": season, "date": day, "page": page})
+            if not data:
+                break
+            for item in data.get("response") or []:
+                fid = (item.get("fixture") or {}).get("id")
+                if fid is not None:
+                    out[str(fid)] = parse_bookmakers(item.get("bookmakers") or [], STORED_MARKETS)
+            total_pages = int((data.get("paging") or {}).get("total", 1) or 1)
+            page += 1
+        return out
+
+    @staticmethod
+    def latest_1x2(conn, fixture_ids: List[str]) -> Dict[str, Dict[int, Tuple[float, float, float]]]:
+        out: Dict[str, Dict[int, Tuple[float, float, float]]] = {}
+        for i in range(0, len(fixture_ids), 500):
+            chunk = fixture_ids[i:i + 500]
+            for r in conn.execute(f"""
+                SELECT fixture_id, bookmaker_id, home_odd, draw_odd, away_odd FROM odds
+                WHERE fixture_id IN ({', '.join('?' * len(chunk))})
+                  AND home_odd IS NOT NULL AND draw_odd IS NOT NULL AND away_odd IS NOT NULL
+            """, chunk).fetchall():
+                out.setdefault(str(r[0]), {})[int(r[1])] = (r[2], r[3], r[4])
+        return out
+
+    def __call__(self, group: List[ScheduledFixture], grouped: bool) -> Dict[str, float]:
+        if grouped:
+            first = group[0]
+            fetched = self.fetch_league(first.league_id, first.season, first.day)
+        else:
+            fetched = {}
+            for e in group:
+                books = self.fetch_fixture(e.fixture_id)
+                if books:
+                    fetched[e.fixture_id] = books
+        fetched = {fid: books for fid, books in fetched.items() if books}
+        if not fetched:
+            return {}
+
+        with db.get_connection() as conn:
+            before = self.latest_1x2(conn, sorted(fetched))
+            writer = MarketWriter(conn)
+            for fid, books in fetched.items():
+                writer.add(fid, books)
+            writer.flush()
+            db.bump_data_version("poll_odds", conn)
+            conn.commit()
+        metrics.count("odds_fixtures", len(fetched))
+        return {fid: price_shift(before.get(fid, {}), {b.id: b.x12 for b in books if b.has_1x2()})
+                for fid, books in fetched.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll pre-match odds more often as kickoff approaches")
+    parser.add_argument("--hours", type=float, default=24.0, help="Matchs dont le coup d'envoi tombe dans N heures.")
+    parser.add_argument("--once", action="store_true", help="Un seul passage sur les fixtures dues.")
+    parser.add_argument("--rate", type=float, default=RATE_PER_MIN, help="Appels API par minute.")
+    parser.add_argument("--burst", type=int, default=5, help="Appels API consécutifs autorisés.")
+    parser.add_argument("--budget", type=int, default=BUDGET, help="Appels API max pour ce passage (0 = illimité).")
+    parser.add_argument("--threshold", type=float, default=REPREDICT_THRESHOLD,
+                        help="Décalage de probabilité implicite déclenchant une re-prédiction.")
+    parser.add_argument("--no-predict", action="store_true", help="Cotes seulement, pas de re-prédiction.")
+    args = parser.parse_args(argv)
+
+    bucket = TokenBucket(args.rate, burst=args.burst, budget=args.budget or None)
+    repredict = None
+    if not args.no_predict:
+        from scripts.generate_predictions import FootballPredictor
+        predictor = FootballPredictor()
+
+        def repredict(fixture_ids: List[str]):
+            with metrics.stage("repredict"):
+                result = predictor.generate_for_fixtures(fixture_ids)
+            print(f"🔁 Re-prédiction: {result['fixtures']} matchs ({result['predictions']} prédictions)", flush=True)
+
+    scheduler = OddsScheduler(OddsPoller(bucket), repredict, bucket=bucket, threshold=args.threshold)
+    with db.get_connection() as conn:
+        loaded = scheduler.load(conn, horizon_hours=args.hours)
+    if not loaded:
+        print(f"ℹ Aucun match à venir dans les {args.hours:g} h.")
+        return 0
+    last = max(e.kickoff for e in scheduler.fixtures.values())
+    print(f"⏰ {loaded} matchs suivis jusqu'au {datetime.fromtimestamp(last, timezone.utc):%d/%m %H:%M} UTC "
+          f"| {args.rate:g} appels/min | budget {args.budget or '∞'}", flush=True)
+
+    t0 = time.perf_counter()
+    if args.once:
+        scheduler.run_once()
+        stats = dict(scheduler.stats, api_calls=bucket.spent)
+    else:
+        stats = scheduler.run()
+    for key in ("api_calls", "grouped_calls", "fixture_calls", "moved", "repredicted"):
+        metrics.count(f"poll_{key}", stats[key])
+    print(f"✅ Cotes: {stats['polls']} relevés en {stats['api_calls']} appels API "
+          f"({stats['grouped_calls']} groupés, {stats['fixture_calls']} unitaires) | "
+          f"{stats['moved']} mouvements, {stats['repredicted']} matchs re-prédits | {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    exit(metrics.main("poll_odds", main))
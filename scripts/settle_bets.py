@@ -0,0 +1,20 @@
+# scripts/settle_bets.py
+"""
+Règle les prédictions dont les matchs ont reçu un score depuis le dernier passage
+et met à jour les agrégats (méthode, marché, jour) lus par le dashboard performance.
+
+Usage:
+  python -u scripts/settle_bets.py
+"""
+from src.services.bet_settlement import bet_settlement
+
+def main():
+    result = bet_settlement.settle_pending()
+    if result["settled"] == 0:
+        print("ℹ Aucune nouvelle prédiction à régler.")
+        return 0
+    print(f"✅ {result['settled']} prédictions réglées ({result['days']} jours agrégés).")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,161 @@
+# scripts/sweep_elo.py
+"""
+Recherche des paramètres ELO (K, avantage du terrain, modèle de nul) par rejeu de tout l'historique.
+
+- chaque rejeu est une passe numpy en mémoire (src/services/elo_replay.py), sans écriture en base,
+- les ratings ne dépendent que de (K, avantage du terrain) : un rejeu par couple, puis toutes les
+  variantes du modèle de nul (draw_base, draw_width) sont scorées sur les mêmes ratings,
+- les couples sont répartis sur plusieurs processus (ProcessPoolExecutor),
+- score = log-loss 1N2 sur les matchs après la période de chauffe (--warmup-days),
+- --save écrit la meilleure configuration dans elo_config (lue par EloSystem et generate_predictions) ;
+  relancer ensuite scripts/build_elo_history.py pour recalculer les ratings.
+
+Usage:
+  python -u scripts/sweep_elo.py                                  # grille par défaut
+  python -u scripts/sweep_elo.py --k 16,24,32,40 --home-adv 40,70,100 --draw-base 0.24,0.27 --draw-width 0,300,600
+  python -u scripts/sweep_elo.py --search random --trials 200 --workers 8 --save
+"""
+import os
+import time
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.models.database import db
+from src.services import elo_replay
+from src.services.elo_system import load_elo_config, save_elo_config
+
+DEFAULT_GRID = {
+    "k": "16,20,24,28,32,40",
+    "home_adv": "40,60,80,100",
+    "draw_base": "0.24,0.26,0.28,0.30",
+    "draw_width": "0,200,300,400,600",
+}
+RANDOM_RANGES = {
+    "k_factor": (8.0, 60.0),
+    "home_advantage": (0.0, 150.0),
+    "draw_base": (0.18, 0.34),
+    "draw_width": (100.0, 1000.0),
+}
+
+# Historique chargé une fois par processus (initializer)
+_HISTORY: pd.DataFrame = None
+_EVAL: np.ndarray = None
+
+def _init_worker(history: pd.DataFrame, eval_mask: np.ndarray):
+    global _HISTORY, _EVAL
+    _HISTORY, _EVAL = history, eval_mask
+
+def _score_pair(task: Tuple[float, float, List[Tuple[float, float]]]) -> List[Dict[str, float]]:
+    """Un rejeu pour (K, avantage du terrain), puis log-loss de chaque variante de nul."""
+    k_factor, home_adv, draws = task
+    elo = elo_replay.replay(_HISTORY, k_factor=k_factor, home_advantage=home_adv)
+    home_pre, away_pre = elo["home_pre"][_EVAL], elo["away_pre"][_EVAL]
+    result = _HISTORY["result"].to_numpy()[_EVAL]
+    out = []
+    for draw_base, draw_width in draws:
+        probs = elo_replay.probabilities(home_pre, away_pre, home_adv, draw_base, draw_width)
+        out.append({
+            "k_factor": k_factor, "home_advantage": home_adv,
+            "draw_base": draw_base, "draw_width": draw_width,
+            "log_loss": elo_replay.log_loss(probs, result),
+        })
+    return out
+
+def floats(raw: str) -> List[float]:
+    return [float(x) for x in raw.split(",") if x.strip()]
+
+def grid_tasks(args) -> List[Tuple[float, float, List[Tuple[float, float]]]]:
+    draws = list(product(floats(args.draw_base), floats(args.draw_width)))
+    return [(k, ha, draws) for k, ha in product(floats(args.k), floats(args.home_adv))]
+
+def random_tasks(trials: int, seed: int, draws_per_pair: int = 8) -> List[Tuple[float, float, List[Tuple[float, float]]]]:
+    """Tirages uniformes ; plusieurs variantes de nul par rejeu (elles ne coûtent qu'un calcul de probas)."""
+    rng = np.random.default_rng(seed)
+    pairs = max(1, trials // draws_per_pair)
+    tasks = []
+    for _ in range(pairs):
+        k = round(float(rng.uniform(*RANDOM_RANGES["k_factor"])), 1)
+        ha = round(float(rng.uniform(*RANDOM_RANGES["home_advantage"])), 1)
+        draws = [(round(float(rng.uniform(*RANDOM_RANGES["draw_base"])), 3),
+                  round(float(rng.uniform(*RANDOM_RANGES["draw_width"])), 0) if rng.random() > 0.1 else 0.0)
+                 for _ in range(draws_per_pair)]
+        tasks.append((k, ha, draws))
+    return tasks
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ELO hyper-parameter sweep")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--k", default=DEFAULT_GRID["k"], help="Valeurs de K (grille).")
+    parser.add_argument("--home-adv", default=DEFAULT_GRID["home_adv"], help="Avantages du terrain (grille).")
+    parser.add_argument("--draw-base", default=DEFAULT_GRID["draw_base"], help="Probabilités de nul à écart nul (grille).")
+    parser.add_argument("--draw-width", default=DEFAULT_GRID["draw_width"], help="Largeurs du modèle de nul, 0 = forfaitaire (grille).")
+    parser.add_argument("--trials", type=int, default=200, help="Nombre de configurations (random).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup-days", type=int, default=180, help="Jours de chauffe exclus du score.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--save", action="store_true", help="Écrit la meilleure configuration dans elo_config.")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    with db.get_connection() as conn:
+        history = elo_replay.load_history(conn)
+        current = load_elo_config(conn)
+    if history.empty:
+        print("❌ Aucun match terminé en base.")
+        return 1
+
+    start = (date.fromisoformat(history["day"].iloc[0]) + timedelta(days=args.warmup_days)).isoformat()
+    eval_mask = (history["day"] >= start).to_numpy()
+    if not eval_mask.any():
+        print(f"❌ Aucun match après la période de chauffe ({start}).")
+        return 1
+
+    tasks = grid_tasks(args) if args.search == "grid" else random_tasks(args.trials, args.seed)
+    n_configs = sum(len(t[2]) for t in tasks)
+    print(f"📚 {len(history):,} matchs, {int(eval_mask.sum()):,} évalués depuis {start}")
+    print(f"🔎 {n_configs} configurations ({len(tasks)} rejeux) sur {args.workers} processus")
+
+    # Configuration actuelle scorée dans les mêmes conditions (référence)
+    _init_worker(history, eval_mask)
+    baseline = _score_pair((current["k_factor"], current["home_advantage"],
+                            [(current["draw_base"], current["draw_width"])]))[0]
+
+    rows = []
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(history, eval_mask)) as pool:
+            for part in pool.map(_score_pair, tasks, chunksize=max(1, len(tasks) // (args.workers * 4))):
+                rows.extend(part)
+    else:
+        for task in tasks:
+            rows.extend(_score_pair(task))
+
+    results = pd.DataFrame(rows).sort_values("log_loss").reset_index(drop=True)
+    best = results.iloc[0].to_dict()
+
+    print(f"\n🏆 Top {args.top} (log-loss, plus bas = meilleur)")
+    print(results.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    print(f"\n📏 Configuration actuelle: K={baseline['k_factor']} HA={baseline['home_advantage']} "
+          f"nul={baseline['draw_base']}/{baseline['draw_width']} → log-loss {baseline['log_loss']:.4f}")
+    print(f"✨ Meilleure: K={best['k_factor']} HA={best['home_advantage']} "
+          f"nul={best['draw_base']}/{best['draw_width']} → log-loss {best['log_loss']:.4f}")
+
+    if args.save:
+        if best["log_loss"] < baseline["log_loss"]:
+            save_elo_config(best, log_loss=best["log_loss"], matches=int(eval_mask.sum()), source=f"sweep:{args.search}")
+            print("💾 elo_config mise à jour → relancer scripts/build_elo_history.py")
+        else:
+            print("ℹ La configuration actuelle reste la meilleure, elo_config inchangée.")
+
+    print(f"\n⏱️ Sweep terminé en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
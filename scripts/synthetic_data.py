@@ -0,0 +1,264 @@
+# scripts/synthetic_data.py
+"""
+Générateur de données synthétiques réalistes pour reproduire hors ligne des volumes de production :
+
+- N saisons × M ligues en aller-retour (une journée par semaine), équipes dont la force
+  (attaque / défense) dérive d'une saison à l'autre ; niveaux différents entre ligues,
+- coupe continentale optionnelle (league 2) : matchs inter-ligues entre les meilleures équipes,
+- scores tirés d'un modèle de Poisson (avantage du terrain inclus),
+- cotes multi-bookmakers dans odds (1X2), ou25_odds et btts_odds : probabilités du même modèle
+  vues avec un bruit propre à chaque bookmaker, marge appliquée (Pinnacle fine, Bet365 plus large),
+- la dernière saison est en cours : une journée tombe aujourd'hui (matchs NS avec cotes),
+  les suivantes sont à venir sans score.
+
+Mêmes conventions que l'ingestion API (db.insert_match) : fixture_id texte, noms + ids d'équipes,
+league = id de ligue en texte, goals_* et *_score renseignés. Écriture par executemany.
+
+Usage:
+  python -u scripts/synthetic_data.py --db /tmp/bench/football.db --seasons 5 --leagues 8
+  python -u scripts/synthetic_data.py --db /tmp/bench/football.db --seasons 2 --leagues 2 --teams 10 --bookmakers 3
+"""
+import os
+import time
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.database import Database
+
+# Ids API-Football des grands championnats (au-delà : ids synthétiques)
+LEAGUE_IDS = [39, 140, 135, 78, 61, 88, 94, 144, 203, 40, 141, 136, 79, 62, 179, 197, 218, 207, 119, 113]
+CUP_LEAGUE_ID = 2
+# id -> (nom, marge, bruit sur les buts attendus)
+BOOKMAKERS = {
+    4: ("Pinnacle", 0.025, 0.04),
+    8: ("Bet365", 0.055, 0.08),
+    6: ("Bwin", 0.065, 0.10),
+    1: ("10Bet", 0.070, 0.10),
+    11: ("1xBet", 0.045, 0.09),
+    16: ("Unibet", 0.060, 0.10),
+    3: ("Betfair", 0.050, 0.09),
+    2: ("Marathonbet", 0.045, 0.08),
+}
+BASE_GOALS = np.log(1.15)
+HOME_GOALS = np.log(1.25)
+MAX_GOALS = 10
+
+def round_robin(n: int) -> List[List[Tuple[int, int]]]:
+    """Calendrier aller-retour (méthode du cercle) : 2(n−1) journées de n/2 matchs."""
+    teams = list(range(n)) + ([None] if n % 2 else [])
+    m = len(teams)
+    rounds = []
+    for r in range(m - 1):
+        pairs = []
+        for i in range(m // 2):
+            a, b = teams[i], teams[m - 1 - i]
+            if a is not None and b is not None:
+                pairs.append((a, b) if r % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds + [[(b, a) for a, b in pairs] for pairs in rounds]
+
+def market_probabilities(lam_h: np.ndarray, lam_a: np.ndarray) -> Dict[str, np.ndarray]:
+    """Probabilités 1X2, Over 2.5 et BTTS d'un modèle de Poisson indépendant (vectorisé)."""
+    k = np.arange(MAX_GOALS + 1)
+    log_fact = np.cumsum(np.r_[0.0, np.log(k[1:])])
+    ph = np.exp(k * np.log(lam_h[:, None]) - lam_h[:, None] - log_fact)
+    pa = np.exp(k * np.log(lam_a[:, None]) - lam_a[:, None] - log_fact)
+    grid = ph[:, :, None] * pa[:, None, :]
+    home = np.tril(np.ones((MAX_GOALS + 1,) * 2), -1).astype(bool)
+    total = k[:, None] + k[None, :]
+    p_home = grid[:, home].sum(axis=1)
+    p_draw = np.einsum("nii->n", grid)
+    p_over = grid[:, total > 2].sum(axis=1)
+    p_btts = (1 - ph[:, 0]) * (1 - pa[:, 0])
+    norm = grid.sum(axis=(1, 2))
+    return {
+        "home": p_home / norm, "draw": p_draw / norm, "away": 1 - (p_home + p_draw) / norm,
+        "over": p_over / norm, "btts": p_btts,
+    }
+
+def to_odds(probs: np.ndarray, margin: float) -> np.ndarray:
+    """Cote décimale avec marge proportionnelle, arrondie au centième (min 1.01)."""
+    return np.maximum(1.01, np.round(1.0 / (np.clip(probs, 1e-4, 1.0) * (1.0 + margin)), 2))
+
+class SyntheticData:
+    def __init__(self, seasons: int = 3, leagues: int = 4, teams: int = 20, bookmakers: int = 4,
+                 cup: bool = True, seed: int = 42, today: Optional[date] = None):
+        self.seasons = seasons
+        self.n_leagues = leagues
+        self.n_teams = teams
+        self.bookmakers = list(BOOKMAKERS.items())[:max(1, min(bookmakers, len(BOOKMAKERS)))]
+        self.cup = cup
+        self.rng = np.random.default_rng(seed)
+        self.today = today or datetime.now(timezone.utc).date()
+        self.league_ids = (LEAGUE_IDS + [1000 + i for i in range(leagues)])[:leagues]
+
+    # ---------- calendrier ----------
+    def schedule(self) -> Dict[str, np.ndarray]:
+        """Tous les matchs (triés par date) : ligue, saison, jour, équipes, forces au moment du match."""
+        rng = self.rng
+        n_rounds = 2 * (self.n_teams - 1) if self.n_teams % 2 == 0 else 2 * self.n_teams
+        # La dernière saison démarre début août et a une journée aujourd'hui (hors saison : la dernière journée)
+        august = date(self.today.year if self.today.month >= 8 else self.today.year - 1, 8, 1)
+        today_round = min((self.today - august).days // 7, n_rounds - 1)
+        last_start = self.today - timedelta(days=7 * today_round)
+        rounds = round_robin(self.n_teams)
+
+        n_total_teams = self.n_leagues * self.n_teams
+        level = np.repeat(np.linspace(0.25, -0.25, self.n_leagues), self.n_teams) if self.n_leagues > 1 \
+            else np.zeros(n_total_teams)
+        attack = level + rng.normal(0, 0.22, n_total_teams)
+        defense = level + rng.normal(0, 0.22, n_total_teams)
+
+        cols = {k: [] for k in ("league", "season", "day", "home", "away", "att_h", "def_h", "att_a", "def_a")}
+        for s in range(self.seasons):
+            start = last_start - timedelta(days=364 * (self.seasons - 1 - s))
+            season = str(start.year if start.month >= 7 else start.year - 1)
+            for li, league_id in enumerate(self.league_ids):
+                base = li * self.n_teams
+                # Décalage de 0 à 2 jours selon la ligue (samedi / dimanche / lundi)
+                for r, pairs in enumerate(rounds):
+                    day = start + timedelta(days=7 * r + li % 3)
+                    for h, a in pairs:
+                        self._append(cols, league_id, season, day, base + h, base + a, attack, defense)
+            if self.cup and self.n_leagues > 1:
+                self._cup_round(cols, season, start, attack, defense)
+            # Dérive des forces entre saisons (mercato, promotions internes)
+            attack += rng.normal(0, 0.08, n_total_teams)
+            defense += rng.normal(0, 0.08, n_total_teams)
+
+        out = {k: np.array(v) for k, v in cols.items()}
+        order = np.lexsort((out["home"], out["day"]))
+        return {k: v[order] for k, v in out.items()}
+
+    def _append(self, cols, league_id, season, day, h, a, attack, defense):
+        cols["league"].append(league_id)
+        cols["season"].append(season)
+        cols["day"].append(day.isoformat())
+        cols["home"].append(h)
+        cols["away"].append(a)
+        cols["att_h"].append(attack[h])
+        cols["def_h"].append(defense[h])
+        cols["att_a"].append(attack[a])
+        cols["def_a"].append(defense[a])
+
+    def _cup_round(self, cols, season, start, attack, defense):
+        """Phase de groupes : les 4 meilleures équipes de chaque ligue, 6 matchs inter-ligues chacune."""
+        strength = attack + defense
+        qualified = np.concatenate([
+            li * self.n_teams + np.argsort(-strength[li * self.n_teams:(li + 1) * self.n_teams])[:4]
+            for li in range(self.n_leagues)
+        ])
+        self.rng.shuffle(qualified)
+        groups = [qualified[i:i + 4] for i in range(0, len(qualified) - len(qualified) % 4, 4)]
+        for g in groups:
+            for r, pairs in enumerate(round_robin(4)):
+                day = start + timedelta(days=7 * (3 + 2 * r) + 3)  # mercredis d'automne
+                for h, a in pairs:
+                    self._append(cols, CUP_LEAGUE_ID, season, day, int(g[h]), int(g[a]), attack, defense)
+
+    # ---------- écriture ----------
+    def write(self, database: Database) -> Dict[str, int]:
+        rng = self.rng
+        m = self.schedule()
+        n = len(m["day"])
+        lam_h = np.exp(BASE_GOALS + HOME_GOALS + m["att_h"] - m["def_a"])
+        lam_a = np.exp(BASE_GOALS + m["att_a"] - m["def_h"])
+        played = m["day"] < self.today.isoformat()
+        gh = rng.poisson(lam_h)
+        ga = rng.poisson(lam_a)
+
+        fixture_ids = [str(1_000_000 + i) for i in range(n)]
+        kickoff = np.where(np.isin(m["league"], [CUP_LEAGUE_ID]), "T19:00:00+00:00", "T15:00:00+00:00")
+        team_name = lambda t: f"Synthetic {self.league_ids[t // self.n_teams]}-{t % self.n_teams + 1:02d}"
+        team_id = lambda t: 10_000 + int(t)
+
+        matches = []
+        for i in range(n):
+            h, a = int(m["home"][i]), int(m["away"][i])
+            score_h = int(gh[i]) if played[i] else None
+            score_a = int(ga[i]) if played[i] else None
+            matches.append((
+                fixture_ids[i], m["day"][i] + kickoff[i], team_name(h), team_name(a), team_id(h), team_id(a),
+                score_h, score_a, score_h, score_a, "FT" if played[i] else "NS",
+                str(int(m["league"][i])), m["season"][i],
+            ))
+
+        odds_rows, ou_rows, btts_rows = [], [], []
+        for bm_id, (name, margin, noise) in self.bookmakers:
+            # Vue du bookmaker : buts attendus bruités, puis marge
+            p = market_probabilities(lam_h * np.exp(rng.normal(0, noise, n)),
+                                     lam_a * np.exp(rng.normal(0, noise, n)))
+            o1x2 = to_odds(np.column_stack([p["home"], p["draw"], p["away"]]), margin)
+            oou = to_odds(np.column_stack([p["over"], 1 - p["over"]]), margin)
+            obtts = to_odds(np.column_stack([p["btts"], 1 - p["btts"]]), margin)
+            # Tous les bookmakers ne couvrent pas tous les matchs
+            covered = rng.random(n) < (1.0 if bm_id in (4, 8) else 0.85)
+            for i in np.flatnonzero(covered):
+                fid = fixture_ids[i]
+                odds_rows.append((fid, str(bm_id), name, *o1x2[i].tolist()))
+                ou_rows.append((int(fid), bm_id, name, *oou[i].tolist()))
+                btts_rows.append((int(fid), bm_id, name, *obtts[i].tolist()))
+
+        n_total_teams = self.n_leagues * self.n_teams
+        teams = [(team_id(t), team_name(t), self.league_ids[t // self.n_teams]) for t in range(n_total_teams)]
+
+        with database.get_connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO teams (team_id, name, league_id) VALUES (?,?,?)", teams)
+            conn.executemany("""
+                INSERT INTO matches (fixture_id, date, home_team, away_team, home_team_id, away_team_id,
+                                     home_score, away_score, goals_home, goals_away, status, league, season)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+            """, matches)
+            conn.executemany("""INSERT OR REPLACE INTO odds (fixture_id, bookmaker_id, bookmaker_name, home_odd, draw_odd, away_odd)
+                                VALUES (?,?,?,?,?,?)""", odds_rows)
+            conn.executemany("""INSERT OR REPLACE INTO ou25_odds (fixture_id, bookmaker_id, bookmaker_name, over25_odd, under25_odd)
+                                VALUES (?,?,?,?,?)""", ou_rows)
+            conn.executemany("""INSERT OR REPLACE INTO btts_odds (fixture_id, bookmaker_id, bookmaker_name, yes_odd, no_odd)
+                                VALUES (?,?,?,?,?)""", btts_rows)
+            conn.executemany("INSERT OR IGNORE INTO team_stats (team_id, elo, updated_at) VALUES (?, 1500.0, datetime('now'))",
+                             [(str(t[0]),) for t in teams])
+            database.bump_data_version("synthetic_data", conn)
+            conn.commit()
+
+        return {
+            "matches": n,
+            "played": int(played.sum()),
+            "today": int((m["day"] == self.today.isoformat()).sum()),
+            "teams": n_total_teams,
+            "odds": len(odds_rows),
+            "ou25_odds": len(ou_rows),
+            "btts_odds": len(btts_rows),
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic football database")
+    parser.add_argument("--db", required=True, help="Chemin de la base à créer (doit être nouvelle, cf. --overwrite).")
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=20, help="Équipes par ligue.")
+    parser.add_argument("--bookmakers", type=int, default=4, help=f"Nombre de bookmakers (max {len(BOOKMAKERS)}).")
+    parser.add_argument("--no-cup", action="store_true", help="Sans compétition inter-ligues.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--overwrite", action="store_true", help="Supprime la base existante.")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        if not args.overwrite:
+            print(f"❌ {args.db} existe déjà (--overwrite pour la remplacer)")
+            return 1
+        os.remove(args.db)
+
+    t0 = time.perf_counter()
+    database = Database(args.db)
+    counts = SyntheticData(args.seasons, args.leagues, args.teams, args.bookmakers,
+                           cup=not args.no_cup, seed=args.seed).write(database)
+    print(f"✅ {args.db} : " + ", ".join(f"{k}={v:,}" for k, v in counts.items())
+          + f" ({time.perf_counter() - t0:.1f}s)")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
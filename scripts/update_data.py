@@ -4,7 +4,7 @@ Ingestion API-Football (RapidAPI) -> SQLite
 - Lit les ligues depuis config/leagues.py (ALLOWED_LEAGUES) ; fallback leagues.json ; fallback env LEAGUE_IDS.
 - Récupère les fixtures de la DATE (env opc) ou today (UTC).
 - Insère/Met à jour teams, matches.
-- Récupère les cotes 1X2 et insère dans odds.
+- Récupère les cotes 1X2 et insère dans odds (dernière cote) + odds_snapshots (historique).
 
 Secrets/ENV nécessaires:
 - RAPIDAPI_KEY (obligatoire)
@@ -20,6 +20,9 @@ from typing import Dict, Any, List, Optional, Tuple
 
 from config.settings import Settings
 from src.models.database import db
+from src.api.http_client import http_session
+from src.services.odds_parser import MARKET_1X2, parse_odds_payload
+from src.services.odds_history import odds_history
 
 # --- Essaye d'importer ALLOWED_LEAGUES depuis config/leagues.py
 def load_leagues_from_py() -> Optional[List[int]]:
@@ -58,7 +61,7 @@ class APIFootball:
         url = f"{self.base_url}/{path.lstrip('/')}"
         for attempt in range(max_retries):
             try:
-                r = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
+                r = http_session.get(url, headers=self.headers, params=params, timeout=self.timeout)
                 if r.status_code == 429:
                     time.sleep((backoff_base ** attempt) + 0.25)
                     continue
@@ -176,46 +179,22 @@ def upsert_match(conn, fx: Dict[str, Any]):
     if away_id:
         upsert_team(conn, away, league_id)
 
-    conn.execute(
-        """INSERT INTO matches (fixture_id, league_id, date, home_team_id, away_team_id)
-           VALUES (?, ?, ?, ?, ?)
-           ON CONFLICT(fixture_id) DO UPDATE SET
-             league_id=excluded.league_id,
-             date=excluded.date,
-             home_team_id=excluded.home_team_id,
-             away_team_id=excluded.away_team_id""",
-        (fixture_id, league_id, date_iso, home_id, away_id),
+    # matches.fixture_id n'est pas UNIQUE (index simple) : UPDATE puis INSERT si absent
+    cur = conn.execute(
+        "UPDATE matches SET league_id=?, date=?, home_team_id=?, away_team_id=? WHERE fixture_id=?",
+        (league_id, date_iso, home_id, away_id, str(fixture_id)),
     )
+    if cur.rowcount == 0:
+        conn.execute(
+            """INSERT INTO matches (fixture_id, league_id, date, home_team_id, away_team_id)
+               VALUES (?, ?, ?, ?, ?)""",
+            (str(fixture_id), league_id, date_iso, home_id, away_id),
+        )
 
 def parse_1x2_from_odds_payload(odds_payload: Dict[str, Any]) -> List[Tuple[int, str, float, float, float]]:
-    res = []
-    responses = odds_payload.get("response") or []
-    if not responses:
-        return res
-    latest = responses[0]
-    for bm in latest.get("bookmakers", []) or []:
-        bm_id = int(bm.get("id"))
-        bm_name = str(bm.get("name") or "")
-        home_odd = draw_odd = away_odd = None
-        for bet in bm.get("bets", []) or []:
-            name = (bet.get("name") or "").lower()
-            if "winner" in name or "1x2" in name:
-                for v in bet.get("values", []) or []:
-                    val = (v.get("value") or "").lower()
-                    odd_str = v.get("odd")
-                    try:
-                        odd = float(odd_str) if odd_str is not None else None
-                    except (TypeError, ValueError):
-                        odd = None
-                    if "home" in val or val in ("1", "local"):
-                        home_odd = odd
-                    elif "draw" in val or val in ("x", "nul"):
-                        draw_odd = odd
-                    elif "away" in val or val in ("2", "visitor", "visiting"):
-                        away_odd = odd
-        if home_odd and draw_odd and away_odd:
-            res.append((bm_id, bm_name, home_odd, draw_odd, away_odd))
-    return res
+    """(bookmaker_id, nom, cote 1, cote N, cote 2) des bookmakers ayant un 1X2 complet."""
+    return [(b.id, b.name, b.home, b.draw, b.away)
+            for b in parse_odds_payload(odds_payload, frozenset({MARKET_1X2})) if b.has_1x2()]
 
 def fetch_and_store_odds_for_fixture(conn, fixture_id: int):
     data = api.get("odds", {"fixture": fixture_id})
@@ -224,6 +203,8 @@ def fetch_and_store_odds_for_fixture(conn, fixture_id: int):
     entries = parse_1x2_from_odds_payload(data)
     if entries:
         seen = set()
+        snapshots = []
+        ts = int(time.time())
         for bm_id, bm_name, oh, od, oa in entries:
             if bm_id in seen:
                 continue
@@ -239,6 +220,8 @@ def fetch_and_store_odds_for_fixture(conn, fixture_id: int):
                 """,
                 (fixture_id, bm_id, bm_name, float(oh), float(od), float(oa))
             )
+            snapshots.append((str(fixture_id), MARKET_1X2, bm_id, ts, float(oh), float(od), float(oa)))
+        odds_history.record(conn, snapshots)
 
 def ingest(date_str: str, league_ids: Optional[List[int]] = None) -> Tuple[int, int, int]:
     fixtures = fetch_fixtures(date_str, league_ids)
@@ -255,6 +238,8 @@ def ingest(date_str: str, league_ids: Optional[List[int]] = None) -> Tuple[int,
             odds_cnt += max(0, after - before)
 
         teams_cnt = conn.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
+        db.bump_data_version("update_data", conn)
+        conn.commit()
 
     return teams_cnt, matches_cnt, odds_cnt
 
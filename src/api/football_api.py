@@ -4,6 +4,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from config.settings import Settings
 from config.leagues import ALLOWED_LEAGUES
+from src.api.http_client import http_session
 
 class FootballAPI:
     def __init__(self):
@@ -17,7 +18,7 @@ class FootballAPI:
         
         try:
             time.sleep(self.rate_limit_delay)
-            response = requests.get(url, headers=self.headers, params=params)
+            response = http_session.get(url, headers=self.headers, params=params, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
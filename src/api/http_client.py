@@ -0,0 +1,56 @@
+# src/api/http_client.py
+"""
+Client HTTP partagé pour API-Football : une seule requests.Session par processus
+(keep-alive + pool de connexions TLS réutilisé entre les appels et entre les threads du pipeline).
+
+Les scripts gardent leur propre logique de retries / backoff ; ils passent simplement par
+`http_session.get(...)` au lieu de `requests.get(...)`. Chaque réponse est comptée pour l'étape
+en cours (src/utils/metrics.py : appels, erreurs, octets, temps de réponse).
+HTTP_RECORD_DIR / HTTP_REPLAY_DIR remplacent le transport par l'enregistrement ou le rejeu de
+cassettes (src/api/replay.py).
+"""
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.api.replay import adapter_from_env
+from src.utils.metrics import metrics
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8"))
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = adapter_from_env(POOL_SIZE) or HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+                session.hooks["response"].append(metrics.http_hook)
+                _session = session
+    return _session
+
+def set_session(session: requests.Session):
+    """Remplace la session partagée (adaptateurs spécifiques, tests de charge…)."""
+    global _session
+    if metrics.http_hook not in session.hooks["response"]:
+        session.hooks["response"].append(metrics.http_hook)
+    with _lock:
+        _session = session
+
+class _SessionProxy:
+    """Délègue à la session courante : `from ... import http_session` reste valable après set_session."""
+
+    def __getattr__(self, name):
+        return getattr(get_session(), name)
+
+# Instance globale
+http_session = _SessionProxy()
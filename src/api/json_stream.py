@@ -0,0 +1,139 @@
+# src/api/json_stream.py
+"""
+Lecture en flux des payloads API-Football : les éléments d'un tableau (ex. `response`) sont
+produits un par un pendant la réception, sans jamais construire l'arbre JSON complet.
+
+    r = http_session.get(url, params=..., stream=True)
+    stream = JSONStream(r.iter_content(CHUNK_SIZE), "response.item")
+    for fixture in stream:                 # un dict par fixture, mémoire constante
+        ...
+    stream.meta["paging"]                  # clés de 1er niveau hors chemin (complet après itération)
+
+Chemin au format ijson : clés séparées par des points, `item` = chaque élément d'un tableau
+("response.item.bookmakers.item" : bookmakers d'un payload /odds). Parseur incrémental de la
+bibliothèque standard (json.JSONDecoder.raw_decode sur un tampon glissant) : pas de dépendance.
+"""
+import json
+import codecs
+from typing import Any, Dict, Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+class JSONStream:
+    def __init__(self, chunks: Iterable[bytes], path: str = "response.item"):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.path: List[str] = path.split(".") if path else []
+        self.meta: Dict[str, Any] = {}
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._peek():
+            yield from self._walk(self.path, 0)
+
+    # ---------- tampon ----------
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        if self._pos > CHUNK_SIZE:  # la partie déjà consommée est libérée
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                self._buf += self._utf8.decode(chunk)
+                return True
+        self._buf += self._utf8.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        """Prochain caractère significatif ('' en fin de flux)."""
+        while True:
+            buf, pos, n = self._buf, self._pos, len(self._buf)
+            while pos < n and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu (octet ~{self.bytes_read})")
+        self._pos += 1
+
+    def _close(self, closing: str) -> bool:
+        """Après un élément : ',' (on continue) ou le délimiteur fermant (fin du conteneur)."""
+        char = self._peek()
+        if char == ",":
+            self._pos += 1
+            return False
+        if char == closing:
+            self._pos += 1
+            return True
+        raise ValueError(f"JSON invalide : ',' ou '{closing}' attendu (octet ~{self.bytes_read})")
+
+    def _value(self) -> Any:
+        """Valeur complète à la position courante (relit le tampon tant qu'elle est tronquée)."""
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # Un nombre en fin de tampon peut continuer dans le bloc suivant
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    # ---------- parcours ----------
+    def _walk(self, parts: List[str], depth: int) -> Iterator[Any]:
+        if not parts:
+            yield self._value()
+            return
+        head, rest = parts[0], parts[1:]
+        char = self._peek()
+        if head == "item":
+            if char != "[":
+                self._value()
+                return
+            self._pos += 1
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            while True:
+                yield from self._walk(rest, depth + 1)
+                if self._close("]"):
+                    return
+        else:
+            if char != "{":
+                self._value()
+                return
+            self._pos += 1
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                key = self._value()
+                self._expect(":")
+                if key == head:
+                    yield from self._walk(rest, depth + 1)
+                else:
+                    value = self._value()
+                    if depth == 0:
+                        self.meta[key] = value
+                if self._close("}"):
+                    return
+
+def stream_items(response, path: str = "response.item", chunk_size: int = CHUNK_SIZE) -> JSONStream:
+    """JSONStream sur le corps d'une réponse requests obtenue avec stream=True."""
+    return JSONStream(response.iter_content(chunk_size), path)
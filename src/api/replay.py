@@ -0,0 +1,264 @@
+# src/api/replay.py
+"""
+Enregistrement / rejeu des réponses API-Football, branché sur la session HTTP partagée
+(src/api/http_client.py) : les scripts d'ingestion tournent sans quota ni réseau.
+
+- RecordingAdapter : transport réel, chaque réponse est copiée dans une « cassette »
+  <dir>/<endpoint>/<clé>.json.gz (1re ligne : métadonnées JSON, puis le corps brut),
+- ReplayAdapter : transport en mémoire qui sert les cassettes, avec latence simulée
+  (fixe + gigue) et 429 injectés (taux aléatoire ou tous les N appels, Retry-After optionnel).
+  /fixtures et /odds filtrés par ligue et date sans cassette dédiée : dérivés de la cassette
+  fixtures de la date entière (et des cassettes /odds par fixture).
+
+Clé = endpoint + paramètres triés (page=1 ignoré) : `fixtures?date=…` et `fixtures?date=…&page=1`
+partagent la même cassette. La clé API n'est jamais enregistrée (en-têtes non stockés).
+
+Activation par variables d'environnement (lues à la création de la session) :
+  HTTP_RECORD_DIR=cassettes/ python -u scripts/fetch_today.py            # enregistre
+  HTTP_REPLAY_DIR=cassettes/ HTTP_REPLAY_LATENCY_MS=80 HTTP_REPLAY_429_RATE=0.05 \\
+      python -u scripts/backfill_history.py                                # rejoue
+ou par code : set_session(replay_session("cassettes/", latency_ms=80)).
+"""
+import io
+import os
+import gzip
+import json
+import time
+import random
+import hashlib
+import threading
+from http.client import responses as HTTP_REASONS
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+def endpoint_and_params(url: str) -> Tuple[str, Dict[str, str]]:
+    """'https://…/v3/odds?fixture=1' -> ('odds', {'fixture': '1'})"""
+    parts = urlsplit(url)
+    path = parts.path
+    endpoint = path.split("/v3/", 1)[1] if "/v3/" in path else path.rsplit("/", 1)[-1]
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    return endpoint.strip("/"), params
+
+def cassette_key(endpoint: str, params: Dict[str, Any]) -> str:
+    norm = {str(k): str(v) for k, v in params.items() if not (k == "page" and str(v) == "1")}
+    query = "&".join(f"{k}={norm[k]}" for k in sorted(norm))
+    readable = "_".join(f"{k}-{norm[k]}" for k in sorted(norm))[:60]
+    digest = hashlib.sha1(f"{endpoint}?{query}".encode()).hexdigest()[:10]
+    return f"{readable or 'all'}_{digest}"
+
+def cassette_path(root: str, endpoint: str, params: Dict[str, Any]) -> str:
+    return os.path.join(root, endpoint.replace("/", "_"), cassette_key(endpoint, params) + ".json.gz")
+
+def write_cassette(root: str, endpoint: str, params: Dict[str, Any], body: bytes,
+                   status: int = 200, content_type: str = "application/json"):
+    path = cassette_path(root, endpoint, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    meta = {"endpoint": endpoint, "params": {k: str(v) for k, v in params.items()},
+            "status": status, "content_type": content_type,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        f.write(json.dumps(meta).encode() + b"\n")
+        f.write(body)
+    os.replace(tmp, path)
+
+def read_cassette(path: str) -> Tuple[Dict[str, Any], bytes]:
+    with gzip.open(path, "rb") as f:
+        meta = json.loads(f.readline())
+        return meta, f.read()
+
+def iter_cassettes(root: str) -> Iterator[Tuple[str, Dict[str, Any], bytes]]:
+    """(chemin, métadonnées, corps) de toutes les cassettes d'un dossier (corpus de benchmarks)."""
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.endswith(".json.gz"):
+                path = os.path.join(dirpath, name)
+                meta, body = read_cassette(path)
+                yield path, meta, body
+
+def _response(request, status: int, body: bytes, headers: Optional[Dict[str, str]] = None,
+              adapter: Optional[BaseAdapter] = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = HTTP_REASONS.get(status, "")
+    resp.headers = CaseInsensitiveDict({"Content-Type": "application/json", "Content-Length": str(len(body)),
+                                        **(headers or {})})
+    resp.raw = io.BytesIO(body)  # lu à la demande : iter_content / stream=True fonctionnent
+    resp.encoding = "utf-8"
+    resp.url = request.url
+    resp.request = request
+    resp.connection = adapter
+    return resp
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport réel ; les réponses 200 sont copiées dans `root`."""
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        self.recorded = 0
+
+    def send(self, request, **kwargs):
+        resp = super().send(request, **kwargs)
+        if request.method == "GET" and resp.status_code == 200:
+            endpoint, params = endpoint_and_params(request.url)
+            write_cassette(self.root, endpoint, params, resp.content,
+                           content_type=resp.headers.get("Content-Type", "application/json"))
+            self.recorded += 1
+        return resp
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport hors ligne servant les cassettes de `root`.
+    latency_ms / jitter_ms : délai par appel ; rate_429 : probabilité d'un 429 ; every_429 : un 429
+    tous les N appels ; retry_after : en-tête Retry-After en secondes entières (absent si None) ;
+    strict : 404 si aucune cassette (sinon réponse vide 200, comme un jour sans match).
+    """
+
+    def __init__(self, root: str, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_429: float = 0.0,
+                 every_429: int = 0, retry_after: Optional[int] = None, strict: bool = False, seed: int = 0):
+        super().__init__()
+        self.root = root
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.every_429 = every_429
+        self.retry_after = retry_after
+        self.strict = strict
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+        self._by_league: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self.stats = {"calls": 0, "served": 0, "derived": 0, "misses": 0, "throttled": 0}
+
+    def _load(self, endpoint: str, params: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        path = cassette_path(self.root, endpoint, params)
+        with self._lock:
+            if path in self._cache:
+                return self._cache[path]
+        if not os.path.exists(path):
+            return None
+        entry = read_cassette(path)
+        with self._lock:
+            self._cache[path] = entry
+        return entry
+
+    def _league_fixtures(self, day: str, league) -> Optional[List[Dict[str, Any]]]:
+        """Fixtures de la ligue `league` à la date `day`, tirées de la cassette fixtures?date=D."""
+        with self._lock:
+            by_league = self._by_league.get(day)
+        if by_league is None:
+            whole = self._load("fixtures", {"date": day})
+            if whole is None:
+                return None
+            by_league = {}
+            for fx in json.loads(whole[1]).get("response") or []:
+                by_league.setdefault(str((fx.get("league") or {}).get("id")), []).append(fx)
+            with self._lock:
+                self._by_league[day] = by_league
+        return by_league.get(str(league), [])
+
+    def _derive(self, endpoint: str, params: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Sans cassette dédiée (page 1) :
+        fixtures?date=D&league=L : filtre de la cassette fixtures?date=D,
+        odds?date=D&league=L(&season=S) : concaténation des cassettes odds?fixture=… de ces fixtures.
+        """
+        if endpoint not in ("fixtures", "odds") or "league" not in params or "date" not in params:
+            return None
+        if str(params.get("page", "1")) != "1":
+            return None
+        fixtures = self._league_fixtures(str(params["date"]), params["league"])
+        if fixtures is None:
+            return None
+        items = fixtures
+        if endpoint == "odds":
+            items = []
+            for fx in fixtures:
+                entry = self._load("odds", {"fixture": str((fx.get("fixture") or {}).get("id"))})
+                if entry is not None:
+                    items += json.loads(entry[1]).get("response") or []
+        return json.dumps({
+            "get": endpoint, "parameters": {k: str(v) for k, v in params.items()}, "errors": [],
+            "results": len(items), "paging": {"current": 1, "total": 1}, "response": items,
+        }).encode()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        with self._lock:
+            self.stats["calls"] += 1
+            n = self.stats["calls"]
+            throttle = bool((self.every_429 and n % self.every_429 == 0) or
+                            (self.rate_429 and self._rng.random() < self.rate_429))
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000.0
+        if delay > 0:
+            time.sleep(delay)
+
+        if throttle:
+            with self._lock:
+                self.stats["throttled"] += 1
+            headers = {} if self.retry_after is None else {"Retry-After": str(int(self.retry_after))}
+            body = b'{"message":"You have exceeded the rate limit per minute for your plan"}'
+            return _response(request, 429, body, headers, self)
+
+        endpoint, params = endpoint_and_params(request.url)
+        entry = self._load(endpoint, params)
+        if entry is not None:
+            meta, body = entry
+            with self._lock:
+                self.stats["served"] += 1
+            return _response(request, int(meta.get("status", 200)), body,
+                             {"Content-Type": meta.get("content_type", "application/json")}, self)
+
+        derived = self._derive(endpoint, params)
+        if derived is not None:
+            with self._lock:
+                self.stats["derived"] += 1
+            return _response(request, 200, derived, None, self)
+
+        with self._lock:
+            self.stats["misses"] += 1
+        if self.strict:
+            return _response(request, 404, b'{"errors":{"replay":"no cassette"}}', None, self)
+        empty = {"get": endpoint, "parameters": params, "errors": [], "results": 0,
+                 "paging": {"current": 1, "total": 1}, "response": []}
+        return _response(request, 200, json.dumps(empty).encode(), {"X-Replay-Miss": "1"}, self)
+
+    def close(self):
+        pass
+
+def _mounted(adapter: BaseAdapter) -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+def replay_session(root: str, **options) -> requests.Session:
+    """Session servant les cassettes de `root` (options : cf. ReplayAdapter)."""
+    return _mounted(ReplayAdapter(root, **options))
+
+def recording_session(root: str, pool_size: int = 8) -> requests.Session:
+    return _mounted(RecordingAdapter(root, pool_connections=pool_size, pool_maxsize=pool_size))
+
+def adapter_from_env(pool_size: int) -> Optional[BaseAdapter]:
+    """Adaptateur demandé par HTTP_REPLAY_DIR / HTTP_RECORD_DIR, None sinon (transport réel)."""
+    replay_dir = os.getenv("HTTP_REPLAY_DIR", "").strip()
+    if replay_dir:
+        retry_after = os.getenv("HTTP_REPLAY_RETRY_AFTER", "").strip()
+        return ReplayAdapter(
+            replay_dir,
+            latency_ms=float(os.getenv("HTTP_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("HTTP_REPLAY_JITTER_MS", "0")),
+            rate_429=float(os.getenv("HTTP_REPLAY_429_RATE", "0")),
+            every_429=int(os.getenv("HTTP_REPLAY_429_EVERY", "0")),
+            retry_after=int(retry_after) if retry_after else None,
+            strict=os.getenv("HTTP_REPLAY_STRICT", "0") == "1",
+        )
+    record_dir = os.getenv("HTTP_RECORD_DIR", "").strip()
+    if record_dir:
+        return RecordingAdapter(record_dir, pool_connections=pool_size, pool_maxsize=pool_size)
+    return None
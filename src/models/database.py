@@ -2,21 +2,77 @@
 from __future__ import annotations
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from typing import Optional, List, Tuple
+from src.utils.metrics import TimedConnection
 
 DB_PATH = os.getenv("DB_PATH", "data/football.db")
+# Attente max (s) sur un verrou d'écriture : les étapes du pipeline écrivent en parallèle
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
 
 class Database:
     def __init__(self, path: str):
         self.path = path
+        self._pooled = False
+        self._local = threading.local()
+        self._opened: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         self._init_db()
 
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=DB_TIMEOUT, check_same_thread=False, factory=TimedConnection)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Connexion brute : celle du thread courant si le pool est actif, sinon une nouvelle.
+        En mode pool, l'appelant ne doit pas la fermer (close_pool s'en charge).
+        """
+        if not self._pooled:
+            return self._new_connection()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._new_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    # ---------- pool (une connexion par thread, réutilisée) ----------
+    def enable_pool(self):
+        """Active la réutilisation des connexions (pipeline in-process : plus de connect/close par requête)."""
+        self._pooled = True
+
+    def close_pool(self):
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+        self._pooled = False
+
     @contextmanager
     def _get_connection(self):
-        conn = sqlite3.connect(self.path)
-        conn.row_factory = sqlite3.Row
+        if self._pooled:
+            conn = self.connect()
+            depth = getattr(self._local, "depth", 0)
+            self._local.depth = depth + 1
+            try:
+                yield conn
+            finally:
+                self._local.depth = depth
+                # Même sémantique qu'une connexion fermée : ce qui n'est pas commité est annulé
+                # (et le verrou d'écriture libéré pour les autres threads)
+                if depth == 0 and conn.in_transaction:
+                    conn.rollback()
+            return
+        conn = self._new_connection()
         try:
             yield conn
         finally:
@@ -25,6 +81,16 @@ class Database:
     def get_connection(self):
         return self._get_connection()
 
+    @contextmanager
+    def _borrow(self, conn: Optional[sqlite3.Connection] = None):
+        """Connexion de l'appelant (écriture groupée, il commite) ou connexion propre commitée en sortie."""
+        if conn is not None:
+            yield conn
+            return
+        with self._get_connection() as own:
+            yield own
+            own.commit()
+
     @staticmethod
     def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
         return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
@@ -111,6 +177,58 @@ class Database:
                     created_at TEXT
                 )
             """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_fixture_id ON predictions(fixture_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions(created_at)")
+            # Empreinte des entrées de la dernière prédiction de chaque match (ratings, cotes) :
+            # generate_predictions ne recalcule que les matchs dont l'empreinte a changé
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prediction_inputs (
+                    fixture_id TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                ) WITHOUT ROWID
+            """)
+
+            # Paris réglés (matérialisés au fil des résultats) + agrégats journaliers
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS settled_bets (
+                    prediction_id INTEGER PRIMARY KEY,
+                    fixture_id TEXT,
+                    day TEXT,
+                    method TEXT,
+                    market TEXT,
+                    selection TEXT,
+                    prob REAL,
+                    odd REAL,
+                    ev REAL,
+                    closing_odd REAL,
+                    goals_home INTEGER,
+                    goals_away INTEGER,
+                    won INTEGER,
+                    pnl REAL,
+                    is_best INTEGER DEFAULT 0,
+                    settled_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_settled_bets_fixture ON settled_bets(fixture_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_settled_bets_day ON settled_bets(day)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_settled_bets_ev ON settled_bets(ev)")
+
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bet_daily_stats (
+                    method TEXT,
+                    market TEXT,
+                    day TEXT,
+                    bets INTEGER,
+                    wins INTEGER,
+                    units REAL,
+                    best_bets INTEGER,
+                    best_wins INTEGER,
+                    best_units REAL,
+                    updated_at TEXT DEFAULT (datetime('now')),
+                    PRIMARY KEY (method, market, day)
+                )
+            """)
 
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS match_elo (
@@ -165,22 +283,223 @@ class Database:
                 )
             """)
 
+            # Historique des cotes en ajout seul, captures inchangées non écrites (cf. services/odds_history.py) ;
+            # odds / ou25_odds / btts_odds gardent la dernière cote. ts = epoch UTC (s) de la capture
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS odds_snapshots (
+                    fixture_id TEXT,
+                    market TEXT,
+                    bookmaker_id INTEGER,
+                    ts INTEGER,
+                    p1 REAL,
+                    p2 REAL,
+                    p3 REAL,
+                    PRIMARY KEY (fixture_id, market, bookmaker_id, ts)
+                ) WITHOUT ROWID
+            """)
+
+            # Confrontations directes par paire non ordonnée (cf. services/h2h_index.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS h2h_summary (
+                    team_a TEXT,
+                    team_b TEXT,
+                    matches INTEGER,
+                    a_wins INTEGER,
+                    b_wins INTEGER,
+                    draws INTEGER,
+                    a_goals INTEGER,
+                    b_goals INTEGER,
+                    last_results TEXT,
+                    last_date TEXT,
+                    updated_at TEXT DEFAULT (datetime('now')),
+                    PRIMARY KEY (team_a, team_b)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS h2h_processed (
+                    fixture_id TEXT PRIMARY KEY
+                ) WITHOUT ROWID
+            """)
+
+            # Forme glissante par équipe, état après chaque match (cf. services/form_features.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS team_form_features (
+                    team TEXT,
+                    date TEXT,
+                    fixture_id TEXT,
+                    is_home INTEGER,
+                    gf INTEGER,
+                    ga INTEGER,
+                    pts INTEGER,
+                    played INTEGER,
+                    pts_last5 INTEGER,
+                    pts_last10 INTEGER,
+                    gf_last5 INTEGER,
+                    ga_last5 INTEGER,
+                    gf_last10 INTEGER,
+                    ga_last10 INTEGER,
+                    venue_pts_last5 INTEGER,
+                    venue_gf_last5 INTEGER,
+                    venue_ga_last5 INTEGER,
+                    PRIMARY KEY (team, date, fixture_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_team_form_fixture ON team_form_features(fixture_id, team)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_team_form_venue ON team_form_features(team, is_home, date)")
+
+            # Alias d'équipes (id API / nom normalisé) -> id canonique (cf. services/team_resolver.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS team_aliases (
+                    alias TEXT PRIMARY KEY,
+                    team_id INTEGER NOT NULL,
+                    source TEXT,
+                    created_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_team_aliases_team ON team_aliases(team_id)")
+
+            # Compteur de version des données : incrémenté par chaque script d'écriture,
+            # sert de clé aux caches des pages Streamlit
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS data_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL DEFAULT 0,
+                    source TEXT,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+            # Paramètres ELO actifs (meilleure config de scripts/sweep_elo.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS elo_config (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    k_factor REAL,
+                    home_advantage REAL,
+                    draw_base REAL,
+                    draw_width REAL,
+                    log_loss REAL,
+                    matches INTEGER,
+                    source TEXT,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                )
+            """)
+
+            # Paramètres ELO par ligue (scripts/fit_elo_leagues.py) : K, avantage du terrain,
+            # décalage de force à l'entrée d'une équipe, régression vers la ligue à chaque nouvelle saison
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS elo_league_params (
+                    league_id TEXT PRIMARY KEY,
+                    k_factor REAL,
+                    home_advantage REAL,
+                    offset REAL,
+                    season_regress REAL,
+                    matches INTEGER,
+                    cross_matches INTEGER,
+                    source TEXT,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                ) WITHOUT ROWID
+            """)
+
+            # Modèle de buts Poisson / Dixon–Coles par ligue (scripts/fit_goal_model.py) :
+            # avantage du terrain et ρ par ligue, attaque / défense (log) par équipe
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS goal_model_leagues (
+                    league_id TEXT PRIMARY KEY,
+                    home_adv REAL,
+                    rho REAL,
+                    decay REAL,
+                    matches INTEGER,
+                    log_lik REAL,
+                    solver TEXT,
+                    updated_at TEXT DEFAULT (datetime('now'))
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS goal_model_teams (
+                    league_id TEXT,
+                    team_id TEXT,
+                    attack REAL,
+                    defence REAL,
+                    matches INTEGER,
+                    PRIMARY KEY (league_id, team_id)
+                ) WITHOUT ROWID
+            """)
+
+            # Empreintes des entrées de chaque étape du pipeline (cf. services/pipeline.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_state (
+                    stage TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    status TEXT,
+                    message TEXT,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    duration_s REAL
+                )
+            """)
+
+            # Durées et compteurs par étape / sous-étape (cf. src/utils/metrics.py)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    stage TEXT NOT NULL,
+                    started_at TEXT,
+                    duration_s REAL,
+                    status TEXT,
+                    rows INTEGER,
+                    api_calls INTEGER,
+                    api_errors INTEGER,
+                    api_bytes INTEGER,
+                    api_time_s REAL,
+                    cache_hits INTEGER,
+                    cache_misses INTEGER,
+                    sql_queries INTEGER,
+                    sql_time_s REAL,
+                    extra TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_metrics_stage ON pipeline_metrics(stage, started_at)")
+
             conn.commit()
 
+    # ---------- version des données ----------
+    def bump_data_version(self, source: Optional[str] = None, conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        Incrémente la version des données après une écriture.
+        Avec `conn`, l'incrément fait partie de la transaction de l'appelant (qui commit).
+        """
+        if conn is not None:
+            conn.execute(
+                "UPDATE data_version SET version = version + 1, source = ?, updated_at = datetime('now') WHERE id = 1",
+                (source,),
+            )
+            return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+        with self._get_connection() as own:
+            version = self.bump_data_version(source, own)
+            own.commit()
+            return version
+
+    def get_data_version(self) -> int:
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+        return int(row[0]) if row else 0
+
     # ---------- helpers ----------
-    def _ensure_team_seed(self, team_id: Optional[str], seed_elo: float = 1500.0):
+    def _ensure_team_seed(self, team_id: Optional[str], seed_elo: float = 1500.0,
+                          conn: Optional[sqlite3.Connection] = None):
         """Stocke toujours le team_id en TEXTE pour éviter datatype mismatch."""
         if team_id is None:
             return
         team_id = str(team_id).strip()
         if not team_id:
             return
-        with self._get_connection() as conn:
-            conn.execute(
+        with self._borrow(conn) as c:
+            c.execute(
                 "INSERT OR IGNORE INTO team_stats (team_id, elo, updated_at) VALUES (?, ?, datetime('now'))",
                 (team_id, seed_elo),
             )
-            conn.commit()
 
     # ---------- upsert match sans changer ton schéma existant ----------
     def insert_match(
@@ -194,23 +513,35 @@ class Database:
         league: Optional[str] = None,
         season: Optional[str] = None,
         fixture_id: Optional[str] = None,
+        home_team_id: Optional[int] = None,
+        away_team_id: Optional[int] = None,
+        conn: Optional[sqlite3.Connection] = None,
     ):
-        """S'adapte au schéma réel de `matches` (utilise seulement les colonnes présentes)."""
-        # Seed ELO avec les noms d'équipes
-        self._ensure_team_seed(home_team)
-        self._ensure_team_seed(away_team)
+        """
+        S'adapte au schéma réel de `matches` (utilise seulement les colonnes présentes).
+        Avec home_team_id/away_team_id (ids canoniques du TeamResolver), l'ELO est amorcé sur l'id
+        et non plus sur le nom brut.
+        Avec `conn`, tout passe par la connexion de l'appelant, qui commite par lots.
+        """
+        with self._borrow(conn) as conn:
+            # Seed ELO avec les ids canoniques (à défaut, les noms d'équipes)
+            self._ensure_team_seed(home_team_id if home_team_id is not None else home_team, conn=conn)
+            self._ensure_team_seed(away_team_id if away_team_id is not None else away_team, conn=conn)
 
-        with self._get_connection() as conn:
             cols = set(self._columns(conn, "matches"))
 
             # Prépare dict valeurs en respectant les colonnes existantes
             values = {}
             if "date" in cols:        values["date"] = date
             if "home_team" in cols:   values["home_team"] = str(home_team)
-            if "home_team_id" in cols and "home_team" not in values:
+            if "home_team_id" in cols and home_team_id is not None:
+                values["home_team_id"] = int(home_team_id)
+            elif "home_team_id" in cols and "home_team" not in values:
                 values["home_team_id"] = str(home_team)
             if "away_team" in cols:   values["away_team"] = str(away_team)
-            if "away_team_id" in cols and "away_team" not in values:
+            if "away_team_id" in cols and away_team_id is not None:
+                values["away_team_id"] = int(away_team_id)
+            elif "away_team_id" in cols and "away_team" not in values:
                 values["away_team_id"] = str(away_team)
             if "home_score" in cols:  values["home_score"] = home_score
             if "away_score" in cols:  values["away_score"] = away_score
@@ -218,8 +549,9 @@ class Database:
             if "goals_away" in cols:  values["goals_away"] = away_score
             if "status" in cols:      values["status"] = status
             if "league" in cols:      values["league"] = league
-            if "league_id" in cols and "league" not in values:
-                values["league_id"] = league
+            if "league_id" in cols and league is not None and ("league" not in values or str(league).isdigit()):
+                # Id de ligue API ("39") : aussi dans league_id (appels groupés de l'ordonnanceur de cotes)
+                values["league_id"] = int(league) if str(league).isdigit() else league
             if "season" in cols:      values["season"] = season
             if "fixture_id" in cols and fixture_id:
                 values["fixture_id"] = str(fixture_id).strip()
@@ -243,8 +575,6 @@ class Database:
                 qmarks  = ", ".join(["?"] * len(values))
                 conn.execute(f"INSERT INTO matches ({cols_sql}) VALUES ({qmarks})", list(values.values()))
 
-            conn.commit()
-
 
 # instance globale
 db = Database(DB_PATH)
@@ -0,0 +1,213 @@
+# src/services/bet_settlement.py
+"""
+Règlement incrémental des prédictions :
+- ne traite que les prédictions dont le match a reçu un score depuis le dernier passage
+  (anti-jointure predictions ↔ settled_bets),
+- stocke issue, P&L (mise plate 1u) et cote de clôture (dernier prix avant le coup d'envoi,
+  Pinnacle en référence) dans settled_bets,
+- maintient les agrégats (méthode, marché, jour) dans bet_daily_stats.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.models.database import db
+
+# Sélections acceptées (codes courts du générateur + codes longs des dashboards)
+SELECTION_ALIASES = {
+    "H": "HOME", "HOME": "HOME",
+    "D": "DRAW", "DRAW": "DRAW",
+    "A": "AWAY", "AWAY": "AWAY",
+    "OVER": "OVER25", "OVER25": "OVER25",
+    "UNDER": "UNDER25", "UNDER25": "UNDER25",
+    "YES": "BTTS_YES", "BTTS_YES": "BTTS_YES",
+    "NO": "BTTS_NO", "BTTS_NO": "BTTS_NO",
+}
+
+# Cote de clôture de chaque sélection : (marché odds_snapshots, colonne) de l'historique, et
+# (table, colonne) des cotes courantes pour les matchs sans historique
+CLOSING_ODDS_COLUMNS = {
+    "HOME": ("1x2", "p1", "odds", "home_odd"),
+    "DRAW": ("1x2", "p2", "odds", "draw_odd"),
+    "AWAY": ("1x2", "p3", "odds", "away_odd"),
+    "OVER25": ("ou25", "p1", "ou25_odds", "over25_odd"),
+    "UNDER25": ("ou25", "p2", "ou25_odds", "under25_odd"),
+    "BTTS_YES": ("btts", "p1", "btts_odds", "yes_odd"),
+    "BTTS_NO": ("btts", "p2", "btts_odds", "no_odd"),
+}
+CLOSING_REFERENCE_BOOKMAKER = 4  # Pinnacle : ligne de clôture de référence ; moyenne des bookmakers sinon
+
+def normalize_selection(selection: Optional[str]) -> Optional[str]:
+    if selection is None:
+        return None
+    return SELECTION_ALIASES.get(str(selection).strip().upper())
+
+def settle_selection(market: str, selection: str, gh: int, ga: int) -> int:
+    """Renvoie 1 si gagné, 0 si perdu. Marchés: 1X2, OU25, BTTS."""
+    sel = normalize_selection(selection)
+    if market == "1X2":
+        if sel == "HOME": return 1 if gh > ga else 0
+        if sel == "DRAW": return 1 if gh == ga else 0
+        if sel == "AWAY": return 1 if gh < ga else 0
+        return 0
+    if market == "OU25":
+        total = gh + ga
+        if sel == "OVER25": return 1 if total > 2.5 else 0
+        if sel == "UNDER25": return 1 if total < 2.5 else 0
+        return 0
+    if market == "BTTS":
+        both = (gh > 0 and ga > 0)
+        if sel == "BTTS_YES": return 1 if both else 0
+        if sel == "BTTS_NO": return 1 if not both else 0
+        return 0
+    return 0
+
+class BetSettlement:
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+
+    def pending_predictions(self, conn) -> List:
+        """Prédictions non réglées dont le match a désormais un score."""
+        return conn.execute("""
+            SELECT p.id, p.fixture_id, p.method, p.market, p.selection, p.prob, p.odd,
+                   COALESCE(m.goals_home, m.home_score) AS gh,
+                   COALESCE(m.goals_away, m.away_score) AS ga,
+                   substr(COALESCE(m.date, p.date), 1, 10) AS day
+            FROM predictions p
+            JOIN matches m ON m.fixture_id = p.fixture_id
+            LEFT JOIN settled_bets s ON s.prediction_id = p.id
+            WHERE s.prediction_id IS NULL
+              AND COALESCE(m.goals_home, m.home_score) IS NOT NULL
+              AND COALESCE(m.goals_away, m.away_score) IS NOT NULL
+        """).fetchall()
+
+    def closing_odds(self, conn, fixture_ids: Iterable[str]) -> Dict[Tuple[str, str], float]:
+        """
+        Cote de clôture par (fixture, sélection) : dernier prix de chaque bookmaker avant le coup
+        d'envoi (odds_snapshots), celui de CLOSING_REFERENCE_BOOKMAKER s'il est coté, sinon la
+        moyenne des bookmakers. Marché sans historique pour ce match : même règle sur les cotes courantes.
+        """
+        ids = sorted({str(f) for f in fixture_ids})
+        prices: Dict[Tuple[str, str], Dict[int, float]] = {}
+        tracked = set()  # (fixture, marché) ayant au moins une capture avant le coup d'envoi
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            qmarks = ", ".join(["?"] * len(chunk))
+            rows = conn.execute(f"""
+                SELECT fixture_id, market, bookmaker_id, p1, p2, p3 FROM (
+                    SELECT s.*, ROW_NUMBER() OVER (PARTITION BY s.fixture_id, s.market, s.bookmaker_id
+                                                   ORDER BY s.ts DESC) AS rev
+                    FROM odds_snapshots s
+                    WHERE s.fixture_id IN ({qmarks})
+                      AND s.ts <= COALESCE((SELECT CAST(strftime('%s', m.date) AS INTEGER) FROM matches m
+                                            WHERE m.fixture_id = s.fixture_id LIMIT 1), s.ts)
+                ) WHERE rev = 1
+            """, chunk).fetchall()
+            for r in rows:
+                tracked.add((str(r["fixture_id"]), r["market"]))
+                for sel, (market, col, _, _) in CLOSING_ODDS_COLUMNS.items():
+                    if r["market"] == market and r[col]:
+                        prices.setdefault((str(r["fixture_id"]), sel), {})[int(r["bookmaker_id"])] = float(r[col])
+
+        # Marchés sans capture pour ce match (données antérieures à odds_snapshots, ou marché
+        # capturé seulement en 1X2) : dernière cote connue, marché par marché
+        for sel, (market, _, table, col) in CLOSING_ODDS_COLUMNS.items():
+            legacy = [f for f in ids if (f, market) not in tracked]
+            for i in range(0, len(legacy), 500):
+                chunk = legacy[i:i + 500]
+                qmarks = ", ".join(["?"] * len(chunk))
+                for fid, bm_id, odd in conn.execute(
+                    f"SELECT fixture_id, bookmaker_id, {col} FROM {table} WHERE fixture_id IN ({qmarks})", chunk,
+                ).fetchall():
+                    if odd:
+                        prices.setdefault((str(fid), sel), {})[int(bm_id)] = float(odd)
+
+        return {key: by_bm.get(CLOSING_REFERENCE_BOOKMAKER, sum(by_bm.values()) / len(by_bm))
+                for key, by_bm in prices.items()}
+
+    def settle_pending(self) -> Dict[str, int]:
+        """Règle les nouvelles prédictions et rafraîchit les agrégats des jours touchés."""
+        with db.get_connection() as conn:
+            rows = self.pending_predictions(conn)
+            if not rows:
+                return {"settled": 0, "days": 0}
+
+            closing = self.closing_odds(conn, (r["fixture_id"] for r in rows))
+            records = []
+            for r in rows:
+                gh, ga = int(r["gh"]), int(r["ga"])
+                odd = float(r["odd"]) if r["odd"] else None
+                prob = float(r["prob"]) if r["prob"] is not None else None
+                won = settle_selection(r["market"], r["selection"], gh, ga)
+                pnl = ((odd - 1.0) if won else -1.0) if odd else None
+                ev = prob * odd if (prob is not None and odd) else None
+                sel = normalize_selection(r["selection"])
+                records.append((
+                    r["id"], str(r["fixture_id"]), r["day"], r["method"], r["market"], r["selection"],
+                    prob, odd, ev, closing.get((str(r["fixture_id"]), sel)), gh, ga, won, pnl,
+                ))
+
+            for i in range(0, len(records), self.batch_size):
+                conn.executemany("""
+                    INSERT OR REPLACE INTO settled_bets (
+                        prediction_id, fixture_id, day, method, market, selection,
+                        prob, odd, ev, closing_odd, goals_home, goals_away, won, pnl
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, records[i:i + self.batch_size])
+
+            fixture_ids = {rec[1] for rec in records}
+            days = {rec[2] for rec in records if rec[2]}
+            self._purge_orphans(conn, days)
+            self._flag_best(conn, fixture_ids)
+            self._refresh_daily_stats(conn, days)
+            db.bump_data_version("settle_bets", conn)
+            conn.commit()
+
+        return {"settled": len(records), "days": len(days)}
+
+    def _purge_orphans(self, conn, days: Set[str]):
+        """Supprime les lignes dont la prédiction a été régénérée (id disparu)."""
+        for day in days:
+            conn.execute("""
+                DELETE FROM settled_bets
+                WHERE day = ?
+                  AND NOT EXISTS (SELECT 1 FROM predictions p WHERE p.id = settled_bets.prediction_id)
+            """, (day,))
+
+    def _flag_best(self, conn, fixture_ids: Set[str]):
+        """Marque la sélection à EV max par (fixture, méthode, marché) — politique MAX_EV."""
+        ids = sorted(fixture_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            qmarks = ", ".join(["?"] * len(chunk))
+            conn.execute(f"""
+                UPDATE settled_bets SET is_best = (
+                    prediction_id = (
+                        SELECT s2.prediction_id FROM settled_bets s2
+                        WHERE s2.fixture_id = settled_bets.fixture_id
+                          AND s2.method = settled_bets.method
+                          AND s2.market = settled_bets.market
+                          AND s2.pnl IS NOT NULL
+                        ORDER BY s2.ev DESC, s2.prediction_id ASC
+                        LIMIT 1
+                    )
+                )
+                WHERE fixture_id IN ({qmarks})
+            """, chunk)
+
+    def _refresh_daily_stats(self, conn, days: Set[str]):
+        for day in days:
+            conn.execute("DELETE FROM bet_daily_stats WHERE day = ?", (day,))
+            conn.execute("""
+                INSERT INTO bet_daily_stats (method, market, day, bets, wins, units, best_bets, best_wins, best_units)
+                SELECT method, market, day,
+                       COUNT(*),
+                       SUM(won),
+                       SUM(pnl),
+                       SUM(is_best),
+                       SUM(CASE WHEN is_best = 1 THEN won ELSE 0 END),
+                       SUM(CASE WHEN is_best = 1 THEN pnl ELSE 0 END)
+                FROM settled_bets
+                WHERE day = ? AND pnl IS NOT NULL
+                GROUP BY method, market, day
+            """, (day,))
+
+# Instance globale
+bet_settlement = BetSettlement()
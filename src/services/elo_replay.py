@@ -0,0 +1,234 @@
+# src/services/elo_replay.py
+"""
+Rejeu ELO en mémoire sur tout l'historique (numpy), sans écriture en base.
+
+Même formule que EloSystem (score attendu logistique base 10 / 400, avantage du terrain,
+mise à jour K × (réel − attendu), modèle de nul draw_base / draw_width), mais :
+- les équipes sont indexées une fois (tableau de ratings au lieu de requêtes team_stats),
+- paramètres par ligue optionnels (elo_league_params) appliqués par tableaux : K et avantage du
+  terrain par match, rating d'entrée par ligue de rattachement, régression de début de saison,
+- les matchs d'une même journée sont traités en bloc : probabilités avec les ratings du début
+  de journée, puis mises à jour cumulées (np.add.at). Identique au rejeu match par match
+  tant qu'une équipe ne joue qu'une fois par jour.
+
+Sert au backtest (scripts/backtest_methods.py) et au sweep de paramètres (scripts/sweep_elo.py) :
+les ratings renvoyés pour un match sont ceux d'avant le coup d'envoi, donc sans fuite du résultat.
+"""
+import re
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.services.elo_system import DEFAULT_ELO, K_FACTOR, HOME_ADVANTAGE, DRAW_BASE, DRAW_WIDTH
+
+HOME, DRAW, AWAY = 0, 1, 2
+
+_ISO_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+# Clés communes à l'historique, au rejeu, à team_stats et aux prédictions live : id canonique
+# (TeamResolver, ou id API) à défaut du nom brut, id de ligue à défaut du libellé
+LEAGUE_KEY = "CAST(COALESCE(league_id, league) AS TEXT)"
+HOME_KEY = "CAST(COALESCE(home_team_id, home_team) AS TEXT)"
+AWAY_KEY = "CAST(COALESCE(away_team_id, away_team) AS TEXT)"
+
+def iso_days(dates: pd.Series) -> pd.Series:
+    """'2024-08-17T14:00:00+00:00' -> '2024-08-17' ; les dates Football-Data 'dd/mm/yyyy' sont converties."""
+    s = dates.astype(str)
+    iso = s.str.match(_ISO_DAY)
+    out = s.str[:10].where(iso)
+    if (~iso).any():
+        parsed = pd.to_datetime(s[~iso], dayfirst=True, errors="coerce")
+        out[~iso] = parsed.dt.strftime("%Y-%m-%d")
+    return out
+
+def iso_day_sql(col: str) -> str:
+    """
+    Équivalent SQL de iso_days pour une colonne : 'YYYY-MM-DD…' -> 10 premiers caractères,
+    'dd/mm/yyyy' et 'dd/mm/yy' (Football-Data, pivot 69 comme pandas) convertis, NULL sinon.
+    """
+    return f"""(CASE
+        WHEN {col} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' THEN substr({col}, 1, 10)
+        WHEN {col} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
+            THEN substr({col}, 7, 4) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2)
+        WHEN {col} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9]'
+            THEN (CASE WHEN substr({col}, 7, 2) >= '69' THEN '19' ELSE '20' END)
+                 || substr({col}, 7, 2) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2)
+    END)"""
+
+def load_history(conn, until: Optional[str] = None) -> pd.DataFrame:
+    """
+    Matchs terminés triés chronologiquement :
+    fixture_id, day (ISO), season, league, home, away, gh, ga, result (0=1, 1=N, 2=2).
+    """
+    df = pd.read_sql_query(f"""
+        SELECT CAST(fixture_id AS TEXT) AS fixture_id, date, season,
+               {LEAGUE_KEY} AS league, {HOME_KEY} AS home, {AWAY_KEY} AS away,
+               COALESCE(goals_home, home_score) AS gh,
+               COALESCE(goals_away, away_score) AS ga
+        FROM matches
+        WHERE COALESCE(goals_home, home_score) IS NOT NULL
+          AND COALESCE(goals_away, away_score) IS NOT NULL
+          AND COALESCE(home_team_id, home_team) IS NOT NULL
+          AND COALESCE(away_team_id, away_team) IS NOT NULL
+    """, conn)
+    df["day"] = iso_days(df["date"])
+    df = df.dropna(subset=["day"])
+    if until:
+        df = df[df["day"] < until]
+    df["gh"] = df["gh"].astype(int)
+    df["ga"] = df["ga"].astype(int)
+    df["result"] = np.select([df["gh"] > df["ga"], df["gh"] == df["ga"]], [HOME, DRAW], AWAY)
+    return df.sort_values(["day", "fixture_id"], kind="mergesort").reset_index(drop=True)
+
+def probabilities(home_r: np.ndarray, away_r: np.ndarray, home_advantage: float = HOME_ADVANTAGE,
+                  draw_base: float = DRAW_BASE, draw_width: float = DRAW_WIDTH) -> np.ndarray:
+    """Probabilités 1N2 (n × 3) de EloSystem.probabilities, vectorisées."""
+    diff = (home_r + home_advantage) - away_r
+    expected = 1.0 / (1.0 + np.power(10.0, -diff / 400.0))
+    if draw_width > 0:
+        draw = draw_base * np.exp(-(diff / draw_width) ** 2)
+    else:
+        draw = np.full_like(expected, draw_base)
+    rest = 1.0 - draw
+    return np.column_stack([expected * rest, draw, (1.0 - expected) * rest])
+
+def team_ratings(conn, teams) -> Dict[str, float]:
+    """Ratings courants (team_stats, écrits par build_elo_history) des équipes désignées par leur clé canonique."""
+    keys = sorted({str(t).strip() for t in teams if t is not None and str(t).strip()})
+    out: Dict[str, float] = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        for r in conn.execute(f"SELECT team_id, elo FROM team_stats WHERE team_id IN ({', '.join('?' * len(chunk))})",
+                              chunk).fetchall():
+            if r[1] is not None:
+                out[str(r[0])] = float(r[1])
+    return out
+
+def lookup_ratings(ratings: Dict[str, float], teams, leagues, league_params: Optional[Dict[str, Dict[str, float]]] = None,
+                   default_elo: float = DEFAULT_ELO) -> np.ndarray:
+    """
+    Rating de chaque équipe (clé canonique) ; équipe sans rating : rating d'entrée de la ligue
+    du match (default_elo + offset), comme dans le rejeu.
+    """
+    prior = _per_league(np.array([str(lg) for lg in leagues], dtype=object), league_params or {}, "offset", 0.0)
+    return np.array([ratings.get(str(t).strip(), default_elo + p) if t is not None else default_elo + p
+                     for t, p in zip(teams, prior)], dtype=float)
+
+def elo_predictions(home_r: np.ndarray, away_r: np.ndarray, leagues, config: Dict[str, float],
+                    league_params: Optional[Dict[str, Dict[str, float]]] = None):
+    """
+    Probabilités 1N2 (n × 3) et confiance (n) à partir des ratings : même calcul pour la méthode
+    ELO live (FootballPredictor.predict_elo) et le backtest. Confiance = |écart avantage du
+    terrain de la ligue inclus| / 400, plafonnée à 1.
+    """
+    home_r, away_r = np.asarray(home_r, dtype=float), np.asarray(away_r, dtype=float)
+    ha = _per_league(np.array([str(lg) for lg in leagues], dtype=object), league_params or {},
+                     "home_advantage", config.get("home_advantage", HOME_ADVANTAGE))
+    probs = probabilities(home_r, away_r, ha, config.get("draw_base", DRAW_BASE), config.get("draw_width", DRAW_WIDTH))
+    confidence = np.minimum(1.0, np.abs(home_r + ha - away_r) / 400.0)
+    return probs, confidence
+
+def home_leagues(history: pd.DataFrame) -> pd.Series:
+    """
+    Ligue de rattachement de chaque équipe = compétition où elle a joué le plus de matchs
+    (une coupe européenne ne l'emporte jamais sur le championnat national).
+    """
+    played = pd.concat([
+        history[["home", "league"]].rename(columns={"home": "team"}),
+        history[["away", "league"]].rename(columns={"away": "team"}),
+    ])
+    counts = played.groupby(["team", "league"]).size().reset_index(name="n")
+    counts = counts.sort_values(["team", "n", "league"], ascending=[True, False, True], kind="mergesort")
+    return counts.drop_duplicates("team").set_index("team")["league"]
+
+def _per_league(values: np.ndarray, league_params: Dict[str, Dict[str, float]], key: str, default: float) -> np.ndarray:
+    """Valeur du paramètre `key` pour chaque ligue de `values` (défaut global si absente)."""
+    table = {lg: float(p[key]) for lg, p in league_params.items() if p.get(key) is not None}
+    return np.array([table.get(v, default) for v in values], dtype=float)
+
+def replay(history: pd.DataFrame, k_factor: float = K_FACTOR, home_advantage: float = HOME_ADVANTAGE,
+           draw_base: float = DRAW_BASE, draw_width: float = DRAW_WIDTH,
+           default_elo: float = DEFAULT_ELO, league_params: Optional[Dict[str, Dict[str, float]]] = None,
+           team_leagues: Optional[pd.Series] = None) -> Dict[str, np.ndarray]:
+    """
+    Rejoue l'historique (trié par jour). Retourne, aligné sur les lignes de `history` :
+    home_pre / away_pre et home_post / away_post (ratings avant / après match), expected (score
+    attendu à domicile), probs (n × 3), et les ratings finaux par équipe.
+
+    league_params (cf. elo_league_params) : K et avantage du terrain pris dans la ligue du match ;
+    rating d'entrée = default_elo + offset de la ligue de rattachement de l'équipe ; au premier match
+    d'une nouvelle saison, l'écart au rating d'entrée est réduit de season_regress.
+    """
+    league_params = league_params or {}
+    teams, codes = np.unique(np.concatenate([history["home"].to_numpy(), history["away"].to_numpy()]),
+                             return_inverse=True)
+    n = len(history)
+    home_idx, away_idx = codes[:n], codes[n:]
+    actual = np.select([history["result"].to_numpy() == HOME, history["result"].to_numpy() == DRAW], [1.0, 0.5], 0.0)
+
+    match_leagues = history["league"].astype(str).to_numpy()
+    k = _per_league(match_leagues, league_params, "k_factor", k_factor)
+    ha = _per_league(match_leagues, league_params, "home_advantage", home_advantage)
+
+    if team_leagues is None and league_params:
+        team_leagues = home_leagues(history)
+    if team_leagues is not None:
+        team_league = team_leagues.reindex(teams).astype(str).to_numpy()
+        prior = default_elo + _per_league(team_league, league_params, "offset", 0.0)
+        regress = _per_league(team_league, league_params, "season_regress", 0.0)
+    else:
+        prior = np.full(len(teams), float(default_elo))
+        regress = np.zeros(len(teams))
+    ratings = prior.copy()
+
+    # Saisons codées en entiers (-1 = inconnue : pas de régression)
+    seasons = history["season"].astype(str).where(history["season"].notna(), "")
+    season_codes = pd.factorize(seasons)[0]
+    season_codes[(seasons == "").to_numpy()] = -1
+    last_season = np.full(len(teams), -1)
+    use_regress = bool(regress.any())
+
+    home_pre, away_pre = np.empty(n), np.empty(n)
+    home_post, away_post = np.empty(n), np.empty(n)
+    expected_home = np.empty(n)
+
+    days = history["day"].to_numpy()
+    bounds = np.flatnonzero(days[1:] != days[:-1]) + 1 if n else np.array([], dtype=int)
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, n]):
+        h, a = home_idx[start:end], away_idx[start:end]
+        if use_regress:
+            season = season_codes[start:end]
+            for side in (h, a):
+                new = (season >= 0) & (last_season[side] >= 0) & (last_season[side] != season)
+                t = side[new]
+                ratings[t] = prior[t] + (ratings[t] - prior[t]) * (1.0 - regress[t])
+                known = season >= 0
+                last_season[side[known]] = season[known]
+        rh, ra = ratings[h], ratings[a]
+        home_pre[start:end] = rh
+        away_pre[start:end] = ra
+        expected = 1.0 / (1.0 + np.power(10.0, (ra - (rh + ha[start:end])) / 400.0))
+        expected_home[start:end] = expected
+        delta = k[start:end] * (actual[start:end] - expected)
+        home_post[start:end] = rh + delta
+        away_post[start:end] = ra - delta
+        np.add.at(ratings, h, delta)
+        np.add.at(ratings, a, -delta)
+
+    return {
+        "home_pre": home_pre,
+        "away_pre": away_pre,
+        "home_post": home_post,
+        "away_post": away_post,
+        "expected": expected_home,
+        "probs": probabilities(home_pre, away_pre, ha, draw_base, draw_width),
+        "teams": teams,
+        "ratings": ratings,
+        "prior": prior,
+    }
+
+def log_loss(probs: np.ndarray, result: np.ndarray) -> float:
+    """Log-loss multiclasse moyenne (probabilité de l'issue réelle bornée à 1e-15)."""
+    p_true = probs[np.arange(len(result)), result]
+    return float(-np.log(np.clip(p_true, 1e-15, 1.0)).mean())
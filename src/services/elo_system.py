@@ -1,19 +1,120 @@
 # src/services/elo_system.py
 import math
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from src.models.database import db
+from src.utils.metrics import metrics
 
 DEFAULT_ELO = 1500.0
+# Valeurs par défaut ; la configuration active vient de la table elo_config (scripts/sweep_elo.py)
 K_FACTOR = 32.0
 HOME_ADVANTAGE = 100.0
+DRAW_BASE = 0.25    # probabilité de nul à écart nul
+DRAW_WIDTH = 0.0    # écart ELO (points) où le nul retombe à DRAW_BASE / e ; 0 = nul forfaitaire
+
+DEFAULT_CONFIG = {
+    "k_factor": K_FACTOR,
+    "home_advantage": HOME_ADVANTAGE,
+    "draw_base": DRAW_BASE,
+    "draw_width": DRAW_WIDTH,
+}
+
+def load_elo_config(conn=None) -> Dict[str, float]:
+    """Paramètres ELO actifs (elo_config), valeurs par défaut sinon."""
+    if conn is None:
+        with db.get_connection() as own:
+            return load_elo_config(own)
+    row = conn.execute(
+        "SELECT k_factor, home_advantage, draw_base, draw_width FROM elo_config WHERE id = 1"
+    ).fetchone()
+    config = dict(DEFAULT_CONFIG)
+    if row:
+        config.update({k: float(row[k]) for k in DEFAULT_CONFIG if row[k] is not None})
+    return config
+
+def save_elo_config(params: Dict[str, float], log_loss: Optional[float] = None,
+                    matches: Optional[int] = None, source: str = "sweep"):
+    config = {**DEFAULT_CONFIG, **{k: float(v) for k, v in params.items() if k in DEFAULT_CONFIG}}
+    with db.get_connection() as conn:
+        conn.execute("""
+            INSERT INTO elo_config (id, k_factor, home_advantage, draw_base, draw_width, log_loss, matches, source, updated_at)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ON CONFLICT(id) DO UPDATE SET
+              k_factor=excluded.k_factor, home_advantage=excluded.home_advantage,
+              draw_base=excluded.draw_base, draw_width=excluded.draw_width,
+              log_loss=excluded.log_loss, matches=excluded.matches,
+              source=excluded.source, updated_at=excluded.updated_at
+        """, (config["k_factor"], config["home_advantage"], config["draw_base"], config["draw_width"],
+              log_loss, matches, source))
+        conn.commit()
+    return config
+
+LEAGUE_PARAM_COLUMNS = ["k_factor", "home_advantage", "offset", "season_regress"]
+
+def load_league_params(conn=None) -> Dict[str, Dict[str, float]]:
+    """Paramètres par ligue (elo_league_params) : {league_id: {k_factor, home_advantage, offset, season_regress}}."""
+    if conn is None:
+        with db.get_connection() as own:
+            return load_league_params(own)
+    rows = conn.execute(f"SELECT league_id, {', '.join(LEAGUE_PARAM_COLUMNS)} FROM elo_league_params").fetchall()
+    return {str(r["league_id"]): {c: r[c] for c in LEAGUE_PARAM_COLUMNS if r[c] is not None} for r in rows}
+
+def save_league_params(rows, source: str = "fit"):
+    """Remplace les paramètres par ligue. rows : dicts avec league_id, colonnes de paramètres, matches, cross_matches."""
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM elo_league_params")
+        conn.executemany("""
+            INSERT INTO elo_league_params (league_id, k_factor, home_advantage, offset, season_regress,
+                                           matches, cross_matches, source, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+        """, [(str(r["league_id"]), r.get("k_factor"), r.get("home_advantage"), r.get("offset"),
+               r.get("season_regress"), r.get("matches"), r.get("cross_matches"), source) for r in rows])
+        conn.commit()
+
+def draw_probability(diff: float, draw_base: float = DRAW_BASE, draw_width: float = DRAW_WIDTH) -> float:
+    """Nul maximal à écart nul, décroissance gaussienne avec l'écart (avantage du terrain inclus)."""
+    if draw_width <= 0:
+        return draw_base
+    return draw_base * math.exp(-(diff / draw_width) ** 2)
 
 class EloSystem:
     def __init__(self):
         self.team_ratings = {}
+        self._config: Optional[Dict[str, float]] = None
+        self._league_params: Optional[Dict[str, Dict[str, float]]] = None
+
+    @property
+    def config(self) -> Dict[str, float]:
+        if self._config is None:
+            self._config = load_elo_config()
+        return self._config
+
+    @property
+    def league_params(self) -> Dict[str, Dict[str, float]]:
+        if self._league_params is None:
+            self._league_params = load_league_params()
+        return self._league_params
+
+    def reload_config(self):
+        self._config = None
+        self._league_params = None
+        self.team_ratings = {}
 
-    def get_team_elo(self, team_id: str) -> float:
-        """Récupère le rating ELO d'une équipe."""
-        if team_id in self.team_ratings:
+    def params_for(self, league=None) -> Tuple[float, float]:
+        """(K, avantage du terrain) de la ligue, configuration globale à défaut."""
+        lp = self.league_params.get(str(league), {}) if league is not None else {}
+        return (lp.get("k_factor", self.config["k_factor"]),
+                lp.get("home_advantage", self.config["home_advantage"]))
+
+    def initial_rating(self, league=None) -> float:
+        """Rating d'entrée d'une équipe : 1500 + décalage de force de sa ligue."""
+        lp = self.league_params.get(str(league), {}) if league is not None else {}
+        return DEFAULT_ELO + lp.get("offset", 0.0)
+
+    def get_team_elo(self, team_id: str, league=None) -> float:
+        """Récupère le rating ELO d'une équipe (une équipe inconnue entre au niveau de sa ligue)."""
+        hit = team_id in self.team_ratings
+        metrics.cache_hit(hit)
+        if hit:
             return self.team_ratings[team_id]
         
         # Charge depuis la DB
@@ -26,7 +127,7 @@ class EloSystem:
         if row and row["elo"] is not None:
             rating = float(row["elo"])
         else:
-            rating = DEFAULT_ELO
+            rating = self.initial_rating(league)
             # Crée l'entrée dans la DB
             with db.get_connection() as conn:
                 conn.execute(
@@ -53,13 +154,14 @@ class EloSystem:
         return 1.0 / (1.0 + math.pow(10, (rating_b - rating_a) / 400.0))
 
     def update_ratings(self, home_rating: float, away_rating: float, 
-                      home_goals: int, away_goals: int) -> Tuple[float, float]:
+                      home_goals: int, away_goals: int, league=None) -> Tuple[float, float]:
         """
-        Met à jour les ratings après un match.
+        Met à jour les ratings après un match (K et avantage du terrain de la ligue).
         Retourne (nouveau_rating_home, nouveau_rating_away)
         """
+        k_factor, home_advantage = self.params_for(league)
         # Ajout de l'avantage du terrain
-        home_rating_adj = home_rating + HOME_ADVANTAGE
+        home_rating_adj = home_rating + home_advantage
         
         # Score attendu
         expected_home = self.expected_score(home_rating_adj, away_rating)
@@ -77,28 +179,26 @@ class EloSystem:
             actual_away = 0.5
         
         # Nouveaux ratings
-        new_home_rating = home_rating + K_FACTOR * (actual_home - expected_home)
-        new_away_rating = away_rating + K_FACTOR * (actual_away - expected_away)
+        new_home_rating = home_rating + k_factor * (actual_home - expected_home)
+        new_away_rating = away_rating + k_factor * (actual_away - expected_away)
         
         return new_home_rating, new_away_rating
 
-    def predict_match(self, home_team_id: str, away_team_id: str) -> Dict[str, float]:
+    def probabilities(self, home_rating: float, away_rating: float, league=None) -> Dict[str, float]:
         """
-        Prédit les probabilités d'un match.
+        Probabilités 1X2 à partir de deux ratings (sans accès DB).
         Retourne un dict avec home_win_prob, draw_prob, away_win_prob
         """
-        home_rating = self.get_team_elo(home_team_id)
-        away_rating = self.get_team_elo(away_team_id)
-        
-        # Ajout de l'avantage du terrain
-        home_rating_adj = home_rating + HOME_ADVANTAGE
+        # Ajout de l'avantage du terrain (celui de la ligue si connu)
+        home_rating_adj = home_rating + self.params_for(league)[1]
         
         # Probabilité de victoire à domicile (sans considérer le nul)
         home_win_raw = self.expected_score(home_rating_adj, away_rating)
         away_win_raw = 1.0 - home_win_raw
         
-        # Ajout d'une probabilité de nul de base
-        draw_prob = 0.25
+        # Probabilité de nul selon l'écart (forfaitaire si draw_width = 0)
+        draw_prob = draw_probability(home_rating_adj - away_rating,
+                                     self.config["draw_base"], self.config["draw_width"])
         
         # Ajustement pour que la somme soit 1
         total_win_prob = home_win_raw + away_win_raw
@@ -115,5 +215,14 @@ class EloSystem:
             "away_win_prob": away_win_prob
         }
 
+    def predict_match(self, home_team_id: str, away_team_id: str, league=None) -> Dict[str, float]:
+        """
+        Prédit les probabilités d'un match.
+        Retourne un dict avec home_win_prob, draw_prob, away_win_prob
+        """
+        home_rating = self.get_team_elo(home_team_id, league)
+        away_rating = self.get_team_elo(away_team_id, league)
+        return self.probabilities(home_rating, away_rating, league)
+
 # Instance globale
 elo_system = EloSystem()
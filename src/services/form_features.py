@@ -0,0 +1,173 @@
+# src/services/form_features.py
+"""
+Feature store de forme glissante par équipe (table team_form_features).
+
+Une ligne par (équipe, match terminé) = état de l'équipe APRÈS ce match :
+points / buts pour / buts contre sur les 5 et 10 derniers matchs, et sur les 5 derniers
+matchs au même lieu (domicile ou extérieur), calculés par fonctions de fenêtre.
+
+Lecture point-in-time sans fuite : les features d'un match du jour D sont celles de la
+dernière ligne de l'équipe strictement avant D (un match ne voit jamais son propre résultat).
+Fenêtres et coupures se font sur le jour ISO (colonne date du store, elo_replay.iso_day_sql) :
+les dates Football-Data 'dd/mm/yyyy' ne se trient pas comme des chaînes.
+Mise à jour incrémentale : seules les équipes ayant de nouveaux résultats sont recalculées.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from src.models.database import db
+from src.services.elo_replay import iso_day_sql, iso_days
+
+FEATURE_COLUMNS = [
+    "played", "pts_last5", "pts_last10", "gf_last5", "ga_last5", "gf_last10", "ga_last10",
+]
+VENUE_COLUMNS = ["venue_pts_last5", "venue_gf_last5", "venue_ga_last5"]
+
+_DAY = iso_day_sql("date")
+_ISO_GLOB = "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+# Équipes à recalculer : temp table form_teams(team)
+_REBUILD_SQL = f"""
+    WITH games AS (
+        SELECT CAST(COALESCE(home_team_id, home_team) AS TEXT) AS team, {_DAY} AS date,
+               CAST(fixture_id AS TEXT) AS fixture_id, 1 AS is_home,
+               COALESCE(goals_home, home_score) AS gf, COALESCE(goals_away, away_score) AS ga
+        FROM matches
+        WHERE CAST(COALESCE(home_team_id, home_team) AS TEXT) IN (SELECT team FROM form_teams)
+          AND COALESCE(goals_home, home_score) IS NOT NULL
+          AND COALESCE(goals_away, away_score) IS NOT NULL
+        UNION ALL
+        SELECT CAST(COALESCE(away_team_id, away_team) AS TEXT) AS team, {_DAY} AS date,
+               CAST(fixture_id AS TEXT) AS fixture_id, 0 AS is_home,
+               COALESCE(goals_away, away_score) AS gf, COALESCE(goals_home, home_score) AS ga
+        FROM matches
+        WHERE CAST(COALESCE(away_team_id, away_team) AS TEXT) IN (SELECT team FROM form_teams)
+          AND COALESCE(goals_home, home_score) IS NOT NULL
+          AND COALESCE(goals_away, away_score) IS NOT NULL
+    ),
+    g AS (
+        SELECT *, CASE WHEN gf > ga THEN 3 WHEN gf = ga THEN 1 ELSE 0 END AS pts
+        FROM games
+        WHERE fixture_id IS NOT NULL AND date IS NOT NULL
+    )
+    INSERT OR REPLACE INTO team_form_features (
+        team, date, fixture_id, is_home, gf, ga, pts,
+        played, pts_last5, pts_last10, gf_last5, ga_last5, gf_last10, ga_last10,
+        venue_pts_last5, venue_gf_last5, venue_ga_last5
+    )
+    SELECT team, date, fixture_id, is_home, gf, ga, pts,
+           COUNT(*) OVER w_all,
+           SUM(pts) OVER w5, SUM(pts) OVER w10,
+           SUM(gf) OVER w5, SUM(ga) OVER w5,
+           SUM(gf) OVER w10, SUM(ga) OVER w10,
+           SUM(pts) OVER wv5, SUM(gf) OVER wv5, SUM(ga) OVER wv5
+    FROM g
+    WINDOW w_all AS (PARTITION BY team ORDER BY date, fixture_id ROWS UNBOUNDED PRECEDING),
+           w5    AS (PARTITION BY team ORDER BY date, fixture_id ROWS BETWEEN 4 PRECEDING AND CURRENT ROW),
+           w10   AS (PARTITION BY team ORDER BY date, fixture_id ROWS BETWEEN 9 PRECEDING AND CURRENT ROW),
+           wv5   AS (PARTITION BY team, is_home ORDER BY date, fixture_id ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)
+"""
+
+class FormFeatureStore:
+    def affected_teams(self, conn) -> List[str]:
+        """Équipes ayant au moins un match terminé absent du store."""
+        rows = conn.execute("""
+            SELECT DISTINCT team FROM (
+                SELECT CAST(COALESCE(home_team_id, home_team) AS TEXT) AS team, CAST(fixture_id AS TEXT) AS fid
+                FROM matches
+                WHERE COALESCE(goals_home, home_score) IS NOT NULL AND COALESCE(goals_away, away_score) IS NOT NULL
+                UNION ALL
+                SELECT CAST(COALESCE(away_team_id, away_team) AS TEXT), CAST(fixture_id AS TEXT)
+                FROM matches
+                WHERE COALESCE(goals_home, home_score) IS NOT NULL AND COALESCE(goals_away, away_score) IS NOT NULL
+            ) t
+            WHERE team IS NOT NULL AND fid IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM team_form_features f WHERE f.fixture_id = t.fid AND f.team = t.team)
+        """).fetchall()
+        return [r[0] for r in rows]
+
+    def update(self, full: bool = False) -> Dict[str, int]:
+        """Recalcule l'historique complet des seules équipes touchées (toutes si full=True)."""
+        with db.get_connection() as conn:
+            # Lignes écrites avant la normalisation des dates (date brute) : reconstruction complète
+            full = full or conn.execute(
+                f"SELECT 1 FROM team_form_features WHERE date NOT GLOB {_ISO_GLOB} LIMIT 1").fetchone() is not None
+            if full:
+                conn.execute("DELETE FROM team_form_features")
+            teams = self.affected_teams(conn)
+            if not teams:
+                return {"teams": 0, "rows": 0}
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS form_teams (team TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM form_teams")
+            conn.executemany("INSERT OR IGNORE INTO form_teams (team) VALUES (?)", [(t,) for t in teams])
+            # Un résultat arrivé en retard décale toutes les fenêtres suivantes : on repart de zéro pour l'équipe
+            conn.execute("DELETE FROM team_form_features WHERE team IN (SELECT team FROM form_teams)")
+            before = conn.total_changes
+            conn.execute(_REBUILD_SQL)
+            rows = conn.total_changes - before
+            db.bump_data_version("form_features", conn)
+            conn.commit()
+        return {"teams": len(teams), "rows": rows}
+
+    # ---------- lectures point-in-time ----------
+    def features_as_of(self, team, as_of: str, venue: Optional[int] = None) -> Optional[Dict]:
+        """État de l'équipe avant le jour `as_of` (exclu). venue=1/0 : dernière ligne à domicile/extérieur."""
+        venue_sql = " AND is_home = ?" if venue is not None else ""
+        params = [str(team), iso_days(pd.Series([as_of])).iloc[0]] + ([int(venue)] if venue is not None else [])
+        with db.get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT * FROM team_form_features
+                WHERE team = ? AND date < ?{venue_sql}
+                ORDER BY date DESC, fixture_id DESC
+                LIMIT 1
+            """, params).fetchone()
+        return dict(row) if row else None
+
+    def fixture_features(self, fixture_ids: Iterable) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Features pré-match de plusieurs matchs en une requête :
+        {fixture_id: {home_pts_last5, ..., home_venue_pts_last5, away_..., ...}}.
+        Chaque valeur vient de la dernière ligne de l'équipe strictement antérieure au match.
+        """
+        ids = sorted({str(f) for f in fixture_ids if f is not None})
+        out: Dict[str, Dict[str, Optional[float]]] = {}
+        if not ids:
+            return out
+
+        def latest(side: str, venue: bool) -> str:
+            venue_sql = f" AND f.is_home = {1 if side == 'home' else 0}" if venue else ""
+            return f"""(SELECT f.fixture_id FROM team_form_features f
+                        WHERE f.team = m.{side}_key AND f.date < m.date{venue_sql}
+                        ORDER BY f.date DESC, f.fixture_id DESC LIMIT 1)"""
+
+        cols = [f"{side}.{c} AS {side}_{c}" for side in ("h", "a") for c in FEATURE_COLUMNS]
+        cols += [f"{side}v.{c} AS {side}_{c}" for side in ("h", "a") for c in VENUE_COLUMNS]
+        with db.get_connection() as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                qmarks = ", ".join(["?"] * len(chunk))
+                rows = conn.execute(f"""
+                    WITH m AS (
+                        SELECT CAST(fixture_id AS TEXT) AS fixture_id, {_DAY} AS date,
+                               CAST(COALESCE(home_team_id, home_team) AS TEXT) AS home_key,
+                               CAST(COALESCE(away_team_id, away_team) AS TEXT) AS away_key
+                        FROM matches WHERE fixture_id IN ({qmarks})
+                    )
+                    SELECT m.fixture_id, {", ".join(cols)}
+                    FROM m
+                    LEFT JOIN team_form_features h  ON h.team  = m.home_key AND h.fixture_id  = {latest("home", False)}
+                    LEFT JOIN team_form_features a  ON a.team  = m.away_key AND a.fixture_id  = {latest("away", False)}
+                    LEFT JOIN team_form_features hv ON hv.team = m.home_key AND hv.fixture_id = {latest("home", True)}
+                    LEFT JOIN team_form_features av ON av.team = m.away_key AND av.fixture_id = {latest("away", True)}
+                """, chunk).fetchall()
+                for r in rows:
+                    d = dict(r)
+                    fid = d.pop("fixture_id")
+                    out[fid] = {k.replace("h_", "home_", 1) if k.startswith("h_") else k.replace("a_", "away_", 1): v
+                                for k, v in d.items()}
+        return out
+
+# Instance globale
+form_features = FormFeatureStore()
@@ -0,0 +1,253 @@
+# src/services/goal_model.py
+"""
+Modèle de buts Poisson / Dixon–Coles par ligue (numpy, scipy optionnel) :
+
+    log λ_dom = avantage + attaque[dom] + défense[ext]      buts du domicile
+    log λ_ext =            attaque[ext] + défense[dom]      buts de l'extérieur
+    P(x, y) = τ(x, y) · Poisson(x; λ_dom) · Poisson(y; λ_ext)   (τ : correction des petits scores, ρ)
+
+- « défense » = perméabilité (plus haute = encaisse plus) ; a priori log-gamma de forme/taux
+  STRENGTH_PRIOR sur attaque et défense : rétrécit les équipes peu observées vers la moyenne de
+  la ligue et rend le modèle identifiable,
+- décroissance temporelle optionnelle : poids exp(-decay × jours écoulés) (Dixon & Coles 1997),
+- ajustement : itérations de point fixe vectorisées (np.bincount) sur la partie Poisson puis ρ par
+  section dorée ; si scipy est installé, L-BFGS-B (gradient analytique) affine le tout conjointement,
+- une ligue = une tâche : fit_leagues répartit les ligues sur plusieurs processus,
+- score_matrices calcule en un appel les matrices de score (m × G × G) de tous les matchs du jour,
+  dont market_probabilities tire 1X2, Over 2.5 et BTTS.
+
+Paramètres stockés dans goal_model_leagues / goal_model_teams (scripts/fit_goal_model.py),
+lus par FootballPredictor (méthode POISSON).
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:  # optionnel : affinage conjoint L-BFGS-B
+    from scipy.optimize import minimize
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    minimize = None
+
+MAX_GOALS = 10             # matrices de score 0..MAX_GOALS buts par équipe
+DEFAULT_DECAY = float(os.getenv("GOAL_MODEL_DECAY", "0.0019"))  # par jour (~1 an de demi-vie) ; 0 = sans
+LOOKBACK_DAYS = 3 * 365    # matchs plus anciens ignorés
+MIN_LEAGUE_MATCHES = 60    # en dessous, pas d'ajustement pour la ligue
+STRENGTH_PRIOR = 2.0       # a priori (buts fictifs) sur attaque / défense
+RHO_BOUNDS = (-0.2, 0.2)
+MAX_ITER = 200
+TOL = 1e-6
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Vraisemblance
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _tau(x: np.ndarray, y: np.ndarray, lam: np.ndarray, mu: np.ndarray, rho: float) -> np.ndarray:
+    """Correction Dixon–Coles des scores 0-0, 1-0, 0-1 et 1-1 (1 ailleurs)."""
+    tau = np.ones_like(lam)
+    tau = np.where((x == 0) & (y == 0), 1.0 - lam * mu * rho, tau)
+    tau = np.where((x == 0) & (y == 1), 1.0 + lam * rho, tau)
+    tau = np.where((x == 1) & (y == 0), 1.0 + mu * rho, tau)
+    tau = np.where((x == 1) & (y == 1), 1.0 - rho, tau)
+    return np.maximum(tau, 1e-10)
+
+def _unpack(params: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, float, float]:
+    return params[:n], params[n:2 * n], float(params[2 * n]), float(params[2 * n + 1])
+
+def neg_log_likelihood(params: np.ndarray, h: np.ndarray, a: np.ndarray, x: np.ndarray, y: np.ndarray,
+                       w: np.ndarray, n: int) -> Tuple[float, np.ndarray]:
+    """−log-vraisemblance pondérée (+ a priori) et son gradient ; params = [attaque, défense, avantage, ρ]."""
+    att, dfn, home, rho = _unpack(params, n)
+    log_lam = home + att[h] + dfn[a]
+    log_mu = att[a] + dfn[h]
+    lam, mu = np.exp(log_lam), np.exp(log_mu)
+    tau = _tau(x, y, lam, mu, rho)
+
+    ll = np.sum(w * (x * log_lam - lam + y * log_mu - mu + np.log(tau)))
+    ll += STRENGTH_PRIOR * np.sum(att - np.exp(att) + dfn - np.exp(dfn))
+
+    # Dérivées de log τ par rapport à log λ, log μ et ρ
+    s00, s01, s10, s11 = (x == 0) & (y == 0), (x == 0) & (y == 1), (x == 1) & (y == 0), (x == 1) & (y == 1)
+    d_lam = np.where(s00, -lam * mu * rho, 0.0) + np.where(s01, lam * rho, 0.0)
+    d_mu = np.where(s00, -lam * mu * rho, 0.0) + np.where(s10, mu * rho, 0.0)
+    d_rho = np.where(s00, -lam * mu, 0.0) + np.where(s01, lam, 0.0) + np.where(s10, mu, 0.0) - s11
+    g_lam = w * (x - lam + d_lam / tau)
+    g_mu = w * (y - mu + d_mu / tau)
+
+    grad = np.empty_like(params)
+    grad[:n] = np.bincount(h, g_lam, n) + np.bincount(a, g_mu, n) + STRENGTH_PRIOR * (1.0 - np.exp(att))
+    grad[n:2 * n] = np.bincount(a, g_lam, n) + np.bincount(h, g_mu, n) + STRENGTH_PRIOR * (1.0 - np.exp(dfn))
+    grad[2 * n] = g_lam.sum()
+    grad[2 * n + 1] = np.sum(w * d_rho / tau)
+    return -ll, -grad
+
+def _fit_rho(h, a, x, y, w, att, dfn, home) -> float:
+    """ρ maximisant Σ w log τ à forces fixées (section dorée, la fonction est concave en ρ)."""
+    low = (x <= 1) & (y <= 1)
+    if not low.any():
+        return 0.0
+    h, a, x, y, w = h[low], a[low], x[low], y[low], w[low]
+    lam, mu = np.exp(home + att[h] + dfn[a]), np.exp(att[a] + dfn[h])
+    f = lambda r: np.sum(w * np.log(_tau(x, y, lam, mu, r)))
+    lo, hi = RHO_BOUNDS
+    g = (np.sqrt(5.0) - 1.0) / 2.0
+    c, d = hi - g * (hi - lo), lo + g * (hi - lo)
+    fc, fd = f(c), f(d)
+    for _ in range(60):
+        if fc > fd:
+            hi, d, fd = d, c, fc
+            c = hi - g * (hi - lo)
+            fc = f(c)
+        else:
+            lo, c, fc = c, d, fd
+            d = lo + g * (hi - lo)
+            fd = f(d)
+    return (lo + hi) / 2.0
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Ajustement
+# ──────────────────────────────────────────────────────────────────────────────
+
+def fit_league(league: str, teams: List[str], h: np.ndarray, a: np.ndarray, x: np.ndarray, y: np.ndarray,
+               w: np.ndarray) -> Dict[str, Any]:
+    """
+    Ajuste une ligue (indices d'équipes h / a dans `teams`, buts x / y, poids w).
+    Point fixe : chaque force est la solution exacte à autres forces fixées (buts observés +
+    a priori) / (buts attendus + a priori), ρ ignoré ; puis ρ, puis L-BFGS-B si scipy.
+    """
+    n = len(teams)
+    att, dfn, home = np.zeros(n), np.zeros(n), 0.0
+    scored = np.bincount(h, w * x, n) + np.bincount(a, w * y, n)
+    conceded = np.bincount(a, w * x, n) + np.bincount(h, w * y, n)
+    for _ in range(MAX_ITER):
+        prev = np.concatenate([att, dfn, [home]])
+        att = np.log((scored + STRENGTH_PRIOR) /
+                     (np.bincount(h, w * np.exp(home + dfn[a]), n) + np.bincount(a, w * np.exp(dfn[h]), n) + STRENGTH_PRIOR))
+        dfn = np.log((conceded + STRENGTH_PRIOR) /
+                     (np.bincount(a, w * np.exp(home + att[h]), n) + np.bincount(h, w * np.exp(att[a]), n) + STRENGTH_PRIOR))
+        home = float(np.log(max(np.sum(w * x), 1e-12) / max(np.sum(w * np.exp(att[h] + dfn[a])), 1e-12)))
+        if np.max(np.abs(np.concatenate([att, dfn, [home]]) - prev)) < TOL:
+            break
+    rho = _fit_rho(h, a, x, y, w, att, dfn, home)
+    params = np.concatenate([att, dfn, [home, rho]])
+
+    solver = "fixed_point"
+    if minimize is not None:
+        bounds = [(None, None)] * (2 * n + 1) + [RHO_BOUNDS]
+        res = minimize(neg_log_likelihood, params, args=(h, a, x, y, w, n), jac=True,
+                       method="L-BFGS-B", bounds=bounds)
+        if res.success or res.fun <= neg_log_likelihood(params, h, a, x, y, w, n)[0]:
+            params, solver = res.x, "lbfgs"
+    att, dfn, home, rho = _unpack(params, n)
+    return {
+        "league": league, "teams": teams, "attack": att, "defence": dfn, "home_adv": home, "rho": rho,
+        "matches": len(x), "team_matches": np.bincount(h, None, n) + np.bincount(a, None, n),
+        "log_lik": -neg_log_likelihood(params, h, a, x, y, w, n)[0], "solver": solver,
+    }
+
+def _fit_task(task: Tuple) -> Dict[str, Any]:
+    return fit_league(*task)
+
+def league_tasks(history: pd.DataFrame, decay: float = DEFAULT_DECAY, reference_day: Optional[str] = None,
+                 lookback_days: Optional[int] = LOOKBACK_DAYS, min_matches: int = MIN_LEAGUE_MATCHES) -> List[Tuple]:
+    """Une tâche (ligue, équipes, h, a, x, y, poids) par ligue assez fournie (history : elo_replay.load_history)."""
+    if history.empty:
+        return []
+    ref = pd.Timestamp(reference_day or history["day"].max())
+    age = (ref - pd.to_datetime(history["day"])).dt.days.to_numpy(dtype=float)
+    keep = age >= 0
+    if lookback_days is not None:
+        keep &= age <= lookback_days
+    df = history.loc[keep, ["league", "home", "away", "gh", "ga"]].assign(w=np.exp(-decay * age[keep]))
+
+    tasks = []
+    for league, g in df.groupby("league", sort=True):
+        if len(g) < min_matches:
+            continue
+        codes, teams = pd.factorize(pd.concat([g["home"], g["away"]]), sort=True)
+        tasks.append((str(league), [str(t) for t in teams], codes[:len(g)], codes[len(g):],
+                      g["gh"].to_numpy(dtype=float), g["ga"].to_numpy(dtype=float), g["w"].to_numpy()))
+    return tasks
+
+def fit_leagues(history: pd.DataFrame, decay: float = DEFAULT_DECAY, reference_day: Optional[str] = None,
+                workers: int = 1, **kwargs) -> List[Dict[str, Any]]:
+    """
+    Ajuste toutes les ligues, réparties sur `workers` processus (1 = dans le processus courant).
+    Processus lancés en « spawn » : le pipeline exécute les étapes dans des threads.
+    """
+    tasks = league_tasks(history, decay, reference_day, **kwargs)
+    if workers > 1 and len(tasks) > 1:
+        # Plus grosses ligues d'abord : meilleur équilibrage entre processus
+        tasks.sort(key=lambda t: -len(t[4]))
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(_fit_task, tasks))
+    return [_fit_task(t) for t in tasks]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Prédiction
+# ──────────────────────────────────────────────────────────────────────────────
+
+def score_matrices(lam: np.ndarray, mu: np.ndarray, rho: np.ndarray, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """Matrices P(buts dom. = i, buts ext. = j) (m × G × G), corrigées Dixon–Coles et renormalisées."""
+    lam, mu = np.asarray(lam, dtype=float), np.asarray(mu, dtype=float)
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), lam.shape)
+    k = np.arange(max_goals + 1)
+    log_fact = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max_goals + 1)))])
+    p_home = np.exp(k * np.log(lam)[:, None] - lam[:, None] - log_fact)
+    p_away = np.exp(k * np.log(mu)[:, None] - mu[:, None] - log_fact)
+    mats = p_home[:, :, None] * p_away[:, None, :]
+    mats[:, 0, 0] *= np.maximum(1.0 - lam * mu * rho, 0.0)
+    mats[:, 0, 1] *= np.maximum(1.0 + lam * rho, 0.0)
+    mats[:, 1, 0] *= np.maximum(1.0 + mu * rho, 0.0)
+    mats[:, 1, 1] *= np.maximum(1.0 - rho, 0.0)
+    return mats / mats.sum(axis=(1, 2), keepdims=True)
+
+def market_probabilities(mats: np.ndarray) -> Dict[str, np.ndarray]:
+    """1X2, Over 2.5 et BTTS (tableaux de taille m) depuis les matrices de score."""
+    i, j = np.indices(mats.shape[1:])
+    return {
+        "home": (mats * (i > j)).sum(axis=(1, 2)),
+        "draw": (mats * (i == j)).sum(axis=(1, 2)),
+        "away": (mats * (i < j)).sum(axis=(1, 2)),
+        "over25": (mats * (i + j > 2)).sum(axis=(1, 2)),
+        "btts": (mats * ((i > 0) & (j > 0))).sum(axis=(1, 2)),
+    }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Stockage
+# ──────────────────────────────────────────────────────────────────────────────
+
+def save_fits(conn, fits: List[Dict[str, Any]], decay: float):
+    """Remplace les paramètres stockés par ceux de `fits` (l'appelant commite)."""
+    conn.execute("DELETE FROM goal_model_teams")
+    conn.execute("DELETE FROM goal_model_leagues")
+    conn.executemany("""
+        INSERT INTO goal_model_leagues (league_id, home_adv, rho, decay, matches, log_lik, solver, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+    """, [(f["league"], float(f["home_adv"]), float(f["rho"]), decay, int(f["matches"]), float(f["log_lik"]),
+           f["solver"]) for f in fits])
+    conn.executemany("""
+        INSERT INTO goal_model_teams (league_id, team_id, attack, defence, matches) VALUES (?, ?, ?, ?, ?)
+    """, [(f["league"], team, float(att), float(dfn), int(n))
+          for f in fits for team, att, dfn, n in zip(f["teams"], f["attack"], f["defence"], f["team_matches"])])
+
+def load_fits(conn, leagues: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """league_id -> {home_adv, rho, teams: team_id -> (attaque, défense, matchs)} ; toutes les ligues par défaut."""
+    where, params = "", []
+    if leagues is not None:
+        leagues = sorted({str(l) for l in leagues})
+        if not leagues:
+            return {}
+        where, params = f"WHERE league_id IN ({', '.join('?' * len(leagues))})", leagues
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in conn.execute(f"SELECT league_id, home_adv, rho FROM goal_model_leagues {where}", params).fetchall():
+        out[str(r[0])] = {"home_adv": float(r[1]), "rho": float(r[2]), "teams": {}}
+    for r in conn.execute(f"SELECT league_id, team_id, attack, defence, matches FROM goal_model_teams {where}",
+                          params).fetchall():
+        if str(r[0]) in out:
+            out[str(r[0])]["teams"][str(r[1])] = (float(r[2]), float(r[3]), int(r[4]))
+    return out
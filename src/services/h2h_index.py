@@ -0,0 +1,166 @@
+# src/services/h2h_index.py
+"""
+Index des confrontations directes (H2H), clé = paire d'équipes non ordonnée (team_a < team_b) :
+- compteurs (victoires A/B, nuls, buts) depuis toujours + les N derniers résultats (JSON),
+- mise à jour incrémentale : seuls les matchs terminés absents de h2h_processed sont fusionnés,
+- dates des derniers résultats stockées en jour ISO (elo_replay.iso_day_sql) : le tri « plus récent
+  d'abord » reste juste avec les dates Football-Data 'dd/mm/yyyy',
+- lecture groupée : toutes les paires du jour en une requête (une recherche par clé primaire et par paire).
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.models.database import db
+from src.services.elo_replay import iso_day_sql
+
+LAST_N = 10
+_ISO_GLOB = "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+def pair_key(team1, team2) -> Tuple[str, str]:
+    a, b = str(team1), str(team2)
+    return (a, b) if a < b else (b, a)
+
+class H2HIndex:
+    def __init__(self, last_n: int = LAST_N, batch_size: int = 400):
+        self.last_n = last_n
+        self.batch_size = batch_size
+
+    # ---------- mise à jour ----------
+    def new_results(self, conn) -> List:
+        """Matchs terminés pas encore intégrés à l'index."""
+        return conn.execute(f"""
+            SELECT CAST(m.fixture_id AS TEXT) AS fixture_id, {iso_day_sql("m.date")} AS date,
+                   CAST(COALESCE(m.home_team_id, m.home_team) AS TEXT) AS home,
+                   CAST(COALESCE(m.away_team_id, m.away_team) AS TEXT) AS away,
+                   COALESCE(m.goals_home, m.home_score) AS gh,
+                   COALESCE(m.goals_away, m.away_score) AS ga
+            FROM matches m
+            LEFT JOIN h2h_processed p ON p.fixture_id = CAST(m.fixture_id AS TEXT)
+            WHERE p.fixture_id IS NULL
+              AND m.fixture_id IS NOT NULL
+              AND COALESCE(m.goals_home, m.home_score) IS NOT NULL
+              AND COALESCE(m.goals_away, m.away_score) IS NOT NULL
+              AND COALESCE(m.home_team_id, m.home_team) IS NOT NULL
+              AND COALESCE(m.away_team_id, m.away_team) IS NOT NULL
+        """).fetchall()
+
+    def _load_rows(self, conn, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict]:
+        out = {}
+        for i in range(0, len(pairs), self.batch_size):
+            chunk = pairs[i:i + self.batch_size]
+            values = ", ".join(["(?, ?)"] * len(chunk))
+            params = [x for p in chunk for x in p]
+            # Jointure sur une table de valeurs : une recherche par clé primaire et par paire
+            # (un "(team_a, team_b) IN (VALUES …)" ferait un scan complet)
+            for r in conn.execute(f"""
+                SELECT h.* FROM (VALUES {values}) v
+                JOIN h2h_summary h ON h.team_a = v.column1 AND h.team_b = v.column2
+            """, params).fetchall():
+                out[(r["team_a"], r["team_b"])] = dict(r)
+        return out
+
+    def update(self) -> Dict[str, int]:
+        """Fusionne les nouveaux résultats dans les paires concernées."""
+        with db.get_connection() as conn:
+            # Résumés écrits avant la normalisation des dates (date brute) : reconstruction complète
+            if conn.execute(f"SELECT 1 FROM h2h_summary WHERE last_date NOT GLOB {_ISO_GLOB} LIMIT 1").fetchone():
+                conn.execute("DELETE FROM h2h_summary")
+                conn.execute("DELETE FROM h2h_processed")
+            rows = self.new_results(conn)
+            if not rows:
+                return {"fixtures": 0, "pairs": 0}
+
+            by_pair: Dict[Tuple[str, str], List] = {}
+            for r in rows:
+                if r["home"] == r["away"]:
+                    continue
+                by_pair.setdefault(pair_key(r["home"], r["away"]), []).append(r)
+
+            existing = self._load_rows(conn, list(by_pair))
+            records = []
+            for (a, b), results in by_pair.items():
+                cur = existing.get((a, b)) or {
+                    "matches": 0, "a_wins": 0, "b_wins": 0, "draws": 0,
+                    "a_goals": 0, "b_goals": 0, "last_results": "[]",
+                }
+                last = json.loads(cur["last_results"] or "[]")
+                for r in results:
+                    gh, ga = int(r["gh"]), int(r["ga"])
+                    a_goals, b_goals = (gh, ga) if r["home"] == a else (ga, gh)
+                    cur["matches"] += 1
+                    cur["a_goals"] += a_goals
+                    cur["b_goals"] += b_goals
+                    if a_goals > b_goals: cur["a_wins"] += 1
+                    elif a_goals < b_goals: cur["b_wins"] += 1
+                    else: cur["draws"] += 1
+                    last.append([r["date"], r["home"], gh, ga])
+                # Plus récents d'abord (un résultat ancien arrivé en retard se range à sa place)
+                last.sort(key=lambda x: x[0] or "", reverse=True)
+                last = last[:self.last_n]
+                records.append((
+                    a, b, cur["matches"], cur["a_wins"], cur["b_wins"], cur["draws"],
+                    cur["a_goals"], cur["b_goals"], json.dumps(last), last[0][0] if last else None,
+                ))
+
+            conn.executemany("""
+                INSERT INTO h2h_summary (team_a, team_b, matches, a_wins, b_wins, draws,
+                                         a_goals, b_goals, last_results, last_date, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(team_a, team_b) DO UPDATE SET
+                  matches=excluded.matches, a_wins=excluded.a_wins, b_wins=excluded.b_wins,
+                  draws=excluded.draws, a_goals=excluded.a_goals, b_goals=excluded.b_goals,
+                  last_results=excluded.last_results, last_date=excluded.last_date,
+                  updated_at=excluded.updated_at
+            """, records)
+            conn.executemany(
+                "INSERT OR IGNORE INTO h2h_processed (fixture_id) VALUES (?)",
+                [(r["fixture_id"],) for r in rows],
+            )
+            db.bump_data_version("h2h_index", conn)
+            conn.commit()
+        return {"fixtures": len(rows), "pairs": len(records)}
+
+    def rebuild(self) -> Dict[str, int]:
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM h2h_summary")
+            conn.execute("DELETE FROM h2h_processed")
+            conn.commit()
+        return self.update()
+
+    # ---------- lecture ----------
+    def lookup_many(self, pairs: Iterable[Tuple]) -> Dict[Tuple[str, str], Dict]:
+        """
+        Résumés H2H pour plusieurs (domicile, extérieur) en une requête.
+        Chaque résumé est exprimé du point de vue de l'équipe à domicile passée en entrée.
+        """
+        wanted = [(str(h), str(a)) for h, a in pairs if h is not None and a is not None]
+        if not wanted:
+            return {}
+        with db.get_connection() as conn:
+            rows = self._load_rows(conn, sorted({pair_key(h, a) for h, a in wanted}))
+
+        out = {}
+        for home, away in wanted:
+            row = rows.get(pair_key(home, away))
+            out[(home, away)] = self._orient(row, home) if row else None
+        return out
+
+    def lookup(self, home, away) -> Optional[Dict]:
+        return self.lookup_many([(home, away)]).get((str(home), str(away)))
+
+    @staticmethod
+    def _orient(row: Dict, home: str) -> Dict:
+        flip = row["team_a"] != home
+        return {
+            "matches": row["matches"],
+            "home_wins": row["b_wins"] if flip else row["a_wins"],
+            "away_wins": row["a_wins"] if flip else row["b_wins"],
+            "draws": row["draws"],
+            "home_goals": row["b_goals"] if flip else row["a_goals"],
+            "away_goals": row["a_goals"] if flip else row["b_goals"],
+            # [date, équipe à domicile ce jour-là, buts domicile, buts extérieur], plus récent d'abord
+            "last_results": json.loads(row["last_results"] or "[]"),
+            "last_date": row["last_date"],
+        }
+
+# Instance globale
+h2h_index = H2HIndex()
@@ -0,0 +1,159 @@
+# src/services/match_queries.py
+"""
+Couche de requêtes pour la page "Matchs du jour" :
+- ne lit que le jour (et la ligue) demandés, page par page,
+- cotes agrégées et ELO pré-joints en SQL (match_elo pour les matchs rejoués, team_stats sinon),
+- le coût d'une page ne dépend pas de la taille de l'historique (index sur matches.date).
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from src.models.database import db
+from src.services.elo_system import elo_system
+from src.services.elo_replay import lookup_ratings
+
+DEFAULT_PAGE_SIZE = 20
+
+def day_bounds(day: str) -> Tuple[str, str]:
+    """Bornes [jour, jour+1) comparables aux dates ISO stockées dans matches.date."""
+    d = datetime.strptime(day[:10], "%Y-%m-%d").date()
+    return d.isoformat(), (d + timedelta(days=1)).isoformat()
+
+def _league_filter(league: Optional[str]) -> Tuple[str, List[Any]]:
+    if league is None or league == "":
+        return "", []
+    return " AND CAST(COALESCE(league_id, league) AS TEXT) = ?", [str(league)]
+
+class MatchQueries:
+    def list_leagues(self, day: str) -> List[Dict[str, Any]]:
+        """Ligues présentes ce jour-là avec leur nombre de matchs."""
+        start, end = day_bounds(day)
+        with db.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT CAST(COALESCE(league_id, league) AS TEXT) AS league, COUNT(*) AS n
+                FROM matches
+                WHERE date >= ? AND date < ?
+                GROUP BY 1
+                ORDER BY n DESC
+            """, (start, end)).fetchall()
+        return [dict(r) for r in rows if r["league"] is not None]
+
+    def count_fixtures(self, day: str, league: Optional[str] = None) -> int:
+        start, end = day_bounds(day)
+        where, params = _league_filter(league)
+        with db.get_connection() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM matches WHERE date >= ? AND date < ?{where}",
+                [start, end] + params,
+            ).fetchone()[0]
+
+    def get_fixtures_page(self, day: str, league: Optional[str] = None,
+                          page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """
+        Une page de matchs du jour avec meilleures cotes 1X2, nb de bookmakers
+        et probabilités ELO déjà calculées.
+        """
+        start, end = day_bounds(day)
+        where, params = _league_filter(league)
+        offset = max(0, (int(page) - 1) * int(page_size))
+
+        with db.get_connection() as conn:
+            rows = conn.execute(f"""
+                WITH page AS (
+                    SELECT fixture_id, date, league, league_id,
+                           home_team, away_team, home_team_id, away_team_id
+                    FROM matches
+                    WHERE date >= ? AND date < ?{where}
+                    ORDER BY date ASC, id ASC
+                    LIMIT ? OFFSET ?
+                ),
+                best AS (
+                    SELECT fixture_id,
+                           MAX(home_odd) AS best_home_odd,
+                           MAX(draw_odd) AS best_draw_odd,
+                           MAX(away_odd) AS best_away_odd,
+                           COUNT(*) AS bookmakers
+                    FROM odds
+                    WHERE fixture_id IN (SELECT fixture_id FROM page)
+                    GROUP BY fixture_id
+                )
+                SELECT p.fixture_id, p.date,
+                       COALESCE(p.league_id, p.league) AS league,
+                       COALESCE(p.home_team_id, p.home_team) AS home_key,
+                       COALESCE(p.away_team_id, p.away_team) AS away_key,
+                       COALESCE(th.name, p.home_team, p.home_team_id) AS home_team,
+                       COALESCE(ta.name, p.away_team, p.away_team_id) AS away_team,
+                       b.best_home_odd, b.best_draw_odd, b.best_away_odd, b.bookmakers,
+                       me.home_pre_elo, me.away_pre_elo,
+                       me.home_win_prob, me.draw_prob, me.away_win_prob,
+                       hs.elo AS home_elo, as_.elo AS away_elo
+                FROM page p
+                LEFT JOIN teams th ON th.team_id = p.home_team_id
+                LEFT JOIN teams ta ON ta.team_id = p.away_team_id
+                LEFT JOIN best b ON b.fixture_id = p.fixture_id
+                LEFT JOIN match_elo me ON me.fixture_id = p.fixture_id
+                LEFT JOIN team_stats hs ON hs.team_id = CAST(COALESCE(p.home_team_id, p.home_team) AS TEXT)
+                LEFT JOIN team_stats as_ ON as_.team_id = CAST(COALESCE(p.away_team_id, p.away_team) AS TEXT)
+                ORDER BY p.date ASC
+            """, [start, end] + params + [int(page_size), offset]).fetchall()
+
+        fixtures = [dict(r) for r in rows]
+        upcoming = []
+        for fx in fixtures:
+            if fx["home_pre_elo"] is not None and fx["away_pre_elo"] is not None:
+                # Snapshot pré-match produit par build_elo_history
+                fx["home_elo"], fx["away_elo"] = fx["home_pre_elo"], fx["away_pre_elo"]
+            else:
+                upcoming.append(fx)
+
+        if upcoming:
+            # Match à venir : ratings courants (team_stats, déjà joints), équipe inconnue au rating
+            # d'entrée de sa ligue, avantage du terrain de la ligue — comme generate_predictions
+            ratings = {}
+            for fx in upcoming:
+                for key, elo in ((fx["home_key"], fx["home_elo"]), (fx["away_key"], fx["away_elo"])):
+                    if key is not None and elo is not None:
+                        ratings[str(key).strip()] = float(elo)
+            leagues = [fx["league"] for fx in upcoming]
+            params = elo_system.league_params
+            home_r = lookup_ratings(ratings, [fx["home_key"] for fx in upcoming], leagues, params)
+            away_r = lookup_ratings(ratings, [fx["away_key"] for fx in upcoming], leagues, params)
+            for fx, h, a in zip(upcoming, home_r, away_r):
+                fx["home_elo"], fx["away_elo"] = float(h), float(a)
+                fx.update(elo_system.probabilities(fx["home_elo"], fx["away_elo"], fx["league"]))
+        return fixtures
+
+    def get_page_details(self, fixture_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Cotes par bookmaker, prédictions et clones pour les seuls matchs de la page."""
+        out: Dict[str, List[Dict[str, Any]]] = {"odds": [], "predictions": [], "clones": []}
+        ids = [str(f) for f in fixture_ids if f is not None]
+        if not ids:
+            return out
+        qmarks = ", ".join(["?"] * len(ids))
+
+        with db.get_connection() as conn:
+            out["odds"] = [dict(r) for r in conn.execute(f"""
+                SELECT fixture_id, bookmaker_name, home_odd, draw_odd, away_odd
+                FROM odds WHERE fixture_id IN ({qmarks})
+                ORDER BY fixture_id, bookmaker_name
+            """, ids).fetchall()]
+
+            out["predictions"] = [dict(r) for r in conn.execute(f"""
+                SELECT fixture_id, method, market, selection, prob, odd, value
+                FROM predictions WHERE fixture_id IN ({qmarks})
+                ORDER BY fixture_id, method, market, selection
+            """, ids).fetchall()]
+
+            has_clones = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='clone_matches'"
+            ).fetchone()
+            if has_clones:
+                out["clones"] = [dict(r) for r in conn.execute(f"""
+                    SELECT fixture1_id, fixture2_id, similarity_score, clone_factors, created_at
+                    FROM clone_matches
+                    WHERE fixture1_id IN ({qmarks}) OR fixture2_id IN ({qmarks})
+                    ORDER BY created_at DESC
+                """, ids + ids).fetchall()]
+        return out
+
+# Instance globale
+match_queries = MatchQueries()
@@ -0,0 +1,143 @@
+# src/services/odds_history.py
+"""
+Historique des cotes (mouvements de ligne) dans odds_snapshots, en ajout seul :
+- une ligne par (fixture, marché, bookmaker, instant de capture) : cotes p1/p2/p3
+  (1x2 : 1/N/2 ; ou25 : over/under ; btts : oui/non),
+- une capture identique à la précédente n'est pas écrite (dédoublonnage dans l'INSERT),
+- odds / ou25_odds / btts_odds restent la vue « dernière cote » des lecteurs actuels
+  (mises à jour dans la même transaction que l'historique),
+- compact() sous-échantillonne les fixtures inactives : ouverture + dernière capture de chaque
+  tranche (1 h par défaut), puis supprime les captures redevenues identiques à la précédente.
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.models.database import db
+from src.services.odds_parser import MARKET_1X2, MARKET_BTTS, BookmakerOdds
+
+MARKET_OU25 = "ou25"   # seule ligne O/U stockée
+
+SnapshotRow = Tuple[str, str, int, int, float, float, Optional[float]]
+
+# Paramètres numérotés : la même valeur sert à l'insertion et à la comparaison avec la capture précédente
+INSERT_SQL = """
+    INSERT OR IGNORE INTO odds_snapshots (fixture_id, market, bookmaker_id, ts, p1, p2, p3)
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7
+    WHERE NOT EXISTS (
+        SELECT 1 FROM (
+            SELECT p1, p2, p3 FROM odds_snapshots
+            WHERE fixture_id = ?1 AND market = ?2 AND bookmaker_id = ?3 AND ts <= ?4
+            ORDER BY ts DESC LIMIT 1
+        ) WHERE p1 IS ?5 AND p2 IS ?6 AND p3 IS ?7
+    )
+"""
+
+def snapshot_rows(fixture_id: Any, books: Iterable[BookmakerOdds], ts: Optional[int] = None) -> List[SnapshotRow]:
+    """Lignes odds_snapshots des marchés complets de chaque bookmaker (capture à `ts`, maintenant par défaut)."""
+    ts = int(time.time()) if ts is None else int(ts)
+    fid = str(fixture_id)
+    rows: List[SnapshotRow] = []
+    for b in books:
+        if b.has_1x2():
+            rows.append((fid, MARKET_1X2, b.id, ts, b.home, b.draw, b.away))
+        over25, under25 = b.ou25
+        if over25 and under25:
+            rows.append((fid, MARKET_OU25, b.id, ts, over25, under25, None))
+        if b.btts_yes and b.btts_no:
+            rows.append((fid, MARKET_BTTS, b.id, ts, b.btts_yes, b.btts_no, None))
+    return rows
+
+class OddsHistory:
+    def record(self, conn, rows: List[SnapshotRow]) -> int:
+        """Ajoute les captures qui changent quelque chose ; l'appelant commite. Renvoie le nb de lignes écrites."""
+        if not rows:
+            return 0
+        before = conn.total_changes
+        conn.executemany(INSERT_SQL, rows)
+        return conn.total_changes - before
+
+    def movement(self, conn, fixture_ids: Iterable[Any], market: str = MARKET_1X2
+                 ) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """Ouverture, clôture et nb de mouvements par (fixture, bookmaker) : base des features de mouvement / CLV."""
+        ids = sorted({str(f) for f in fixture_ids})
+        out: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            qmarks = ", ".join(["?"] * len(chunk))
+            rows = conn.execute(f"""
+                SELECT fixture_id, bookmaker_id, ts, p1, p2, p3,
+                       ROW_NUMBER() OVER w_asc AS nth, ROW_NUMBER() OVER w_desc AS rev
+                FROM odds_snapshots
+                WHERE market = ? AND fixture_id IN ({qmarks})
+                WINDOW w_asc AS (PARTITION BY fixture_id, bookmaker_id ORDER BY ts),
+                       w_desc AS (PARTITION BY fixture_id, bookmaker_id ORDER BY ts DESC)
+            """, [market, *chunk]).fetchall()
+            for fid, bm_id, ts, p1, p2, p3, nth, rev in rows:
+                entry = out.setdefault((fid, bm_id), {"moves": 0})
+                prices = (p1, p2, p3) if market == MARKET_1X2 else (p1, p2)
+                if nth == 1:
+                    entry["opening"], entry["opened_at"] = prices, ts
+                if rev == 1:
+                    entry["closing"], entry["closed_at"] = prices, ts
+                    entry["moves"] = nth - 1
+        return out
+
+    def compact(self, idle_days: float = 3.0, bucket_s: int = 3600, lookback_days: Optional[float] = 30.0,
+                now: Optional[int] = None) -> Dict[str, int]:
+        """
+        Sous-échantillonne les fixtures sans nouvelle capture depuis `idle_days` (matchs joués) :
+        garde l'ouverture et la dernière capture de chaque tranche de `bucket_s` secondes, puis les
+        changements de prix seulement. `lookback_days` limite le passage aux fixtures devenues
+        inactives récemment (None = tout l'historique).
+        """
+        now = int(time.time()) if now is None else int(now)
+        cutoff = now - int(idle_days * 86400)
+        since = cutoff - int(lookback_days * 86400) if lookback_days is not None else None
+        idle = ("SELECT fixture_id FROM odds_snapshots GROUP BY fixture_id "
+                "HAVING MAX(ts) < :cutoff" + (" AND MAX(ts) >= :since" if since is not None else ""))
+        params = {"cutoff": cutoff, "since": since, "bucket": max(int(bucket_s), 1)}
+        key = "(fixture_id, market, bookmaker_id, ts)"
+
+        with db.get_connection() as conn:
+            start = conn.total_changes
+            conn.execute(f"""
+                WITH ranked AS (
+                    SELECT fixture_id, market, bookmaker_id, ts,
+                           ROW_NUMBER() OVER (PARTITION BY fixture_id, market, bookmaker_id ORDER BY ts) AS nth,
+                           ROW_NUMBER() OVER (PARTITION BY fixture_id, market, bookmaker_id, ts / :bucket
+                                              ORDER BY ts DESC) AS bucket_rank
+                    FROM odds_snapshots WHERE fixture_id IN ({idle})
+                )
+                DELETE FROM odds_snapshots WHERE {key} IN (
+                    SELECT fixture_id, market, bookmaker_id, ts FROM ranked WHERE nth > 1 AND bucket_rank > 1
+                )
+            """, params)
+            downsampled = conn.total_changes - start
+
+            start = conn.total_changes
+            conn.execute(f"""
+                WITH seq AS (
+                    SELECT fixture_id, market, bookmaker_id, ts, p1, p2, p3,
+                           LAG(p1) OVER w AS q1, LAG(p2) OVER w AS q2, LAG(p3) OVER w AS q3,
+                           ROW_NUMBER() OVER w AS nth
+                    FROM odds_snapshots WHERE fixture_id IN ({idle})
+                    WINDOW w AS (PARTITION BY fixture_id, market, bookmaker_id ORDER BY ts)
+                )
+                DELETE FROM odds_snapshots WHERE {key} IN (
+                    SELECT fixture_id, market, bookmaker_id, ts FROM seq
+                    WHERE nth > 1 AND p1 IS q1 AND p2 IS q2 AND p3 IS q3
+                )
+            """, params)
+            merged = conn.total_changes - start
+            remaining = conn.execute("SELECT COUNT(*) FROM odds_snapshots").fetchone()[0]
+            if downsampled or merged:
+                db.bump_data_version("compact_odds", conn)
+            conn.commit()
+        return {"downsampled": downsampled, "merged": merged, "remaining": remaining}
+
+    def vacuum(self):
+        """Rend au système les pages libérées par compact() (hors transaction)."""
+        with db.get_connection() as conn:
+            conn.execute("VACUUM")
+
+# Instance globale
+odds_history = OddsHistory()
@@ -0,0 +1,113 @@
+# src/services/odds_neighbours.py
+"""
+Estimateur à plus proches voisins des méthodes bookmaker (B365 / PINNACLE), en numpy :
+- points = probabilités implicites 1X2 normalisées des matchs joués, issues = colonnes 0/1
+  (domicile, nul, extérieur, Over 2.5, BTTS),
+- requêtes traitées en bloc (tous les matchs du jour) : distances par produit matriciel,
+  k plus proches par sélection partielle (np.argpartition) au lieu d'un tri complet,
+- rayon adaptatif : max(distance du k-ième voisin, min_radius). Les zones denses gardent le
+  rayon fixe historique, les zones creuses (gros favoris) l'élargissent jusqu'à avoir k voisins,
+- pondération par noyau gaussien de largeur rayon × KERNEL_WIDTH : un voisin proche compte plus
+  qu'un voisin en bord de rayon ; taille d'échantillon effective de Kish (Σw)² / Σw².
+
+Sert à FootballPredictor (scripts/generate_predictions.py) et au backtest (scripts/backtest_methods.py),
+qui restreint chaque requête aux matchs des jours antérieurs (`visible`).
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+HOME, DRAW, AWAY, OVER25, BTTS = range(5)
+OUTCOMES = 5
+
+KERNEL_WIDTH = 0.5        # écart-type du noyau en fraction du rayon : poids exp(-2) ≈ 0.14 au bord
+CONFIDENCE_SAMPLE = 50.0  # taille effective donnant une confiance de 1 (à rayon minimal)
+MAX_CELLS = 4_000_000     # requêtes × historique par bloc de distances (~32 Mo en float64)
+
+def implied(odds: np.ndarray) -> np.ndarray:
+    """Probas implicites normalisées (n × 3), comme FootballPredictor.implied_probabilities."""
+    odds = np.asarray(odds, dtype=float).reshape(-1, 3)
+    bad = ~(odds > 0).all(axis=1)
+    inv = 1.0 / np.where(odds > 0, odds, 1.0)
+    probs = inv / inv.sum(axis=1, keepdims=True)
+    probs[bad] = 0.33
+    return probs
+
+def outcomes(goals_home: np.ndarray, goals_away: np.ndarray) -> np.ndarray:
+    """Issues 0/1 (n × OUTCOMES) : domicile, nul, extérieur, Over 2.5, BTTS."""
+    gh = np.asarray(goals_home, dtype=int)
+    ga = np.asarray(goals_away, dtype=int)
+    out = np.zeros((len(gh), OUTCOMES))
+    out[:, HOME] = gh > ga
+    out[:, DRAW] = gh == ga
+    out[:, AWAY] = gh < ga
+    out[:, OVER25] = gh + ga > 2
+    out[:, BTTS] = (gh > 0) & (ga > 0)
+    return out
+
+class NeighbourIndex:
+    def __init__(self, points: np.ndarray, results: np.ndarray):
+        """points : probas implicites (n × 3) ; results : issues (n × c), cf. outcomes()."""
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.results = np.asarray(results, dtype=float)
+        self.sq = (self.points ** 2).sum(axis=1)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def query(self, queries: np.ndarray, k: int, min_radius: float, min_samples: int = 1,
+              visible: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Estimations pondérées pour chaque requête (m × 3 probas implicites).
+        visible : nb de points (préfixe de l'index) visibles par requête, tous par défaut.
+        Renvoie estimates (m × c, NaN si moins de `min_samples` points visibles), samples
+        (voisins retenus), effective (taille effective), radius et confidence (m).
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, 3)
+        m, n = len(queries), len(self)
+        out = {
+            "estimates": np.full((m, self.results.shape[1]), np.nan),
+            "samples": np.zeros(m, dtype=int),
+            "effective": np.zeros(m),
+            "radius": np.full(m, np.nan),
+            "confidence": np.zeros(m),
+        }
+        if m == 0 or n == 0:
+            return out
+        limits = np.full(m, n) if visible is None else np.minimum(np.asarray(visible, dtype=int), n)
+        q_sq = (queries ** 2).sum(axis=1)
+        chunk = max(1, MAX_CELLS // n)
+        floor = max(min_radius, 1e-9)
+
+        for start in range(0, m, chunk):
+            rows = np.arange(start, min(start + chunk, m))
+            rows = rows[limits[rows] >= max(min_samples, 1)]
+            if len(rows) == 0:
+                continue
+            limit = int(limits[rows].max())
+            d2 = q_sq[rows, None] + self.sq[None, :limit] - 2.0 * queries[rows] @ self.points[:limit].T
+            np.maximum(d2, 0.0, out=d2)
+            if visible is not None:
+                d2[np.arange(limit)[None, :] >= limits[rows, None]] = np.inf
+
+            kk = min(k, limit)
+            if limit > kk:
+                nearest = np.argpartition(d2, kk - 1, axis=1)[:, :kk]
+            else:
+                nearest = np.broadcast_to(np.arange(limit), (len(rows), limit))
+            dist = np.sqrt(np.take_along_axis(d2, nearest, axis=1))
+            valid = np.isfinite(dist)
+            dist = np.where(valid, dist, 0.0)
+            # Rayon adaptatif : k-ième voisin visible, jamais sous le rayon fixe historique
+            radius = np.maximum(dist.max(axis=1), floor)
+            w = np.where(valid, np.exp(-0.5 * (dist / (radius[:, None] * KERNEL_WIDTH)) ** 2), 0.0)
+            total = w.sum(axis=1)
+            effective = total ** 2 / np.maximum((w ** 2).sum(axis=1), 1e-300)
+
+            out["estimates"][rows] = np.einsum("qk,qkc->qc", w, self.results[nearest]) / total[:, None]
+            out["samples"][rows] = valid.sum(axis=1)
+            out["effective"][rows] = effective
+            out["radius"][rows] = radius
+            # Moins confiant quand l'échantillon effectif est petit ou que le rayon a dû s'élargir
+            out["confidence"][rows] = np.minimum(1.0, effective / CONFIDENCE_SAMPLE) * np.minimum(1.0, floor / radius)
+        return out
@@ -0,0 +1,213 @@
+# src/services/odds_parser.py
+"""
+Parseur unique des payloads /odds d'API-Football (remplace les parseurs de update_data et
+backfill_history). Un enregistrement compact (__slots__) par bookmaker :
+
+    for b in parse_odds_payload(payload):          # ou parse_bookmakers(flux JSONStream)
+        b.home, b.draw, b.away                     # 1X2
+        b.ou[2.5]  -> [over, under]                # toutes les lignes Over/Under (b.ou25 : tuple)
+        b.btts_yes, b.btts_no
+        b.ah[-0.5] -> [home, away]                 # handicap asiatique, ligne côté domicile
+        b.dc       -> [1X, 12, X2]                 # double chance
+        b.cs["2:1"]                                # score exact
+
+Chaque pari est routé par une table (id API-Football, nom normalisé à défaut d'id) vers son handler,
+et chaque valeur par un dictionnaire de sélections : pas de tests de sous-chaînes, et les
+marchés voisins (« Second Half Winner », « Goals Over/Under First Half »…) ne sont plus confondus
+avec les marchés plein temps. `markets` limite le parsing aux marchés utiles.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+MARKET_1X2 = "1x2"
+MARKET_OU = "ou"
+MARKET_BTTS = "btts"
+MARKET_AH = "ah"
+MARKET_DC = "dc"
+MARKET_CS = "cs"
+ALL_MARKETS = frozenset({MARKET_1X2, MARKET_OU, MARKET_BTTS, MARKET_AH, MARKET_DC, MARKET_CS})
+# Marchés stockés en base (odds, ou25_odds, btts_odds)
+STORED_MARKETS = frozenset({MARKET_1X2, MARKET_OU, MARKET_BTTS})
+
+class BookmakerOdds:
+    __slots__ = ("id", "name", "home", "draw", "away", "ou", "btts_yes", "btts_no", "ah", "dc", "cs")
+
+    def __init__(self, bm_id: int, name: str):
+        self.id = bm_id
+        self.name = name
+        self.home: Optional[float] = None
+        self.draw: Optional[float] = None
+        self.away: Optional[float] = None
+        self.ou: Dict[float, List[Optional[float]]] = {}   # ligne -> [over, under]
+        self.btts_yes: Optional[float] = None
+        self.btts_no: Optional[float] = None
+        self.ah: Dict[float, List[Optional[float]]] = {}   # ligne domicile -> [home, away]
+        self.dc: List[Optional[float]] = [None, None, None]
+        self.cs: Dict[str, float] = {}
+
+    @property
+    def x12(self) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        return self.home, self.draw, self.away
+
+    @property
+    def ou25(self) -> Tuple[Optional[float], Optional[float]]:
+        pair = self.ou.get(2.5)
+        return (pair[0], pair[1]) if pair else (None, None)
+
+    @property
+    def btts(self) -> Tuple[Optional[float], Optional[float]]:
+        return self.btts_yes, self.btts_no
+
+    def has_1x2(self) -> bool:
+        return bool(self.home and self.draw and self.away)
+
+    def __repr__(self):
+        return f"BookmakerOdds({self.id}, {self.name!r}, 1x2={self.x12}, ou={self.ou}, btts={self.btts})"
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Handlers par marché : (record, values) -> None
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _odd(raw: Any) -> Optional[float]:
+    try:
+        odd = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return odd if odd > 1.0 else None
+
+def _selections(**groups: Tuple[str, ...]) -> Dict[str, Any]:
+    """Table libellé -> sélection, avec la casse API ('Home') et en minuscules."""
+    table = {}
+    for key, labels in groups.items():
+        for label in labels:
+            table[label] = table[label.lower()] = table[label.title()] = key
+    return table
+
+_1X2 = _selections(home=("Home", "1", "Local"), draw=("Draw", "X", "Nul"), away=("Away", "2", "Visitor", "Visiting"))
+_YES_NO = _selections(yes=("Yes", "Oui"), no=("No", "Non"))
+_DC = _selections(**{"0": ("Home/Draw", "1X", "Home / Draw"), "1": ("Home/Away", "12", "Home / Away"),
+                     "2": ("Draw/Away", "X2", "Draw / Away")})
+_LINES: Dict[str, Tuple[int, Optional[float]]] = {}   # 'Over 2.5' -> (0, 2.5), mémorisé
+_SIDES = {"over": 0, "under": 1, "home": 0, "away": 1}
+
+def _line(value: Any) -> Tuple[int, Optional[float]]:
+    """'Over 2.5' -> (0, 2.5) ; 'Away +1' -> (1, 1.0) ; (-1, None) si illisible."""
+    found = _LINES.get(value)
+    if found is None:
+        side, _, line = str(value or "").strip().partition(" ")
+        try:
+            found = (_SIDES.get(side.lower(), -1), float(line))
+        except ValueError:
+            found = (-1, None)
+        if len(_LINES) < 10_000:
+            _LINES[value] = found
+    return found
+
+def _match_winner(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    for v in values:
+        sel = _1X2.get(v.get("value"))
+        if sel is None:
+            sel = _1X2.get(str(v.get("value") or "").strip().lower())
+        if sel == "home":
+            b.home = _odd(v.get("odd"))
+        elif sel == "draw":
+            b.draw = _odd(v.get("odd"))
+        elif sel == "away":
+            b.away = _odd(v.get("odd"))
+
+def _pairs(book: Dict[float, List[Optional[float]]], values: List[Dict[str, Any]], sign: bool = False):
+    for v in values:
+        side, line = _line(v.get("value"))
+        if side < 0:
+            continue
+        if sign and side == 1:
+            line = -line  # ligne exprimée côté domicile : « Away +0.5 » = « Home -0.5 »
+        pair = book.get(line)
+        if pair is None:
+            pair = book[line] = [None, None]
+        pair[side] = _odd(v.get("odd"))
+
+def _over_under(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    _pairs(b.ou, values)
+
+def _asian_handicap(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    _pairs(b.ah, values, sign=True)
+
+def _btts(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    for v in values:
+        sel = _YES_NO.get(v.get("value"))
+        if sel is None:
+            sel = _YES_NO.get(str(v.get("value") or "").strip().lower())
+        if sel == "yes":
+            b.btts_yes = _odd(v.get("odd"))
+        elif sel == "no":
+            b.btts_no = _odd(v.get("odd"))
+
+def _double_chance(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    for v in values:
+        sel = _DC.get(v.get("value"))
+        if sel is None:
+            sel = _DC.get(str(v.get("value") or "").strip().lower())
+        if sel is not None:
+            b.dc[int(sel)] = _odd(v.get("odd"))
+
+def _correct_score(b: BookmakerOdds, values: List[Dict[str, Any]]):
+    for v in values:
+        score = str(v.get("value") or "").strip().replace("-", ":")
+        odd = _odd(v.get("odd"))
+        if ":" in score and odd:
+            b.cs[score] = odd
+
+# (marché, handler) par id de pari API-Football ; par nom normalisé pour les payloads sans id
+MarketHandler = Tuple[str, Callable[[BookmakerOdds, List[Dict[str, Any]]], None]]
+BET_IDS: Dict[int, MarketHandler] = {
+    1: (MARKET_1X2, _match_winner),
+    5: (MARKET_OU, _over_under),
+    8: (MARKET_BTTS, _btts),
+    4: (MARKET_AH, _asian_handicap),
+    12: (MARKET_DC, _double_chance),
+    10: (MARKET_CS, _correct_score),
+}
+BET_NAMES: Dict[str, MarketHandler] = {
+    "match winner": BET_IDS[1], "1x2": BET_IDS[1], "fulltime result": BET_IDS[1],
+    "goals over/under": BET_IDS[5], "over/under": BET_IDS[5],
+    "both teams score": BET_IDS[8], "both teams to score": BET_IDS[8], "btts": BET_IDS[8],
+    "asian handicap": BET_IDS[4],
+    "double chance": BET_IDS[12],
+    "exact score": BET_IDS[10], "correct score": BET_IDS[10],
+}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# API
+# ──────────────────────────────────────────────────────────────────────────────
+
+def parse_bookmaker(bm: Dict[str, Any], markets: frozenset = ALL_MARKETS) -> Optional[BookmakerOdds]:
+    try:
+        bm_id = int(bm.get("id"))
+    except (TypeError, ValueError):
+        return None
+    record = BookmakerOdds(bm_id, str(bm.get("name") or ""))
+    for bet in bm.get("bets") or ():
+        bet_id = bet.get("id")
+        # Id entier : table des ids (inconnu = marché ignoré, sans normaliser le nom) ; sinon le nom
+        found = BET_IDS.get(bet_id)
+        if found is None and not isinstance(bet_id, int):
+            found = BET_NAMES.get(str(bet.get("name") or "").strip().lower())
+        if found is not None and found[0] in markets:
+            found[1](record, bet.get("values") or ())
+    return record
+
+def parse_bookmakers(bookmakers: Iterable[Dict[str, Any]], markets: frozenset = ALL_MARKETS) -> List[BookmakerOdds]:
+    """Liste ou flux (JSONStream "response.item.bookmakers.item") de bookmakers."""
+    out = []
+    for bm in bookmakers:
+        record = parse_bookmaker(bm, markets)
+        if record is not None:
+            out.append(record)
+    return out
+
+def parse_odds_payload(payload: Dict[str, Any], markets: frozenset = ALL_MARKETS) -> List[BookmakerOdds]:
+    """Payload /odds?fixture=… complet (1er bloc de `response`, le plus récent)."""
+    responses = payload.get("response") or []
+    if not responses:
+        return []
+    return parse_bookmakers(responses[0].get("bookmakers") or [], markets)
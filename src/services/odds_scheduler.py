@@ -0,0 +1,269 @@
+# src/services/odds_scheduler.py
+"""
+Ordonnanceur de rafraîchissement des cotes avant-match :
+- file de priorité (heapq) des fixtures à venir, clé = prochain passage, dont l'intervalle
+  se resserre à l'approche du coup d'envoi (POLL_TIERS) ; plus rien après le coup d'envoi,
+- budget d'appels API : seau à jetons (débit par minute + rafale) et plafond par passage,
+- regroupement : les fixtures dues d'une même ligue et d'un même jour partent en un appel
+  /odds?league=…&season=…&date=… (au-delà de COALESCE_MIN), en embarquant celles qui seraient
+  dues dans les COALESCE_AHEAD secondes ; les fixtures revenues dans la réponse sont reprogrammées,
+- re-prédiction incrémentale : seuls les matchs dont une probabilité implicite 1X2 a bougé de
+  plus de `threshold` (ou qui reçoivent leurs premières cotes) sont transmis à `repredict`.
+
+L'accès API et l'écriture des cotes sont fournis par l'appelant (cf. scripts/poll_odds.py) :
+    poll(group: List[ScheduledFixture], coalesce: bool) -> Dict[fixture_id, décalage max]
+"""
+import time
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (secondes avant le coup d'envoi, intervalle entre deux passages)
+POLL_TIERS: Tuple[Tuple[float, float], ...] = (
+    (3600, 600),             # dernière heure : toutes les 10 min
+    (6 * 3600, 1800),        # < 6 h : 30 min
+    (24 * 3600, 2 * 3600),   # < 24 h : 2 h
+    (float("inf"), 6 * 3600),
+)
+COALESCE_MIN = 3          # fixtures dues d'une même ligue/jour pour un appel groupé
+COALESCE_AHEAD = 300      # une fixture due dans les 5 min suit un appel groupé de sa ligue
+REPREDICT_THRESHOLD = 0.02  # décalage de probabilité implicite (points) déclenchant une re-prédiction
+
+def poll_interval(seconds_to_kickoff: float, tiers: Sequence[Tuple[float, float]] = POLL_TIERS) -> float:
+    for horizon, interval in tiers:
+        if seconds_to_kickoff <= horizon:
+            return interval
+    return tiers[-1][1]
+
+def implied(h: float, d: float, a: float) -> Tuple[float, float, float]:
+    inv = (1.0 / h, 1.0 / d, 1.0 / a)
+    total = sum(inv)
+    return inv[0] / total, inv[1] / total, inv[2] / total
+
+def price_shift(before: Dict[int, Tuple[float, float, float]], after: Dict[int, Tuple[float, float, float]]) -> float:
+    """Plus grand écart de probabilité implicite 1X2 entre deux relevés, bookmaker par bookmaker (1.0 = premières cotes)."""
+    if not after:
+        return 0.0
+    if not before:
+        return 1.0
+    shift = 0.0
+    for bm_id, odds in after.items():
+        old = before.get(bm_id)
+        if old is None:
+            continue
+        shift = max(shift, *(abs(x - y) for x, y in zip(implied(*odds), implied(*old))))
+    return shift
+
+class TokenBucket:
+    """Débit `rate_per_min` appels/min avec rafale `burst`, et au plus `budget` appels (None = illimité)."""
+
+    def __init__(self, rate_per_min: float, burst: int = 5, budget: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate_per_min / 60.0
+        self.burst = max(1, burst)
+        self.budget = budget
+        self.spent = 0
+        self.tokens = float(self.burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.budget is not None and self.spent >= self.budget
+
+    def acquire(self) -> bool:
+        """Attend un jeton ; False si le budget du passage est épuisé."""
+        with self._lock:
+            if self.exhausted:
+                return False
+            while True:
+                now = self._clock()
+                self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    self.spent += 1
+                    return True
+                self._sleep((1.0 - self.tokens) / self.rate)
+
+class ScheduledFixture:
+    __slots__ = ("fixture_id", "league_id", "season", "kickoff", "due", "polls")
+
+    def __init__(self, fixture_id: str, league_id, season, kickoff: float):
+        self.fixture_id = fixture_id
+        self.league_id = league_id
+        self.season = season
+        self.kickoff = kickoff
+        self.due = 0.0
+        self.polls = 0
+
+    @property
+    def day(self) -> str:
+        return datetime.fromtimestamp(self.kickoff, timezone.utc).strftime("%Y-%m-%d")
+
+    def __repr__(self):
+        return f"ScheduledFixture({self.fixture_id}, league={self.league_id}, due={self.due:.0f})"
+
+def parse_kickoff(value) -> Optional[float]:
+    """'2025-08-15T19:00:00+00:00' (ou date seule, minuit UTC) -> epoch."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+class OddsScheduler:
+    def __init__(self, poll: Callable[[List[ScheduledFixture], bool], Dict[str, float]],
+                 repredict: Optional[Callable[[List[str]], object]] = None,
+                 bucket: Optional[TokenBucket] = None, threshold: float = REPREDICT_THRESHOLD,
+                 coalesce_min: int = COALESCE_MIN, coalesce_ahead: float = COALESCE_AHEAD,
+                 tiers: Sequence[Tuple[float, float]] = POLL_TIERS,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        self.poll = poll
+        self.repredict = repredict
+        self.bucket = bucket or TokenBucket(rate_per_min=30)
+        self.threshold = threshold
+        self.coalesce_min = coalesce_min
+        self.coalesce_ahead = coalesce_ahead
+        self.tiers = tiers
+        self.clock = clock
+        self.sleep = sleep
+        self.fixtures: Dict[str, ScheduledFixture] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self.stats = {"polls": 0, "grouped_calls": 0, "fixture_calls": 0, "moved": 0, "repredicted": 0}
+
+    # ---------- file ----------
+    def add(self, fixture_id, league_id, season, kickoff: float, last_polled: Optional[float] = None):
+        """Programme une fixture : tout de suite, ou un intervalle après son dernier relevé connu."""
+        entry = ScheduledFixture(str(fixture_id), league_id, season, kickoff)
+        self.fixtures[entry.fixture_id] = entry
+        due = self.clock()
+        if last_polled is not None:
+            due = max(due, last_polled + poll_interval(kickoff - last_polled, self.tiers))
+        self._push(entry, due)
+
+    def _push(self, entry: ScheduledFixture, due: float):
+        entry.due = due
+        heapq.heappush(self._heap, (due, entry.fixture_id))
+
+    def reschedule(self, entry: ScheduledFixture, now: float):
+        """Prochain passage selon la distance au coup d'envoi ; retirée de la file une fois le match commencé."""
+        if entry.kickoff <= now:
+            self.fixtures.pop(entry.fixture_id, None)
+            return
+        self._push(entry, min(now + poll_interval(entry.kickoff - now, self.tiers), entry.kickoff))
+
+    def next_due(self) -> Optional[float]:
+        while self._heap:
+            due, fid = self._heap[0]
+            entry = self.fixtures.get(fid)
+            if entry is not None and entry.due == due:
+                return due
+            heapq.heappop(self._heap)  # entrée périmée (reprogrammée ou retirée)
+        return None
+
+    def due(self, now: float) -> List[Tuple[List[ScheduledFixture], bool]]:
+        """Groupes (ligue, saison, jour) à interroger : (fixtures, appel groupé ?)."""
+        groups: Dict[Tuple, List[ScheduledFixture]] = {}
+        while True:
+            due = self.next_due()
+            if due is None or due > now + self.coalesce_ahead:
+                break
+            _, fid = heapq.heappop(self._heap)
+            entry = self.fixtures[fid]
+            groups.setdefault((entry.league_id, entry.season, entry.day), []).append(entry)
+
+        out = []
+        for key, entries in groups.items():
+            ready = [e for e in entries if e.due <= now]
+            grouped = key[0] is not None and key[1] is not None and len(ready) >= self.coalesce_min
+            if grouped:
+                out.append((entries, True))
+                continue
+            # Pas d'appel groupé : les fixtures pas encore dues retournent dans la file
+            for e in entries:
+                if e.due > now:
+                    self._push(e, e.due)
+            if ready:
+                out.append((ready, False))
+        return out
+
+    # ---------- boucle ----------
+    def run_once(self) -> Dict[str, int]:
+        now = self.clock()
+        moved: List[str] = []
+        for group, grouped in self.due(now):
+            if self.bucket.exhausted:
+                for e in group:
+                    self._push(e, e.due)
+                continue
+            shifts = self.poll(group, grouped)
+            if grouped:
+                self.stats["grouped_calls"] += 1
+            else:
+                self.stats["fixture_calls"] += len(group)
+            now = self.clock()
+            # Un appel groupé couvre aussi des fixtures non dues de la ligue : elles sont reprogrammées
+            polled = {e.fixture_id for e in group}
+            extra = [self.fixtures[fid] for fid in shifts if fid in self.fixtures and fid not in polled]
+            for e in group + extra:
+                e.polls += 1
+                self.stats["polls"] += 1
+                self.reschedule(e, now)
+            moved += [fid for fid, shift in shifts.items() if shift >= self.threshold]
+
+        if moved:
+            self.stats["moved"] += len(moved)
+            if self.repredict is not None:
+                self.repredict(sorted(set(moved)))
+                self.stats["repredicted"] += len(set(moved))
+        return {"moved": len(moved)}
+
+    def run(self, until: Optional[float] = None) -> Dict[str, int]:
+        """Enchaîne les passages jusqu'à `until` (epoch), file vide ou budget épuisé."""
+        while True:
+            self.run_once()
+            nxt = self.next_due()
+            if nxt is None or self.bucket.exhausted or (until is not None and nxt >= until):
+                break
+            now = self.clock()
+            if nxt > now:
+                self.sleep(nxt - now)
+        return dict(self.stats, api_calls=self.bucket.spent)
+
+    # ---------- chargement ----------
+    def load(self, conn, horizon_hours: float = 48.0) -> int:
+        """Fixtures sans score dont le coup d'envoi tombe dans les `horizon_hours` prochaines heures."""
+        now = self.clock()
+        start = datetime.fromtimestamp(now, timezone.utc)
+        end = start + timedelta(hours=horizon_hours)
+        rows = conn.execute("""
+            SELECT CAST(m.fixture_id AS TEXT) AS fixture_id,
+                   -- Lignes antérieures à l'alimentation de league_id par insert_match : id API numérique dans league
+                   COALESCE(m.league_id, CASE WHEN m.league <> '' AND m.league NOT GLOB '*[^0-9]*'
+                                              THEN CAST(m.league AS INTEGER) END) AS league_id,
+                   m.season, m.date,
+                   (SELECT MAX(s.ts) FROM odds_snapshots s WHERE s.fixture_id = CAST(m.fixture_id AS TEXT)) AS last_ts
+            FROM matches m
+            WHERE m.fixture_id IS NOT NULL
+              AND COALESCE(m.goals_home, m.home_score) IS NULL
+              AND substr(m.date, 1, 10) BETWEEN ? AND ?
+        """, (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))).fetchall()
+        added = 0
+        for r in rows:
+            kickoff = parse_kickoff(r["date"])
+            if kickoff is None or not (now < kickoff <= end.timestamp()) or r["fixture_id"] in self.fixtures:
+                continue
+            self.add(r["fixture_id"], r["league_id"], r["season"], kickoff, r["last_ts"])
+            added += 1
+        return added
+
+    def pending(self) -> Iterable[ScheduledFixture]:
+        return sorted(self.fixtures.values(), key=lambda e: e.due)
@@ -0,0 +1,179 @@
+# src/services/pipeline.py
+"""
+Orchestrateur in-process des étapes de mise à jour (ingestion → index → prédictions → export).
+
+Chaque étape déclare les tables qu'elle lit (inputs) et écrit (outputs) :
+- dépendances déduites : B dépend de A si A (déclarée avant) écrit une table que B lit,
+- empreinte des entrées (COUNT, MAX(rowid), MAX(updated_at)… par table, + watermark externe
+  comme la date du jour) mémorisée dans pipeline_state après un succès,
+- une étape dont l'empreinte n'a pas bougé est sautée (--force pour ignorer),
+- les étapes prêtes et indépendantes tournent en parallèle (ThreadPoolExecutor) ;
+  les connexions SQLite sont réutilisées par thread (db.enable_pool) et le client HTTP est partagé,
+- chaque étape exécutée est mesurée (src/utils/metrics.py → pipeline_metrics, même run_id par passage).
+"""
+import json
+import time
+import hashlib
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.models.database import db
+from src.utils.metrics import metrics
+
+# Agrégats supplémentaires pour les tables modifiées en place (scores, cotes, ELO mis à jour)
+TABLE_FINGERPRINT_EXTRA = {
+    "matches": [
+        "SUM(COALESCE(goals_home, home_score) IS NOT NULL)",
+        "TOTAL(COALESCE(goals_home, home_score))",
+        "TOTAL(COALESCE(goals_away, away_score))",
+        "MAX(date)",
+    ],
+    "odds": ["TOTAL(home_odd)", "TOTAL(draw_odd)", "TOTAL(away_odd)"],
+    "ou25_odds": ["TOTAL(over25_odd)", "TOTAL(under25_odd)"],
+    "btts_odds": ["TOTAL(yes_odd)", "TOTAL(no_odd)"],
+    "odds_snapshots": ["MAX(ts)"],
+    "team_stats": ["TOTAL(elo)"],
+    "goal_model_leagues": ["TOTAL(home_adv)", "TOTAL(rho)"],
+    "goal_model_teams": ["TOTAL(attack)", "TOTAL(defence)"],
+}
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    watermark: Optional[Callable[[], str]] = None   # entrée hors base (date du jour…)
+    always: bool = False                             # source externe (API) : jamais sautée
+    description: str = ""
+
+def table_fingerprint(conn, table: str) -> List[Any]:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if row is None:
+        return ["absent"]
+    cols = set(db._columns(conn, table))
+    exprs = ["COUNT(*)"]
+    if "WITHOUT ROWID" not in (row[0] or "").upper():
+        exprs.append("MAX(rowid)")
+    exprs += [f"MAX({c})" for c in ("updated_at", "created_at") if c in cols]
+    exprs += TABLE_FINGERPRINT_EXTRA.get(table, [])
+    return list(conn.execute(f"SELECT {', '.join(exprs)} FROM {table}").fetchone())
+
+def stage_fingerprint(conn, stage: Stage) -> str:
+    payload = {t: table_fingerprint(conn, t) for t in stage.inputs}
+    if stage.watermark is not None:
+        payload["@watermark"] = stage.watermark()
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def today_watermark() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], max_workers: int = 4):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Étape en double: {stage.name}")
+            self.stages[stage.name] = stage
+        self.max_workers = max_workers
+
+    def dependencies(self) -> Dict[str, Set[str]]:
+        deps: Dict[str, Set[str]] = {}
+        order = list(self.stages.values())
+        for i, stage in enumerate(order):
+            deps[stage.name] = {
+                prev.name for prev in order[:i]
+                if set(prev.outputs) & set(stage.inputs)
+            }
+        return deps
+
+    # ---------- état ----------
+    def load_state(self) -> Dict[str, Dict]:
+        with db.get_connection() as conn:
+            return {r["stage"]: dict(r) for r in conn.execute("SELECT * FROM pipeline_state").fetchall()}
+
+    def _save_state(self, name: str, fingerprint: Optional[str], status: str, message: str,
+                    started: datetime, duration: float):
+        with db.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO pipeline_state (stage, fingerprint, status, message, started_at, finished_at, duration_s)
+                VALUES (?, ?, ?, ?, ?, datetime('now'), ?)
+                ON CONFLICT(stage) DO UPDATE SET
+                  fingerprint=COALESCE(excluded.fingerprint, pipeline_state.fingerprint),
+                  status=excluded.status, message=excluded.message, started_at=excluded.started_at,
+                  finished_at=excluded.finished_at, duration_s=excluded.duration_s
+            """, (name, fingerprint, status, message[:500], started.strftime("%Y-%m-%d %H:%M:%S"), round(duration, 3)))
+            conn.commit()
+
+    # ---------- exécution ----------
+    def _execute(self, stage: Stage, force: bool, previous: Optional[Dict]) -> Dict[str, Any]:
+        started = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        with db.get_connection() as conn:
+            fingerprint = stage_fingerprint(conn, stage)
+        if (not force and not stage.always and previous
+                and previous.get("status") == "ok" and previous.get("fingerprint") == fingerprint):
+            return {"stage": stage.name, "status": "skipped", "message": "entrées inchangées", "duration_s": 0.0}
+
+        print(f"▶️  [{stage.name}] démarrage", flush=True)
+        try:
+            with metrics.stage(stage.name):
+                result = stage.run()
+        except (Exception, SystemExit) as e:  # SystemExit des scripts compris
+            duration = time.perf_counter() - t0
+            traceback.print_exc()
+            message = f"{type(e).__name__}: {e}"
+            self._save_state(stage.name, None, "failed", message, started, duration)
+            return {"stage": stage.name, "status": "failed", "message": message, "duration_s": duration}
+
+        duration = time.perf_counter() - t0
+        # Les main() des scripts renvoient un code : non nul = rien produit, pas un échec du pipeline
+        status = "warn" if isinstance(result, int) and result != 0 else "ok"
+        message = f"code {result}" if status == "warn" else ""
+        # L'empreinte prise AVANT l'exécution est celle des entrées effectivement traitées
+        self._save_state(stage.name, fingerprint if status == "ok" else None, status, message, started, duration)
+        return {"stage": stage.name, "status": status, "message": message, "duration_s": duration}
+
+    def run(self, only: Optional[Iterable[str]] = None, skip: Iterable[str] = (),
+            force: bool = False) -> List[Dict[str, Any]]:
+        """Exécute les étapes sélectionnées dans l'ordre des dépendances. Retourne un rapport par étape."""
+        selected = set(only) if only else set(self.stages)
+        selected -= set(skip)
+        unknown = selected - set(self.stages)
+        if unknown:
+            raise ValueError(f"Étapes inconnues: {', '.join(sorted(unknown))}")
+
+        deps = {name: d & selected for name, d in self.dependencies().items() if name in selected}
+        state = self.load_state()
+        metrics.new_run()
+        pending = [name for name in self.stages if name in selected]
+        finished: Dict[str, Dict[str, Any]] = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                for name in list(pending):
+                    if not deps[name] <= set(finished):
+                        continue
+                    pending.remove(name)
+                    failed = [d for d in deps[name] if finished[d]["status"] in ("failed", "blocked")]
+                    if failed:
+                        finished[name] = {"stage": name, "status": "blocked",
+                                          "message": f"dépendance en échec: {', '.join(sorted(failed))}",
+                                          "duration_s": 0.0}
+                        continue
+                    future = pool.submit(self._execute, self.stages[name], force, state.get(name))
+                    running[future] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    finished[name] = future.result()
+                    report = finished[name]
+                    icon = {"ok": "✅", "warn": "⚠️", "skipped": "⏭️", "failed": "❌"}.get(report["status"], "•")
+                    print(f"{icon} [{name}] {report['status']} ({report['duration_s']:.1f}s) {report['message']}", flush=True)
+
+        return [finished[name] for name in self.stages if name in finished]
@@ -0,0 +1,79 @@
+# src/services/prediction_matrix.py
+"""
+Vue "large" des prédictions pour le comparateur :
+une ligne par (fixture_id, market, selection) et, pour chaque méthode, prob / EV / cote.
+Rafraîchie par generate_predictions pour les seuls matchs recalculés ; le comparateur
+la lit directement au lieu de filtrer la table predictions cellule par cellule.
+"""
+from typing import Iterable, List
+from src.services.bet_settlement import SELECTION_ALIASES
+
+# Méthode (colonne predictions.method) -> préfixe de colonnes
+PIVOT_METHODS = {
+    "ELO": "elo",
+    "B365": "b365",
+    "PINNACLE": "pinnacle",
+    "COMBINED": "combined",
+    "POISSON": "poisson",
+}
+
+def _method_columns() -> List[str]:
+    cols = []
+    for prefix in PIVOT_METHODS.values():
+        cols += [f"{prefix}_prob", f"{prefix}_ev", f"{prefix}_odd"]
+    return cols
+
+def _selection_case(column: str = "selection") -> str:
+    whens = " ".join(f"WHEN '{k}' THEN '{v}'" for k, v in SELECTION_ALIASES.items())
+    return f"CASE UPPER({column}) {whens} ELSE {column} END"
+
+def ensure_schema(conn):
+    """Crée la table et ajoute les colonnes des méthodes apparues depuis."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS prediction_matrix (
+            fixture_id TEXT,
+            market TEXT,
+            selection TEXT,
+            day TEXT,
+            updated_at TEXT DEFAULT (datetime('now')),
+            PRIMARY KEY (fixture_id, market, selection)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prediction_matrix_day ON prediction_matrix(day)")
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(prediction_matrix)").fetchall()}
+    for col in _method_columns():
+        if col not in existing:
+            conn.execute(f"ALTER TABLE prediction_matrix ADD COLUMN {col} REAL")
+
+def refresh(conn, fixture_ids: Iterable[str]) -> int:
+    """Reconstruit les lignes pivotées des matchs donnés. Retourne le nb de lignes écrites."""
+    ensure_schema(conn)
+    ids = sorted({str(f) for f in fixture_ids if f is not None})
+    if not ids:
+        return 0
+
+    pivots = []
+    for method, prefix in PIVOT_METHODS.items():
+        pivots += [
+            f"MAX(CASE WHEN method = '{method}' THEN prob END) AS {prefix}_prob",
+            f"MAX(CASE WHEN method = '{method}' THEN prob * odd END) AS {prefix}_ev",
+            f"MAX(CASE WHEN method = '{method}' THEN odd END) AS {prefix}_odd",
+        ]
+    cols = ", ".join(_method_columns())
+
+    written = 0
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        qmarks = ", ".join(["?"] * len(chunk))
+        conn.execute(f"DELETE FROM prediction_matrix WHERE fixture_id IN ({qmarks})", chunk)
+        cur = conn.execute(f"""
+            INSERT INTO prediction_matrix (fixture_id, market, selection, day, {cols})
+            SELECT CAST(fixture_id AS TEXT), market, {_selection_case()} AS sel,
+                   MAX(substr(date, 1, 10)),
+                   {", ".join(pivots)}
+            FROM predictions
+            WHERE fixture_id IN ({qmarks})
+            GROUP BY fixture_id, market, sel
+        """, chunk)
+        written += cur.rowcount if cur.rowcount and cur.rowcount > 0 else 0
+    return written
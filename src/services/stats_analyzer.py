@@ -1,41 +1,144 @@
 from typing import Dict, List, Optional
 import statistics
-from datetime import datetime, timedelta
+from datetime import datetime
 from src.models.database import db
+from src.utils.metrics import metrics
 from src.api.football_api import FootballAPI
+from src.services.h2h_index import h2h_index
+from src.services.elo_replay import iso_day_sql
+
+# Une ligne par (équipe, match) joué dans la ligue-saison : perspective domicile puis extérieur.
+# Forme = derniers matchs par jour ISO ({day}) : les dates Football-Data 'dd/mm/yyyy' ne se trient pas en texte.
+LEAGUE_SEASON_STATS_SQL = """
+    WITH games AS (
+        SELECT CAST(COALESCE(home_team_id, home_team) AS TEXT) AS team, {day} AS day, date,
+               COALESCE(goals_home, home_score) AS gf, COALESCE(goals_away, away_score) AS ga
+        FROM matches
+        WHERE {where}
+        UNION ALL
+        SELECT CAST(COALESCE(away_team_id, away_team) AS TEXT) AS team, {day} AS day, date,
+               COALESCE(goals_away, away_score) AS gf, COALESCE(goals_home, home_score) AS ga
+        FROM matches
+        WHERE {where}
+    ),
+    ranked AS (
+        SELECT team, gf, ga,
+               CASE WHEN gf > ga THEN 3 WHEN gf = ga THEN 1 ELSE 0 END AS pts,
+               ROW_NUMBER() OVER (PARTITION BY team ORDER BY day DESC, date DESC) AS rn
+        FROM games
+        WHERE team IS NOT NULL
+    )
+    SELECT team,
+           COUNT(*)              AS matches_played,
+           SUM(gf > ga)          AS wins,
+           SUM(gf = ga)          AS draws,
+           SUM(gf < ga)          AS losses,
+           SUM(gf)               AS goals_for,
+           SUM(ga)               AS goals_against,
+           SUM(ga = 0)           AS clean_sheets,
+           SUM(gf = 0)           AS failed_to_score,
+           SUM(CASE WHEN rn <= {form_matches} THEN pts ELSE 0 END) AS form_points
+    FROM ranked
+    GROUP BY team
+"""
 
 class StatsAnalyzer:
     def __init__(self):
         self.api = FootballAPI()
+        # (ligue, saison) -> {team_id: stats} ; stats API des équipes sans historique local
+        self._league_stats: Dict[tuple, Dict[str, Dict]] = {}
+        self._api_stats: Dict[tuple, Dict] = {}
+        self._version = None
     
     def analyze_team_performance(self, team_id: int, league_id: int, season: int) -> Dict:
         """Analyse complète des performances d'une équipe"""
         stats = self.get_team_stats_from_db(team_id, league_id, season)
         
         if not stats:
-            # Récupérer depuis l'API et stocker
-            api_stats = self.api.get_team_stats(team_id, league_id, season)
-            if api_stats and 'response' in api_stats:
-                stats = self.store_team_stats(team_id, league_id, season, api_stats['response'])
+            # Pas d'historique local : repli sur l'API (mis en cache pour le processus)
+            key = (str(team_id), str(league_id), str(season))
+            stats = self._api_stats.get(key)
+            if stats is None:
+                api_stats = self.api.get_team_stats(team_id, league_id, season)
+                if api_stats and 'response' in api_stats:
+                    stats = self.store_team_stats(team_id, league_id, season, api_stats['response'])
         
         if stats:
             return self.calculate_performance_metrics(stats)
         
         return {}
     
-    def get_team_stats_from_db(self, team_id: int, league_id: int, season: int) -> Optional[Dict]:
-        """Récupère les stats d'une équipe depuis la base"""
+    def analyze_league(self, league_id: int, season: int) -> Dict[str, Dict]:
+        """Métriques de toutes les équipes d'une ligue-saison (une seule requête)."""
+        return {
+            team: self.calculate_performance_metrics(stats)
+            for team, stats in self.get_league_season_stats(league_id, season).items()
+        }
+    
+    def get_league_season_stats(self, league_id: int, season: Optional[int], form_matches: int = 5) -> Dict[str, Dict]:
+        """
+        Stats de toutes les équipes d'une ligue-saison en un passage groupé sur `matches`
+        (victoires, nuls, défaites, buts, clean sheets, points des `form_matches` derniers matchs).
+        """
+        # Cache invalidé dès qu'un script d'écriture a incrémenté la version des données
+        version = db.get_data_version()
+        if version != self._version:
+            self._league_stats.clear()
+            self._version = version
+        
+        key = (str(league_id), str(season) if season is not None else None, form_matches)
+        hit = key in self._league_stats
+        metrics.cache_hit(hit)
+        if hit:
+            return self._league_stats[key]
+        
+        where = ("CAST(COALESCE(league_id, league) AS TEXT) = ?"
+                 " AND COALESCE(goals_home, home_score) IS NOT NULL"
+                 " AND COALESCE(goals_away, away_score) IS NOT NULL")
+        params = [str(league_id)]
+        if season is not None:
+            # Saisons stockées "2024" (API) ou "2024-25" (Football-Data)
+            where += " AND substr(CAST(season AS TEXT), 1, 4) = ?"
+            params.append(str(season)[:4])
+        
         with db.get_connection() as conn:
-            cursor = conn.execute(
-                """SELECT * FROM team_stats 
-                   WHERE team_id = ? AND league_id = ? AND season = ?""",
-                (team_id, league_id, season)
-            )
-            result = cursor.fetchone()
-            return dict(result) if result else None
+            rows = conn.execute(
+                LEAGUE_SEASON_STATS_SQL.format(where=where, day=iso_day_sql("date"), form_matches=int(form_matches)),
+                params + params,
+            ).fetchall()
+        
+        out = {}
+        for r in rows:
+            stats = dict(r)
+            team = stats.pop('team')
+            played = stats['matches_played'] or 1
+            stats.update({
+                'team_id': team,
+                'league_id': league_id,
+                'season': season,
+                'avg_goals_for': stats['goals_for'] / played,
+                'avg_goals_against': stats['goals_against'] / played,
+            })
+            out[team] = stats
+        self._league_stats[key] = out
+        return out
+    
+    def latest_local_season(self, league_id: int) -> Optional[int]:
+        """Dernière saison présente en base pour la ligue (ex. 2024 pour "2024-25")."""
+        with db.get_connection() as conn:
+            row = conn.execute(
+                """SELECT MAX(CAST(substr(CAST(season AS TEXT), 1, 4) AS INTEGER))
+                   FROM matches WHERE CAST(COALESCE(league_id, league) AS TEXT) = ?""",
+                (str(league_id),)
+            ).fetchone()
+        return int(row[0]) if row and row[0] else None
+    
+    def get_team_stats_from_db(self, team_id: int, league_id: int, season: int) -> Optional[Dict]:
+        """Stats d'une équipe calculées depuis `matches` (toute la ligue-saison est calculée et mise en cache)"""
+        return self.get_league_season_stats(league_id, season).get(str(team_id))
     
     def store_team_stats(self, team_id: int, league_id: int, season: int, api_data: Dict) -> Dict:
-        """Stocke les statistiques d'équipe depuis l'API"""
+        """Convertit et met en cache les statistiques d'équipe venues de l'API"""
         fixtures = api_data.get('fixtures', {})
         goals = api_data.get('goals', {})
         
@@ -61,57 +164,13 @@ class StatsAnalyzer:
         # Calcul de la forme (points des 5 derniers matchs)
         stats_data['form_points'] = self.calculate_recent_form(team_id, league_id)
         
-        with db.get_connection() as conn:
-            conn.execute(
-                """INSERT OR REPLACE INTO team_stats 
-                   (team_id, league_id, season, matches_played, wins, draws, losses,
-                    goals_for, goals_against, clean_sheets, failed_to_score,
-                    avg_goals_for, avg_goals_against, form_points)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                tuple(stats_data[k] for k in [
-                    'team_id', 'league_id', 'season', 'matches_played', 'wins', 'draws', 'losses',
-                    'goals_for', 'goals_against', 'clean_sheets', 'failed_to_score',
-                    'avg_goals_for', 'avg_goals_against', 'form_points'
-                ])
-            )
-            conn.commit()
-        
+        self._api_stats[(str(team_id), str(league_id), str(season))] = stats_data
         return stats_data
     
     def calculate_recent_form(self, team_id: int, league_id: int, num_matches: int = 5) -> float:
-        """Calcule la forme récente d'une équipe en points"""
-        with db.get_connection() as conn:
-            cursor = conn.execute(
-                """SELECT home_score, away_score, home_team_id
-                   FROM matches 
-                   WHERE (home_team_id = ? OR away_team_id = ?) 
-                   AND league_id = ? AND status = 'FT'
-                   ORDER BY match_date DESC 
-                   LIMIT ?""",
-                (team_id, team_id, league_id, num_matches)
-            )
-            
-            total_points = 0
-            match_count = 0
-            
-            for row in cursor.fetchall():
-                home_score, away_score, home_team_id = row
-                is_home = (home_team_id == team_id)
-                
-                if is_home:
-                    if home_score > away_score:
-                        total_points += 3  # Victoire
-                    elif home_score == away_score:
-                        total_points += 1  # Nul
-                else:
-                    if away_score > home_score:
-                        total_points += 3  # Victoire
-                    elif home_score == away_score:
-                        total_points += 1  # Nul
-                
-                match_count += 1
-            
-            return total_points
+        """Calcule la forme récente d'une équipe en points (toutes saisons confondues)"""
+        stats = self.get_league_season_stats(league_id, None, num_matches).get(str(team_id))
+        return stats['form_points'] if stats else 0
     
     def calculate_performance_metrics(self, stats: Dict) -> Dict:
         """Calcule des métriques de performance avancées"""
@@ -165,8 +224,10 @@ class StatsAnalyzer:
     
     def get_match_prediction_data(self, home_team_id: int, away_team_id: int, league_id: int) -> Dict:
         """Compile toutes les données pour la prédiction d'un match"""
-        season = datetime.now().year
+        season = self.latest_local_season(league_id) or datetime.now().year
         
+        # Une seule requête groupée pour toute la ligue-saison, puis lectures en mémoire
+        self.get_league_season_stats(league_id, season)
         home_analysis = self.analyze_team_performance(home_team_id, league_id, season)
         away_analysis = self.analyze_team_performance(away_team_id, league_id, season)
         
@@ -182,46 +243,41 @@ class StatsAnalyzer:
     
     def get_head_to_head_analysis(self, home_team_id: int, away_team_id: int) -> Dict:
         """Analyse détaillée des confrontations directes"""
-        with db.get_connection() as conn:
-            cursor = conn.execute(
-                """SELECT home_score, away_score, home_team_id, match_date
-                   FROM matches 
-                   WHERE ((home_team_id = ? AND away_team_id = ?) 
-                         OR (home_team_id = ? AND away_team_id = ?))
-                   AND status = 'FT'
-                   ORDER BY match_date DESC 
-                   LIMIT 10""",
-                (home_team_id, away_team_id, away_team_id, home_team_id)
-            )
-            
-            matches = cursor.fetchall()
-            
-            if not matches:
-                return {'total_matches': 0, 'trend': 'No history'}
-            
-            home_wins = sum(1 for m in matches 
-                          if (m[2] == home_team_id and m[0] > m[1]) or 
-                             (m[2] == away_team_id and m[1] > m[0]))
-            
-            away_wins = sum(1 for m in matches 
-                          if (m[2] == home_team_id and m[0] < m[1]) or 
-                             (m[2] == away_team_id and m[1] < m[0]))
-            
-            draws = len(matches) - home_wins - away_wins
+        return self.get_head_to_head_many([(home_team_id, away_team_id)])[(str(home_team_id), str(away_team_id))]
+    
+    def get_head_to_head_many(self, pairs: List) -> Dict:
+        """H2H de plusieurs matchs (ex. tous ceux du jour) en une lecture de l'index h2h_summary"""
+        out = {}
+        for (home_team_id, away_team_id), summary in h2h_index.lookup_many(pairs).items():
+            if not summary:
+                out[(home_team_id, away_team_id)] = {'total_matches': 0, 'trend': 'No history'}
+                continue
             
-            # Tendance récente (3 derniers matchs)
-            recent_matches = matches[:3]
-            recent_trend = self.analyze_recent_h2h_trend(recent_matches, home_team_id)
+            # Même format qu'avant : (buts domicile, buts extérieur, équipe à domicile) des 10 derniers
+            matches = [(r[2], r[3], r[1]) for r in summary['last_results']]
+            home_wins = sum(1 for m in matches
+                            if (m[2] == home_team_id and m[0] > m[1]) or
+                               (m[2] == away_team_id and m[1] > m[0]))
+            away_wins = sum(1 for m in matches
+                            if (m[2] == home_team_id and m[0] < m[1]) or
+                               (m[2] == away_team_id and m[1] < m[0]))
             
-            return {
+            out[(home_team_id, away_team_id)] = {
                 'total_matches': len(matches),
                 'home_wins': home_wins,
                 'away_wins': away_wins,
-                'draws': draws,
-                'recent_trend': recent_trend,
+                'draws': len(matches) - home_wins - away_wins,
+                'recent_trend': self.analyze_recent_h2h_trend(matches[:3], home_team_id),
                 'avg_goals': statistics.mean([m[0] + m[1] for m in matches]),
-                'home_advantage': home_wins > away_wins
+                'home_advantage': home_wins > away_wins,
+                'all_time': {
+                    'matches': summary['matches'],
+                    'home_wins': summary['home_wins'],
+                    'away_wins': summary['away_wins'],
+                    'draws': summary['draws'],
+                },
             }
+        return out
     
     def analyze_recent_h2h_trend(self, matches: List, home_team_id: int) -> str:
         """Analyse la tendance récente des H2H"""
@@ -0,0 +1,194 @@
+# src/services/team_name_matcher.py
+"""
+Matching de noms d'équipes (Football-Data ↔ API-Football) sans comparaison n×m :
+- normalisation par tokens (accents, ponctuation, affixes FC/CF/SC…), calculée une seule fois par nom,
+- index inversé de trigrammes de caractères pour le blocage des candidats,
+- score (SequenceMatcher + couverture par préfixes / abréviations de tokens) uniquement sur la
+  courte liste bloquée ; un nom court dont un token ne se retrouve pas dans le nom long
+  ("Ath Madrid" / "Real Madrid") est écarté, et le meilleur candidat doit devancer le second,
+- cache JSON par (ligue, saison) des équipes API et des correspondances déjà trouvées.
+"""
+import os
+import re
+import json
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CACHE_DIR = os.getenv("TEAM_MATCH_CACHE_DIR", "data/team_match_cache")
+
+MATCH_THRESHOLD = 0.75   # même seuil que l'ancien matching difflib
+MAX_CANDIDATES = 8       # candidats scorés par nom après blocage
+MATCH_MARGIN = 0.05      # avance minimale du meilleur candidat sur le second
+STRICT_RATIO = 0.85      # similarité suffisant seule (fautes de frappe) sans couverture complète des tokens
+
+# Tokens ignorés (affixes de forme juridique / club). Traités comme mots entiers :
+# "Las Palmas" n'est plus amputé de son "as".
+DROP_TOKENS = {
+    "fc", "cf", "ac", "sc", "as", "cd", "sk", "fk", "afc", "club",
+}
+TOKEN_ALIASES = {"saint": "st", "utd": "united"}
+# Abréviations Football-Data : token court -> tokens complets qu'il peut désigner
+ABBREVIATIONS = {
+    "ath": ("athletic", "atletico"), "atl": ("atletico", "atlanta"), "sp": ("sporting",),
+    "weds": ("wednesday",), "ein": ("eintracht",), "sheff": ("sheffield",),
+}
+# Tokens trop communs pour identifier un club à eux seuls ("Real" ne désigne pas Real Madrid)
+GENERIC_TOKENS = {
+    "real", "united", "city", "town", "athletic", "atletico", "sporting", "st", "inter", "racing",
+    "olympique", "dynamo", "union", "sport", "de", "la", "le", "the", "county", "rovers", "wanderers",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize_name(name: str) -> str:
+    """'1. FC Köln' -> 'koln', 'Saint-Étienne' -> 'st etienne', 'Las Palmas' -> 'las palmas'."""
+    return " ".join(name_tokens(name))
+
+def name_tokens(name: str) -> List[str]:
+    folded = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = []
+    for tok in _NON_ALNUM.split(folded):
+        if not tok or tok in DROP_TOKENS or (tok.isdigit() and len(tok) == 1):
+            continue
+        tokens.append(TOKEN_ALIASES.get(tok, tok))
+    # Nom composé uniquement d'affixes ("Real", "AS"…) : on garde la forme brute
+    return tokens or [t for t in _NON_ALNUM.split(folded) if t]
+
+def trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _covers(tok: str, target: str) -> bool:
+    return target.startswith(tok) or target in ABBREVIATIONS.get(tok, ())
+
+def prefix_cover(short: List[str], long: List[str]) -> float:
+    """
+    Part des tokens du nom court qui préfixent (ou abrègent, cf. ABBREVIATIONS), dans l'ordre,
+    un token du nom long ('man utd' ⊂ 'manchester united', 'ath madrid' ⊂ 'atletico madrid').
+    0 si seuls des tokens génériques se recouvrent ('real' ⊄ 'real madrid').
+    """
+    if not short:
+        return 0.0
+    j = hits = counted = 0
+    specific = False
+    for tok in short:
+        k = j
+        while k < len(long) and not _covers(tok, long[k]):
+            k += 1
+        if k < len(long):
+            hits += 1
+            counted += 1
+            specific = specific or long[k] not in GENERIC_TOKENS
+            j = k + 1
+        elif len(tok) > 1:  # lettre isolée ("Nott'm") : ignorée si elle ne couvre rien
+            counted += 1
+    return hits / counted if specific else 0.0
+
+def score_names(a: str, b: str, a_tokens: List[str] = None, b_tokens: List[str] = None) -> float:
+    """
+    Similarité 0-1. Couverture complète des tokens du nom court : au moins 0.9 ; sinon la
+    similarité de caractères ne compte que si elle est très forte (STRICT_RATIO, faute de frappe),
+    et est pondérée par la couverture : "ath madrid" / "real madrid" (0.76 × 0.5) reste sous le seuil.
+    """
+    a_tokens = a_tokens if a_tokens is not None else a.split()
+    b_tokens = b_tokens if b_tokens is not None else b.split()
+    ratio = SequenceMatcher(None, a, b).ratio()
+    # Nom court = le plus court en caractères (abrégé), quel que soit son nombre de tokens
+    short, long = (a_tokens, b_tokens) if len(a) <= len(b) else (b_tokens, a_tokens)
+    cover = prefix_cover(short, long)
+    if cover >= 1.0:
+        return max(ratio, 0.9)
+    if ratio >= STRICT_RATIO:
+        return ratio
+    return ratio * cover
+
+class TeamNameIndex:
+    """Index des équipes API d'une ligue (ou de toutes les ligues pour les coupes)."""
+
+    def __init__(self, teams: Iterable[Dict[str, Any]] = ()):
+        self.teams: List[Dict[str, Any]] = []
+        self.normalized: List[str] = []
+        self.tokens: List[List[str]] = []
+        self.exact: Dict[str, int] = {}
+        self.by_id: Dict[Any, int] = {}
+        self.grams: Dict[str, List[int]] = defaultdict(list)
+        for team in teams:
+            self.add(team)
+
+    def add(self, team: Dict[str, Any]):
+        if team.get("id") is not None and team["id"] in self.by_id:
+            return
+        idx = len(self.teams)
+        toks = name_tokens(team["name"])
+        norm = " ".join(toks)
+        self.teams.append(team)
+        self.normalized.append(norm)
+        self.tokens.append(toks)
+        self.exact.setdefault(norm, idx)
+        if team.get("id") is not None:
+            self.by_id[team["id"]] = idx
+        for g in trigrams(norm):
+            self.grams[g].append(idx)
+
+    def __len__(self):
+        return len(self.teams)
+
+    def candidates(self, norm: str, limit: int = MAX_CANDIDATES) -> List[int]:
+        counts = Counter()
+        for g in trigrams(norm):
+            counts.update(self.grams.get(g, ()))
+        # Initiale du premier token : rattrape les abréviations ("Man" → "Manchester") pauvres en trigrammes
+        if norm:
+            counts.update(self.grams.get(f"  {norm[0]}", ()))
+        return [idx for idx, _ in counts.most_common(limit)]
+
+    def match(self, name: str, threshold: float = MATCH_THRESHOLD) -> Optional[Tuple[Dict[str, Any], float]]:
+        toks = name_tokens(name)
+        norm = " ".join(toks)
+        if norm in self.exact:
+            return self.teams[self.exact[norm]], 1.0
+        scored = sorted(((score_names(norm, self.normalized[idx], toks, self.tokens[idx]), idx)
+                         for idx in self.candidates(norm)), reverse=True)
+        if not scored or scored[0][0] <= threshold:
+            return None
+        best_score, best = scored[0]
+        # Deux candidats presque ex aequo ("Real" : Real Madrid / Real Betis) : pas de correspondance
+        if len(scored) > 1 and best_score - scored[1][0] < MATCH_MARGIN:
+            return None
+        return self.teams[best], best_score
+
+    def match_many(self, names: Iterable[str], threshold: float = MATCH_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name in names:
+            hit = self.match(name, threshold)
+            if hit:
+                out[name] = hit[0]
+        return out
+
+class MatchCache:
+    """Cache disque par (ligue, saison) : équipes API et correspondances déjà résolues."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, league_id, season) -> str:
+        return os.path.join(self.cache_dir, f"{league_id}_{season}.json")
+
+    def load(self, league_id, season) -> Dict[str, Any]:
+        path = self._path(league_id, season)
+        if not os.path.exists(path):
+            return {"api_teams": None, "mapping": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.setdefault("mapping", {})
+        return data
+
+    def save(self, league_id, season, api_teams: List[Dict[str, Any]], mapping: Dict[str, str]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path(league_id, season), "w", encoding="utf-8") as f:
+            json.dump({"api_teams": api_teams, "mapping": mapping}, f, indent=2, ensure_ascii=False)
+
+# Instance globale
+match_cache = MatchCache()
@@ -0,0 +1,177 @@
+# src/services/team_resolver.py
+"""
+Résolution d'identité des équipes sur le chemin chaud de l'ingestion.
+
+Table team_aliases (alias -> team_id canonique) chargée une fois en mémoire :
+- ids API-Football ("id:33") et noms normalisés ("name:manchester united") pointent vers le même entier,
+- amorcée depuis teams (noms API) et config/team_mapping.json (noms FD -> noms API, produit par TeamMapper),
+- un nom inconnu reçoit un id synthétique négatif (jamais en collision avec les ids API),
+- quand un id API arrive pour un nom rattaché à un id synthétique, l'id synthétique est fusionné
+  dans l'id API : alias re-pointés, matchs, team_stats et index dérivés migrés au flush,
+- les nouveaux alias sont accumulés puis écrits en un seul executemany (flush).
+"""
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+from src.models.database import db
+from src.services.team_name_matcher import normalize_name
+
+TEAM_MAPPING_PATH = "config/team_mapping.json"
+
+def id_alias(team_id) -> str:
+    return f"id:{int(team_id)}"
+
+def name_alias(name: str) -> str:
+    return f"name:{normalize_name(name)}"
+
+class TeamResolver:
+    def __init__(self, mapping_path: str = TEAM_MAPPING_PATH):
+        self.mapping_path = mapping_path
+        self.aliases: Dict[str, int] = {}
+        self.names: Dict[int, str] = {}
+        self.pending: List[Tuple[str, int, str]] = []
+        self.new_teams: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.merges: Dict[int, int] = {}
+        self.next_synthetic = -1
+        self.loaded = False
+
+    # ---------- chargement ----------
+    def load(self):
+        with db.get_connection() as conn:
+            for alias, team_id in conn.execute("SELECT alias, team_id FROM team_aliases").fetchall():
+                self.aliases[alias] = int(team_id)
+            for team_id, name in conn.execute("SELECT team_id, name FROM teams").fetchall():
+                if team_id is None:
+                    continue
+                self.names[int(team_id)] = name
+                self._remember(id_alias(team_id), int(team_id), "api")
+                if name:
+                    self._remember(name_alias(name), int(team_id), "api")
+            low = conn.execute("SELECT MIN(team_id) FROM team_aliases").fetchone()[0]
+        if low is not None and low < 0:
+            self.next_synthetic = int(low) - 1
+        self._seed_from_mapping()
+        self.loaded = True
+        return self
+
+    def _seed_from_mapping(self):
+        """Noms FD de team_mapping.json rattachés à l'id de leur équipe API (si connue)."""
+        if not os.path.exists(self.mapping_path):
+            return
+        with open(self.mapping_path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        for teams in mapping.values():
+            for fd_name, api_name in teams.items():
+                team_id = self.aliases.get(name_alias(api_name))
+                if team_id is not None:
+                    self._remember(name_alias(fd_name), team_id, "team_mapping")
+
+    def _remember(self, alias: str, team_id: int, source: str):
+        if alias in self.aliases:
+            return
+        self.aliases[alias] = team_id
+        self.pending.append((alias, team_id, source))
+
+    def _merge(self, synthetic: int, canonical: int):
+        """Re-pointe en mémoire les alias d'un id synthétique vers l'id API ; migration en base au flush."""
+        for alias, team_id in self.aliases.items():
+            if team_id == synthetic:
+                self.aliases[alias] = canonical
+        self.pending = [(a, canonical if t == synthetic else t, src) for a, t, src in self.pending]
+        for old, target in self.merges.items():
+            if target == synthetic:
+                self.merges[old] = canonical
+        self.merges[synthetic] = canonical
+        self.new_teams.pop(synthetic, None)
+        self.names.pop(synthetic, None)
+
+    # ---------- résolution (O(1)) ----------
+    def resolve(self, name: Optional[str] = None, team_id=None, league: Optional[str] = None) -> Optional[int]:
+        """
+        Renvoie l'id canonique. Un id API connu fait foi et enregistre le nom comme alias ;
+        un nom seul est cherché dans les alias, sinon un id synthétique négatif est créé.
+        """
+        if not self.loaded:
+            self.load()
+
+        if team_id is not None and str(team_id).strip().lstrip("-").isdigit():
+            canonical = self.aliases.get(id_alias(team_id), int(team_id))
+            self._remember(id_alias(team_id), canonical, "api")
+            if name:
+                previous = self.aliases.get(name_alias(name))
+                if previous is not None and previous < 0 <= canonical:
+                    # nom vu d'abord sans id (Football-Data) : l'id API remplace l'id synthétique
+                    self._merge(previous, canonical)
+                self._remember(name_alias(name), canonical, "api")
+            return canonical
+
+        if not name or not str(name).strip():
+            return None
+        key = name_alias(name)
+        canonical = self.aliases.get(key)
+        if canonical is None:
+            canonical = self.next_synthetic
+            self.next_synthetic -= 1
+            self._remember(key, canonical, "synthetic")
+            self.new_teams[canonical] = (str(name).strip(), league)
+        return canonical
+
+    def name_of(self, team_id: int) -> Optional[str]:
+        if team_id in self.names:
+            return self.names[team_id]
+        new = self.new_teams.get(team_id)
+        return new[0] if new else None
+
+    # ---------- écriture groupée ----------
+    def flush(self, conn=None) -> int:
+        """Écrit les nouveaux alias (et les équipes synthétiques) en une passe. Retourne le nb d'alias écrits."""
+        if conn is None:
+            with db.get_connection() as own:
+                n = self.flush(own)
+                own.commit()
+                return n
+        for synthetic, canonical in self.merges.items():
+            self._migrate(conn, synthetic, canonical)
+        if self.pending:
+            conn.executemany(
+                "INSERT OR IGNORE INTO team_aliases (alias, team_id, source) VALUES (?, ?, ?)",
+                self.pending,
+            )
+        if self.new_teams:
+            # teams.league_id est l'id de ligue API : un code Football-Data ('E0') n'y est pas écrit
+            conn.executemany(
+                "INSERT OR IGNORE INTO teams (team_id, name, league_id) VALUES (?, ?, ?)",
+                [(tid, name, int(league) if league is not None and str(league).isdigit() else None)
+                 for tid, (name, league) in self.new_teams.items()],
+            )
+            for tid, (name, _) in self.new_teams.items():
+                self.names[tid] = name
+        n = len(self.pending)
+        self.pending = []
+        self.new_teams = {}
+        self.merges = {}
+        return n
+
+    @staticmethod
+    def _migrate(conn, synthetic: int, canonical: int):
+        """Remplace un id synthétique par l'id API dans les alias, les matchs et les tables indexées par équipe."""
+        old, new = str(synthetic), str(canonical)
+        fixtures = [r[0] for r in conn.execute(
+            "SELECT CAST(fixture_id AS TEXT) FROM matches WHERE home_team_id = ? OR away_team_id = ?",
+            (synthetic, synthetic)).fetchall() if r[0] is not None]
+        conn.execute("UPDATE team_aliases SET team_id = ?, source = 'merge' WHERE team_id = ?", (canonical, synthetic))
+        conn.execute("UPDATE matches SET home_team_id = ? WHERE home_team_id = ?", (canonical, synthetic))
+        conn.execute("UPDATE matches SET away_team_id = ? WHERE away_team_id = ?", (canonical, synthetic))
+        conn.execute("DELETE FROM teams WHERE team_id = ?", (synthetic,))
+        # rating : celui de l'id API s'il existe déjà (build_elo_history rejoue de toute façon l'historique)
+        conn.execute("UPDATE OR IGNORE team_stats SET team_id = ? WHERE team_id = ?", (new, old))
+        conn.execute("DELETE FROM team_stats WHERE team_id = ?", (old,))
+        # index dérivés : l'équipe API sera recalculée avec les matchs migrés au prochain update
+        conn.execute("DELETE FROM team_form_features WHERE team = ?", (old,))
+        conn.execute("DELETE FROM h2h_summary WHERE team_a = ? OR team_b = ?", (old, old))
+        for i in range(0, len(fixtures), 500):
+            chunk = fixtures[i:i + 500]
+            conn.execute(f"DELETE FROM h2h_processed WHERE fixture_id IN ({', '.join('?' * len(chunk))})", chunk)
+
+# Instance globale (chargée au premier resolve)
+team_resolver = TeamResolver()
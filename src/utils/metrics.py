@@ -0,0 +1,273 @@
+# src/utils/metrics.py
+"""
+Instrumentation légère des chemins chauds (ingestion, ELO, prédictions) :
+
+    with metrics.stage("build_elo_history"):        # durée + compteurs de l'étape
+        with metrics.stage("replay"):               # sous-étape : build_elo_history.replay
+            ...
+        metrics.rows(len(snapshots))                # lignes produites / écrites
+
+    @metrics.timed("predict_elo")                   # appels fréquents : cumul predict_elo_s / _n
+    def predict_elo(...): ...
+
+Compteurs collectés automatiquement pour l'étape courante du thread :
+- SQLite : requêtes et temps passé (execute / executemany / fetch*) via TimedConnection,
+  la fabrique de connexions de src/models/database.py,
+- HTTP : appels, erreurs (statut >= 400), octets et temps de réponse via un hook de la session
+  partagée (src/api/http_client.py),
+- caches : metrics.cache_hit(hit) depuis les caches applicatifs.
+
+Les compteurs d'une sous-étape remontent dans son parent. À la fin d'une étape racine, toutes ses
+lignes sont écrites dans pipeline_metrics (METRICS=0 pour désactiver) et gardées en mémoire pour
+un rapport JSON (metrics.write_report). Le contexte est propre à chaque thread : les étapes
+parallèles du pipeline ne se mélangent pas.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+METRICS_ENABLED = os.getenv("METRICS", "1") != "0"
+
+# Colonnes dédiées de pipeline_metrics ; tout autre compteur va dans `extra` (JSON)
+COUNTERS = ("rows", "api_calls", "api_errors", "api_bytes", "api_time_s",
+            "cache_hits", "cache_misses", "sql_queries", "sql_time_s")
+
+class StageMetrics:
+    def __init__(self, name: str, parent: Optional["StageMetrics"] = None):
+        self.name = f"{parent.name}.{name}" if parent else name
+        self.parent = parent
+        self.started_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self.t0 = time.perf_counter()
+        self.duration_s: Optional[float] = None
+        self.status = "ok"
+        self.counters: Dict[str, float] = {}
+        self.children: List["StageMetrics"] = []
+
+    def add(self, key: str, value: float = 1):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def as_dict(self) -> Dict[str, Any]:
+        c = self.counters
+        hits, misses = c.get("cache_hits", 0), c.get("cache_misses", 0)
+        return {
+            "stage": self.name,
+            "started_at": self.started_at,
+            "duration_s": round(self.duration_s or 0.0, 4),
+            "status": self.status,
+            **{k: round(c.get(k, 0), 4) for k in COUNTERS},
+            "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "extra": {k: v for k, v in c.items() if k not in COUNTERS},
+        }
+
+class Metrics:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.run_id = self.new_run()
+        self.records: List[Dict[str, Any]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def new_run(self) -> str:
+        """Identifiant commun aux étapes d'un même passage (un run du pipeline)."""
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S-") + uuid.uuid4().hex[:6]
+        return self.run_id
+
+    # ---------- étapes ----------
+    def current(self) -> Optional[StageMetrics]:
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        sm = StageMetrics(name, parent)
+        stack.append(sm)
+        try:
+            yield sm
+        except BaseException:
+            sm.status = "failed"
+            raise
+        finally:
+            sm.duration_s = time.perf_counter() - sm.t0
+            stack.pop()
+            if parent is not None:
+                parent.children.append(sm)
+                for key, value in sm.counters.items():
+                    parent.add(key, value)
+            else:
+                self._finish(sm)
+
+    @contextmanager
+    def timer(self, key: str):
+        """Cumul dans l'étape courante (`<key>_s`, `<key>_n`) : pour les boucles chaudes, sans ligne par appel."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            sm = self.current()
+            if sm is not None:
+                sm.add(f"{key}_s", time.perf_counter() - t0)
+                sm.add(f"{key}_n")
+
+    def timed(self, key: Optional[str] = None):
+        """Décorateur de `timer`, nommé d'après la fonction par défaut."""
+        def decorator(func):
+            label = key or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def main(self, name: str, func, *args):
+        """Point d'entrée d'un script lancé seul : `exit(metrics.main("build_h2h", main))`."""
+        with self.stage(name):
+            return func(*args)
+
+    # ---------- compteurs ----------
+    def count(self, key: str, value: float = 1):
+        sm = self.current()
+        if sm is not None:
+            sm.add(key, value)
+
+    def rows(self, n: int):
+        self.count("rows", n)
+
+    def cache_hit(self, hit: bool):
+        self.count("cache_hits" if hit else "cache_misses")
+
+    def add_sql(self, elapsed: float, query: bool = True):
+        sm = self.current()
+        if sm is not None:
+            sm.add("sql_time_s", elapsed)
+            if query:
+                sm.add("sql_queries")
+
+    def http_hook(self, response, *args, **kwargs):
+        """Hook `response` de requests.Session."""
+        sm = self.current()
+        if sm is not None:
+            sm.add("api_calls")
+            if response.status_code >= 400:
+                sm.add("api_errors")
+            if kwargs.get("stream"):  # corps lu plus tard en flux : ne pas le charger ici
+                sm.add("api_bytes", int(response.headers.get("Content-Length") or 0))
+            else:
+                sm.add("api_bytes", len(response.content or b""))
+            if response.elapsed is not None:
+                sm.add("api_time_s", response.elapsed.total_seconds())
+        return response
+
+    # ---------- persistance ----------
+    def _finish(self, root: StageMetrics):
+        flat, todo = [], [root]
+        while todo:
+            sm = todo.pop()
+            flat.append(sm.as_dict())
+            todo.extend(reversed(sm.children))
+        with self._lock:
+            self.records.extend(flat)
+        if self.enabled:
+            try:
+                self.save(flat)
+            except sqlite3.Error as e:
+                print(f"⚠️ pipeline_metrics non écrite: {e}")
+
+    def save(self, records: List[Dict[str, Any]]):
+        from src.models.database import db  # import tardif : database importe TimedConnection
+        cols = ("stage", "started_at", "duration_s", "status") + COUNTERS
+        with db.get_connection() as conn:
+            conn.executemany(
+                f"INSERT INTO pipeline_metrics (run_id, {', '.join(cols)}, extra) "
+                f"VALUES ({', '.join('?' * (len(cols) + 2))})",
+                [(self.run_id, *(r[c] for c in cols), json.dumps(r["extra"]) if r["extra"] else None)
+                 for r in records],
+            )
+            conn.commit()
+
+    def write_report(self, path: str) -> str:
+        """Rapport JSON des étapes mesurées dans ce processus."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            stages = list(self.records)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"run_id": self.run_id, "stages": stages}, f, ensure_ascii=False, indent=2)
+        return path
+
+# Instance globale
+metrics = Metrics()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Connexion SQLite chronométrée (fabrique utilisée par Database)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            metrics.add_sql(time.perf_counter() - t0)
+
+    def executemany(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            metrics.add_sql(time.perf_counter() - t0)
+
+    def executescript(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(*args)
+        finally:
+            metrics.add_sql(time.perf_counter() - t0)
+
+    # Le pas à pas SQLite se fait pendant la lecture des lignes
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.add_sql(time.perf_counter() - t0, query=False)
+
+    def fetchmany(self, *args):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(*args)
+        finally:
+            metrics.add_sql(time.perf_counter() - t0, query=False)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.add_sql(time.perf_counter() - t0, query=False)
+
+class TimedConnection(sqlite3.Connection):
+    """Les raccourcis conn.execute* passent par TimedCursor (le module C ne rappelle pas cursor())."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
@@ -0,0 +1,29 @@
+# streamlit_app/components/data_cache.py
+"""
+Cache partagé des pages Streamlit, indexé sur la version des données (table data_version).
+
+Chaque script d'écriture incrémente la version ; les loaders décorés avec `versioned_cache`
+prennent cette version en premier argument : tant qu'elle ne change pas, les lectures
+sortent du cache (pas de TTL), et le premier rerun après un passage du pipeline relit la base.
+
+    @versioned_cache
+    def load_page(version: int, day: str): ...
+
+    df = load_page(data_version(), day)
+"""
+import streamlit as st
+from src.models.database import db
+
+# Quelques versions × paramètres suffisent : les anciennes versions ne sont plus jamais relues
+CACHE_MAX_ENTRIES = 64
+
+def data_version() -> int:
+    """Lecture d'une seule ligne, faite à chaque rerun."""
+    return db.get_data_version()
+
+def versioned_cache(func):
+    """st.cache_data sans expiration : la clé inclut déjà la version des données."""
+    return st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)(func)
+
+def version_caption(version: int):
+    st.sidebar.caption(f"🗃️ Données v{version}")
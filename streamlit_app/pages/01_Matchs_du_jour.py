@@ -1,91 +1,103 @@
 # streamlit_app/pages/01_Matchs_du_jour.py
+import math
 import streamlit as st
 import pandas as pd
-from src.models.database import db
-from src.services.elo_system import elo_system
-from src.services.odds_analyzer import odds_analyzer
-from src.services.clone_detector import clone_detector
+from datetime import datetime, timezone
+from config.settings import Settings
+from src.services.match_queries import match_queries, DEFAULT_PAGE_SIZE
+from streamlit_app.components.data_cache import data_version, versioned_cache, version_caption
 
 st.set_page_config(page_title="Matchs du jour", page_icon="🏆", layout="wide")
 st.title("🏆 Matchs & Value Bets")
 
-@st.cache_data(ttl=60)
-def load_data():
-    with db.get_connection() as conn:
-        matches = pd.read_sql_query("""
-            SELECT m.fixture_id, m.league_id, m.date, 
-                   m.home_team_id, th.name as home_team,
-                   m.away_team_id, ta.name as away_team
-            FROM matches m
-            LEFT JOIN teams th ON th.team_id = m.home_team_id
-            LEFT JOIN teams ta ON ta.team_id = m.away_team_id
-            ORDER BY date ASC
-        """, conn)
+MIN_VALUE = Settings.BETTING.MIN_VALUE
 
-        odds = pd.read_sql_query("""
-            SELECT fixture_id, bookmaker_name, home_odd, draw_odd, away_odd
-            FROM odds
-            ORDER BY fixture_id, bookmaker_name
-        """, conn)
+@versioned_cache
+def load_leagues(version: int, day: str):
+    return match_queries.list_leagues(day)
 
-        preds = pd.read_sql_query("""
-            SELECT fixture_id, selection, prob, odd, ev, kelly, confidence, created_at
-            FROM predictions ORDER BY created_at DESC
-        """, conn)
+@versioned_cache
+def load_count(version: int, day: str, league):
+    return match_queries.count_fixtures(day, league)
 
-        clones = pd.read_sql_query("""
-            SELECT fixture1_id, fixture2_id, similarity_score, clone_factors, created_at
-            FROM clone_matches ORDER BY created_at DESC
-        """, conn)
+@versioned_cache
+def load_page(version: int, day: str, league, page: int, page_size: int):
+    """Uniquement le jour / la ligue / la page demandés (cotes et ELO pré-joints en SQL)."""
+    fixtures = match_queries.get_fixtures_page(day, league, page, page_size)
+    details = match_queries.get_page_details([f["fixture_id"] for f in fixtures])
+    return (
+        pd.DataFrame(fixtures),
+        pd.DataFrame(details["odds"]),
+        pd.DataFrame(details["predictions"]),
+        pd.DataFrame(details["clones"]),
+    )
 
-    return matches, odds, preds, clones
+version = data_version()
+version_caption(version)
 
-matches, odds, preds, clones = load_data()
+with st.sidebar:
+    day = st.date_input("Jour", value=datetime.now(timezone.utc).date()).isoformat()
+    leagues = load_leagues(version, day)
+    league_options = [None] + [l["league"] for l in leagues]
+    league_counts = {l["league"]: l["n"] for l in leagues}
+    league = st.selectbox(
+        "Ligue",
+        options=league_options,
+        format_func=lambda x: "Toutes" if x is None else f"{x} ({league_counts.get(x, 0)})",
+    )
+    page_size = st.selectbox("Matchs par page", options=[10, 20, 50], index=[10, 20, 50].index(DEFAULT_PAGE_SIZE))
+
+total = load_count(version, day, league)
+pages = max(1, math.ceil(total / page_size))
+page = st.sidebar.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+
+matches, odds, preds, clones = load_page(version, day, league, int(page), int(page_size))
 
 if matches.empty:
-    st.info("Aucun match en base. Lance d'abord le seed et la génération de prédictions.")
+    st.info("Aucun match en base pour ce jour. Lance d'abord l'ingestion et la génération de prédictions.")
 else:
+    st.caption(f"{total} matchs — page {int(page)}/{pages}")
     for _, row in matches.iterrows():
-        fid = int(row["fixture_id"])
+        fid = str(row["fixture_id"])
         st.subheader(f"Fixture {fid}: {row['home_team']} vs {row['away_team']} — {row['date']}")
 
         # Odds table
-        o = odds[odds.fixture_id == fid]
+        o = odds[odds.fixture_id.astype(str) == fid] if not odds.empty else odds
         st.caption("Cotes disponibles")
         st.dataframe(o, use_container_width=True)
 
-        # ELO & Probas
-        p = elo_system.predict_match(int(row["home_team_id"]), int(row["away_team_id"]))
+        # ELO & Probas (pré-calculés par la couche de requêtes)
         col1, col2, col3, col4, col5 = st.columns(5)
-        col1.metric("ELO Home", f"{p['home_elo']:.0f}")
-        col2.metric("ELO Away", f"{p['away_elo']:.0f}")
-        col3.metric("P(Home)", f"{p['home_win_prob']*100:.1f}%")
-        col4.metric("P(Nul)", f"{p['draw_prob']*100:.1f}%")
-        col5.metric("P(Away)", f"{p['away_win_prob']*100:.1f}%")
+        col1.metric("ELO Home", f"{row['home_elo']:.0f}")
+        col2.metric("ELO Away", f"{row['away_elo']:.0f}")
+        col3.metric("P(Home)", f"{row['home_win_prob']*100:.1f}%")
+        col4.metric("P(Nul)", f"{row['draw_prob']*100:.1f}%")
+        col5.metric("P(Away)", f"{row['away_win_prob']*100:.1f}%")
 
         # Predictions/value bets
-        pv = preds[preds.fixture_id == fid]
+        pv = preds[preds.fixture_id.astype(str) == fid] if not preds.empty else preds
+        if not pv.empty:
+            pv = pv[pv.prob * pv.odd >= MIN_VALUE]
         if pv.empty:
             st.warning("Pas de value bet retenu pour ce match.")
         else:
             st.success("Value bets détectés :")
             st.dataframe(
-                pv[["selection","prob","odd","ev","kelly","confidence"]]
+                pv[["method","market","selection","prob","odd","value"]]
                   .assign(prob=lambda d: (d.prob*100).round(1),
-                          ev=lambda d: d.ev.round(3),
-                          kelly=lambda d: (d.kelly*100).round(1),
-                          confidence=lambda d: (d.confidence*100).round(0))
-                  .rename(columns={"prob":"Prob (%)","ev":"EV","kelly":"Kelly (%)","confidence":"Confiance (%)"}),
+                          value=lambda d: d.value.round(3))
+                  .rename(columns={"method":"Méthode","market":"Marché","prob":"Prob (%)","value":"Value"}),
                 use_container_width=True
             )
 
         # Clones où ce match apparaît
-        cc = clones[(clones.fixture1_id == fid) | (clones.fixture2_id == fid)]
-        if not cc.empty:
-            st.info("Clones détectés sur ce match :")
-            st.dataframe(
-                cc.assign(similarity_score=lambda d: (d.similarity_score*100).round(1))
-                  .rename(columns={"similarity_score":"Similarity (%)", "clone_factors":"Facteurs"}),
-                use_container_width=True
-            )
+        if not clones.empty:
+            cc = clones[(clones.fixture1_id.astype(str) == fid) | (clones.fixture2_id.astype(str) == fid)]
+            if not cc.empty:
+                st.info("Clones détectés sur ce match :")
+                st.dataframe(
+                    cc.assign(similarity_score=lambda d: (d.similarity_score*100).round(1))
+                      .rename(columns={"similarity_score":"Similarity (%)", "clone_factors":"Facteurs"}),
+                    use_container_width=True
+                )
         st.divider()
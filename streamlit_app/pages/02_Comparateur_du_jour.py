@@ -1,8 +1,10 @@
 # streamlit_app/pages/02_Comparateur_du_jour.py
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from src.models.database import db
+from src.services import prediction_matrix
+from streamlit_app.components.data_cache import data_version, versioned_cache, version_caption
 from config.settings import Settings
 
 st.set_page_config(page_title="Comparateur (ELO / B365 / PIN / Combined)", page_icon="🧮", layout="wide")
@@ -10,32 +12,36 @@ st.title("🧮 Comparateur — ELO vs Codes (Bet365 / Pinnacle) vs Combiné")
 
 MIN_VALUE = Settings.BETTING.MIN_VALUE
 
-@st.cache_data(ttl=60)
-def load_today_data():
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+@versioned_cache
+def load_today_data(version: int, day: str):
+    today = datetime.strptime(day, "%Y-%m-%d").date()
+    start, end = today.isoformat(), (today + timedelta(days=1)).isoformat()
     with db.get_connection() as conn:
+        prediction_matrix.ensure_schema(conn)
         matches = pd.read_sql_query("""
-            SELECT m.fixture_id, m.league_id, m.date, m.home_team_id, m.away_team_id, 
-                   th.name as home_team, ta.name as away_team
+            SELECT m.fixture_id, m.league_id, m.date, m.home_team_id, m.away_team_id,
+                   COALESCE(th.name, m.home_team) as home_team, COALESCE(ta.name, m.away_team) as away_team
             FROM matches m
             LEFT JOIN teams th ON th.team_id=m.home_team_id
             LEFT JOIN teams ta ON ta.team_id=m.away_team_id
-            WHERE substr(m.date,1,10)=?
+            WHERE m.date >= ? AND m.date < ?
             ORDER BY m.date ASC
-        """, conn, params=(today,))
+        """, conn, params=(start, end))
 
-        preds = pd.read_sql_query("""
-            SELECT fixture_id, market, selection, source_method, prob, odd, ev, kelly, confidence, created_at
-            FROM predictions
-            WHERE substr(created_at,1,10) >= date('now','-1 day')  -- sécurité
-        """, conn)
+        # Vue pivotée: une ligne par (fixture, marché, sélection), colonnes par méthode
+        matrix = pd.read_sql_query("""
+            SELECT pm.*
+            FROM prediction_matrix pm
+            WHERE pm.fixture_id IN (SELECT CAST(fixture_id AS TEXT) FROM matches WHERE date >= ? AND date < ?)
+        """, conn, params=(start, end))
 
         method_stats = pd.read_sql_query("""
             SELECT fixture_id, method, sample_size, home_win_pct, draw_pct, away_win_pct, over25_pct, btts_yes_pct
             FROM method_stats
-        """, conn)
+            WHERE fixture_id IN (SELECT fixture_id FROM matches WHERE date >= ? AND date < ?)
+        """, conn, params=(start, end))
 
-    return matches, preds, method_stats
+    return matches, matrix, method_stats
 
 def fancy_pct(x):
     return f"{x*100:.1f}%" if pd.notnull(x) else "—"
@@ -44,100 +50,89 @@ def value_tag(ev):
     if pd.isna(ev): return ""
     return "✅ Value" if ev >= MIN_VALUE else ""
 
-def build_market_table(preds_df: pd.DataFrame, market: str, samples_row_b365, samples_row_pin):
-    """
-    Construit un tableau comparatif pour un marché donné:
-    Colonnes: Selection, Odd, ELO Prob/EV, B365 Prob/EV, PIN Prob/EV, COMBINED Prob/EV, Value? (sur EV COMBINED).
-    """
-    df = preds_df[preds_df["market"] == market].copy()
-    if df.empty:
-        return pd.DataFrame()
+MARKET_SELECTIONS = {
+    "1X2": ["HOME", "DRAW", "AWAY"],
+    "OU25": ["OVER25", "UNDER25"],
+    "BTTS": ["BTTS_YES", "BTTS_NO"],
+}
 
-    # Pivot des probs & EV par méthode
-    def pick(selection, method, field):
-        rows = df[(df.selection == selection) & (df.source_method == method)]
-        return rows[field].iloc[0] if not rows.empty else None
-
-    selections = []
+def sample_footer(market: str, label: str, samples_row) -> str:
+    foot = f"📊 {label} échantillon: {int(samples_row['sample_size'])} matchs — "
     if market == "1X2":
-        selections = ["HOME", "DRAW", "AWAY"]
+        foot += f"HW={fancy_pct(samples_row['home_win_pct'])}, D={fancy_pct(samples_row['draw_pct'])}, AW={fancy_pct(samples_row['away_win_pct'])}"
     elif market == "OU25":
-        selections = ["OVER25", "UNDER25"]
+        foot += f"Over2.5={fancy_pct(samples_row['over25_pct'])}"
     elif market == "BTTS":
-        selections = ["BTTS_YES", "BTTS_NO"]
-
-    rows = []
-    for sel in selections:
-        odd = pick(sel, "COMBINED", "odd") or pick(sel, "B365", "odd") or pick(sel, "PINNACLE", "odd") or pick(sel, "ELO", "odd")
-        elo_prob = pick(sel, "ELO", "prob")
-        elo_ev   = pick(sel, "ELO", "ev")
-        b_prob   = pick(sel, "B365", "prob")
-        b_ev     = pick(sel, "B365", "ev")
-        p_prob   = pick(sel, "PINNACLE", "prob")
-        p_ev     = pick(sel, "PINNACLE", "ev")
-        c_prob   = pick(sel, "COMBINED", "prob")
-        c_ev     = pick(sel, "COMBINED", "ev")
-
-        rows.append({
-            "Sélection": sel,
-            "Cote": odd,
-            "ELO Prob": elo_prob, "ELO EV": elo_ev,
-            "B365 Prob": b_prob,  "B365 EV": b_ev,
-            "PIN Prob": p_prob,   "PIN EV": p_ev,
-            "COMB Prob": c_prob,  "COMB EV": c_ev,
-            "Value?": value_tag(c_ev)
-        })
-
-    out = pd.DataFrame(rows)
+        foot += f"BTTS Yes={fancy_pct(samples_row['btts_yes_pct'])}"
+    return foot
+
+def build_market_table(fixture_matrix: pd.DataFrame, market: str, samples_row_b365, samples_row_pin):
+    """
+    Construit un tableau comparatif pour un marché donné, directement depuis la vue pivotée:
+    Colonnes: Selection, Odd, ELO Prob/EV, B365 Prob/EV, PIN Prob/EV, COMBINED Prob/EV, POISSON Prob/EV,
+    Value? (sur EV COMBINED).
+    """
+    df = fixture_matrix[fixture_matrix["market"] == market]
+    if df.empty:
+        return pd.DataFrame(), ""
+
+    order = {sel: i for i, sel in enumerate(MARKET_SELECTIONS.get(market, []))}
+    df = df.assign(_order=df["selection"].map(order)).sort_values("_order")
+    # Vue pivotée antérieure à la méthode POISSON : colonnes absentes jusqu'au prochain generate_predictions
+    df = df.reindex(columns=df.columns.union(["poisson_prob", "poisson_ev"], sort=False))
+
+    out = pd.DataFrame({
+        "Sélection": df["selection"].values,
+        "Cote": df["combined_odd"].fillna(df["b365_odd"]).fillna(df["pinnacle_odd"]).fillna(df["elo_odd"]).values,
+        "ELO Prob": df["elo_prob"].values, "ELO EV": df["elo_ev"].values,
+        "B365 Prob": df["b365_prob"].values, "B365 EV": df["b365_ev"].values,
+        "PIN Prob": df["pinnacle_prob"].values, "PIN EV": df["pinnacle_ev"].values,
+        "COMB Prob": df["combined_prob"].values, "COMB EV": df["combined_ev"].values,
+        "POIS Prob": df["poisson_prob"].values, "POIS EV": df["poisson_ev"].values,
+        "Value?": [value_tag(ev) for ev in df["combined_ev"].values],
+    })
     # mise en forme lisible
-    for col in ["ELO Prob","B365 Prob","PIN Prob","COMB Prob"]:
-        out[col] = out[col].apply(lambda x: fancy_pct(x) if pd.notnull(x) else "—")
-    for col in ["Cote","ELO EV","B365 EV","PIN EV","COMB EV"]:
+    for col in ["ELO Prob","B365 Prob","PIN Prob","COMB Prob","POIS Prob"]:
+        out[col] = out[col].apply(fancy_pct)
+    for col in ["Cote","ELO EV","B365 EV","PIN EV","COMB EV","POIS EV"]:
         out[col] = out[col].apply(lambda x: f"{x:.3f}" if pd.notnull(x) else "—")
 
     # Ajouter info sample sizes pour B365 / PIN si disponible
-    foot = ""
+    foots = []
     if samples_row_b365 is not None:
-        foot += f"📊 B365 échantillon: {int(samples_row_b365['sample_size'])} matchs — "
-        if market == "1X2":
-            foot += f"HW={fancy_pct(samples_row_b365['home_win_pct'])}, D={fancy_pct(samples_row_b365['draw_pct'])}, AW={fancy_pct(samples_row_b365['away_win_pct'])}"
-        elif market == "OU25":
-            foot += f"Over2.5={fancy_pct(samples_row_b365['over25_pct'])}"
-        elif market == "BTTS":
-            foot += f"BTTS Yes={fancy_pct(samples_row_b365['btts_yes_pct'])}"
+        foots.append(sample_footer(market, "B365", samples_row_b365))
     if samples_row_pin is not None:
-        foot += " | " if foot else ""
-        foot += f"📊 Pinnacle échantillon: {int(samples_row_pin['sample_size'])} matchs — "
-        if market == "1X2":
-            foot += f"HW={fancy_pct(samples_row_pin['home_win_pct'])}, D={fancy_pct(samples_row_pin['draw_pct'])}, AW={fancy_pct(samples_row_pin['away_win_pct'])}"
-        elif market == "OU25":
-            foot += f"Over2.5={fancy_pct(samples_row_pin['over25_pct'])}"
-        elif market == "BTTS":
-            foot += f"BTTS Yes={fancy_pct(samples_row_pin['btts_yes_pct'])}"
+        foots.append(sample_footer(market, "Pinnacle", samples_row_pin))
 
-    return out, foot
+    return out, " | ".join(foots)
 
-matches, preds, method_stats = load_today_data()
+version = data_version()
+version_caption(version)
+matches, matrix, method_stats = load_today_data(version, datetime.now(timezone.utc).date().isoformat())
 
 if matches.empty:
     st.info("Aucun match aujourd'hui dans la base. Assure-toi que le workflow a tourné (`update_data.py` + `generate_predictions.py`).")
     st.stop()
 
+# Index par fixture (un seul passage) plutôt qu'un filtrage du DataFrame complet par match
+matrix_by_fixture = {str(fid): g for fid, g in matrix.groupby("fixture_id")} if not matrix.empty else {}
+stats_by_key = {(str(r.fixture_id), r.method): r for r in method_stats.itertuples(index=False)}
+
 for _, m in matches.iterrows():
-    fid = int(m["fixture_id"])
+    fid = str(m["fixture_id"])
     st.subheader(f"Fixture {fid} — {m['home_team']} vs {m['away_team']} — {m['date']}")
 
-    pv = preds[preds.fixture_id == fid].copy()
-    if pv.empty:
-        st.warning("Pas de prédictions pour ce match (vérifie que `odds_method_stats` et `generate_predictions` ont tourné).")
+    pv = matrix_by_fixture.get(fid)
+    if pv is None or pv.empty:
+        st.warning("Pas de prédictions pour ce match (vérifie que `generate_predictions` a tourné).")
         st.divider()
         continue
 
     # Méthode stats (samples) par bookmaker
-    b365 = method_stats[(method_stats.fixture_id == fid) & (method_stats.method == "B365")]
-    b365 = b365.iloc[0] if not b365.empty else None
-    pin  = method_stats[(method_stats.fixture_id == fid) & (method_stats.method == "PINNACLE")]
-    pin  = pin.iloc[0] if not pin.empty else None
+    b365 = stats_by_key.get((fid, "B365"))
+    b365 = b365._asdict() if b365 is not None else None
+    pin = stats_by_key.get((fid, "PINNACLE"))
+    pin = pin._asdict() if pin is not None else None
 
     # 1X2
     t1x2, foot1 = build_market_table(pv, "1X2", b365, pin)
@@ -167,13 +162,14 @@ for _, m in matches.iterrows():
         st.info("Pas de données BTTS pour ce match.")
 
     # Synthèse recommandations: on liste les selections COMBINED avec EV >= MIN_VALUE
-    recs = pv[(pv.source_method == "COMBINED") & (pv.ev >= MIN_VALUE)][["market","selection","prob","odd","ev","kelly"]].copy()
+    recs = pv[pv["combined_ev"] >= MIN_VALUE][["market","selection","combined_prob","combined_odd","combined_ev"]].copy()
     if not recs.empty:
         st.success("Recommandations (méthode COMBINED) — EV ≥ seuil :")
-        recs["Prob (%)"] = (recs["prob"]*100).round(1)
-        recs["Odd"] = recs["odd"].round(3)
-        recs["EV"] = recs["ev"].round(3)
-        recs["Kelly (%)"] = (recs["kelly"]*100).round(1)
+        b = recs["combined_odd"] - 1.0
+        recs["Prob (%)"] = (recs["combined_prob"]*100).round(1)
+        recs["Odd"] = recs["combined_odd"].round(3)
+        recs["EV"] = recs["combined_ev"].round(3)
+        recs["Kelly (%)"] = (((b * recs["combined_prob"] - (1.0 - recs["combined_prob"])) / b).clip(lower=0)*100).round(1)
         st.dataframe(recs[["market","selection","Prob (%)","Odd","EV","Kelly (%)"]], use_container_width=True)
     else:
         st.info("Aucune recommandation COMBINED (EV insuffisant).")
@@ -1,110 +1,71 @@
 # streamlit_app/pages/03_Dashboard_performance.py
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timezone
 from config.settings import Settings
 from src.models.database import db
+from streamlit_app.components.data_cache import data_version, versioned_cache, version_caption
 
 st.set_page_config(page_title="Dashboard Performance", page_icon="📊", layout="wide")
 st.title("📊 Dashboard — Performance par méthode & marché")
 
 MIN_VALUE = Settings.BETTING.MIN_VALUE
 
-@st.cache_data(ttl=120)
-def load_history():
+@versioned_cache
+def load_best_ev_stats(version: int):
+    """Agrégats précalculés (politique MAX_EV) par méthode & marché."""
     with db.get_connection() as conn:
-        matches = pd.read_sql_query("""
-            SELECT fixture_id, date, goals_home, goals_away
-            FROM matches
-            WHERE goals_home IS NOT NULL AND goals_away IS NOT NULL
-            ORDER BY date DESC
+        return pd.read_sql_query("""
+            SELECT method AS source_method, market,
+                   SUM(best_bets) AS bets, SUM(best_wins) AS wins, SUM(best_units) AS units
+            FROM bet_daily_stats
+            GROUP BY method, market
         """, conn)
-        preds = pd.read_sql_query("""
-            SELECT fixture_id, market, selection, source_method, prob, odd, ev, kelly, created_at
-            FROM predictions
-        """, conn)
-    return matches, preds
-
-def settle_bet(row, gh, ga):
-    """Renvoie 1 si gagné, 0 si perdu. Marchés: 1X2, OU25, BTTS."""
-    if row["market"] == "1X2":
-        if row["selection"] == "HOME": return 1 if gh > ga else 0
-        if row["selection"] == "DRAW": return 1 if gh == ga else 0
-        if row["selection"] == "AWAY": return 1 if gh < ga else 0
-        return 0
-    if row["market"] == "OU25":
-        total = gh + ga
-        if row["selection"] == "OVER25": return 1 if total > 2.5 else 0
-        if row["selection"] == "UNDER25": return 1 if total < 2.5 else 0
-        return 0
-    if row["market"] == "BTTS":
-        both = (gh > 0 and ga > 0)
-        if row["selection"] == "BTTS_YES": return 1 if both else 0
-        if row["selection"] == "BTTS_NO":  return 1 if (not both) else 0
-        return 0
-    return 0
 
-def evaluate_performance(matches, preds, ev_threshold: float, pick_policy: str):
+@versioned_cache
+def load_threshold_stats(version: int, ev_threshold: float):
+    """Toutes les bets réglées avec EV >= seuil, agrégées côté SQL."""
+    with db.get_connection() as conn:
+        return pd.read_sql_query("""
+            SELECT method AS source_method, market,
+                   COUNT(*) AS bets, SUM(won) AS wins, SUM(pnl) AS units
+            FROM settled_bets
+            WHERE pnl IS NOT NULL AND ev >= ?
+            GROUP BY method, market
+        """, conn, params=(ev_threshold,))
+
+def evaluate_performance(version: int, ev_threshold: float, pick_policy: str):
     """
     pick_policy:
-      - 'MAX_EV': sélectionne la ligne de prédiction (par fixture/méthode/marché) à EV max
-      - 'EV_THRESHOLD_ALL': prend toutes les lignes EV >= seuil (multiple bets possible)
+      - 'MAX_EV': la ligne de prédiction (par fixture/méthode/marché) à EV max
+      - 'EV_THRESHOLD_ALL': toutes les lignes EV >= seuil (multiple bets possible)
+    Les paris sont réglés en amont par scripts/settle_bets.py (table settled_bets).
     """
-    # Restreindre aux fixtures déjà joués
-    past_ids = set(matches["fixture_id"].tolist())
-    p = preds[preds.fixture_id.isin(past_ids)].copy()
-    if p.empty:
-        return pd.DataFrame(columns=["source_method","market","bets","wins","winrate","roi","units"])
-
-    # On évalue séparément par méthode & marché
-    out_rows = []
-    for (method, market), g in p.groupby(["source_method","market"]):
-        # join goals
-        g = g.merge(matches[["fixture_id","goals_home","goals_away"]], on="fixture_id", how="left")
-        g = g.dropna(subset=["goals_home","goals_away"])
-        # politique de sélection
-        if pick_policy == "MAX_EV":
-            # garder la meilleure EV par fixture
-            g = g.sort_values(["fixture_id","ev"], ascending=[True, False])
-            g = g.groupby("fixture_id", as_index=False).first()
-        else:  # EV_THRESHOLD_ALL
-            g = g[g["ev"] >= ev_threshold]
+    if pick_policy == "MAX_EV":
+        out = load_best_ev_stats(version)
+    else:  # EV_THRESHOLD_ALL
+        out = load_threshold_stats(version, ev_threshold)
 
-        if g.empty:
-            continue
-
-        g["win"] = g.apply(lambda r: settle_bet(r, int(r["goals_home"]), int(r["goals_away"])), axis=1)
-
-        # Flat stake 1u
-        g["pl"] = g.apply(lambda r: (r["odd"] - 1.0) if r["win"] == 1 else -1.0, axis=1)
-
-        bets = len(g)
-        wins = int(g["win"].sum())
-        winrate = wins / bets if bets else 0.0
-        units = g["pl"].sum()
-        roi = units / bets if bets else 0.0
+    out = out[out["bets"] > 0].copy()
+    if out.empty:
+        return pd.DataFrame(columns=["source_method","market","bets","wins","winrate","roi","units"])
 
-        out_rows.append({
-            "source_method": method,
-            "market": market,
-            "bets": bets,
-            "wins": wins,
-            "winrate": winrate,
-            "roi": roi,
-            "units": units
-        })
+    out["wins"] = out["wins"].fillna(0).astype(int)
+    out["units"] = out["units"].fillna(0.0)
+    out["winrate"] = (out["wins"] / out["bets"] * 100).round(1)
+    out["roi"] = (out["units"] / out["bets"] * 100).round(1)
+    out["units"] = out["units"].round(2)
+    return out[["source_method","market","bets","wins","winrate","roi","units"]].sort_values(["market","source_method"])
 
-    out = pd.DataFrame(out_rows)
-    if not out.empty:
-        out["winrate"] = (out["winrate"]*100).round(1)
-        out["roi"] = (out["roi"]*100).round(1)
-        out["units"] = out["units"].round(2)
-    return out.sort_values(["market","source_method"])
+@versioned_cache
+def has_settled_bets(version: int) -> bool:
+    with db.get_connection() as conn:
+        return conn.execute("SELECT 1 FROM settled_bets LIMIT 1").fetchone() is not None
 
-matches, preds = load_history()
+version = data_version()
+version_caption(version)
 
-if matches.empty or preds.empty:
-    st.info("Pas encore assez d'historique pour calculer les performances.")
+if not has_settled_bets(version):
+    st.info("Pas encore assez d'historique pour calculer les performances (lance `scripts/settle_bets.py`).")
     st.stop()
 
 colA, colB, colC = st.columns(3)
@@ -120,7 +81,7 @@ with colB:
 with colC:
     st.write("")
 
-perf = evaluate_performance(matches, preds, ev_threshold, pick_policy)
+perf = evaluate_performance(version, ev_threshold, pick_policy)
 
 if perf.empty:
     st.info("Aucune bet à évaluer avec ces critères.")
@@ -0,0 +1,97 @@
+# streamlit_app/pages/04_Metriques_pipeline.py
+import json
+import streamlit as st
+import pandas as pd
+from src.models.database import db
+from streamlit_app.components.data_cache import versioned_cache
+
+st.set_page_config(page_title="Métriques pipeline", page_icon="⏱️", layout="wide")
+st.title("⏱️ Métriques du pipeline — durées & compteurs par étape")
+
+METRIC_LABELS = {
+    "duration_s": "Durée (s)",
+    "sql_time_s": "Temps SQLite (s)",
+    "sql_queries": "Requêtes SQLite",
+    "api_calls": "Appels API",
+    "api_time_s": "Temps API (s)",
+    "rows": "Lignes produites",
+    "cache_hit_rate": "Taux de succès cache",
+}
+
+def metrics_version() -> int:
+    """Dernier id de pipeline_metrics : clé de cache (les métriques n'incrémentent pas data_version)."""
+    with db.get_connection() as conn:
+        row = conn.execute("SELECT MAX(id) FROM pipeline_metrics").fetchone()
+    return int(row[0] or 0)
+
+@versioned_cache
+def load_metrics(version: int, days: int) -> pd.DataFrame:
+    with db.get_connection() as conn:
+        df = pd.read_sql_query("""
+            SELECT run_id, stage, started_at, duration_s, status, rows, api_calls, api_errors, api_bytes,
+                   api_time_s, cache_hits, cache_misses, sql_queries, sql_time_s, extra
+            FROM pipeline_metrics
+            WHERE started_at >= datetime('now', ?)
+            ORDER BY started_at, id
+        """, conn, params=(f"-{int(days)} days",))
+    if df.empty:
+        return df
+    df["started_at"] = pd.to_datetime(df["started_at"])
+    lookups = df["cache_hits"] + df["cache_misses"]
+    df["cache_hit_rate"] = (df["cache_hits"] / lookups).where(lookups > 0)
+    df["depth"] = df["stage"].str.count(r"\.")
+    return df
+
+version = metrics_version()
+st.sidebar.caption(f"🗃️ Métriques #{version}")
+
+if version == 0:
+    st.info("Aucune métrique enregistrée (lance `python -u run.py` ou un script instrumenté).")
+    st.stop()
+
+colA, colB, colC = st.columns(3)
+with colA:
+    days = st.slider("Historique (jours)", min_value=1, max_value=180, value=30)
+with colB:
+    metric = st.selectbox("Indicateur", options=list(METRIC_LABELS), format_func=METRIC_LABELS.get)
+with colC:
+    show_sub = st.checkbox("Inclure les sous-étapes", value=False)
+
+df = load_metrics(version, days)
+if df.empty:
+    st.info("Aucune métrique sur la période.")
+    st.stop()
+
+view = df if show_sub else df[df["depth"] == 0]
+stages = sorted(view["stage"].unique())
+selected = st.multiselect("Étapes", options=stages, default=stages[:8])
+view = view[view["stage"].isin(selected)]
+
+# Tendance : une série par étape (moyenne si plusieurs passages à la même seconde)
+st.subheader(f"Tendance — {METRIC_LABELS[metric]}")
+trend = view.pivot_table(index="started_at", columns="stage", values=metric, aggfunc="mean")
+if trend.empty:
+    st.info("Rien à tracer pour cette sélection.")
+else:
+    st.line_chart(trend, use_container_width=True)
+
+# Dernier passage vs médiane des passages précédents : repère les régressions
+st.subheader("Dernier passage vs médiane historique")
+last_idx = view.groupby("stage").tail(1).index
+latest = view.loc[last_idx].set_index("stage")
+median = view.drop(last_idx).groupby("stage")[["duration_s", "sql_time_s", "api_calls", "rows"]].median()
+summary = latest[["started_at", "duration_s", "sql_time_s", "sql_queries", "api_calls", "rows", "cache_hit_rate"]].join(
+    median.add_suffix("_median"))
+summary["Δ durée (%)"] = ((summary["duration_s"] / summary["duration_s_median"] - 1) * 100).round(1)
+st.dataframe(summary.sort_values("duration_s", ascending=False), use_container_width=True)
+
+# Compteurs libres (timers des fonctions chaudes : *_s / *_n) du dernier passage
+st.subheader("Détail des timers (dernier passage)")
+rows = []
+for stage, raw in latest["extra"].dropna().items():
+    for key, value in json.loads(raw).items():
+        rows.append({"Étape": stage, "Compteur": key, "Valeur": round(value, 4)})
+if rows:
+    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+else:
+    st.caption("Aucun timer détaillé.")
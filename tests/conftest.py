@@ -0,0 +1,30 @@
+# tests/conftest.py
+"""
+Base SQLite temporaire pour toute la session (DB_PATH fixé avant l'import de src.models.database),
+vidée avant chaque test. Lancer depuis la racine : python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="football-tests-"), "football.db")
+os.environ.setdefault("METRICS", "0")
+
+import pytest
+
+from src.models.database import db
+from src.services.elo_system import elo_system
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    with db.get_connection() as conn:
+        tables = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            " AND name <> 'data_version'").fetchall()]
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+    elo_system.reload_config()
+    yield
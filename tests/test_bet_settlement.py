@@ -0,0 +1,33 @@
+# tests/test_bet_settlement.py
+from datetime import datetime, timezone
+
+from src.models.database import db
+from src.services.bet_settlement import bet_settlement
+
+KICKOFF = datetime(2024, 3, 2, 15, 0, tzinfo=timezone.utc)
+
+def snapshot(conn, bookmaker_id, minutes_to_kickoff, p1, p2, p3=None, market="1x2"):
+    ts = int(KICKOFF.timestamp()) - 60 * minutes_to_kickoff
+    conn.execute("INSERT INTO odds_snapshots (fixture_id, market, bookmaker_id, ts, p1, p2, p3) VALUES ('900', ?, ?, ?, ?, ?, ?)",
+                 (market, bookmaker_id, ts, p1, p2, p3))
+
+def test_closing_odds_are_last_pre_kickoff_prices():
+    db.insert_match(date=KICKOFF.isoformat(), home_team="Home", away_team="Away", home_score=1, away_score=0,
+                    status="FT", league="39", season="2023", fixture_id="900")
+    with db.get_connection() as conn:
+        snapshot(conn, 4, 600, 2.10, 3.40, 3.60)   # Pinnacle, ouverture
+        snapshot(conn, 4, 10, 1.95, 3.50, 4.00)    # Pinnacle, clôture
+        snapshot(conn, 4, -30, 1.20, 5.00, 9.00)   # en jeu : ignorée
+        snapshot(conn, 8, 10, 2.05, 3.30, 3.70)    # Bet365 : meilleur prix domicile
+        snapshot(conn, 8, 10, 1.80, 2.00, market="btts")  # BTTS sans Pinnacle : moyenne
+        snapshot(conn, 6, 10, 1.90, 1.90, market="btts")
+        # O/U 2.5 jamais capturé : cote courante, même si le match a des captures 1X2
+        conn.execute("INSERT INTO ou25_odds (fixture_id, bookmaker_id, over25_odd, under25_odd) VALUES (900, 4, 1.75, 2.15)")
+        conn.commit()
+
+        closing = bet_settlement.closing_odds(conn, ["900"])
+
+    assert closing[("900", "HOME")] == 1.95
+    assert closing[("900", "AWAY")] == 4.00
+    assert closing[("900", "BTTS_YES")] == 1.85
+    assert closing[("900", "OVER25")] == 1.75
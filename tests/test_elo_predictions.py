@@ -0,0 +1,79 @@
+# tests/test_elo_predictions.py
+from scripts import build_elo_history
+from scripts.generate_predictions import FootballPredictor
+from src.models.database import db
+from src.services.elo_system import save_league_params
+
+LEAGUE = "39"
+
+def add_match(fixture_id, date, home, away, gh=None, ga=None):
+    """Match ingéré comme fetch_today : noms bruts + ids canoniques (TeamResolver)."""
+    db.insert_match(date=date, home_team=f"Team {home}", away_team=f"Team {away}", home_score=gh, away_score=ga,
+                    status="FT" if gh is not None else "NS", league=LEAGUE, season="2024",
+                    fixture_id=str(fixture_id), home_team_id=home, away_team_id=away)
+
+def elo_rows(predictor):
+    with db.get_connection() as conn:
+        rows = conn.execute("""
+            SELECT fixture_id, selection, prob FROM predictions WHERE method = 'ELO' AND market = '1X2'
+        """).fetchall()
+    out = {}
+    for r in rows:
+        out.setdefault(str(r["fixture_id"]), {})[r["selection"]] = r["prob"]
+    return out
+
+def test_live_elo_uses_replayed_ratings_by_team_id():
+    # 101 domine 103, 102 perd contre 103 : ratings rejoués très différents
+    for i in range(12):
+        day = f"2024-01-{i + 1:02d}"
+        add_match(1000 + 2 * i, day, 101, 103, 3, 0)
+        add_match(1001 + 2 * i, day, 103, 102, 2, 0)
+    build_elo_history.main()
+
+    predictor = FootballPredictor()
+    today = predictor.today_str()
+    add_match(1, f"{today}T15:00:00+00:00", 101, 104)
+    add_match(2, f"{today}T17:00:00+00:00", 102, 104)
+    predictor.generate_all_predictions(incremental=False)
+
+    ratings = predictor.team_ratings(["101", "102"])
+    assert ratings["101"] > ratings["102"]
+    elo = elo_rows(predictor)
+    assert elo["1"]["H"] > elo["2"]["H"] + 0.1
+    assert predictor.predict_elo("101", "104", LEAGUE).home_prob == elo["1"]["H"]
+
+def test_teams_without_history_enter_at_league_offset():
+    save_league_params([{"league_id": LEAGUE, "offset": -60.0}])
+    for i in range(3):
+        add_match(2000 + i, f"2024-02-{i + 1:02d}", 201, 202, 1, 1)
+    add_match(3, "2099-01-01T15:00:00+00:00", 203, 201)  # promue : aucun match joué
+    build_elo_history.main()
+
+    ratings = FootballPredictor().team_ratings(["203"])
+    assert ratings["203"] == 1440.0
+
+def test_match_page_uses_league_params_like_predictions():
+    from src.services.elo_system import elo_system
+    from src.services.match_queries import match_queries
+
+    save_league_params([{"league_id": LEAGUE, "offset": -60.0, "home_advantage": 120.0}])
+    for i in range(6):
+        add_match(4000 + i, f"2024-03-{i + 1:02d}", 301, 302, 2, 0)
+    predictor = FootballPredictor()
+    today = predictor.today_str()
+    add_match(5, f"{today}T15:00:00+00:00", 305, 301)  # 305 : aucun match joué
+    build_elo_history.main()
+    elo_system.reload_config()
+
+    fx = match_queries.get_fixtures_page(today, LEAGUE)[0]
+    expected = predictor.predict_elo("305", "301", LEAGUE)
+    assert fx["home_elo"] == 1440.0
+    assert abs(fx["home_win_prob"] - expected.home_prob) < 1e-9
+
+    # sans ligne team_stats : rating d'entrée de la ligue, pas DEFAULT_ELO
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM team_stats WHERE team_id = '305'")
+        conn.commit()
+    fx = match_queries.get_fixtures_page(today, LEAGUE)[0]
+    assert fx["home_elo"] == 1440.0
+    assert abs(fx["home_win_prob"] - expected.home_prob) < 1e-9
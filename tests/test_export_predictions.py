@@ -0,0 +1,72 @@
+# tests/test_export_predictions.py
+import csv
+import json
+import os
+import datetime as dt
+
+import pytest
+
+from scripts import export_predictions as export
+from src.models.database import db
+
+TODAY = dt.datetime.utcnow().date().isoformat()
+YESTERDAY = (dt.datetime.utcnow().date() - dt.timedelta(days=1)).isoformat()
+
+@pytest.fixture(autouse=True)
+def out_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "OUT_DIR", str(tmp_path))
+    monkeypatch.setattr(export, "STATE_PATH", str(tmp_path / ".export_state.json"))
+    return tmp_path
+
+def predict(fixture_id, method, prob, created_at):
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM predictions WHERE fixture_id = ? AND method = ?", (fixture_id, method))
+        conn.execute("""
+            INSERT INTO predictions (fixture_id, date, method, market, selection, prob, created_at)
+            VALUES (?, ?, ?, '1X2', 'H', ?, ?)
+        """, (fixture_id, TODAY, method, prob, created_at))
+        conn.commit()
+
+def csv_rows(out_dir, day):
+    with open(out_dir / f"{day}.csv", newline="", encoding="utf-8") as f:
+        return [(r["fixture_id"], r["method"], float(r["prob"])) for r in csv.DictReader(f)]
+
+def test_full_export_writes_one_file_per_day(out_dir):
+    predict("1", "ELO", 0.5, f"{YESTERDAY} 10:00:00")
+    predict("2", "ELO", 0.6, f"{TODAY} 09:00:00")
+
+    export.main(["--days", "2", "--formats", "csv,json,ndjson"])
+
+    assert csv_rows(out_dir, YESTERDAY) == [("1", "ELO", 0.5)]
+    with open(out_dir / f"{TODAY}.json", encoding="utf-8") as f:
+        assert [r["fixture_id"] for r in json.load(f)] == ["2"]
+    with open(out_dir / f"{TODAY}.ndjson", encoding="utf-8") as f:
+        assert [json.loads(line)["prob"] for line in f] == [0.6]
+
+def test_incremental_rewrites_days_touched_by_repredictions(out_dir):
+    predict("1", "ELO", 0.5, f"{YESTERDAY} 10:00:00")
+    predict("2", "ELO", 0.6, f"{TODAY} 09:00:00")
+    export.main(["--days", "2", "--formats", "csv,json", "--incremental"])
+
+    # Re-prédiction (DELETE + INSERT, nouvel id) des deux matchs, dont un créé la veille
+    predict("1", "ELO", 0.55, f"{TODAY} 12:00:00")
+    predict("2", "ELO", 0.65, f"{TODAY} 12:00:00")
+    export.main(["--formats", "csv,json", "--incremental"])
+
+    assert csv_rows(out_dir, TODAY) == [("1", "ELO", 0.55), ("2", "ELO", 0.65)]
+    with open(out_dir / f"{TODAY}.json", encoding="utf-8") as f:
+        assert len(json.load(f)) == 2
+    # la veille ne contient plus aucune prédiction : ses fichiers sont supprimés
+    assert not os.path.exists(out_dir / f"{YESTERDAY}.csv")
+    assert not os.path.exists(out_dir / f"{YESTERDAY}.json")
+
+def test_incremental_without_changes_keeps_files(out_dir, capsys):
+    predict("1", "ELO", 0.5, f"{TODAY} 09:00:00")
+    export.main(["--formats", "csv", "--incremental"])
+    with open(export.STATE_PATH, encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["days"] == {TODAY: 1}
+
+    export.main(["--formats", "csv", "--incremental"])
+    assert "Aucune prédiction modifiée" in capsys.readouterr().out
+    assert csv_rows(out_dir, TODAY) == [("1", "ELO", 0.5)]
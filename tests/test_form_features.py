@@ -0,0 +1,29 @@
+# tests/test_form_features.py
+from src.models.database import db
+from src.services.form_features import form_features
+
+def add_result(fixture_id, date, home, away, gh, ga):
+    db.insert_match(date=date, home_team=home, away_team=away, home_score=gh, away_score=ga,
+                    status="FT", league="E0", season="2024", fixture_id=fixture_id)
+
+def test_windows_follow_calendar_order_with_mixed_date_formats():
+    # Dates Football-Data (dd/mm/yyyy) : l'ordre des chaînes serait 05/09 < 15/12 < 20/08
+    add_result("fd1", "20/08/2024", "X", "Y", 2, 0)
+    add_result("fd2", "05/09/2024", "X", "Z", 1, 1)
+    add_result("fd3", "15/12/2024", "Y", "X", 3, 0)
+    add_result("api1", "2025-01-10T15:00:00+00:00", "X", "Z", 1, 0)
+    form_features.update()
+
+    early = form_features.features_as_of("X", "2024-09-01")
+    assert early["fixture_id"] == "fd1"
+    assert early["played"] == 1 and early["pts_last5"] == 3
+
+    before_api = form_features.features_as_of("X", "2025-01-10")
+    assert before_api["fixture_id"] == "fd3"
+    assert before_api["played"] == 3 and before_api["pts_last5"] == 4
+
+    # Même coupure en lecture groupée, dates de match dans les deux formats
+    feats = form_features.fixture_features(["fd2", "api1"])
+    assert feats["fd2"]["home_played"] == 1
+    assert feats["api1"]["home_played"] == 3 and feats["api1"]["home_pts_last5"] == 4
+    assert form_features.features_as_of("X", "20/08/2024") is None
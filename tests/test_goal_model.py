@@ -0,0 +1,72 @@
+# tests/test_goal_model.py
+import numpy as np
+import pandas as pd
+
+from src.models.database import db
+from src.services import goal_model
+
+TEAMS = ["1", "2", "3", "4", "5", "6"]
+ATTACK = np.array([0.35, 0.2, 0.0, 0.0, -0.2, -0.35])
+DEFENCE = np.array([-0.3, -0.15, 0.0, 0.05, 0.15, 0.25])
+HOME_ADV = 0.25
+
+def simulate(rounds=40, seed=7, league="39", start="2024-01-01"):
+    """Double round-robin répété ; buts de Poisson avec les forces ci-dessus."""
+    rng = np.random.default_rng(seed)
+    rows, day = [], pd.Timestamp(start)
+    for _ in range(rounds):
+        for i in range(len(TEAMS)):
+            for j in range(len(TEAMS)):
+                if i == j:
+                    continue
+                gh = rng.poisson(np.exp(HOME_ADV + ATTACK[i] + DEFENCE[j]))
+                ga = rng.poisson(np.exp(ATTACK[j] + DEFENCE[i]))
+                rows.append({"day": day.strftime("%Y-%m-%d"), "league": league,
+                             "home": TEAMS[i], "away": TEAMS[j], "gh": gh, "ga": ga})
+        day += pd.Timedelta(days=1)
+    return pd.DataFrame(rows)
+
+def test_fit_recovers_simulated_strengths():
+    (fit,) = goal_model.fit_leagues(simulate(), decay=0.0)
+    assert fit["league"] == "39" and fit["teams"] == TEAMS and fit["matches"] == 40 * 30
+    assert abs(fit["home_adv"] - HOME_ADV) < 0.08
+    assert goal_model.RHO_BOUNDS[0] <= fit["rho"] <= goal_model.RHO_BOUNDS[1]
+    # forces identifiées à une constante près (a priori) : on compare les écarts
+    np.testing.assert_allclose(fit["attack"] - fit["attack"].mean(), ATTACK - ATTACK.mean(), atol=0.1)
+    np.testing.assert_allclose(fit["defence"] - fit["defence"].mean(), DEFENCE - DEFENCE.mean(), atol=0.1)
+    assert list(fit["team_matches"]) == [400] * 6
+
+def test_league_tasks_filter_and_weight_matches():
+    # 61 : 30 matchs, tous postérieurs à la référence
+    history = pd.concat([simulate(rounds=3), simulate(rounds=1, league="61", start="2024-01-05")])
+    tasks = goal_model.league_tasks(history, decay=0.01, reference_day="2024-01-02", min_matches=30)
+    (task,) = tasks
+    league, teams, h, a, x, y, w = task
+    assert league == "39" and teams == TEAMS
+    assert len(x) == 60                                       # jours 1 et 2 seulement
+    np.testing.assert_allclose(sorted(set(np.round(w, 12))), [np.exp(-0.01), 1.0])
+    assert goal_model.league_tasks(history, lookback_days=0, reference_day="2024-01-03", min_matches=60) == []
+
+def test_score_matrices_and_markets():
+    mats = goal_model.score_matrices(np.array([1.4, 0.9]), np.array([1.1, 1.6]), np.array([0.0, -0.1]))
+    np.testing.assert_allclose(mats.sum(axis=(1, 2)), 1.0)
+    markets = goal_model.market_probabilities(mats)
+    np.testing.assert_allclose(markets["home"] + markets["draw"] + markets["away"], 1.0)
+    # ρ = 0 : Poisson indépendants (à la troncature près)
+    p00 = np.exp(-1.4) * np.exp(-1.1)
+    assert abs(mats[0, 0, 0] - p00) < 1e-6
+    # ρ < 0 : plus de 0-0 et de 1-1, moins de 1-0 / 0-1
+    indep = goal_model.score_matrices(np.array([0.9]), np.array([1.6]), np.array([0.0]))
+    assert mats[1, 0, 0] > indep[0, 0, 0] and mats[1, 1, 1] > indep[0, 1, 1]
+    assert mats[1, 1, 0] < indep[0, 1, 0] and mats[1, 0, 1] < indep[0, 0, 1]
+
+def test_save_and_load_round_trip():
+    (fit,) = goal_model.fit_leagues(simulate(rounds=4), decay=0.0)
+    with db.get_connection() as conn:
+        goal_model.save_fits(conn, [fit], decay=0.0)
+        conn.commit()
+        loaded = goal_model.load_fits(conn, ["39", "61"])
+    assert set(loaded) == {"39"}
+    assert abs(loaded["39"]["home_adv"] - fit["home_adv"]) < 1e-12
+    att, dfn, n = loaded["39"]["teams"]["1"]
+    assert (att, dfn, n) == (float(fit["attack"][0]), float(fit["defence"][0]), 40)
@@ -0,0 +1,49 @@
+# tests/test_h2h_index.py
+from src.models.database import db
+from src.services.h2h_index import H2HIndex, h2h_index
+
+def add_result(fixture_id, date, home, away, gh, ga):
+    db.insert_match(date=date, home_team=f"Team {home}", away_team=f"Team {away}", home_score=gh, away_score=ga,
+                    status="FT", league="39", season="2324", fixture_id=str(fixture_id),
+                    home_team_id=home, away_team_id=away)
+
+def test_pair_summary_is_oriented_and_sorted_on_iso_day():
+    add_result(1, "15/03/2024", 1, 2, 2, 1)                  # Football-Data
+    add_result(2, "02/11/2023", 2, 1, 0, 0)
+    add_result(3, "2024-01-20T15:00:00+00:00", 2, 1, 3, 1)   # API-Football
+    assert h2h_index.update() == {"fixtures": 3, "pairs": 1}
+
+    summary = h2h_index.lookup(2, 1)
+    assert (summary["matches"], summary["home_wins"], summary["away_wins"], summary["draws"]) == (3, 1, 1, 1)
+    assert (summary["home_goals"], summary["away_goals"]) == (4, 3)
+    assert [r[0] for r in summary["last_results"]] == ["2024-03-15", "2024-01-20", "2023-11-02"]
+    assert summary["last_date"] == "2024-03-15"
+    assert h2h_index.lookup(1, 2)["home_wins"] == 1
+
+def test_update_merges_only_new_results():
+    index = H2HIndex(last_n=2)
+    add_result(1, "2024-01-01", 1, 2, 1, 0)
+    add_result(2, "2024-02-01", 2, 1, 1, 0)
+    index.update()
+    assert index.update() == {"fixtures": 0, "pairs": 0}
+
+    add_result(3, "2023-06-01", 1, 2, 0, 3)  # ancien résultat arrivé en retard
+    assert index.update() == {"fixtures": 1, "pairs": 1}
+    summary = index.lookup(1, 2)
+    assert (summary["matches"], summary["home_wins"], summary["away_wins"]) == (3, 1, 2)
+    assert [r[0] for r in summary["last_results"]] == ["2024-02-01", "2024-01-01"]
+
+def test_summaries_with_raw_dates_are_rebuilt():
+    add_result(1, "15/03/2024", 1, 2, 2, 1)
+    with db.get_connection() as conn:
+        conn.execute("""
+            INSERT INTO h2h_summary (team_a, team_b, matches, a_wins, b_wins, draws, a_goals, b_goals,
+                                     last_results, last_date)
+            VALUES ('1', '2', 1, 1, 0, 0, 2, 1, '[["15/03/2024", "1", 2, 1]]', '15/03/2024')
+        """)
+        conn.execute("INSERT INTO h2h_processed (fixture_id) VALUES ('1')")
+        conn.commit()
+
+    assert h2h_index.update() == {"fixtures": 1, "pairs": 1}
+    summary = h2h_index.lookup(1, 2)
+    assert summary["matches"] == 1 and summary["last_date"] == "2024-03-15"
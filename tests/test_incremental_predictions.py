@@ -0,0 +1,35 @@
+# tests/test_incremental_predictions.py
+from scripts.generate_predictions import FootballPredictor
+from src.models.database import db
+
+def add_fixture(fixture_id, date, home, away):
+    db.insert_match(date=date, home_team=f"Team {home}", away_team=f"Team {away}", status="NS", league="39",
+                    season="2024", fixture_id=str(fixture_id), home_team_id=home, away_team_id=away)
+
+def elo_home_prob(fixture_id):
+    with db.get_connection() as conn:
+        row = conn.execute("""
+            SELECT prob FROM predictions WHERE fixture_id = ? AND method = 'ELO' AND selection = 'H'
+        """, (str(fixture_id),)).fetchone()
+    return row["prob"]
+
+def test_rating_change_repredicts_only_that_fixture():
+    predictor = FootballPredictor()
+    today = predictor.today_str()
+    add_fixture(1, f"{today}T15:00:00+00:00", 301, 302)
+    add_fixture(2, f"{today}T17:00:00+00:00", 303, 304)
+
+    first = predictor.generate_all_predictions(incremental=True)
+    assert first["fixtures"] == 2
+    before = elo_home_prob(1)
+
+    again = predictor.generate_all_predictions(incremental=True)
+    assert again["fixtures"] == 0 and again["unchanged"] == 2
+
+    # Seul le rating d'une équipe change (nouveau build_elo_history) : son match est recalculé
+    with db.get_connection() as conn:
+        conn.execute("UPDATE team_stats SET elo = 1600 WHERE team_id = '301'")
+        conn.commit()
+    after = predictor.generate_all_predictions(incremental=True)
+    assert after["fixtures"] == 1 and after["unchanged"] == 1
+    assert elo_home_prob(1) > before
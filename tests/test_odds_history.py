@@ -0,0 +1,78 @@
+# tests/test_odds_history.py
+from src.models.database import db
+from src.services.odds_history import MARKET_OU25, odds_history, snapshot_rows
+from src.services.odds_parser import MARKET_1X2, MARKET_BTTS, BookmakerOdds
+
+T0 = 1_700_000_000
+HOUR = 3600
+
+def book(bm_id, home, draw, away, over=None, under=None):
+    b = BookmakerOdds(bm_id, f"bm{bm_id}")
+    b.home, b.draw, b.away = home, draw, away
+    if over is not None:
+        b.ou[2.5] = [over, under]
+    return b
+
+def record(fixture_id, books, ts):
+    with db.get_connection() as conn:
+        n = odds_history.record(conn, snapshot_rows(fixture_id, books, ts))
+        conn.commit()
+    return n
+
+def snapshots(fixture_id, market=MARKET_1X2):
+    with db.get_connection() as conn:
+        return [tuple(r) for r in conn.execute("""
+            SELECT ts, p1, p2, p3 FROM odds_snapshots WHERE fixture_id = ? AND market = ? ORDER BY ts
+        """, (fixture_id, market)).fetchall()]
+
+def test_snapshot_rows_keep_complete_markets_only():
+    b = book(8, 2.0, 3.4, 3.6, over=1.9, under=1.95)
+    b.btts_yes = 1.8  # marché incomplet : pas de ligne
+    assert snapshot_rows(1, [b, book(6, 2.1, None, 3.5)], T0) == [
+        ("1", MARKET_1X2, 8, T0, 2.0, 3.4, 3.6),
+        ("1", MARKET_OU25, 8, T0, 1.9, 1.95, None),
+    ]
+    assert all(r[1] != MARKET_BTTS for r in snapshot_rows(1, [b], T0))
+
+def test_unchanged_captures_are_not_written():
+    assert record(1, [book(8, 2.0, 3.4, 3.6)], T0) == 1
+    assert record(1, [book(8, 2.0, 3.4, 3.6)], T0 + 60) == 0
+    assert record(1, [book(8, 1.9, 3.4, 3.8)], T0 + 120) == 1
+    assert record(1, [book(8, 2.0, 3.4, 3.6)], T0 + 180) == 1  # retour au prix d'ouverture : un mouvement
+
+    with db.get_connection() as conn:
+        moves = odds_history.movement(conn, ["1"])
+    entry = moves[("1", 8)]
+    assert entry["opening"] == (2.0, 3.4, 3.6) and entry["opened_at"] == T0
+    assert entry["closing"] == (2.0, 3.4, 3.6) and entry["closed_at"] == T0 + 180
+    assert entry["moves"] == 2
+
+def test_compact_keeps_opening_and_last_capture_per_bucket():
+    # Match inactif : une capture toutes les 10 min pendant 3 h, le prix ne change qu'une fois
+    for i in range(18):
+        home = 2.0 if i < 9 else 1.9
+        record(1, [book(8, home, 3.4, 3.6 + 0.01 * i)], T0 + 600 * i)
+    # Match encore actif : pas touché
+    record(2, [book(8, 2.0, 3.4, 3.6)], T0 + 10 * 86400)
+    record(2, [book(8, 2.1, 3.4, 3.5)], T0 + 10 * 86400 + 60)
+
+    result = odds_history.compact(idle_days=3, bucket_s=HOUR, lookback_days=None, now=T0 + 10 * 86400 + 120)
+
+    # T0 tombe 800 s après le début d'une tranche horaire : tranches = captures 0-4, 5-10, 11-16, 17
+    kept = [ts for ts, *_ in snapshots("1")]
+    assert kept == [T0 + 600 * i for i in (0, 4, 10, 16, 17)]  # ouverture + dernière de chaque tranche
+    assert len(snapshots("2")) == 2
+    assert result["downsampled"] == 18 - len(kept) and result["remaining"] == len(kept) + 2
+
+def test_compact_merges_captures_equal_to_the_previous_one():
+    # Prix A, B, A, A sur des heures distinctes : après le sous-échantillonnage rien à supprimer
+    # puis la dernière capture A, identique à la précédente, est fusionnée
+    for i, home in enumerate([2.0, 1.9, 2.0]):
+        record(1, [book(8, home, 3.4, 3.6)], T0 + HOUR * i)
+    with db.get_connection() as conn:  # capture identique écrite hors record() (import brut)
+        conn.execute("INSERT INTO odds_snapshots VALUES ('1', '1x2', 8, ?, 2.0, 3.4, 3.6)", (T0 + HOUR * 3,))
+        conn.commit()
+
+    result = odds_history.compact(idle_days=1, bucket_s=HOUR, lookback_days=None, now=T0 + 5 * 86400)
+    assert result == {"downsampled": 0, "merged": 1, "remaining": 3}
+    assert [ts for ts, *_ in snapshots("1")] == [T0, T0 + HOUR, T0 + 2 * HOUR]
@@ -0,0 +1,51 @@
+# tests/test_odds_neighbours.py
+import numpy as np
+
+from src.services import odds_neighbours
+from src.services.odds_neighbours import HOME, NeighbourIndex, implied, outcomes
+
+def history(n=200, seed=3):
+    rng = np.random.default_rng(seed)
+    odds = np.column_stack([rng.uniform(1.3, 6.0, n), rng.uniform(2.8, 4.5, n), rng.uniform(1.3, 8.0, n)])
+    return implied(odds), outcomes(rng.integers(0, 4, n), rng.integers(0, 4, n))
+
+def test_visible_prefix_matches_an_index_built_on_that_prefix():
+    points, results = history()
+    index = NeighbourIndex(points, results)
+    queries = points[[10, 50, 150]] + 0.01
+    visible = np.array([40, 120, 200])
+
+    masked = index.query(queries, k=15, min_radius=0.02, visible=visible)
+    for i, limit in enumerate(visible):
+        alone = NeighbourIndex(points[:limit], results[:limit]).query(queries[i], k=15, min_radius=0.02)
+        np.testing.assert_allclose(masked["estimates"][i], alone["estimates"][0])
+        assert masked["samples"][i] == alone["samples"][0]
+        np.testing.assert_allclose(masked["radius"][i], alone["radius"][0])
+
+def test_hidden_points_never_leak_even_when_nearest():
+    points, results = history(50)
+    # le point 49 (invisible) est exactement la requête et a gagné à domicile
+    points[49], results[49] = [0.6, 0.25, 0.15], [1, 0, 0, 1, 1]
+    results[:49, HOME] = 0
+    index = NeighbourIndex(points, results)
+
+    out = index.query(points[49], k=5, min_radius=0.01, visible=[49])
+    assert out["estimates"][0, HOME] == 0.0
+    assert index.query(points[49], k=5, min_radius=0.01)["estimates"][0, HOME] > 0.0
+
+def test_too_few_visible_points_give_nan():
+    points, results = history(30)
+    out = NeighbourIndex(points, results).query(points[:2], k=10, min_radius=0.02, min_samples=5, visible=[4, 30])
+    assert np.isnan(out["estimates"][0]).all() and out["samples"][0] == 0 and out["confidence"][0] == 0.0
+    assert out["samples"][1] == 10
+
+def test_chunked_distance_blocks_give_the_same_result(monkeypatch):
+    points, results = history()
+    index = NeighbourIndex(points, results)
+    visible = np.arange(20, 200, 9)
+    queries = points[visible - 1]
+    full = index.query(queries, k=12, min_radius=0.03, visible=visible)
+    monkeypatch.setattr(odds_neighbours, "MAX_CELLS", 3 * len(points))  # 3 requêtes par bloc
+    chunked = index.query(queries, k=12, min_radius=0.03, visible=visible)
+    for key in ("estimates", "samples", "radius", "confidence"):
+        np.testing.assert_allclose(full[key], chunked[key])
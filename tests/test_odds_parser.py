@@ -0,0 +1,51 @@
+# tests/test_odds_parser.py
+from src.services.odds_parser import (MARKET_1X2, STORED_MARKETS, parse_bookmaker, parse_bookmakers,
+                                      parse_odds_payload)
+
+def bet(bet_id, name, *values):
+    return {"id": bet_id, "name": name, "values": [{"value": v, "odd": o} for v, o in values]}
+
+BOOKMAKER = {
+    "id": 8, "name": "Bet365",
+    "bets": [
+        bet(1, "Match Winner", ("Home", "2.10"), ("Draw", "3.40"), ("Away", "3.60")),
+        bet(5, "Goals Over/Under", ("Over 2.5", "1.90"), ("Under 2.5", "1.95"), ("Over 1.5", "1.30")),
+        bet(8, "Both Teams Score", ("Yes", "1.80"), ("No", "2.00")),
+        bet(4, "Asian Handicap", ("Home -0.5", "2.05"), ("Away -0.5", "1.85"),
+            ("Home +1", "1.40"), ("Away +1", "3.00")),
+        bet(12, "Double Chance", ("Home/Draw", "1.30"), ("Home/Away", "1.33"), ("Draw/Away", "1.75")),
+        bet(10, "Exact Score", ("1:0", "7.50"), ("2-1", "9.00"), ("1:1", "1.00")),
+        bet(13, "First Half Winner", ("Home", "2.90"), ("Draw", "2.10"), ("Away", "4.10")),
+    ],
+}
+
+def test_full_payload_round_trip():
+    (b,) = parse_odds_payload({"response": [{"bookmakers": [BOOKMAKER]}]})
+    assert (b.id, b.name) == (8, "Bet365")
+    assert b.x12 == (2.10, 3.40, 3.60)  # « First Half Winner » (id 13) ne remplace pas le 1X2
+    assert b.ou25 == (1.90, 1.95) and b.ou[1.5] == [1.30, None]
+    assert b.btts == (1.80, 2.00)
+    assert b.dc == [1.30, 1.33, 1.75]
+    assert b.cs == {"1:0": 7.50, "2:1": 9.00}  # cote 1.00 rejetée, « 2-1 » normalisé
+
+def test_asian_handicap_lines_are_home_side():
+    (b,) = parse_bookmakers([BOOKMAKER])
+    # « Away -0.5 » = « Home +0.5 » ; « Away +1 » = « Home -1 »
+    assert b.ah == {-0.5: [2.05, None], 0.5: [None, 1.85], 1.0: [1.40, None], -1.0: [None, 3.00]}
+
+def test_bets_without_ids_are_routed_by_name():
+    bm = {"id": "6", "name": "Bwin", "bets": [
+        {"name": "Second Half Winner", "values": [{"value": "Home", "odd": "2.5"}]},
+        {"name": "Fulltime Result", "values": [{"value": "1", "odd": "1.5"}, {"value": "X", "odd": "4"},
+                                                 {"value": "2", "odd": "6"}]},
+        {"name": "Correct Score", "values": [{"value": "0:0", "odd": "11"}]},
+    ]}
+    b = parse_bookmaker(bm)
+    assert b.id == 6 and b.x12 == (1.5, 4.0, 6.0) and b.cs == {"0:0": 11.0}
+
+def test_market_filter_and_invalid_bookmakers():
+    (b,) = parse_bookmakers([BOOKMAKER, {"id": None, "bets": []}], markets=frozenset({MARKET_1X2}))
+    assert b.has_1x2() and b.ou == {} and b.ah == {} and b.cs == {}
+    (b,) = parse_bookmakers([BOOKMAKER], markets=STORED_MARKETS)
+    assert b.ou25 == (1.90, 1.95) and b.dc == [None, None, None]
+    assert parse_odds_payload({"response": []}) == []
@@ -0,0 +1,35 @@
+# tests/test_odds_scheduler.py
+from datetime import datetime, timedelta, timezone
+
+from scripts.fetch_today import parse_and_store_fixture
+from src.models.database import db
+from src.services.odds_scheduler import OddsScheduler, TokenBucket
+
+def api_fixture(fixture_id, kickoff, home, away):
+    """Réponse /fixtures d'API-Football (ligue 39) telle que fetch_today la reçoit."""
+    return {
+        "fixture": {"id": fixture_id, "date": kickoff.isoformat(), "status": {"short": "NS"}},
+        "league": {"id": 39, "season": 2024},
+        "teams": {"home": {"id": home, "name": f"Team {home}"}, "away": {"id": away, "name": f"Team {away}"}},
+        "goals": {"home": None, "away": None},
+        "score": {},
+    }
+
+def test_fetch_today_fixtures_are_polled_in_one_league_call():
+    kickoff = (datetime.now(timezone.utc) + timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+    with db.get_connection() as conn:
+        for i in range(3):
+            assert parse_and_store_fixture(api_fixture(500 + i, kickoff, 10 + 2 * i, 11 + 2 * i), conn=conn)
+        conn.commit()
+
+    calls = []
+    def poll(group, coalesce):
+        calls.append((coalesce, sorted(e.fixture_id for e in group), {e.league_id for e in group}))
+        return {}
+
+    scheduler = OddsScheduler(poll, bucket=TokenBucket(rate_per_min=600, burst=10))
+    with db.get_connection() as conn:
+        assert scheduler.load(conn) == 3
+    scheduler.run_once()
+
+    assert calls == [(True, ["500", "501", "502"], {39})]
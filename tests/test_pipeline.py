@@ -0,0 +1,54 @@
+# tests/test_pipeline.py
+from src.models.database import db
+from src.services.pipeline import Pipeline, Stage
+
+def add_team(team_id, elo=1500.0):
+    with db.get_connection() as conn:
+        conn.execute("INSERT OR REPLACE INTO team_stats (team_id, elo) VALUES (?, ?)", (str(team_id), elo))
+        conn.commit()
+
+def by_stage(report):
+    return {r["stage"]: r["status"] for r in report}
+
+def test_dependencies_follow_declared_tables():
+    pipeline = Pipeline([
+        Stage("ingest", lambda: None, outputs=("matches",)),
+        Stage("elo", lambda: None, inputs=("matches",), outputs=("team_stats",)),
+        Stage("predict", lambda: None, inputs=("team_stats", "odds"), outputs=("predictions",)),
+        Stage("odds", lambda: None, outputs=("odds",)),  # déclarée après predict : pas une dépendance
+    ])
+    assert pipeline.dependencies() == {"ingest": set(), "elo": {"ingest"}, "predict": {"elo"}, "odds": set()}
+
+def test_unchanged_inputs_are_skipped_until_a_table_moves():
+    calls = []
+    pipeline = Pipeline([Stage("predict", lambda: calls.append(1), inputs=("team_stats",))])
+    add_team(1)
+
+    assert by_stage(pipeline.run()) == {"predict": "ok"}
+    assert by_stage(pipeline.run()) == {"predict": "skipped"}
+    add_team(1, 1520.0)  # mise à jour en place : TOTAL(elo) change
+    assert by_stage(pipeline.run()) == {"predict": "ok"}
+    assert by_stage(pipeline.run(force=True)) == {"predict": "ok"}
+    assert len(calls) == 3
+
+def test_failure_blocks_dependents_only():
+    def boom():
+        raise RuntimeError("API indisponible")
+    ran = []
+    pipeline = Pipeline([
+        Stage("fetch", boom, outputs=("matches",), always=True),
+        Stage("elo", lambda: ran.append("elo"), inputs=("matches",), outputs=("team_stats",)),
+        Stage("predict", lambda: ran.append("predict"), inputs=("team_stats",)),
+        Stage("export", lambda: ran.append("export"), inputs=("predictions",)),
+    ])
+    report = pipeline.run()
+
+    assert by_stage(report) == {"fetch": "failed", "elo": "blocked", "predict": "blocked", "export": "ok"}
+    assert ran == ["export"]
+    # l'échec n'enregistre pas d'empreinte : l'étape n'est pas sautée au passage suivant
+    assert pipeline.load_state()["fetch"]["fingerprint"] is None
+
+def test_nonzero_exit_code_is_a_warning_and_not_memoised():
+    pipeline = Pipeline([Stage("export", lambda: 1, inputs=("predictions",))])
+    assert by_stage(pipeline.run()) == {"export": "warn"}
+    assert by_stage(pipeline.run()) == {"export": "warn"}
@@ -0,0 +1,17 @@
+# tests/test_stats_analyzer.py
+from src.models.database import db
+from src.services.stats_analyzer import StatsAnalyzer
+
+def add_result(fixture_id, date, home, away, gh, ga):
+    db.insert_match(date=date, home_team=home, away_team=away, home_score=gh, away_score=ga,
+                    status="FT", league="E0", season="2024-25", fixture_id=fixture_id)
+
+def test_form_points_use_latest_matches_with_fd_dates():
+    # En texte, 31/08 > 28/09 > 02/11 : la forme prendrait le match le plus ancien
+    add_result("fd1", "31/08/2024", "X", "Y", 2, 0)   # victoire, la plus ancienne
+    add_result("fd2", "28/09/2024", "Z", "X", 1, 1)   # nul
+    add_result("fd3", "02/11/2024", "X", "Z", 0, 1)   # défaite, la plus récente
+
+    stats = StatsAnalyzer().get_league_season_stats("E0", 2024, form_matches=2)
+    assert stats["X"]["matches_played"] == 3
+    assert stats["X"]["form_points"] == 1
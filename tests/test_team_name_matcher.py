@@ -0,0 +1,29 @@
+# tests/test_team_name_matcher.py
+from src.services.team_name_matcher import TeamNameIndex, normalize_name, score_names
+
+LALIGA = [{"id": 541, "name": "Real Madrid"}, {"id": 530, "name": "Atletico Madrid"},
+          {"id": 531, "name": "Athletic Club"}, {"id": 543, "name": "Real Betis"}]
+EPL = [{"id": 33, "name": "Manchester United"}, {"id": 50, "name": "Manchester City"},
+       {"id": 74, "name": "Sheffield Wednesday"}, {"id": 65, "name": "Nottingham Forest"}]
+
+def test_fd_abbreviations_match_their_club():
+    index = TeamNameIndex(LALIGA + EPL)
+    assert index.match("Ath Madrid")[0]["id"] == 530
+    assert index.match("Man United")[0]["id"] == 33
+    assert index.match("Man City")[0]["id"] == 50
+    assert index.match("Sheffield Weds")[0]["id"] == 74
+    assert index.match("Nott'm Forest")[0]["id"] == 65
+
+def test_no_false_positive_without_the_right_club():
+    # Atlético absent de l'index : l'ancien boost donnait Real Madrid à 0.76
+    index = TeamNameIndex([t for t in LALIGA if t["id"] != 530])
+    assert index.match("Ath Madrid") is None
+    assert score_names(normalize_name("Ath Madrid"), normalize_name("Real Madrid")) < 0.75
+
+def test_ambiguous_generic_name_is_not_matched():
+    assert TeamNameIndex(LALIGA).match("Real") is None
+
+def test_typos_still_match():
+    index = TeamNameIndex([{"id": 171, "name": "Nuernberg"}, {"id": 169, "name": "Eintracht Frankfurt"}])
+    assert index.match("Nurnberg")[0]["id"] == 171
+    assert index.match("Ein Frankfurt")[0]["id"] == 169
@@ -0,0 +1,33 @@
+# tests/test_team_resolver.py
+from src.models.database import db
+from src.services.team_resolver import TeamResolver, name_alias
+
+def resolver():
+    return TeamResolver(mapping_path="/nonexistent/team_mapping.json").load()
+
+def test_api_id_takes_over_synthetic_id():
+    fd = resolver()
+    synthetic = fd.resolve("Ath Madrid", league="SP1")
+    assert synthetic < 0
+    db.insert_match(date="2024-01-01", home_team="Ath Madrid", away_team="Getafe", home_score=2, away_score=0,
+                    status="FT", league="SP1", season="2324", fixture_id="fd-1",
+                    home_team_id=synthetic, away_team_id=fd.resolve("Getafe", league="SP1"))
+    fd.flush()
+    with db.get_connection() as conn:
+        # code Football-Data : pas d'id de ligue API dans teams.league_id
+        assert conn.execute("SELECT league_id FROM teams WHERE team_id = ?", (synthetic,)).fetchone()[0] is None
+
+    api = resolver()
+    assert api.resolve("Ath Madrid", 530) == 530
+    assert api.resolve("Ath Madrid") == 530
+    api.flush()
+
+    with db.get_connection() as conn:
+        assert int(conn.execute("SELECT home_team_id FROM matches WHERE fixture_id = 'fd-1'").fetchone()[0]) == 530
+        assert conn.execute("SELECT team_id FROM team_aliases WHERE alias = ?",
+                            (name_alias("Ath Madrid"),)).fetchone()[0] == 530
+        assert conn.execute("SELECT COUNT(*) FROM teams WHERE team_id = ?", (synthetic,)).fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM team_stats WHERE team_id = ?", (str(synthetic),)).fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM team_stats WHERE team_id = '530'").fetchone()[0] == 1
+    # un nouveau chargement voit l'alias re-pointé
+    assert resolver().resolve("Ath Madrid") == 530